@@ -87,6 +87,7 @@
 #include "openmm/VirtualSite.h"
 #include "openmm/Platform.h"
 #include "openmm/serialization/XmlSerializer.h"
+#include "openmm/serialization/BinarySerializer.h"
 #include "openmm/ATMForce.h"
 
 #endif /*OPENMM_H_*/
@@ -0,0 +1,123 @@
+#ifndef OPENMM_BINARY_SERIALIZER_H_
+#define OPENMM_BINARY_SERIALIZER_H_
+
+/* -------------------------------------------------------------------------- *
+ *                                   OpenMM                                   *
+ * -------------------------------------------------------------------------- *
+ * This is part of the OpenMM molecular simulation toolkit.                   *
+ * See https://openmm.org/development.                                        *
+ *                                                                            *
+ * Portions copyright (c) 2026 Stanford University and the Authors.           *
+ * Authors:                                                                   *
+ * Contributors:                                                              *
+ *                                                                            *
+ * Permission is hereby granted, free of charge, to any person obtaining a    *
+ * copy of this software and associated documentation files (the "Software"), *
+ * to deal in the Software without restriction, including without limitation  *
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,   *
+ * and/or sell copies of the Software, and to permit persons to whom the      *
+ * Software is furnished to do so, subject to the following conditions:       *
+ *                                                                            *
+ * The above copyright notice and this permission notice shall be included in *
+ * all copies or substantial portions of the Software.                        *
+ *                                                                            *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR *
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,   *
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL    *
+ * THE AUTHORS, CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,    *
+ * DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR      *
+ * OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE  *
+ * USE OR OTHER DEALINGS IN THE SOFTWARE.                                     *
+ * -------------------------------------------------------------------------- */
+
+#include "openmm/serialization/SerializationNode.h"
+#include "openmm/serialization/SerializationProxy.h"
+#include "openmm/OpenMMException.h"
+#include "openmm/internal/windowsExport.h"
+#include <iosfwd>
+
+namespace OpenMM {
+
+/**
+ * BinarySerializer is used for serializing objects in a compact binary format, and for reconstructing
+ * them again.  It is an alternative to XmlSerializer that produces much smaller output and is much faster
+ * to read and write, especially for large Systems and States.  The output is not human readable and should
+ * be treated as an opaque block of binary data.
+ *
+ * The format is versioned and uses little endian byte order on all platforms.  Numeric property values
+ * are stored in binary form, and sequences of child nodes that all have the same name and properties
+ * (such as the particles in a System or the exceptions in a NonbondedForce) are stored as a table, with
+ * the values of each property packed into a contiguous array.  Deserializing the output reproduces exactly
+ * the same SerializationNodes that were written, so objects are reconstructed identically to XmlSerializer.
+ */
+
+class OPENMM_EXPORT BinarySerializer {
+public:
+    /**
+     * The version of the binary format written by this class.
+     */
+    static const int FORMAT_VERSION = 1;
+    /**
+     * Serialize an object in binary format.
+     *
+     * @param object    the object to serialize
+     * @param rootName  the name to use for the root node
+     * @param stream    an output stream to write the data to.  It should be opened in binary mode.
+     */
+    template <class T>
+    static void serialize(const T* object, const std::string& rootName, std::ostream& stream) {
+        const SerializationProxy& proxy = SerializationProxy::getProxy(typeid(*object));
+        SerializationNode node;
+        node.setName(rootName);
+        proxy.serialize(object, node);
+        if (node.hasProperty("type"))
+            throw OpenMMException(proxy.getTypeName()+" created node with reserved property 'type'");
+        node.setStringProperty("type", proxy.getTypeName());
+        serialize(node, stream);
+    }
+    /**
+     * Reconstruct an object that has been serialized in binary format.
+     *
+     * @param stream    an input stream to read the data from.  It should be opened in binary mode.
+     * @return a pointer to the newly created object.  The caller assumes ownership of the object.
+     */
+    template <class T>
+    static T* deserialize(std::istream& stream) {
+        return reinterpret_cast<T*>(deserializeStream(stream));
+    }
+    /**
+     * Clone an object by first serializing it, then deserializing it again.  Like XmlSerializer::clone(),
+     * this constructs the new object directly from the SerializationNodes without encoding them.
+     */
+    template <class T>
+    static T* clone(const T& object) {
+        const SerializationProxy& proxy = SerializationProxy::getProxy(typeid(object));
+        SerializationNode node;
+        proxy.serialize(&object, node);
+        return reinterpret_cast<T*>(proxy.deserialize(node));
+    }
+    /**
+     * Write a tree of SerializationNodes to a stream in binary format.
+     *
+     * @param node      the root node of the tree to write
+     * @param stream    an output stream to write the data to
+     */
+    static void serialize(const SerializationNode& node, std::ostream& stream);
+    /**
+     * Read a tree of SerializationNodes that was written by serialize().
+     *
+     * @param stream    an input stream to read the data from
+     * @param node      the contents of the root node are stored into this
+     */
+    static void deserialize(std::istream& stream, SerializationNode& node);
+private:
+    class Writer;
+    class Reader;
+    static void* deserializeStream(std::istream& stream);
+    static const std::string& getPropertyData(const SerializationNode& node);
+    static std::string& getPropertyData(SerializationNode& node);
+};
+
+} // namespace OpenMM
+
+#endif /*OPENMM_BINARY_SERIALIZER_H_*/
@@ -261,6 +261,7 @@ public:
         return reinterpret_cast<T*>(SerializationProxy::getProxy(getStringProperty("type")).deserialize(*this));
     }
 private:
+    friend class BinarySerializer;
     const char* findPropertyValue(const std::string& name, bool required) const;
     std::string name;
     std::vector<SerializationNode> children;
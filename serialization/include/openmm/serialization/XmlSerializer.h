@@ -72,6 +72,20 @@ public:
     static T* deserialize(std::istream& stream) {
         return reinterpret_cast<T*>(deserializeStream(stream));
     }
+    /**
+     * Reconstruct an object that has been serialized as XML, reading the input incrementally.  This produces
+     * the same result as deserialize(), but the input is read in small pieces and is never held in memory all
+     * at once.  When reconstructing a System, each Force is created as soon as its XML element has been read,
+     * and the information describing it is then discarded.  This greatly reduces the memory required to load
+     * very large Systems.
+     *
+     * @param stream    an input stream to read the XML from
+     * @return a pointer to the newly created object.  The caller assumes ownership of the object.
+     */
+    template <class T>
+    static T* deserializeIncrementally(std::istream& stream) {
+        return reinterpret_cast<T*>(deserializeStreamIncrementally(stream));
+    }
     /**
      * Clone an object by first serializing it, then deserializing it again.  This method constructs the
      * new object directly from the SerializationNodes without first converting them to XML.  This means
@@ -86,8 +100,10 @@ public:
     }
 private:
     class StreamReader;
+    class IncrementalParser;
     static void serialize(const SerializationNode& node, std::ostream& stream);
     static void* deserializeStream(std::istream& stream);
+    static void* deserializeStreamIncrementally(std::istream& stream);
     static void encodeNode(const SerializationNode& node, std::ostream& stream, int depth);
 };
 
@@ -0,0 +1,446 @@
+/* -------------------------------------------------------------------------- *
+ *                                   OpenMM                                   *
+ * -------------------------------------------------------------------------- *
+ * This is part of the OpenMM molecular simulation toolkit.                   *
+ * See https://openmm.org/development.                                        *
+ *                                                                            *
+ * Portions copyright (c) 2026 Stanford University and the Authors.           *
+ * Authors:                                                                   *
+ * Contributors:                                                              *
+ *                                                                            *
+ * Permission is hereby granted, free of charge, to any person obtaining a    *
+ * copy of this software and associated documentation files (the "Software"), *
+ * to deal in the Software without restriction, including without limitation  *
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,   *
+ * and/or sell copies of the Software, and to permit persons to whom the      *
+ * Software is furnished to do so, subject to the following conditions:       *
+ *                                                                            *
+ * The above copyright notice and this permission notice shall be included in *
+ * all copies or substantial portions of the Software.                        *
+ *                                                                            *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR *
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,   *
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL    *
+ * THE AUTHORS, CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,    *
+ * DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR      *
+ * OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE  *
+ * USE OR OTHER DEALINGS IN THE SOFTWARE.                                     *
+ * -------------------------------------------------------------------------- */
+
+#include "openmm/serialization/BinarySerializer.h"
+#include <cstdint>
+#include <cstring>
+#include <iostream>
+#include <iterator>
+
+using namespace OpenMM;
+using namespace std;
+
+extern "C" char* g_fmt(char*, double);
+extern "C" double strtod2(const char* s00, char** se);
+
+/**
+ * Every encoded tree begins with these four bytes, followed by the format version.
+ */
+static const char MAGIC[] = {'O', 'M', 'M', 'B'};
+
+/**
+ * Codes identifying how a property value or a group of child nodes is stored.
+ */
+enum ValueType {STRING_VALUE = 0, INT32_VALUE = 1, INT64_VALUE = 2, DOUBLE_VALUE = 3};
+enum GroupType {SINGLE_NODE = 0, NODE_TABLE = 1};
+
+/**
+ * Determine whether a property value is the string representation of an integer, formatted exactly as
+ * SerializationNode::setLongProperty() would format it.
+ */
+static bool parseInt(const char* value, long long& result) {
+    const char* p = value;
+    bool negative = (*p == '-');
+    if (negative)
+        p++;
+    if (*p < '0' || *p > '9' || (*p == '0' && (p[1] != 0 || negative)))
+        return false;
+    unsigned long long magnitude = 0;
+    for (int digits = 0; *p != 0; p++, digits++) {
+        if (*p < '0' || *p > '9' || digits == 18)
+            return false;
+        magnitude = 10*magnitude + (*p-'0');
+    }
+    result = (negative ? -(long long) magnitude : (long long) magnitude);
+    return true;
+}
+
+/**
+ * Determine whether a property value is the string representation of a double, formatted exactly as
+ * SerializationNode::setDoubleProperty() would format it.
+ */
+static bool parseDouble(const char* value, double& result) {
+    if (value[0] == 0)
+        return false;
+    result = strtod2(value, NULL);
+    char buffer[32];
+    g_fmt(buffer, result);
+    return strcmp(buffer, value) == 0;
+}
+
+static bool fitsInt32(long long value) {
+    return value >= INT32_MIN && value <= INT32_MAX;
+}
+
+/**
+ * Append the decimal representation of an integer to a string.
+ */
+static void appendInt(string& output, long long value) {
+    char buffer[24];
+    char* end = buffer+sizeof(buffer);
+    char* p = end;
+    unsigned long long magnitude = (value < 0 ? 0ULL-(unsigned long long) value : (unsigned long long) value);
+    do {
+        *--p = (char) ('0'+magnitude%10);
+        magnitude /= 10;
+    } while (magnitude != 0);
+    if (value < 0)
+        *--p = '-';
+    output.append(p, end-p);
+}
+
+/**
+ * Get pointers to the names and values of all properties of a node, in the order they were set.
+ * The properties of a SerializationNode are stored as a sequence of null terminated strings.
+ */
+static void getProperties(const string& data, vector<const char*>& names, vector<const char*>& values) {
+    size_t start = 0;
+    while (start < data.size()) {
+        names.push_back(&data[start]);
+        start += strlen(&data[start])+1;
+        values.push_back(&data[start]);
+        start += strlen(&data[start])+1;
+    }
+}
+
+/**
+ * Determine whether two nodes have properties with the same names in the same order.
+ */
+static bool sameProperties(const string& data1, const string& data2) {
+    size_t start1 = 0, start2 = 0;
+    while (start1 < data1.size() && start2 < data2.size()) {
+        const char* name = &data1[start1];
+        if (strcmp(name, &data2[start2]) != 0)
+            return false;
+        size_t length = strlen(name)+1;
+        start1 += length;
+        start2 += length;
+        start1 += strlen(&data1[start1])+1;
+        start2 += strlen(&data2[start2])+1;
+    }
+    return start1 == data1.size() && start2 == data2.size();
+}
+
+const string& BinarySerializer::getPropertyData(const SerializationNode& node) {
+    return node.properties;
+}
+
+string& BinarySerializer::getPropertyData(SerializationNode& node) {
+    return node.properties;
+}
+
+/**
+ * This class accumulates the encoded data in memory.  All values are written in little endian byte order.
+ */
+class BinarySerializer::Writer {
+public:
+    void writeByte(int value) {
+        data.push_back((char) value);
+    }
+    void writeUInt32(uint32_t value) {
+        char bytes[4];
+        for (int i = 0; i < 4; i++)
+            bytes[i] = (char) ((value >> (8*i)) & 0xFF);
+        data.append(bytes, 4);
+    }
+    void writeUInt64(uint64_t value) {
+        char bytes[8];
+        for (int i = 0; i < 8; i++)
+            bytes[i] = (char) ((value >> (8*i)) & 0xFF);
+        data.append(bytes, 8);
+    }
+    void writeDouble(double value) {
+        uint64_t bits;
+        memcpy(&bits, &value, sizeof(bits));
+        writeUInt64(bits);
+    }
+    void writeString(const char* value) {
+        size_t length = strlen(value);
+        writeUInt32(length);
+        data.append(value, length);
+    }
+    void writeValue(const char* value) {
+        long long intValue;
+        double doubleValue;
+        if (parseInt(value, intValue)) {
+            if (fitsInt32(intValue)) {
+                writeByte(INT32_VALUE);
+                writeUInt32((uint32_t) intValue);
+            }
+            else {
+                writeByte(INT64_VALUE);
+                writeUInt64((uint64_t) intValue);
+            }
+        }
+        else if (parseDouble(value, doubleValue)) {
+            writeByte(DOUBLE_VALUE);
+            writeDouble(doubleValue);
+        }
+        else {
+            writeByte(STRING_VALUE);
+            writeString(value);
+        }
+    }
+    void writeNode(const SerializationNode& node);
+    void writeTable(const vector<SerializationNode>& children, int start, int end);
+    string data;
+};
+
+void BinarySerializer::Writer::writeNode(const SerializationNode& node) {
+    writeString(node.getName().c_str());
+    vector<const char*> names, values;
+    getProperties(getPropertyData(node), names, values);
+    writeUInt32(names.size());
+    for (int i = 0; i < names.size(); i++) {
+        writeString(names[i]);
+        writeValue(values[i]);
+    }
+
+    // Divide the children into groups.  Consecutive nodes that have no children of their own, and that
+    // have the same name and the same properties, are combined into a table.  Everything else is written
+    // as a single node.  Nodes without properties are never combined, so every row of a table takes up
+    // space in the data, which lets the reader check the size of a table before creating it.
+
+    const vector<SerializationNode>& children = node.getChildren();
+    vector<pair<int, int> > groups;
+    int start = 0;
+    while (start < children.size()) {
+        const SerializationNode& first = children[start];
+        int end = start+1;
+        if (first.getChildren().size() == 0 && !getPropertyData(first).empty())
+            while (end < children.size() && children[end].getChildren().size() == 0 && children[end].getName() == first.getName() &&
+                    sameProperties(getPropertyData(first), getPropertyData(children[end])))
+                end++;
+        groups.push_back(make_pair(start, end));
+        start = end;
+    }
+    writeUInt32(groups.size());
+    for (auto& group : groups) {
+        if (group.second-group.first == 1) {
+            writeByte(SINGLE_NODE);
+            writeNode(children[group.first]);
+        }
+        else {
+            writeByte(NODE_TABLE);
+            writeTable(children, group.first, group.second);
+        }
+    }
+}
+
+void BinarySerializer::Writer::writeTable(const vector<SerializationNode>& children, int start, int end) {
+    int numRows = end-start;
+    vector<const char*> names, values;
+    for (int i = start; i < end; i++)
+        getProperties(getPropertyData(children[i]), names, values);
+    int numColumns = names.size()/numRows;
+    writeString(children[start].getName().c_str());
+    writeUInt32(numRows);
+    writeUInt32(numColumns);
+
+    // Each column is stored as a packed array of ints or doubles if every value in it can be represented
+    // exactly that way.  Otherwise it is stored as strings.
+
+    vector<long long> intValues(numRows);
+    vector<double> doubleValues(numRows);
+    for (int j = 0; j < numColumns; j++) {
+        writeString(names[j]);
+        bool allInts = true, allInt32 = true;
+        for (int i = 0; i < numRows && allInts; i++) {
+            allInts = parseInt(values[i*numColumns+j], intValues[i]);
+            allInt32 &= fitsInt32(intValues[i]);
+        }
+        if (allInts) {
+            writeByte(allInt32 ? INT32_VALUE : INT64_VALUE);
+            for (long long value : intValues) {
+                if (allInt32)
+                    writeUInt32((uint32_t) value);
+                else
+                    writeUInt64((uint64_t) value);
+            }
+            continue;
+        }
+        bool allDoubles = true;
+        for (int i = 0; i < numRows && allDoubles; i++)
+            allDoubles = parseDouble(values[i*numColumns+j], doubleValues[i]);
+        if (allDoubles) {
+            writeByte(DOUBLE_VALUE);
+            for (double value : doubleValues)
+                writeDouble(value);
+            continue;
+        }
+        writeByte(STRING_VALUE);
+        for (int i = 0; i < numRows; i++)
+            writeString(values[i*numColumns+j]);
+    }
+}
+
+/**
+ * This class decodes data that was produced by a Writer.
+ */
+class BinarySerializer::Reader {
+public:
+    Reader(const string& data) : data(data), position(0) {
+    }
+    void require(size_t bytes) {
+        if (data.size()-position < bytes)
+            throw OpenMMException("BinarySerializer: Unexpected end of data");
+    }
+    int readByte() {
+        require(1);
+        return (unsigned char) data[position++];
+    }
+    uint32_t readUInt32() {
+        require(4);
+        uint32_t value = 0;
+        for (int i = 0; i < 4; i++)
+            value |= ((uint32_t) (unsigned char) data[position++]) << (8*i);
+        return value;
+    }
+    uint64_t readUInt64() {
+        require(8);
+        uint64_t value = 0;
+        for (int i = 0; i < 8; i++)
+            value |= ((uint64_t) (unsigned char) data[position++]) << (8*i);
+        return value;
+    }
+    double readDouble() {
+        uint64_t bits = readUInt64();
+        double value;
+        memcpy(&value, &bits, sizeof(value));
+        return value;
+    }
+    string readString() {
+        uint32_t length = readUInt32();
+        require(length);
+        string value = data.substr(position, length);
+        position += length;
+        return value;
+    }
+    /**
+     * Read a property value and append it to the property data of a node, followed by a null terminator.
+     */
+    void readValue(int type, string& output) {
+        switch (type) {
+            case INT32_VALUE:
+                appendInt(output, (int32_t) readUInt32());
+                break;
+            case INT64_VALUE:
+                appendInt(output, (long long) readUInt64());
+                break;
+            case DOUBLE_VALUE:
+            {
+                char buffer[32];
+                g_fmt(buffer, readDouble());
+                output.append(buffer);
+                break;
+            }
+            case STRING_VALUE:
+            {
+                uint32_t length = readUInt32();
+                require(length);
+                output.append(&data[position], length);
+                position += length;
+                break;
+            }
+            default:
+                throw OpenMMException("BinarySerializer: Unknown value type");
+        }
+        output.push_back(0);
+    }
+    void readNode(SerializationNode& node);
+    void readTable(SerializationNode& parent);
+    const string& data;
+    size_t position;
+};
+
+void BinarySerializer::Reader::readNode(SerializationNode& node) {
+    node.setName(readString());
+    string& properties = getPropertyData(node);
+    uint32_t numProperties = readUInt32();
+    for (int i = 0; i < numProperties; i++) {
+        properties.append(readString());
+        properties.push_back(0);
+        readValue(readByte(), properties);
+    }
+    uint32_t numGroups = readUInt32();
+    for (int i = 0; i < numGroups; i++) {
+        int type = readByte();
+        if (type == SINGLE_NODE)
+            readNode(node.createChildNode(""));
+        else if (type == NODE_TABLE)
+            readTable(node);
+        else
+            throw OpenMMException("BinarySerializer: Unknown node group type");
+    }
+}
+
+void BinarySerializer::Reader::readTable(SerializationNode& parent) {
+    string name = readString();
+    uint32_t numRows = readUInt32();
+    uint32_t numColumns = readUInt32();
+
+    // Every column holds a name, a type, and at least four bytes for each row.  If there is not enough
+    // data left for that, the table is corrupt, so don't try to allocate it.
+
+    size_t remaining = data.size()-position;
+    if (numColumns == 0 || numRows > remaining/4 || numColumns > remaining/(5+4*(uint64_t) numRows))
+        throw OpenMMException("BinarySerializer: Invalid table size");
+    vector<SerializationNode>& children = parent.getChildren();
+    int start = children.size();
+    children.reserve(start+numRows);
+    for (int i = 0; i < numRows; i++)
+        parent.createChildNode(name);
+    for (int j = 0; j < numColumns; j++) {
+        string key = readString();
+        int type = readByte();
+        for (int i = 0; i < numRows; i++) {
+            string& properties = getPropertyData(children[start+i]);
+            properties.append(key);
+            properties.push_back(0);
+            readValue(type, properties);
+        }
+    }
+}
+
+void BinarySerializer::serialize(const SerializationNode& node, std::ostream& stream) {
+    Writer writer;
+    writer.data.append(MAGIC, sizeof(MAGIC));
+    writer.writeUInt32(FORMAT_VERSION);
+    writer.writeNode(node);
+    stream.write(writer.data.data(), writer.data.size());
+}
+
+void BinarySerializer::deserialize(std::istream& stream, SerializationNode& node) {
+    string data((istreambuf_iterator<char>(stream)), istreambuf_iterator<char>());
+    if (data.size() < sizeof(MAGIC) || data.compare(0, sizeof(MAGIC), MAGIC, sizeof(MAGIC)) != 0)
+        throw OpenMMException("BinarySerializer: The data is not in OpenMM binary serialization format");
+    Reader reader(data);
+    reader.position = sizeof(MAGIC);
+    uint32_t version = reader.readUInt32();
+    if (version > FORMAT_VERSION)
+        throw OpenMMException("BinarySerializer: Unsupported format version "+to_string(version));
+    reader.readNode(node);
+}
+
+void* BinarySerializer::deserializeStream(std::istream& stream) {
+    SerializationNode root;
+    deserialize(stream, root);
+    const SerializationProxy& proxy = SerializationProxy::getProxy(root.getStringProperty("type"));
+    return proxy.deserialize(root);
+}
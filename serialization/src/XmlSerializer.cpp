@@ -28,7 +28,11 @@
  * -------------------------------------------------------------------------- */
 
 #include "openmm/serialization/XmlSerializer.h"
+#include "openmm/Force.h"
+#include "openmm/System.h"
 #include "irrXML.h"
+#include <algorithm>
+#include <cstdlib>
 #include <cstring>
 #include <iostream>
 #include <map>
@@ -193,3 +197,285 @@ void* XmlSerializer::deserializeStream(std::istream& stream) {
     const SerializationProxy& proxy = SerializationProxy::getProxy(root.getStringProperty("type"));
     return proxy.deserialize(root);
 }
+
+/**
+ * A minimal XML parser that reads its input in pieces, so the document never needs to be held in memory
+ * all at once.  It interprets documents in the same way as the irrXML based parser used by deserialize():
+ * declarations, comments, CDATA sections, and text are ignored, and the predefined entities and numeric
+ * character references are replaced in attribute values.  Numeric character references are encoded as UTF-8.
+ */
+class XmlSerializer::IncrementalParser {
+public:
+    IncrementalParser(std::istream& stream) : stream(stream), position(0), atEnd(false), isSystem(false) {
+    }
+    void* parse();
+private:
+    static const int CHUNK_SIZE = 1<<20;
+    /**
+     * Read the next piece of the input into the buffer.  Returns false if the end of the input has been reached.
+     */
+    bool readMore() {
+        if (atEnd)
+            return false;
+        // Discard data that has already been processed before reading more.
+        if (position > CHUNK_SIZE) {
+            buffer.erase(0, position);
+            position = 0;
+        }
+        size_t size = buffer.size();
+        buffer.resize(size+CHUNK_SIZE);
+        stream.read(&buffer[size], CHUNK_SIZE);
+        size_t count = stream.gcount();
+        buffer.resize(size+count);
+        if (count == 0)
+            atEnd = true;
+        return count > 0;
+    }
+    /**
+     * Get the character at an offset from the current position, or 0 if the input ends before it.
+     */
+    char peek(size_t offset) {
+        while (position+offset >= buffer.size())
+            if (!readMore())
+                return 0;
+        return buffer[position+offset];
+    }
+    /**
+     * Find the offset from the current position at which a string next appears, or string::npos if it does not.
+     */
+    size_t find(const char* text, size_t from) {
+        size_t length = strlen(text);
+        while (true) {
+            size_t index = buffer.find(text, position+from);
+            if (index != string::npos)
+                return index-position;
+            if (buffer.size()-position >= length)
+                from = max(from, buffer.size()-position-length+1);
+            if (!readMore())
+                return string::npos;
+        }
+    }
+    /**
+     * Advance the current position to just after the next appearance of a string.
+     */
+    void skipPast(const char* text) {
+        size_t index = find(text, 0);
+        if (index == string::npos)
+            throw OpenMMException("XmlSerializer: Unexpected end of input");
+        position += index+strlen(text);
+    }
+    void parseStartTag(size_t end);
+    void endElement();
+    static string replaceEntities(const char* begin, const char* end);
+    static void appendUtf8(string& str, unsigned long code);
+    std::istream& stream;
+    string buffer;
+    size_t position;
+    bool atEnd;
+    SerializationNode root;
+    vector<SerializationNode*> stack;
+    bool isSystem;
+    vector<Force*> forces;
+};
+
+void XmlSerializer::IncrementalParser::appendUtf8(string& str, unsigned long code) {
+    if (code < 0x80)
+        str.push_back((char) code);
+    else if (code < 0x800) {
+        str.push_back((char) (0xC0 | (code>>6)));
+        str.push_back((char) (0x80 | (code&0x3F)));
+    }
+    else if (code < 0x10000) {
+        str.push_back((char) (0xE0 | (code>>12)));
+        str.push_back((char) (0x80 | ((code>>6)&0x3F)));
+        str.push_back((char) (0x80 | (code&0x3F)));
+    }
+    else {
+        str.push_back((char) (0xF0 | (code>>18)));
+        str.push_back((char) (0x80 | ((code>>12)&0x3F)));
+        str.push_back((char) (0x80 | ((code>>6)&0x3F)));
+        str.push_back((char) (0x80 | (code&0x3F)));
+    }
+}
+
+string XmlSerializer::IncrementalParser::replaceEntities(const char* begin, const char* end) {
+    static const char* entities[] = {"&amp;", "<lt;", ">gt;", "\"quot;", "'apos;"};
+    string result;
+    result.reserve(end-begin);
+    while (begin < end) {
+        if (*begin == '&') {
+            bool found = false;
+            for (const char* entity : entities) {
+                size_t length = strlen(entity+1);
+                if (end-begin > length && strncmp(begin+1, entity+1, length) == 0) {
+                    result.push_back(entity[0]);
+                    begin += length+1;
+                    found = true;
+                    break;
+                }
+            }
+            if (found)
+                continue;
+            if (end-begin > 2 && begin[1] == '#') {
+                // A numeric character reference.
+
+                const char* semicolon = std::find(begin, end, ';');
+                if (semicolon != end) {
+                    bool hex = (begin[2] == 'x');
+                    unsigned long code = strtoul(string(begin+(hex ? 3 : 2), semicolon).c_str(), NULL, hex ? 16 : 10);
+                    if (code > 0 && code <= 0x10FFFF) {
+                        appendUtf8(result, code);
+                        begin = semicolon+1;
+                        continue;
+                    }
+                }
+            }
+        }
+        result.push_back(*begin++);
+    }
+    return result;
+}
+
+void XmlSerializer::IncrementalParser::parseStartTag(size_t end) {
+    // The tag occupies the buffer from position to position+end, where end is the offset of the closing '>'.
+
+    const char* p = &buffer[position+1];
+    const char* tagEnd = &buffer[position+end];
+    const char* nameBegin = p;
+    while (p < tagEnd && !isspace((unsigned char) *p))
+        p++;
+    const char* nameEnd = p;
+    bool empty = false;
+    if (nameEnd > nameBegin && nameEnd[-1] == '/') {
+        empty = true;
+        nameEnd--;
+    }
+    SerializationNode* node;
+    if (stack.size() == 0)
+        node = &root;
+    else
+        node = &stack.back()->createChildNode("");
+    node->setName(string(nameBegin, nameEnd));
+    while (p < tagEnd) {
+        if (isspace((unsigned char) *p))
+            p++;
+        else if (*p == '/') {
+            empty = true;
+            break;
+        }
+        else {
+            const char* attributeBegin = p;
+            while (p < tagEnd && !isspace((unsigned char) *p) && *p != '=')
+                p++;
+            const char* attributeEnd = p;
+            while (p < tagEnd && *p != '"' && *p != '\'')
+                p++;
+            if (p == tagEnd)
+                throw OpenMMException("XmlSerializer: Malformed attribute in element '"+node->getName()+"'");
+            char quote = *p++;
+            const char* valueBegin = p;
+            while (p < tagEnd && *p != quote)
+                p++;
+            if (p == tagEnd)
+                throw OpenMMException("XmlSerializer: Malformed attribute in element '"+node->getName()+"'");
+            node->setStringProperty(string(attributeBegin, attributeEnd), replaceEntities(valueBegin, p));
+            p++;
+        }
+    }
+    position += end+1;
+    if (stack.size() == 0)
+        isSystem = (root.getStringProperty("type", "") == "System");
+    stack.push_back(node);
+    if (empty)
+        endElement();
+}
+
+void XmlSerializer::IncrementalParser::endElement() {
+    SerializationNode* node = stack.back();
+    stack.pop_back();
+
+    // If this is a Force in a System, create it now and discard its node.
+
+    if (isSystem && stack.size() == 2 && stack[1]->getName() == "Forces") {
+        forces.push_back(node->decodeObject<Force>());
+        stack[1]->getChildren().pop_back();
+    }
+}
+
+void* XmlSerializer::IncrementalParser::parse() {
+    try {
+        // Process tags until the root element has been completed.
+
+        bool started = false;
+        while (!started || stack.size() > 0) {
+            size_t start = find("<", 0);
+            if (start == string::npos)
+                break;
+            position += start;
+            char next = peek(1);
+            if (next == '?')
+                skipPast(">");
+            else if (next == '!') {
+                if (peek(2) == '-' && peek(3) == '-')
+                    skipPast("-->");
+                else if (peek(2) == '[')
+                    skipPast("]]>");
+                else
+                    skipPast(">");
+            }
+            else if (next == '/') {
+                skipPast(">");
+                if (stack.size() > 0)
+                    endElement();
+            }
+            else {
+                // Find the end of the tag, allowing for '>' characters inside quoted attribute values.
+
+                char quote = 0;
+                bool afterEquals = false;
+                size_t end = 1;
+                for (char c = peek(end); c != 0 && (c != '>' || quote != 0); c = peek(++end)) {
+                    if (quote != 0) {
+                        if (c == quote)
+                            quote = 0;
+                    }
+                    else if (afterEquals && (c == '"' || c == '\''))
+                        quote = c;
+                    if (c == '=' && quote == 0)
+                        afterEquals = true;
+                    else if (!isspace((unsigned char) c))
+                        afterEquals = false;
+                }
+                if (peek(end) == 0)
+                    throw OpenMMException("XmlSerializer: Unexpected end of input");
+                parseStartTag(end);
+                started = true;
+            }
+        }
+        if (!started || stack.size() > 0)
+            throw OpenMMException("XmlSerializer: Unexpected end of input");
+
+        // Create the object.
+
+        const SerializationProxy& proxy = SerializationProxy::getProxy(root.getStringProperty("type"));
+        void* result = proxy.deserialize(root);
+        if (isSystem) {
+            System* system = reinterpret_cast<System*>(result);
+            for (Force*& force : forces) {
+                system->addForce(force);
+                force = NULL;
+            }
+        }
+        return result;
+    }
+    catch (...) {
+        for (Force* force : forces)
+            delete force;
+        throw;
+    }
+}
+
+void* XmlSerializer::deserializeStreamIncrementally(std::istream& stream) {
+    IncrementalParser parser(stream);
+    return parser.parse();
+}
@@ -0,0 +1,208 @@
+/* -------------------------------------------------------------------------- *
+ *                                   OpenMM                                   *
+ * -------------------------------------------------------------------------- *
+ * This is part of the OpenMM molecular simulation toolkit.                   *
+ * See https://openmm.org/development.                                        *
+ *                                                                            *
+ * Portions copyright (c) 2026 Stanford University and the Authors.           *
+ * Authors:                                                                   *
+ * Contributors:                                                              *
+ *                                                                            *
+ * Permission is hereby granted, free of charge, to any person obtaining a    *
+ * copy of this software and associated documentation files (the "Software"), *
+ * to deal in the Software without restriction, including without limitation  *
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,   *
+ * and/or sell copies of the Software, and to permit persons to whom the      *
+ * Software is furnished to do so, subject to the following conditions:       *
+ *                                                                            *
+ * The above copyright notice and this permission notice shall be included in *
+ * all copies or substantial portions of the Software.                        *
+ *                                                                            *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR *
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,   *
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL    *
+ * THE AUTHORS, CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,    *
+ * DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR      *
+ * OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE  *
+ * USE OR OTHER DEALINGS IN THE SOFTWARE.                                     *
+ * -------------------------------------------------------------------------- */
+
+#include "openmm/internal/AssertionUtilities.h"
+#include "openmm/HarmonicBondForce.h"
+#include "openmm/NonbondedForce.h"
+#include "openmm/System.h"
+#include "openmm/serialization/BinarySerializer.h"
+#include "openmm/serialization/XmlSerializer.h"
+#include <iostream>
+#include <sstream>
+
+using namespace OpenMM;
+using namespace std;
+
+void compareNodes(const SerializationNode& node1, const SerializationNode& node2) {
+    ASSERT_EQUAL(node1.getName(), node2.getName());
+    map<string, string> properties1 = node1.getProperties();
+    map<string, string> properties2 = node2.getProperties();
+    ASSERT_EQUAL(properties1.size(), properties2.size());
+    for (auto& prop : properties1)
+        ASSERT_EQUAL(prop.second, node2.getStringProperty(prop.first));
+    ASSERT_EQUAL(node1.getChildren().size(), node2.getChildren().size());
+    for (int i = 0; i < node1.getChildren().size(); i++)
+        compareNodes(node1.getChildren()[i], node2.getChildren()[i]);
+}
+
+void testNodes() {
+    // Build a tree containing every kind of value, including some that cannot be stored as numbers
+    // without changing their representation.
+
+    SerializationNode root;
+    root.setName("Root");
+    root.setIntProperty("int", -12);
+    root.setLongProperty("long", 1234567890123LL);
+    root.setDoubleProperty("double", 0.1);
+    root.setDoubleProperty("tiny", 1e-300);
+    root.setStringProperty("string", "a <b> & \"c\"");
+    root.setStringProperty("empty", "");
+    root.setStringProperty("padded", "007");
+    root.setStringProperty("text", "1.50");
+    SerializationNode& particles = root.createChildNode("Particles");
+    for (int i = 0; i < 20; i++)
+        particles.createChildNode("Particle").setIntProperty("index", i).setDoubleProperty("q", 0.1*i-1.0);
+    particles.createChildNode("Particle").setIntProperty("index", 20).setStringProperty("q", "x");
+    particles.createChildNode("Particle").setIntProperty("index", 21).setStringProperty("q", "1.0");
+    particles.createChildNode("Other");
+    particles.createChildNode("Particle").setIntProperty("index", 22);
+    SerializationNode& nested = root.createChildNode("Nested");
+    nested.createChildNode("Child").createChildNode("Grandchild").setDoubleProperty("x", 3.5);
+    nested.createChildNode("Child").setDoubleProperty("x", 2.0);
+
+    // Write it out and read it back, then make sure nothing changed.
+
+    stringstream buffer;
+    BinarySerializer::serialize(root, buffer);
+    SerializationNode copy;
+    BinarySerializer::deserialize(buffer, copy);
+    compareNodes(root, copy);
+}
+
+void testSystem() {
+    // Create a System with enough particles and exceptions that they get stored as tables.
+
+    System system;
+    NonbondedForce* nonbonded = new NonbondedForce();
+    HarmonicBondForce* bonds = new HarmonicBondForce();
+    for (int i = 0; i < 100; i++) {
+        system.addParticle(1.0+0.01*i);
+        nonbonded->addParticle(0.3*(i%3-1), 0.1+0.001*i, 0.5);
+        if (i > 0) {
+            bonds->addBond(i-1, i, 0.1, 1000.0);
+            nonbonded->addException(i-1, i, 0.0, 1.0, 0.0);
+        }
+    }
+    system.addConstraint(0, 1, 0.1);
+    system.addForce(nonbonded);
+    system.addForce(bonds);
+
+    // Serialize and deserialize it, then make sure it produces the same XML as the original.
+
+    stringstream xml1, xml2, buffer;
+    XmlSerializer::serialize<System>(&system, "System", xml1);
+    BinarySerializer::serialize<System>(&system, "System", buffer);
+    ASSERT(buffer.str().size() < xml1.str().size()/2);
+    System* copy = BinarySerializer::deserialize<System>(buffer);
+    XmlSerializer::serialize<System>(copy, "System", xml2);
+    ASSERT_EQUAL(xml1.str(), xml2.str());
+    delete copy;
+
+    // Now do the same thing but by calling clone().
+
+    copy = BinarySerializer::clone(system);
+    stringstream xml3;
+    XmlSerializer::serialize<System>(copy, "System", xml3);
+    ASSERT_EQUAL(xml1.str(), xml3.str());
+    delete copy;
+}
+
+void testInvalidData() {
+    // Data that is not in the binary format, or that has been truncated, should throw an exception.
+
+    stringstream xml;
+    xml << "<?xml version=\"1.0\" ?>";
+    SerializationNode node;
+    bool threw = false;
+    try {
+        BinarySerializer::deserialize(xml, node);
+    }
+    catch (const OpenMMException& ex) {
+        threw = true;
+    }
+    ASSERT(threw);
+    System system;
+    system.addParticle(1.0);
+    stringstream buffer;
+    BinarySerializer::serialize<System>(&system, "System", buffer);
+    string data = buffer.str();
+    stringstream truncated(data.substr(0, data.size()-3));
+    threw = false;
+    try {
+        delete BinarySerializer::deserialize<System>(truncated);
+    }
+    catch (const OpenMMException& ex) {
+        threw = true;
+    }
+    ASSERT(threw);
+}
+
+void appendUInt32(string& data, uint32_t value) {
+    for (int i = 0; i < 4; i++)
+        data.push_back((char) ((value >> (8*i)) & 0xFF));
+}
+
+void appendString(string& data, const string& value) {
+    appendUInt32(data, value.size());
+    data.append(value);
+}
+
+void testCorruptTable() {
+    // Tables whose sizes do not fit in the remaining data should be rejected without trying to create them.
+
+    for (uint32_t numColumns : {0u, 1u, 0xFFFFFFFFu}) {
+        string data("OMMB");
+        appendUInt32(data, BinarySerializer::FORMAT_VERSION);
+        appendString(data, "Root");
+        appendUInt32(data, 0);
+        appendUInt32(data, 1);
+        data.push_back(1);
+        appendString(data, "Particle");
+        appendUInt32(data, 0xFFFFFFFFu);
+        appendUInt32(data, numColumns);
+        appendString(data, "index");
+        data.push_back(1);
+        appendUInt32(data, 0);
+        stringstream buffer(data);
+        SerializationNode node;
+        bool threw = false;
+        try {
+            BinarySerializer::deserialize(buffer, node);
+        }
+        catch (const OpenMMException& ex) {
+            threw = true;
+        }
+        ASSERT(threw);
+    }
+}
+
+int main() {
+    try {
+        testNodes();
+        testSystem();
+        testInvalidData();
+        testCorruptTable();
+    }
+    catch(const exception& e) {
+        cout << "exception: " << e.what() << endl;
+        return 1;
+    }
+    cout << "Done" << endl;
+    return 0;
+}
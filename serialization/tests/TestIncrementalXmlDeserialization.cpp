@@ -0,0 +1,162 @@
+/* -------------------------------------------------------------------------- *
+ *                                   OpenMM                                   *
+ * -------------------------------------------------------------------------- *
+ * This is part of the OpenMM molecular simulation toolkit.                   *
+ * See https://openmm.org/development.                                        *
+ *                                                                            *
+ * Portions copyright (c) 2026 Stanford University and the Authors.           *
+ * Authors:                                                                   *
+ * Contributors:                                                              *
+ *                                                                            *
+ * Permission is hereby granted, free of charge, to any person obtaining a    *
+ * copy of this software and associated documentation files (the "Software"), *
+ * to deal in the Software without restriction, including without limitation  *
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,   *
+ * and/or sell copies of the Software, and to permit persons to whom the      *
+ * Software is furnished to do so, subject to the following conditions:       *
+ *                                                                            *
+ * The above copyright notice and this permission notice shall be included in *
+ * all copies or substantial portions of the Software.                        *
+ *                                                                            *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR *
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,   *
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL    *
+ * THE AUTHORS, CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,    *
+ * DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR      *
+ * OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE  *
+ * USE OR OTHER DEALINGS IN THE SOFTWARE.                                     *
+ * -------------------------------------------------------------------------- */
+
+#include "openmm/internal/AssertionUtilities.h"
+#include "openmm/CustomBondForce.h"
+#include "openmm/HarmonicBondForce.h"
+#include "openmm/NonbondedForce.h"
+#include "openmm/System.h"
+#include "openmm/serialization/XmlSerializer.h"
+#include <iostream>
+#include <sstream>
+
+using namespace OpenMM;
+using namespace std;
+
+void testSystem() {
+    // Create a System large enough that the parser needs to read it in several pieces.
+
+    System system;
+    NonbondedForce* nonbonded = new NonbondedForce();
+    HarmonicBondForce* bonds = new HarmonicBondForce();
+    CustomBondForce* custom = new CustomBondForce("k*(r-r0)^2 + (r>r0)*1e-3");
+    custom->addPerBondParameter("k");
+    custom->addGlobalParameter("r0", 0.2);
+    for (int i = 0; i < 20000; i++) {
+        system.addParticle(1.0+0.01*i);
+        nonbonded->addParticle(0.3*(i%3-1), 0.1+0.001*i, 0.5);
+        if (i > 0) {
+            bonds->addBond(i-1, i, 0.1, 1000.0);
+            nonbonded->addException(i-1, i, 0.0, 1.0, 0.0);
+        }
+    }
+    custom->addBond(0, 1, {2.0});
+    system.addConstraint(0, 1, 0.1);
+    system.addForce(nonbonded);
+    system.addForce(bonds);
+    system.addForce(custom);
+
+    // Deserialize it, then make sure it produces the same XML as the original.
+
+    stringstream xml1, xml2;
+    XmlSerializer::serialize<System>(&system, "System", xml1);
+    ASSERT(xml1.str().size() > 3<<20);
+    System* copy = XmlSerializer::deserializeIncrementally<System>(xml1);
+    ASSERT_EQUAL(3, copy->getNumForces());
+    XmlSerializer::serialize<System>(copy, "System", xml2);
+    ASSERT_EQUAL(xml1.str(), xml2.str());
+    delete copy;
+}
+
+void testSyntax() {
+    // The parser should handle all the constructs that deserialize() does, and interpret them the same way.
+
+    string xml = "\xEF\xBB\xBF<?xml version=\"1.0\" ?>\n"
+            "<!-- a comment with <tags> -->\n"
+            "<System openmmVersion='8.0' type=\"System\" version=\"1\">\n"
+            "  some text\n"
+            "  <PeriodicBoxVectors>\n"
+            "    <A x=\"2\" y=\"0\" z=\"0\"/><B x=\"0\" y=\"2\" z=\"0\"/>\n"
+            "    <C x=\"0\" y=\"0\" z=\"2\" />\n"
+            "  </PeriodicBoxVectors>\n"
+            "  <![CDATA[ <Ignored/> ]]>\n"
+            "  <Particles><Particle mass=\"1\"/><Particle mass=\"2\"/></Particles>\n"
+            "  <Constraints/>\n"
+            "  <Forces>\n"
+            "    <Force energy = 'k*(r>r0) + 0*(r&lt;r0) &amp; &#65;' forceGroup=\"0\" name=\"test &quot;force&apos;\"\n"
+            "        type=\"CustomBondForce\" usesPeriodic=\"0\" version=\"3\">\n"
+            "      <PerBondParameters><Parameter name=\"k\"/></PerBondParameters>\n"
+            "      <GlobalParameters><Parameter default=\"0.1\" name=\"r0\"/></GlobalParameters>\n"
+            "      <EnergyParameterDerivatives/>\n"
+            "      <Bonds><Bond d=\"5\" p1=\"0\" p2=\"1\" param1=\"2\"/></Bonds>\n"
+            "    </Force>\n"
+            "    <Force forceGroup=\"1\" name=\"bonds\" type=\"HarmonicBondForce\" usesPeriodic=\"0\" version=\"2\">\n"
+            "      <Bonds />\n"
+            "    </Force>\n"
+            "  </Forces>\n"
+            "</System>\n";
+    stringstream stream1(xml), stream2(xml);
+    System* system1 = XmlSerializer::deserialize<System>(stream1);
+    System* system2 = XmlSerializer::deserializeIncrementally<System>(stream2);
+    ASSERT_EQUAL(2, system2->getNumForces());
+    ASSERT_EQUAL("k*(r>r0) + 0*(r<r0) & A", dynamic_cast<CustomBondForce&>(system2->getForce(0)).getEnergyFunction());
+    ASSERT_EQUAL("test \"force'", system2->getForce(0).getName());
+    stringstream xml1, xml2;
+    XmlSerializer::serialize<System>(system1, "System", xml1);
+    XmlSerializer::serialize<System>(system2, "System", xml2);
+    ASSERT_EQUAL(xml1.str(), xml2.str());
+    delete system1;
+    delete system2;
+
+    // Numeric character references to characters outside the ASCII range should be encoded as UTF-8.
+
+    string modified = xml;
+    modified.replace(modified.find("name=\"test"), 6, "name =\n  \"&#xE9;&#8364;&#x1F600;>");
+    stringstream stream3(modified);
+    system2 = XmlSerializer::deserializeIncrementally<System>(stream3);
+    ASSERT_EQUAL("\xC3\xA9\xE2\x82\xAC\xF0\x9F\x98\x80>test \"force'", system2->getForce(0).getName());
+    delete system2;
+}
+
+void testInvalidData() {
+    // Truncated input should throw an exception.
+
+    System system;
+    for (int i = 0; i < 10; i++)
+        system.addParticle(1.0);
+    system.addForce(new HarmonicBondForce());
+    stringstream buffer;
+    XmlSerializer::serialize<System>(&system, "System", buffer);
+    string xml = buffer.str();
+    for (int length : {0, 10, (int) xml.size()/2, (int) xml.size()-10}) {
+        stringstream truncated(xml.substr(0, length));
+        bool threw = false;
+        try {
+            delete XmlSerializer::deserializeIncrementally<System>(truncated);
+        }
+        catch (const OpenMMException& ex) {
+            threw = true;
+        }
+        ASSERT(threw);
+    }
+}
+
+int main() {
+    try {
+        testSystem();
+        testSyntax();
+        testInvalidData();
+    }
+    catch(const exception& e) {
+        cout << "exception: " << e.what() << endl;
+        return 1;
+    }
+    cout << "Done" << endl;
+    return 0;
+}
@@ -14,7 +14,7 @@ __email__ = "peastman@stanford.edu"
 
 from .topology import Topology, Chain, Residue, Atom
 from .pdbfile import PDBFile
-from .xtcfile import XTCFile
+from .xtcfile import XTCFile, XTCTrajectory
 from .pdbxfile import PDBxFile
 from .forcefield import ForceField
 from .simulation import Simulation
@@ -23,7 +23,7 @@ from .xtcreporter import XTCReporter
 from .amberprmtopfile import AmberPrmtopFile, HCT, OBC1, OBC2, GBn, GBn2
 from .amberinpcrdfile import AmberInpcrdFile
 from .tinkerfiles import TinkerFiles
-from .dcdfile import DCDFile
+from .dcdfile import DCDFile, DCDTrajectory
 from .gromacsgrofile import GromacsGroFile
 from .gromacstopfile import GromacsTopFile
 from .dcdreporter import DCDReporter
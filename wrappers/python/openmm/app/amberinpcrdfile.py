@@ -32,7 +32,7 @@ __version__ = "1.0"
 
 from functools import wraps
 from openmm.app.internal import amber_file_parser
-from openmm.unit import Quantity, nanometers, picoseconds
+from openmm.unit import Quantity, nanometers, picoseconds, strip_units
 import warnings
 try:
     import numpy as np
@@ -95,7 +95,7 @@ class AmberInpcrdFile(object):
         """
         if asNumpy:
             if self._numpyPositions is None:
-                self._numpyPositions = Quantity(np.array(self.positions.value_in_unit(nanometers)), nanometers)
+                self._numpyPositions = Quantity(np.array(strip_units(self.positions, nanometers)), nanometers)
             return self._numpyPositions
         return self.positions
 
@@ -112,7 +112,7 @@ class AmberInpcrdFile(object):
             raise AttributeError('velocities not found in %s' % self.file)
         if asNumpy:
             if self._numpyVelocities is None:
-                self._numpyVelocities = Quantity(np.array(self.velocities.value_in_unit(nanometers/picoseconds)), nanometers/picoseconds)
+                self._numpyVelocities = Quantity(np.array(strip_units(self.velocities, nanometers/picoseconds)), nanometers/picoseconds)
             return self._numpyVelocities
         return self.velocities
 
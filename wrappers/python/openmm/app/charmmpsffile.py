@@ -1007,13 +1007,15 @@ class CharmmPsfFile(object):
         omit_all = not flexibleConstraints and constraints in (ff.AllBonds, ff.HAngles)
         omit_h = not flexibleConstraints and constraints is not None
         omit_h_in_water = not flexibleConstraints and (constraints is not None or rigidWater)
+        bonds = []
         for bond in self.bond_list:
             if omit_all: continue
             if omit_h and (bond.atom1.type.atomic_number == 1 or bond.atom2.type.atomic_number == 1): continue
             if omit_h_in_water and _is_bond_in_water(bond): continue
-            force.addBond(bond.atom1.idx, bond.atom2.idx,
+            bonds.append((bond.atom1.idx, bond.atom2.idx,
                           bond.bond_type.req*length_conv,
-                          2*bond.bond_type.k*bond_frc_conv)
+                          2*bond.bond_type.k*bond_frc_conv))
+        force.addBonds([b[:2] for b in bonds], [b[2] for b in bonds], [b[3] for b in bonds])
         system.addForce(force)
         # Add Angle forces
         if verbose: print('Adding angles...')
@@ -1027,6 +1029,7 @@ class CharmmPsfFile(object):
                 dist = c[2].value_in_unit(u.nanometer)
                 atom_constraints[c[0]].append((c[1], dist))
                 atom_constraints[c[1]].append((c[0], dist))
+        angles = []
         for angle in self.angle_list:
             # Only constrain angles including hydrogen here
             if (angle.atom1.type.atomic_number != 1 and angle.atom3.type.atomic_number != 1):
@@ -1054,9 +1057,9 @@ class CharmmPsfFile(object):
                 system.addConstraint(angle.atom1.idx, angle.atom3.idx, length)
                 n_cons_angle += 1
             if flexibleConstraints or not constrained:
-                force.addAngle(angle.atom1.idx, angle.atom2.idx,
+                angles.append((angle.atom1.idx, angle.atom2.idx,
                                angle.atom3.idx, angle.angle_type.theteq*pi/180,
-                               2*angle.angle_type.k*angle_frc_conv)
+                               2*angle.angle_type.k*angle_frc_conv))
         if verbose and (constraints is not None or rigidWater):
             print('    Number of bond constraints:', n_cons_bond)
             print('    Number of angle constraints:', n_cons_angle)
@@ -1064,30 +1067,31 @@ class CharmmPsfFile(object):
             # Already did the angles with hydrogen above. So skip those here
             if (angle.atom1.type.atomic_number == 1 or angle.atom3.type.atomic_number == 1):
                 continue
-            force.addAngle(angle.atom1.idx, angle.atom2.idx,
+            angles.append((angle.atom1.idx, angle.atom2.idx,
                            angle.atom3.idx, angle.angle_type.theteq*pi/180,
-                           2*angle.angle_type.k*angle_frc_conv)
+                           2*angle.angle_type.k*angle_frc_conv))
+        force.addAngles([a[:3] for a in angles], [a[3] for a in angles], [a[4] for a in angles])
         system.addForce(force)
 
         # Add the urey-bradley terms
         if verbose: print('Adding Urey-Bradley terms')
         force = mm.HarmonicBondForce()
         force.setForceGroup(self.UREY_BRADLEY_FORCE_GROUP)
-        for ub in self.urey_bradley_list:
-            force.addBond(ub.atom1.idx, ub.atom2.idx,
-                          ub.ub_type.req*length_conv,
-                          2*ub.ub_type.k*bond_frc_conv)
+        ubs = self.urey_bradley_list
+        force.addBonds([(ub.atom1.idx, ub.atom2.idx) for ub in ubs],
+                       [ub.ub_type.req*length_conv for ub in ubs],
+                       [2*ub.ub_type.k*bond_frc_conv for ub in ubs])
         system.addForce(force)
 
         # Add dihedral forces
         if verbose: print('Adding torsions...')
         force = mm.PeriodicTorsionForce()
         force.setForceGroup(self.DIHEDRAL_FORCE_GROUP)
-        for tor in self.dihedral_parameter_list:
-            force.addTorsion(tor.atom1.idx, tor.atom2.idx, tor.atom3.idx,
-                             tor.atom4.idx, tor.dihedral_type.per,
-                             tor.dihedral_type.phase*pi/180,
-                             tor.dihedral_type.phi_k*dihe_frc_conv)
+        tors = self.dihedral_parameter_list
+        force.addTorsions([(tor.atom1.idx, tor.atom2.idx, tor.atom3.idx, tor.atom4.idx) for tor in tors],
+                          [tor.dihedral_type.per for tor in tors],
+                          [tor.dihedral_type.phase*pi/180 for tor in tors],
+                          [tor.dihedral_type.phi_k*dihe_frc_conv for tor in tors])
         system.addForce(force)
 
         if verbose: print('Adding impropers...')
@@ -1222,14 +1226,15 @@ class CharmmPsfFile(object):
         # Add per-particle nonbonded parameters (LJ params)
         sigma_scale = 2**(-1/6) * 2
         if not has_nbfix_terms:
-            for atm in self.atom_list:
-                force.addParticle(atm.charge, sigma_scale*atm.type.rmin*length_conv,
-                                  abs(atm.type.epsilon*ene_conv))
+            atoms = self.atom_list
+            force.addParticles([atm.charge for atm in atoms],
+                               [sigma_scale*atm.type.rmin*length_conv for atm in atoms],
+                               [abs(atm.type.epsilon*ene_conv) for atm in atoms])
         else:
             if nonbondedMethod is ff.LJPME:
                 raise ValueError('LJPME is not supported when NBFIX terms are present')
-            for atm in self.atom_list:
-                force.addParticle(atm.charge, 1.0, 0.0)
+            n = len(self.atom_list)
+            force.addParticles([atm.charge for atm in self.atom_list], [1.0]*n, [0.0]*n)
             # Now add the custom nonbonded force that implements NBFIX. First
             # thing we need to do is condense our number of types
             lj_idx_list = [0 for atom in self.atom_list]
@@ -1379,9 +1384,10 @@ class CharmmPsfFile(object):
         # Add 1-4 interactions
         sigma_scale = 2**(-1/6)
         nbxmod = abs(params.nbxmod)
+        exceptions = []
         if nbxmod == 4:
             for ia1, ia4 in self.pair_14_list:
-                force.addException(ia1, ia4, 0.0, 0.1, 0.0)
+                exceptions.append((ia1, ia4, 0.0, 0.1, 0.0))
         if nbxmod == 5:
             for ia1, ia4 in self.pair_14_list:
                 atom1 = self.atom_list[ia1]
@@ -1394,7 +1400,7 @@ class CharmmPsfFile(object):
                 except KeyError:
                     epsilon = sqrt(abs(atom1.type.epsilon_14 * atom4.type.epsilon_14)) * ene_conv
                     sigma = (atom1.type.rmin_14 + atom4.type.rmin_14) * (length_conv * sigma_scale)
-                force.addException(ia1, ia4, charge_prod, sigma, epsilon)
+                exceptions.append((ia1, ia4, charge_prod, sigma, epsilon))
 
         # Add excluded atoms
         # Drude and lonepairs will be excluded based on their parent atoms
@@ -1403,30 +1409,31 @@ class CharmmPsfFile(object):
             idx = lpsite[1]
             idxa = lpsite[0]
             parent_exclude_list[idx].append(idxa)
-            force.addException(idx, idxa, 0.0, 0.1, 0.0)
+            exceptions.append((idx, idxa, 0.0, 0.1, 0.0))
         if has_drude_particle:
             for pair in self.drudepair_list:
                 idx = pair[0]
                 idxa = pair[1]
                 parent_exclude_list[idx].append(idxa)
-                force.addException(idx, idxa, 0.0, 0.1, 0.0)
+                exceptions.append((idx, idxa, 0.0, 0.1, 0.0))
         # If lonepairs and Drude particles are bonded to the same parent atom, add exception
         for excludeterm in parent_exclude_list:
             if(len(excludeterm) >= 2):
                 for i in range(len(excludeterm)):
                     for j in range(i):
-                        force.addException(excludeterm[j], excludeterm[i], 0.0, 0.1, 0.0)
+                        exceptions.append((excludeterm[j], excludeterm[i], 0.0, 0.1, 0.0))
         # Exclude 1-2 and 1-3 pairs as well as the lonepair/Drude attached onto them
         if nbxmod > 1:
             for ia1, ia2 in self.pair_12_list:
                 for excludeatom in [ia1]+parent_exclude_list[ia1]:
                     for excludeatom2 in [ia2]+parent_exclude_list[ia2]:
-                        force.addException(excludeatom, excludeatom2, 0.0, 0.1, 0.0)
+                        exceptions.append((excludeatom, excludeatom2, 0.0, 0.1, 0.0))
         if nbxmod > 2:
             for ia1, ia3 in self.pair_13_list:
                 for excludeatom in [ia1]+parent_exclude_list[ia1]:
                     for excludeatom2 in [ia3]+parent_exclude_list[ia3]:
-                        force.addException(excludeatom, excludeatom2, 0.0, 0.1, 0.0)
+                        exceptions.append((excludeatom, excludeatom2, 0.0, 0.1, 0.0))
+        force.addExceptions([e[:2] for e in exceptions], [e[2] for e in exceptions], [e[3] for e in exceptions], [e[4] for e in exceptions])
         system.addForce(force)
 
         # Add Drude particles (Drude force)
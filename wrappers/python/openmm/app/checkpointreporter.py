@@ -32,6 +32,8 @@ __version__ = "1.0"
 
 __all__ = ['CheckpointReporter']
 
+from openmm.app.internal.checkpointstore import CheckpointStore
+
 
 class CheckpointReporter(object):
     """CheckpointReporter saves periodic checkpoints of a simulation.
@@ -74,8 +76,21 @@ class CheckpointReporter(object):
     portable.  Reloading the State will put the Simulation back into approximately
     the same state it had before, but you should not expect it to produce an
     identical trajectory to the original Simulation.
+
+    For long simulations, writing a complete checkpoint at every report can
+    be expensive.  If you specify fullInterval, the reporter instead writes
+    to a directory.  A full checkpoint (or State) is written only every
+    fullInterval time steps, and the reports in between write compact deltas
+    that record the positions and velocities in single precision, along with
+    the parameters of the Context and the Integrator.  Only the newest delta
+    after each full checkpoint is kept.  The internal state of the Context,
+    such as random number generator states, is restored from the most recent
+    full checkpoint.  Pass the directory to loadCheckpoint() to restore the most
+    recent state:
+
+    >>> simulation.loadCheckpoint('checkpoints')
     """
-    def __init__(self, file, reportInterval, writeState=False):
+    def __init__(self, file, reportInterval, writeState=False, fullInterval=None, retain=2, compress=True):
         """Create a CheckpointReporter.
 
         Parameters
@@ -88,11 +103,29 @@ class CheckpointReporter(object):
             The interval (in time steps) at which to write checkpoints.
         writeState : bool=False
             If true, write serialized State objects.  If false, write checkpoints.
+        fullInterval : int=None
+            If not None, file is the path of a directory in which to store full
+            checkpoints every fullInterval time steps, with deltas written at
+            every report in between.
+        retain : int=2
+            When fullInterval is specified, the number of full checkpoints to
+            keep.  Older ones are deleted along with their deltas.
+        compress : bool=True
+            When fullInterval is specified, whether to compress the deltas.
+            Compression is lossless.
         """
 
         self._reportInterval = reportInterval
         self._file = file
         self._writeState = writeState
+        self._fullInterval = fullInterval
+        if fullInterval is None:
+            self._store = None
+        else:
+            if not isinstance(file, str):
+                raise ValueError('When fullInterval is specified, file must be the path of a directory')
+            self._store = CheckpointStore(file, writeState, retain, compress)
+            self._lastFullStep = None
 
     def describeNextReport(self, simulation):
         """Get information about the next report this object will generate.
@@ -108,6 +141,8 @@ class CheckpointReporter(object):
             A dictionary describing the required information for the next report
         """
         steps = self._reportInterval - simulation.currentStep%self._reportInterval
+        if self._store is not None:
+            return {'steps':steps, 'periodic':False, 'include':['positions', 'velocities']}
         return {'steps':steps, 'periodic':None, 'include':[]}
 
     def report(self, simulation, state):
@@ -120,6 +155,15 @@ class CheckpointReporter(object):
         state : State
             The current state of the simulation
         """
+        if self._store is not None:
+            step = state.getStepCount()
+            if not self._store.hasSnapshot or step-self._lastFullStep >= self._fullInterval:
+                self._store.saveSnapshot(simulation, state)
+                self._lastFullStep = step
+            else:
+                self._store.saveDelta(simulation, state)
+            return
+
         isFileObj = not isinstance(self._file, str)
         if isFileObj:
             self._file.seek(0)
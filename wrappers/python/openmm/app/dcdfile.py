@@ -30,14 +30,14 @@ from __future__ import absolute_import
 __author__ = "Peter Eastman"
 __version__ = "1.0"
 
-import array
 import os
 import time
 import struct
 import math
-from openmm.unit import picoseconds, nanometers, is_quantity, norm
+from openmm.unit import picoseconds, nanometers, is_quantity, norm, strip_units
 from openmm import Vec3
-from openmm.app.internal.unitcell import computeLengthsAndAngles
+from openmm.app.internal.unitcell import computeLengthsAndAngles, computePeriodicBoxVectors
+from openmm.app.internal.trajectoryreader import TrajectoryReader
 
 class DCDFile(object):
     """DCDFile provides methods for creating DCD files.
@@ -48,9 +48,26 @@ class DCDFile(object):
     standard byte ordering (big-endian or little-endian) for this format.  This class always generates
     files with little-endian ordering.
 
-    To use this class, create a DCDFile object, then call writeModel() once for each model in the file."""
+    To use this class, create a DCDFile object, then call writeModel() once for each model in the file,
+    or writeModels() to write many models at once.  To read an existing file, call DCDFile.read()."""
 
-    def __init__(self, file, topology, dt, firstStep=0, interval=1, append=False):
+    @staticmethod
+    def read(file):
+        """Open an existing DCD file for reading.
+
+        Parameters
+        ----------
+        file : str
+            The name of the file to read
+
+        Returns
+        -------
+        DCDTrajectory
+            an object providing access to the frames in the file
+        """
+        return DCDTrajectory(file)
+
+    def __init__(self, file, topology, dt, firstStep=0, interval=1, append=False, bufferFrames=1):
         """Create a DCD file and write out the header, or open an existing file to append.
 
         Parameters
@@ -68,12 +85,18 @@ class DCDFile(object):
             to the trajectory
         append : bool=False
             If True, open an existing DCD file to append to.  If False, create a new file.
+        bufferFrames : int=1
+            The number of models to accumulate in memory before writing them to the file
+            and updating the header.  If this is greater than 1, call flush() after writing
+            the last model.
         """
         self._file = file
         self._topology = topology
         self._firstStep = firstStep
         self._interval = interval
         self._modelCount = 0
+        self._bufferFrames = bufferFrames
+        self._pendingFrames = []
         if is_quantity(dt):
             dt = dt.value_in_unit(picoseconds)
         dt /= 0.04888821
@@ -122,16 +145,73 @@ class DCDFile(object):
         """
         if self._topology.getNumAtoms() != len(positions):
             raise ValueError('The number of positions must match the number of atoms')
-        if is_quantity(positions):
-            positions = positions.value_in_unit(nanometers)
+        self._addModel(self._checkPositions(positions), unitCellDimensions, periodicBoxVectors)
+        if len(self._pendingFrames) >= self._bufferFrames:
+            self.flush()
+
+    def writeModels(self, positions, unitCellDimensions=None, periodicBoxVectors=None):
+        """Write out many models to the DCD file at once.
+
+        This is equivalent to calling writeModel() for each model, but it is much faster,
+        since the file is only updated once.
+
+        Parameters
+        ----------
+        positions : array
+            The atomic positions to write, with shape (models, atoms, 3)
+        unitCellDimensions : list of Vec3=None
+            The dimensions of the crystallographic unit cell for each model.
+        periodicBoxVectors : list of tuple of Vec3=None
+            The vectors defining the periodic box for each model.
+        """
+        positions = self._checkPositions(positions)
+        if len(positions.shape) != 3 or positions.shape[1:] != (self._topology.getNumAtoms(), 3):
+            raise ValueError('positions must have shape (models, atoms, 3), where atoms is the number of atoms')
+        for arg in (unitCellDimensions, periodicBoxVectors):
+            if arg is not None and len(arg) != len(positions):
+                raise ValueError('The number of periodic boxes must match the number of models')
+        for i in range(len(positions)):
+            self._addModel(positions[i],
+                           None if unitCellDimensions is None else unitCellDimensions[i],
+                           None if periodicBoxVectors is None else periodicBoxVectors[i])
+        self.flush()
+
+    def flush(self):
+        """Write all buffered models to the file and update the header."""
+        if len(self._pendingFrames) == 0:
+            return
+        file = self._file
+
+        # Update the header.
+
+        file.seek(8, os.SEEK_SET)
+        file.write(struct.pack('<i', self._modelCount))
+        file.seek(20, os.SEEK_SET)
+        file.write(struct.pack('<i', self._firstStep+(self._modelCount-1)*self._interval))
+
+        # Write the data.
+
+        file.seek(0, os.SEEK_END)
+        file.write(b''.join(self._pendingFrames))
+        self._pendingFrames = []
+        try:
+            file.flush()
+        except AttributeError:
+            pass
+
+    def _checkPositions(self, positions):
+        """Convert positions to a NumPy array in nanometers, and check that they are finite."""
+        positions = strip_units(positions, nanometers)
         import numpy as np
         positions = np.asarray(positions)
         if np.isnan(positions).any():
             raise ValueError('Particle position is NaN.  For more information, see https://github.com/openmm/openmm/wiki/Frequently-Asked-Questions#nan')
         if np.isinf(positions).any():
             raise ValueError('Particle position is infinite.  For more information, see https://github.com/openmm/openmm/wiki/Frequently-Asked-Questions#nan')
-        file = self._file
+        return positions
 
+    def _addModel(self, positions, unitCellDimensions, periodicBoxVectors):
+        """Encode a model and add it to the list of models waiting to be written."""
         self._modelCount += 1
         if self._interval > 1 and self._firstStep+self._modelCount*self._interval > 1<<31:
             # This will exceed the range of a 32 bit integer.  To avoid crashing or producing a corrupt file,
@@ -140,18 +220,9 @@ class DCDFile(object):
             self._firstStep //= self._interval
             self._dt *= self._interval
             self._interval = 1
-            file.seek(0, os.SEEK_SET)
-            file.write(struct.pack('<i4c9if', 84, b'C', b'O', b'R', b'D', 0, self._firstStep, self._interval, 0, 0, 0, 0, 0, 0, self._dt))
-
-        # Update the header.
-
-        file.seek(8, os.SEEK_SET)
-        file.write(struct.pack('<i', self._modelCount))
-        file.seek(20, os.SEEK_SET)
-        file.write(struct.pack('<i', self._firstStep+(self._modelCount-1)*self._interval))
-        # Write the data.
-
-        file.seek(0, os.SEEK_END)
+            self._file.seek(0, os.SEEK_SET)
+            self._file.write(struct.pack('<i4c9if', 84, b'C', b'O', b'R', b'D', 0, self._firstStep, self._interval, 0, 0, 0, 0, 0, 0, self._dt))
+        frame = b''
         boxVectors = self._topology.getPeriodicBoxVectors()
         if boxVectors is not None:
             if periodicBoxVectors is not None:
@@ -167,14 +238,113 @@ class DCDFile(object):
             angle1 = math.sin(math.pi/2-gamma)
             angle2 = math.sin(math.pi/2-beta)
             angle3 = math.sin(math.pi/2-alpha)
-            file.write(struct.pack('<i6di', 48, a_length, angle1, b_length, angle2, angle3, c_length, 48))
-        length = struct.pack('<i', 4*len(positions))
+            frame = struct.pack('<i6di', 48, a_length, angle1, b_length, angle2, angle3, c_length, 48)
+        self._pendingFrames.append(frame+_encodeCoordinates(positions))
+
+
+class DCDTrajectory(TrajectoryReader):
+    """DCDTrajectory provides random access to the frames of an existing DCD file.
+
+    Index it like an array to get particle positions.  The first index selects frames and the
+    optional second index selects atoms, so for example trajectory[-1] returns the positions in
+    the last frame, and trajectory[::10, atoms] returns the positions of a subset of atoms in
+    every tenth frame.  len(trajectory) is the number of frames.
+
+    Every frame of a DCD file has the same size, so frames are located without reading the file.
+    The file is memory mapped, and only the data that is accessed is read from disk.  Frames
+    that are added to the file after it is opened are not visible.
+    """
+
+    def __init__(self, file):
+        """Open a DCD file for reading.
+
+        Parameters
+        ----------
+        file : str
+            The name of the file to read
+        """
+        import numpy as np
+        with open(file, 'rb') as f:
+            # Determine the byte order from the length of the first record.
+
+            if struct.unpack('<i', f.read(4))[0] == 84:
+                order = '<'
+            else:
+                order = '>'
+            record = f.read(88)
+            if len(record) != 88 or record[:4] != b'CORD' or struct.unpack(order+'i', record[84:])[0] != 84:
+                raise ValueError('Not a valid DCD file')
+            control = struct.unpack(order+'20i', record[4:84])
+            self._firstStep = control[1]
+            self._interval = control[2]
+            self._dt = struct.unpack(order+'f', record[40:44])[0]*0.04888821
+            hasBox = (control[10] != 0)
+            has4D = (control[11] != 0)
+
+            # Skip the title record and read the number of atoms.
+
+            titleLength = struct.unpack(order+'i', f.read(4))[0]
+            f.seek(titleLength+4, os.SEEK_CUR)
+            self._numAtoms = struct.unpack(order+'3i', f.read(12))[1]
+            headerSize = f.tell()
+            fileSize = os.fstat(f.fileno()).st_size
+
+        # Create views of the box and coordinates in every frame.
+
+        recordSize = 4*self._numAtoms+8
+        boxSize = (56 if hasBox else 0)
+        frameSize = boxSize + (4 if has4D else 3)*recordSize
+        self._numFrames = (fileSize-headerSize)//frameSize
+        if self._numFrames > 0:
+            data = np.memmap(file, dtype=np.uint8, mode='r', offset=headerSize, shape=(self._numFrames*frameSize,))
+        else:
+            data = np.zeros(0, dtype=np.uint8)
+        self._coordinates = [np.ndarray((self._numFrames, self._numAtoms), order+'f4', buffer=data, offset=boxSize+i*recordSize+4, strides=(frameSize, 4)) for i in range(3)]
+        if hasBox:
+            self._box = np.ndarray((self._numFrames, 6), order+'f8', buffer=data, offset=4, strides=(frameSize, 8))
+        else:
+            self._box = None
+
+    def getPeriodicBoxVectors(self, frame):
+        """Get the periodic box vectors for a frame, or None if the file does not contain periodic boxes."""
+        import numpy as np
+        if self._box is None:
+            return None
+        a_length, cosGamma, b_length, cosBeta, cosAlpha, c_length = self._box[frame].tolist()
+        angles = np.array([cosAlpha, cosBeta, cosGamma])
+        if np.all(np.abs(angles) <= 1):
+            # The angles are stored as cosines.
+            alpha, beta, gamma = np.arccos(angles).tolist()
+        else:
+            # The angles are stored in degrees.
+            alpha, beta, gamma = np.radians(angles).tolist()
+        return computePeriodicBoxVectors(0.1*a_length, 0.1*b_length, 0.1*c_length, alpha, beta, gamma)
+
+    def getStep(self, frame):
+        """Get the index of the time step at which a frame was saved."""
+        frame = range(self._numFrames)[frame]
+        return self._firstStep+frame*self._interval
+
+    def getTime(self, frame):
+        """Get the simulation time at which a frame was saved."""
+        return self.getStep(frame)*self._dt*picoseconds
+
+    def _readFrames(self, frames, atoms):
+        import numpy as np
+        positions = np.empty((len(frames), len(atoms), 3))
         for i in range(3):
-            file.write(length)
-            data = array.array('f', (10*x[i] for x in positions))
-            data.tofile(file)
-            file.write(length)
-        try:
-            file.flush()
-        except AttributeError:
-            pass
+            positions[:, :, i] = self._coordinates[i][np.ix_(frames, atoms)]
+        return 0.1*positions
+
+
+def _encodeCoordinates(positions):
+    """Convert an array of positions in nanometers to the three Fortran records (the x, y, and z
+    coordinates in angstroms, each preceded and followed by its length in bytes) stored in a DCD frame."""
+    import numpy as np
+    numAtoms = len(positions)
+    records = np.empty((3, numAtoms+2), dtype='<f4')
+    records[:, 1:-1] = 10*positions.T
+    lengths = records.view('<i4')
+    lengths[:, 0] = 4*numAtoms
+    lengths[:, -1] = 4*numAtoms
+    return records.tobytes()
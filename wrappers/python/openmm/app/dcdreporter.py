@@ -38,7 +38,7 @@ class DCDReporter(object):
     To use it, create a DCDReporter, then add it to the Simulation's list of reporters.
     """
 
-    def __init__(self, file, reportInterval, append=False, enforcePeriodicBox=None, atomSubset=None):
+    def __init__(self, file, reportInterval, append=False, enforcePeriodicBox=None, atomSubset=None, bufferFrames=1):
         """Create a DCDReporter.
 
         Parameters
@@ -56,11 +56,17 @@ class DCDReporter(object):
             conditions.
         atomSubset: list
             Atom indices (zero indexed) of the particles to output.  If None (the default), all particles will be output.
+        bufferFrames: int
+            The number of frames to accumulate in memory before writing them to the file together.  Buffered
+            frames are written when flush() or close() is called, when the Simulation's flushReports() is called
+            (which happens automatically when saving a checkpoint or State), and when the reporter is deleted.
+            If the program crashes, any frames that are still buffered are lost.
         """
         self._reportInterval = reportInterval
         self._append = append
         self._enforcePeriodicBox = enforcePeriodicBox
         self._atomSubset = atomSubset
+        self._bufferFrames = bufferFrames
         if append:
             mode = 'r+b'
         else:
@@ -82,7 +88,7 @@ class DCDReporter(object):
             A dictionary describing the required information for the next report
         """
         steps = self._reportInterval - simulation.currentStep%self._reportInterval
-        return {'steps':steps, 'periodic':self._enforcePeriodicBox, 'include':['positions']}
+        return {'steps':steps, 'periodic':self._enforcePeriodicBox, 'include':['positions'], 'async':True}
 
     def report(self, simulation, state):
         """Generate a report.
@@ -108,12 +114,23 @@ class DCDReporter(object):
                     topology.addAtom(atoms[i].name, atoms[i].element, residue)
             self._dcd = DCDFile(
                 self._out, topology, simulation.integrator.getStepSize(),
-                self._reportInterval, self._reportInterval, self._append
+                self._reportInterval, self._reportInterval, self._append, self._bufferFrames
             )
-        positions = state.getPositions(asNumpy=True)
+        positions = state.getPositionsArray()
         if self._atomSubset is not None:
-            positions = [positions[i] for i in self._atomSubset]
+            positions = positions[self._atomSubset]
         self._dcd.writeModel(positions, periodicBoxVectors=state.getPeriodicBoxVectors())
 
+    def flush(self):
+        """Write any buffered frames to the file."""
+        if self._dcd is not None and not self._out.closed:
+            self._dcd.flush()
+
+    def close(self):
+        """Write any buffered frames and close the file.  No more reports may be generated after this is called."""
+        if not self._out.closed:
+            self.flush()
+            self._out.close()
+
     def __del__(self):
-        self._out.close()
+        self.close()
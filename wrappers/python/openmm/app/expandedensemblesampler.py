@@ -34,8 +34,11 @@ __version__ = "1.0"
 import openmm
 import openmm.unit as unit
 from openmm.app.internal import safesave
+from openmm.app.internal.contextsnapshot import ContextSnapshot
 from openmm.app.internal.multistatesampler import MultistateSampler
+from openmm.app.internal.recordfile import RecordFile
 import math
+import os
 import pickle
 import random
 
@@ -114,8 +117,10 @@ class ExpandedEnsembleSampler(object):
     - A file recording the current reduced energy (potential energy divided by kT) of every thermodynamic state.  This
     information is useful for calculating free energies.
     - A checkpoint file containing all information necessary to resume the simulation.  This includes internal fields
-    of the ExpandedEnsembleSampler itself, as well as a State object recording the current positions, velocities,
+    of the ExpandedEnsembleSampler itself, as well as a snapshot recording the current positions, velocities,
     parameters, etc.
+    - A binary data file containing the same information as the log and energy files, stored as fixed-size records.
+    It is faster to write and to resume from than the text files, and loadData() returns its contents as NumPy arrays.
 
     To resume a simulation from the saved checkpoint, pass `resume=True` to the constructor.  It will load all necessary
     information and configure the ExpandedEnsembleSampler correctly.
@@ -141,7 +146,7 @@ class ExpandedEnsembleSampler(object):
     def __init__(self, states: list[dict], simulation: "openmm.app.Simulation", stepsPerIteration: int,
                  reinitializeVelocities: bool = False, weights: list[float] | None = None, reportInterval: int = 1000,
                  logFile: str | object | None = None, energyFile: str | object | None = None,
-                 checkpointFile: str | None = None, resume: bool = False):
+                 checkpointFile: str | None = None, resume: bool = False, dataFile: str | None = None):
         """Create a new ExpandedEnsembleSampler.
 
         Parameters
@@ -171,6 +176,10 @@ class ExpandedEnsembleSampler(object):
         resume: bool
             Specifies whether to resume an earlier simulation.  If True, the checkpoint will be loaded and future output
             will be appended to the existing files.
+        dataFile: str | None
+            The path to an optional binary file for saving the current state, weights, and reduced energies at each
+            report.  Use loadData() to read it.  If resume is True, records are appended to the file.  If it does not
+            exist yet, a new one is created, as is done for logFile and energyFile.
         """
         self.states = states
         self.simulation = simulation
@@ -220,7 +229,7 @@ class ExpandedEnsembleSampler(object):
 
         # Open output files.
 
-        if (logFile is not None or energyFile is not None) and reportInterval%stepsPerIteration != 0:
+        if (logFile is not None or energyFile is not None or dataFile is not None) and reportInterval%stepsPerIteration != 0:
             raise ValueError('The reporting interval must be a multiple iteration length.')
         mode = 'a' if resume else 'w'
         self._openedLogFile = isinstance(logFile, str)
@@ -234,6 +243,12 @@ class ExpandedEnsembleSampler(object):
         else:
             self._energy = energyFile
         self._checkpointFile = checkpointFile
+        if dataFile is None:
+            self._records = None
+        else:
+            n = len(states)
+            fields = [('step', 'int64', ()), ('iteration', 'int64', ()), ('stateIndex', 'int32', ()), ('weights', 'float64', (n,)), ('energy', 'float64', (n,))]
+            self._records = RecordFile(dataFile, fields, append=resume and os.path.exists(dataFile))
 
         # Add a reporter to the simulation which will handle the updates and reports.
 
@@ -276,6 +291,8 @@ class ExpandedEnsembleSampler(object):
             self._log.close()
         if self._openedEnergyFile:
             self._energy.close()
+        if self._records is not None:
+            self._records.close()
 
     @property
     def weights(self):
@@ -362,7 +379,7 @@ class ExpandedEnsembleSampler(object):
             self.simulation.context.setVelocitiesToTemperature(temperature)
         elif kT[prevState] != kT[self.currentStateIndex]:
             scale = math.sqrt(kT[self.currentStateIndex]/kT[prevState])
-            self.simulation.context.setVelocities(scale*state.getVelocities(asNumpy=True))
+            self.simulation.context.setVelocities(scale*state.getVelocitiesArray())
         return reducedEnergy
 
     def _writeReport(self, reducedEnergy: list[float]):
@@ -371,10 +388,31 @@ class ExpandedEnsembleSampler(object):
             print(f'{self.simulation.currentStep},{self.currentIteration},{self.currentStateIndex},' + ','.join('%g' % v for v in self.weights), file=self._log)
         if self._energy is not None:
             print(f'{self.simulation.currentStep},' + ','.join('%g' % v for v in reducedEnergy), file=self._energy)
+        if self._records is not None:
+            self._records.append(step=self.simulation.currentStep, iteration=self.currentIteration, stateIndex=self.currentStateIndex,
+                                 weights=self.weights, energy=reducedEnergy)
         if self._checkpointFile is not None:
             checkpoint = self._createCheckpoint()
             safesave.save(pickle.dumps(checkpoint), self._checkpointFile)
 
+    @staticmethod
+    def loadData(dataFile: str) -> dict:
+        """Load the data written to the binary data file specified with the dataFile argument to the constructor.
+
+        Parameters
+        ----------
+        dataFile: str
+            The path to the file
+
+        Returns
+        -------
+        dict
+            A dict containing NumPy arrays whose first dimension is the number of reports.  'step', 'iteration', and
+            'stateIndex' contain the time step, iteration, and current state at each report.  'weights' and 'energy'
+            have shape (reports, states) and contain the weight and reduced energy of every state.
+        """
+        return RecordFile.load(dataFile)
+
     def _createCheckpoint(self) -> dict:
         """Create a dict containing the information to save to a checkpoint file."""
         checkpoint = {}
@@ -385,7 +423,7 @@ class ExpandedEnsembleSampler(object):
         checkpoint['weightUpdateFactor'] = self._weightUpdateFactor
         checkpoint['histogram'] = self._histogram
         checkpoint['hasMadeTransition'] = self._hasMadeTransition
-        checkpoint['state'] = self.simulation.context.getState(positions=True, velocities=True, parameters=True, integratorParameters=True)
+        checkpoint['state'] = ContextSnapshot.fromContext(self.simulation.context)
         return checkpoint
 
     def _applyCheckpoint(self, checkpoint: dict):
@@ -397,4 +435,9 @@ class ExpandedEnsembleSampler(object):
         self._weightUpdateFactor = checkpoint['weightUpdateFactor']
         self._histogram = checkpoint['histogram']
         self._hasMadeTransition = checkpoint['hasMadeTransition']
-        self.simulation.context.setState(checkpoint['state'])
+        if isinstance(checkpoint['state'], ContextSnapshot):
+            checkpoint['state'].applyTo(self.simulation.context)
+        else:
+            # Checkpoints written by older versions contain a State.
+
+            self.simulation.context.setState(checkpoint['state'])
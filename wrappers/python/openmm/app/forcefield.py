@@ -32,7 +32,11 @@ __author__ = "Peter Eastman"
 __version__ = "1.0"
 
 import os
+import io
 import itertools
+import hashlib
+import pickle
+import stat
 import xml.etree.ElementTree as etree
 import math
 import warnings
@@ -40,6 +44,7 @@ from math import sqrt, cos
 from copy import deepcopy
 from collections import Counter, defaultdict
 from difflib import SequenceMatcher
+import numpy as np
 import openmm as mm
 import openmm.unit as unit
 from . import element as elem
@@ -47,6 +52,7 @@ from openmm.app.topology import MergedResidue
 from openmm.app.internal.singleton import Singleton
 from openmm.app.internal import compiled, amoebaforces
 from openmm.app.internal.argtracker import ArgTracker
+from openmm.app.internal import safesave
 
 # Directories from which to load built in force fields.
 
@@ -195,7 +201,7 @@ parsers = {}
 class ForceField(object):
     """A ForceField constructs OpenMM System objects based on a Topology."""
 
-    def __init__(self, *files):
+    def __init__(self, *files, cacheDir=None):
         """Load one or more XML files and create a ForceField object based on them.
 
         Parameters
@@ -206,6 +212,13 @@ class ForceField(object):
             directory, a path relative to this module's data subdirectory
             (for built in force fields), or an open file-like object with a
             read() method from which the forcefield XML data can be loaded.
+        cacheDir : string=None
+            If specified, a directory in which to cache the fully processed
+            force field.  Loading the same files again (with the same version
+            of OpenMM) restores the cached definitions instead of parsing the
+            XML.  Cache files are unpickled, so they can execute arbitrary code.
+            Only use a directory that other users cannot write to.  See loadFile()
+            for details.
         """
         self._atomTypes = {}
         self._templates = {}
@@ -217,9 +230,9 @@ class ForceField(object):
         self._scripts = []
         self._templateMatchers = []
         self._templateGenerators = []
-        self.loadFile(files)
+        self.loadFile(files, cacheDir=cacheDir)
 
-    def loadFile(self, files, resname_prefix=''):
+    def loadFile(self, files, resname_prefix='', cacheDir=None):
         """Load an XML file and add the definitions from it to this ForceField.
 
         Parameters
@@ -233,6 +246,19 @@ class ForceField(object):
         prefix : string
             An optional string to be prepended to each residue name found in the
             loaded files.
+        cacheDir : string=None
+            If specified, a directory in which to cache the fully processed
+            force field.  The cache is keyed on the contents of the files, the
+            residue name prefix, and the OpenMM version, and it is ignored if any
+            included file has changed since it was written.  The cache is only
+            used when loading files into an otherwise empty ForceField, and it
+            is not written for files containing initialization scripts.
+
+            Cache files are read with pickle, so anyone who can write to the
+            directory can make this process execute arbitrary code.  On systems
+            that support it, a cache file is ignored with a warning unless both
+            it and the directory are owned by the current user and are not
+            writable by the group or by other users.
         """
 
         if isinstance(files, tuple):
@@ -240,7 +266,16 @@ class ForceField(object):
         else:
             files = [files]
 
+        cacheFile = None
+        if cacheDir is not None and len(files) > 0 and self._isEmpty():
+            files, cacheKey = _computeCacheKey(files, resname_prefix)
+            cacheFile = os.path.join(cacheDir, 'forcefield-%s.cache' % cacheKey)
+            if self._loadFromCache(cacheFile):
+                return
+        numTopLevelFiles = len(files)
+
         trees = []
+        filenames = []
 
         i = 0
         while i < len(files):
@@ -265,6 +300,7 @@ class ForceField(object):
                 raise Exception('ForceField.loadFile() encountered an error reading file "%s": %s' % (filename, e))
 
             trees.append(tree)
+            filenames.append(file)
             i += 1
 
             # Process includes in this file.
@@ -427,6 +463,56 @@ class ForceField(object):
             for node in tree.getroot().findall('InitializationScript'):
                 exec(node.text, locals())
 
+        # Save the processed force field for future use.
+
+        if cacheFile is not None and not any(tree.getroot().find('InitializationScript') is not None for tree in trees):
+            self._saveToCache(cacheFile, filenames[numTopLevelFiles:])
+
+    def _isEmpty(self):
+        """Get whether nothing has been added to this ForceField since it was created."""
+        return (len(self._atomTypes) == 0 and len(self._templates) == 0 and len(self._patches) == 0 and len(self._forces) == 0
+                and len(self._scripts) == 0 and len(self._templateMatchers) == 0 and len(self._templateGenerators) == 0)
+
+    def _loadFromCache(self, cacheFile):
+        """Try to restore the definitions of this ForceField from a cache file.  Returns True on success."""
+        if not os.path.isfile(cacheFile):
+            return False
+        try:
+            with open(cacheFile, 'rb') as f:
+                if not _isPrivateCacheFile(f, os.path.dirname(os.path.abspath(cacheFile))):
+                    warnings.warn('Ignoring force field cache file "%s" because it may have been written by another user' % cacheFile)
+                    return False
+                unpickler = _ForceFieldCacheUnpickler(f, self)
+                dependencies = unpickler.load()
+                for filename, fileHash in dependencies:
+                    if not os.path.isfile(filename) or _hashFile(filename) != fileHash:
+                        # An included file has changed, so the cache is out of date.
+                        return False
+                state = unpickler.load()
+        except Exception:
+            # The cache is corrupt or was written by an incompatible version, so just reparse the files.
+            return False
+        self.__dict__.update(state)
+        return True
+
+    def _saveToCache(self, cacheFile, includedFiles):
+        """Write the definitions of this ForceField to a cache file."""
+        dependencies = [(os.path.abspath(f), _hashFile(f)) for f in includedFiles if isinstance(f, str)]
+        stream = io.BytesIO()
+        pickler = _ForceFieldCachePickler(stream, self)
+        try:
+            pickler.dump(dependencies)
+            pickler.dump(self.__dict__)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # Something added by a plugin cannot be pickled, so this force field cannot be cached.
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(cacheFile)), mode=0o755, exist_ok=True)
+            safesave.save(stream.getvalue(), cacheFile)
+            os.chmod(cacheFile, 0o644)
+        except OSError:
+            warnings.warn('Could not write force field cache file "%s"' % cacheFile)
+
     def getGenerators(self):
         """Get the list of all registered generators."""
         return self._forces
@@ -639,26 +725,25 @@ class ForceField(object):
             self.atomBonds = [[] for _ in self.atoms]
             self.isAngleConstrained = []
             self.constraints = {}
-            self.bondedToAtom = [set() for _ in self.atoms]
             self.atomClasses = []
 
             # Record which atoms are bonded to each other atom
 
             for i, bond in enumerate(self.bonds):
-                self.bondedToAtom[bond.atom1].add(bond.atom2)
-                self.bondedToAtom[bond.atom2].add(bond.atom1)
                 self.atomBonds[bond.atom1].append(i)
                 self.atomBonds[bond.atom2].append(i)
-            self.bondedToAtom = [sorted(b) for b in self.bondedToAtom]
+            self.bondedToAtom = ForceField._buildBondedToAtomList(topology)
 
             # Record which residues are bonded to each other atom
 
-            bondedResidues = defaultdict(set)
-            for atom1, atom2 in topology.bonds():
-                if atom1.residue != atom2.residue:
-                    bondedResidues[atom1.residue].add(atom2.residue)
-                    bondedResidues[atom2.residue].add(atom1.residue)
-            self.bondedResidues = {x:list(y) for x, y in bondedResidues.items()}
+            bondResidues = topology.getAtomResidueIndices()[topology.getBondAtomIndices()]
+            bondResidues = bondResidues[bondResidues[:,0] != bondResidues[:,1]]
+            bondResidues = np.unique(np.concatenate([bondResidues, bondResidues[:,::-1]]), axis=0)
+            residues = list(topology.residues())
+            bondedResidues = defaultdict(list)
+            for res1, res2 in bondResidues.tolist():
+                bondedResidues[residues[res1]].append(residues[res2])
+            self.bondedResidues = dict(bondedResidues)
 
         def addConstraint(self, system, atom1, atom2, distance):
             """Add a constraint to the system, avoiding duplicate constraints."""
@@ -1038,7 +1123,7 @@ class ForceField(object):
                 raise ValueError('%s: No parameters defined for atom type %s' % (self.forceName, t))
 
 
-    def _getResidueTemplateMatches(self, res, bondedToAtom, templateSignatures=None, ignoreExternalBonds=False, ignoreExtraParticles=False):
+    def _getResidueTemplateMatches(self, res, bondedToAtom, templateSignatures=None, ignoreExternalBonds=False, ignoreExtraParticles=False, matchCache=None):
         """Return the templates that match a residue, or None if none are found.
 
         Parameters
@@ -1047,6 +1132,12 @@ class ForceField(object):
             The residue for which template matches are to be retrieved.
         bondedToAtom : list of set of int
             bondedToAtom[i] is the set of atoms bonded to atom index i
+        matchCache : dict=None
+            If specified, results are stored in this dict keyed by a fingerprint of
+            the residue, and identical residues reuse the stored result instead of
+            repeating the matching.  The same dict must only be used with the same
+            templateSignatures, ignoreExternalBonds, and ignoreExtraParticles, and
+            only while the set of templates does not change.
 
         Returns
         -------
@@ -1057,6 +1148,11 @@ class ForceField(object):
             corresponds to, or None if it does not match the template
 
         """
+        if matchCache is not None and len(self._templateMatchers) == 0:
+            fingerprint = _createResidueFingerprint(res, bondedToAtom, ignoreExternalBonds)
+            if fingerprint not in matchCache:
+                matchCache[fingerprint] = self._getResidueTemplateMatches(res, bondedToAtom, templateSignatures, ignoreExternalBonds, ignoreExtraParticles)
+            return list(matchCache[fingerprint])
         template = None
         matches = None
         for matcher in self._templateMatchers:
@@ -1075,20 +1171,92 @@ class ForceField(object):
                 match = compiled.matchResidueToTemplate(res, t, bondedToAtom, ignoreExternalBonds, ignoreExtraParticles)
                 if match is not None:
                     allMatches.append((t, match))
-            if len(allMatches) == 1:
-                template = allMatches[0][0]
-                matches = allMatches[0][1]
-            elif len(allMatches) > 1:
-                # We found multiple matches.  This is OK if and only if they assign identical types and parameters to all atoms.
-                t1, m1 = allMatches[0]
-                for t2, m2 in allMatches[1:]:
-                    if not t1.areParametersIdentical(t2, m1, m2):
-                        raise Exception('Multiple non-identical matching templates found for residue %d (%s): %s.' % (res.index, res.name, ', '.join(match[0].name for match in allMatches)))
-                template = allMatches[0][0]
-                matches = allMatches[0][1]
+            template, matches = self._selectTemplateMatch(res, allMatches)
         return [template, matches]
 
-    def _buildBondedToAtomList(self, topology):
+    def _selectTemplateMatch(self, res, allMatches):
+        """Select the template to use for a residue, given a list of (template, matches) for all
+        templates that match it.  This returns a list [template, matches], or [None, None] if there are
+        no matches."""
+        if len(allMatches) == 0:
+            return [None, None]
+        if len(allMatches) > 1:
+            # We found multiple matches.  This is OK if and only if they assign identical types and parameters to all atoms.
+            t1, m1 = allMatches[0]
+            for t2, m2 in allMatches[1:]:
+                if not t1.areParametersIdentical(t2, m1, m2):
+                    raise Exception('Multiple non-identical matching templates found for residue %d (%s): %s.' % (res.index, res.name, ', '.join(match[0].name for match in allMatches)))
+        return [allMatches[0][0], allMatches[0][1]]
+
+    def _findTemplatesForResidues(self, residues, bondedToAtom, ignoreExternalBonds=False, ignoreExtraParticles=False, executor=None):
+        """Find the existing template that matches each of a list of residues.
+
+        Parameters
+        ----------
+        residues : list of Topology.Residue
+            The residues for which template matches are to be retrieved.
+        bondedToAtom : list of set of int
+            bondedToAtom[i] is the set of atoms bonded to atom index i
+        executor : concurrent.futures.Executor=None
+            If specified, distinct residues are matched in parallel by tasks
+            submitted to this executor, one for each chain.  The tasks only
+            receive and return plain data, so the executor may use processes.
+
+        Returns
+        -------
+        list
+            For each residue, a list [template, matches] as returned by
+            _getResidueTemplateMatches().  The results do not depend on whether
+            an executor is used.
+        """
+        matchCache = {}
+        if executor is None or len(self._templateMatchers) > 0:
+            # Custom template matchers may depend on state that is not safe to access in parallel,
+            # so they are always invoked serially.
+            return [self._getResidueTemplateMatches(res, bondedToAtom, ignoreExternalBonds=ignoreExternalBonds, ignoreExtraParticles=ignoreExtraParticles, matchCache=matchCache) for res in residues]
+
+        # Identify the distinct residues and group them by chain.  Only the first residue with each
+        # fingerprint needs to be matched.
+
+        fingerprints = [_createResidueFingerprint(res, bondedToAtom, ignoreExternalBonds) for res in residues]
+        groups = {}
+        for res, fingerprint in zip(residues, fingerprints):
+            if fingerprint not in matchCache:
+                matchCache[fingerprint] = None
+                if res.chain not in groups:
+                    groups[res.chain] = []
+                groups[res.chain].append((fingerprint, res))
+
+        # Match each group in a separate task.  Each task is sent the bond graphs of its residues and of the
+        # templates they might match, and it returns the names of the matching templates.  That keeps the data
+        # passed to other processes small, and lets the results refer to the original template objects.
+
+        templateGraphs = {}
+        templatesByName = {}
+        futures = []
+        for group in groups.values():
+            residueGraphs = []
+            groupTemplateGraphs = {}
+            for fingerprint, res in group:
+                signature = _createResidueSignature([atom.element for atom in res.atoms()])
+                candidates = self._templateSignatures.get(signature, [])
+                for t in candidates:
+                    if t.name not in templateGraphs:
+                        templateGraphs[t.name] = _encodeTemplateGraph(t)
+                        templatesByName[t.name] = t
+                    groupTemplateGraphs[t.name] = templateGraphs[t.name]
+                residueGraphs.append((_encodeResidueGraph(fingerprint), [t.name for t in candidates]))
+            futures.append((group, executor.submit(_matchResidueGraphs, residueGraphs, groupTemplateGraphs, ignoreExternalBonds, ignoreExtraParticles)))
+
+        # Merge the results in order.
+
+        for group, future in futures:
+            for (fingerprint, res), matches in zip(group, future.result()):
+                matchCache[fingerprint] = self._selectTemplateMatch(res, [(templatesByName[name], match) for name, match in matches])
+        return [list(matchCache[fingerprint]) for fingerprint in fingerprints]
+
+    @staticmethod
+    def _buildBondedToAtomList(topology):
         """Build a list of which atom indices are bonded to each atom.
 
         Parameters
@@ -1102,14 +1270,12 @@ class ForceField(object):
             bondedToAtom[index] is the list of atom indices bonded to atom `index`
 
         """
-        bondedToAtom = [set() for _ in topology.atoms()]
-        for (atom1, atom2) in topology.bonds():
-            bondedToAtom[atom1.index].add(atom2.index)
-            bondedToAtom[atom2.index].add(atom1.index)
-        bondedToAtom = [sorted(b) for b in bondedToAtom]
-        return bondedToAtom
-
-    def getUnmatchedResidues(self, topology, residueTemplates=dict()):
+        offsets, neighbors = topology.getBondedAtomIndices()
+        offsets = offsets.tolist()
+        neighbors = neighbors.tolist()
+        return [neighbors[offsets[i]:offsets[i+1]] for i in range(topology.getNumAtoms())]
+
+    def getUnmatchedResidues(self, topology, residueTemplates=dict(), executor=None):
         """Return a list of Residue objects from specified topology for which no forcefield templates are available.
 
         .. CAUTION:: This method is experimental, and its API is subject to change.
@@ -1124,6 +1290,9 @@ class ForceField(object):
             use for them.  This is useful when a ForceField contains multiple templates that
             can match the same residue (e.g Fe2+ and Fe3+ templates in the ForceField for a
             monoatomic iron ion in the Topology).
+        executor : concurrent.futures.Executor=None
+            If specified, residues are matched to templates in parallel using this executor.
+            See createSystem() for details.
 
         Returns
         -------
@@ -1136,21 +1305,23 @@ class ForceField(object):
         # Find the template matching each residue, compiling a list of residues for which no templates are available.
         bondedToAtom = self._buildBondedToAtomList(topology)
         unmatched_residues = list() # list of unmatched residues
+        residues = [res for res in topology.residues() if res not in residueTemplates]
+        templateMatches = dict(zip(residues, self._findTemplatesForResidues(residues, bondedToAtom, executor=executor)))
         for res in topology.residues():
             if res in residueTemplates:
                 # Make sure the specified template matches.
                 template = self._templates[residueTemplates[res]]
                 matches = compiled.matchResidueToTemplate(res, template, bondedToAtom, False, False)
             else:
-                # Attempt to match one of the existing templates.
-                [template, matches] = self._getResidueTemplateMatches(res, bondedToAtom)
+                # Use the match to one of the existing templates.
+                [template, matches] = templateMatches[res]
             if matches is None:
                 # No existing templates match.
                 unmatched_residues.append(res)
 
         return unmatched_residues
 
-    def getMatchingTemplates(self, topology, ignoreExternalBonds=False):
+    def getMatchingTemplates(self, topology, ignoreExternalBonds=False, executor=None):
         """Return a list of forcefield residue templates matching residues in the specified topology.
 
         .. CAUTION:: This method is experimental, and its API is subject to change.
@@ -1161,6 +1332,10 @@ class ForceField(object):
             The Topology whose residues are to be checked against the forcefield residue templates.
         ignoreExternalBonds : bool=False
             If true, ignore external bonds when matching residues to templates.
+        executor : concurrent.futures.Executor=None
+            If specified, residues are matched to templates in parallel using this executor.
+            See createSystem() for details.
+
         Returns
         -------
         templates : list of _TemplateData
@@ -1172,9 +1347,8 @@ class ForceField(object):
         # Find the template matching each residue, compiling a list of residues for which no templates are available.
         bondedToAtom = self._buildBondedToAtomList(topology)
         templates = list() # list of templates matching the corresponding residues
-        for residue in topology.residues():
-            # Attempt to match one of the existing templates.
-            [template, matches] = self._getResidueTemplateMatches(residue, bondedToAtom, ignoreExternalBonds=ignoreExternalBonds)
+        residues = list(topology.residues())
+        for residue, [template, matches] in zip(residues, self._findTemplatesForResidues(residues, bondedToAtom, ignoreExternalBonds=ignoreExternalBonds, executor=executor)):
             # Raise an exception if we have found no templates that match.
             if matches is None:
                 raise ValueError('No template found for chainid <%s> resid <%s> resname <%s> (residue index within topology %d).\n%s' % (residue.chain.id, residue.id, residue.name, residue.index, _findMatchErrors(self, residue)))
@@ -1230,7 +1404,7 @@ class ForceField(object):
 
     def createSystem(self, topology, nonbondedMethod=NoCutoff, nonbondedCutoff=1.0*unit.nanometer,
                      constraints=None, rigidWater=None, removeCMMotion=True, hydrogenMass=None, residueTemplates=dict(),
-                     ignoreExternalBonds=False, switchDistance=None, flexibleConstraints=False, drudeMass=0.4*unit.amu, **args):
+                     ignoreExternalBonds=False, switchDistance=None, flexibleConstraints=False, drudeMass=0.4*unit.amu, executor=None, **args):
         """Construct an OpenMM System representing a Topology with this force field.
 
         Parameters
@@ -1277,6 +1451,14 @@ class ForceField(object):
         drudeMass : mass=0.4*amu
             The mass to use for Drude particles.  Any mass added to a Drude particle is
             subtracted from its parent atom to keep their total mass the same.
+        executor : concurrent.futures.Executor=None
+            If specified, residues are matched to templates in parallel by submitting one
+            task for each chain to this executor.  Matching is done in Python and holds the
+            global interpreter lock, so use a ProcessPoolExecutor to get a speedup.  Results
+            are merged in the same order as the residues, so the System is identical to the
+            one created without an executor.  Patches and residue template generators are
+            always applied serially afterward.  Custom template matchers disable parallel
+            matching.
         args
             Arbitrary additional keyword arguments may also be specified.
             This allows extra parameters to be specified that are specific to
@@ -1302,7 +1484,7 @@ class ForceField(object):
 
         # Find the template matching each residue and assign atom types.
 
-        templateForResidue = self._matchAllResiduesToTemplates(data, topology, residueTemplates, ignoreExternalBonds)
+        templateForResidue = self._matchAllResiduesToTemplates(data, topology, residueTemplates, ignoreExternalBonds, executor=executor)
         for res, template in templateForResidue.items():
             if res.name == 'HOH':
                 # Determine whether this should be a rigid water.
@@ -1357,49 +1539,12 @@ class ForceField(object):
         elif nonbondedMethod not in [NoCutoff, CutoffNonPeriodic]:
             raise ValueError('Requested periodic boundary conditions for a Topology that does not specify periodic box dimensions')
 
-        # Make a list of all unique angles
-
-        uniqueAngles = set()
-        for bond in data.bonds:
-            for atom in data.bondedToAtom[bond.atom1]:
-                if atom != bond.atom2:
-                    if atom < bond.atom2:
-                        uniqueAngles.add((atom, bond.atom1, bond.atom2))
-                    else:
-                        uniqueAngles.add((bond.atom2, bond.atom1, atom))
-            for atom in data.bondedToAtom[bond.atom2]:
-                if atom != bond.atom1:
-                    if atom > bond.atom1:
-                        uniqueAngles.add((bond.atom1, bond.atom2, atom))
-                    else:
-                        uniqueAngles.add((atom, bond.atom2, bond.atom1))
-        data.angles = sorted(list(uniqueAngles))
-
-        # Make a list of all unique proper torsions
-
-        uniquePropers = set()
-        for angle in data.angles:
-            for atom in data.bondedToAtom[angle[0]]:
-                if atom not in angle:
-                    if atom < angle[2]:
-                        uniquePropers.add((atom, angle[0], angle[1], angle[2]))
-                    else:
-                        uniquePropers.add((angle[2], angle[1], angle[0], atom))
-            for atom in data.bondedToAtom[angle[2]]:
-                if atom not in angle:
-                    if atom > angle[0]:
-                        uniquePropers.add((angle[0], angle[1], angle[2], atom))
-                    else:
-                        uniquePropers.add((atom, angle[2], angle[1], angle[0]))
-        data.propers = sorted(list(uniquePropers))
+        # Make lists of all unique angles, proper torsions, and improper torsions
 
-        # Make a list of all unique improper torsions
-
-        for atom in range(len(data.bondedToAtom)):
-            bondedTo = data.bondedToAtom[atom]
-            if len(bondedTo) > 2:
-                for subset in itertools.combinations(bondedTo, 3):
-                    data.impropers.append((atom, subset[0], subset[1], subset[2]))
+        angles, propers, impropers = _findAnglesAndTorsions(data.bondedToAtom)
+        data.angles = list(map(tuple, angles.tolist()))
+        data.propers = list(map(tuple, propers.tolist()))
+        data.impropers = list(map(tuple, impropers.tolist()))
 
         # Identify bonds that should be implemented with constraints
 
@@ -1514,10 +1659,12 @@ class ForceField(object):
         return sys
 
 
-    def _matchAllResiduesToTemplates(self, data, topology, residueTemplates, ignoreExternalBonds, ignoreExtraParticles=False, recordParameters=True):
+    def _matchAllResiduesToTemplates(self, data, topology, residueTemplates, ignoreExternalBonds, ignoreExtraParticles=False, recordParameters=True, executor=None):
         """Return a list of which template matches each residue in the topology, and assign atom types."""
         templateForResidue = {}
         unmatchedResidues = []
+        residues = [res for chain in topology.chains() for res in chain.residues() if res not in residueTemplates]
+        templateMatches = dict(zip(residues, self._findTemplatesForResidues(residues, data.bondedToAtom, ignoreExternalBonds, ignoreExtraParticles, executor)))
         for chain in topology.chains():
             for res in chain.residues():
                 if res in residueTemplates:
@@ -1527,8 +1674,8 @@ class ForceField(object):
                     if matches is None:
                         raise Exception('User-supplied template %s does not match the residue %d (%s)' % (tname, res.index, res.name))
                 else:
-                    # Attempt to match one of the existing templates.
-                    [template, matches] = self._getResidueTemplateMatches(res, data.bondedToAtom, ignoreExternalBonds=ignoreExternalBonds, ignoreExtraParticles=ignoreExtraParticles)
+                    # Use the match to one of the existing templates.
+                    [template, matches] = templateMatches[res]
                 if matches is None:
                     unmatchedResidues.append(res)
                 else:
@@ -1614,6 +1761,169 @@ class ForceField(object):
         return MergedResidue(list(molecule))
 
 
+class _ForceFieldCachePickler(pickle.Pickler):
+    """Pickler used to write ForceField caches.  References to the ForceField itself (for example, held
+    by generators) are stored symbolically so they can be reconnected to the ForceField being loaded."""
+    def __init__(self, file, forcefield):
+        super(_ForceFieldCachePickler, self).__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.forcefield = forcefield
+
+    def persistent_id(self, obj):
+        if obj is self.forcefield:
+            return 'forcefield'
+        return None
+
+
+class _ForceFieldCacheUnpickler(pickle.Unpickler):
+    """Unpickler used to read ForceField caches written by _ForceFieldCachePickler."""
+    def __init__(self, file, forcefield):
+        super(_ForceFieldCacheUnpickler, self).__init__(file)
+        self.forcefield = forcefield
+
+    def persistent_load(self, pid):
+        if pid == 'forcefield':
+            return self.forcefield
+        raise pickle.UnpicklingError('Unknown persistent id: %s' % pid)
+
+
+def _isPrivateCacheFile(file, directory):
+    """Get whether an open cache file and the directory containing it are owned by the current user
+    and cannot be modified by anyone else, so it is safe to unpickle the file."""
+    if not hasattr(os, 'getuid'):
+        # Ownership and permission bits are not meaningful on Windows.
+        return True
+    for info in (os.stat(directory), os.fstat(file.fileno())):
+        if info.st_uid != os.getuid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH) != 0:
+            return False
+    return True
+
+
+def _hashFile(filename):
+    """Compute a hash of the contents of a file."""
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _computeCacheKey(files, resname_prefix):
+    """Compute the key identifying a set of force field files in the cache.
+
+    File-like objects are read in the process, so this returns a new list of files in which they
+    have been replaced by in-memory copies that can still be parsed.
+    """
+    key = hashlib.sha256()
+    key.update(mm.version.full_version.encode('utf-8'))
+    key.update(b'\0'+resname_prefix.encode('utf-8'))
+    newFiles = []
+    for file in files:
+        if isinstance(file, str):
+            if not os.path.isfile(file):
+                for dataDir in _getDataDirectories():
+                    f = os.path.join(dataDir, file)
+                    if os.path.isfile(f):
+                        file = f
+                        break
+            if not os.path.isfile(file):
+                raise ValueError('Could not locate file "%s"' % file)
+            with open(file, 'rb') as f:
+                data = f.read()
+            # The location affects how includes are resolved, so it must be part of the key.
+            key.update(b'\0'+os.path.abspath(file).encode('utf-8'))
+        else:
+            data = file.read()
+            if isinstance(data, str):
+                copy = io.StringIO(data)
+                data = data.encode('utf-8')
+            else:
+                copy = io.BytesIO(data)
+            if hasattr(file, 'name'):
+                copy.name = file.name
+            file = copy
+        key.update(b'\0'+hashlib.sha256(data).digest())
+        newFiles.append(file)
+    return newFiles, key.hexdigest()
+
+
+def _findAnglesAndTorsions(bondedToAtom):
+    """Identify all unique angles, proper torsions, and improper torsions formed by a set of bonds.
+
+    Parameters
+    ----------
+    bondedToAtom : list of list of int
+        bondedToAtom[i] is the sorted list of atoms bonded to atom index i
+
+    Returns
+    -------
+    angles : array
+        an (n, 3) array of atom indices.  Each angle is listed once, with the
+        lower index first, and rows are sorted.
+    propers : array
+        an (n, 4) array of atom indices.  Each torsion is listed once, with the
+        lower index first, and rows are sorted.
+    impropers : array
+        an (n, 4) array of atom indices.  The central atom is listed first,
+        followed by every combination of three atoms bonded to it.  Rows are sorted.
+    """
+    numAtoms = len(bondedToAtom)
+    degree = np.array([len(b) for b in bondedToAtom], dtype=np.int64)
+    offsets = np.zeros(numAtoms+1, dtype=np.int64)
+    np.cumsum(degree, out=offsets[1:])
+    neighbors = np.fromiter(itertools.chain.from_iterable(bondedToAtom), dtype=np.int64, count=offsets[-1])
+
+    def sortRows(rows):
+        return rows[np.lexsort(rows.T[::-1])]
+
+    def combinations(size):
+        # For every atom with at least `size` bonds, list every combination of `size` atoms bonded to it.
+        # Atoms with the same number of bonds are processed together.
+        rows = [np.zeros((0, size+1), dtype=np.int64)]
+        for d in np.unique(degree[degree >= size]):
+            centers = np.nonzero(degree == d)[0]
+            bonded = neighbors[offsets[centers][:,np.newaxis] + np.arange(d)]
+            choices = np.array(list(itertools.combinations(range(d), size)), dtype=np.int64)
+            rows.append(np.column_stack([np.repeat(centers, len(choices)), bonded[:,choices].reshape(-1, size)]))
+        return sortRows(np.concatenate(rows))
+
+    def expand(counts):
+        # Given the size of each group, return the group of each element and its position within the group.
+        group = np.repeat(np.arange(len(counts)), counts)
+        starts = np.cumsum(counts)-counts
+        return group, np.arange(len(group))-starts[group]
+
+    # An angle is a pair of atoms bonded to a central atom.
+
+    combos = combinations(2)
+    angles = sortRows(combos[:,[1, 0, 2]])
+
+    # Impropers are triples of atoms bonded to a central atom.
+
+    impropers = combinations(3)
+
+    # A proper torsion i-j-k-l is formed by a central bond j-k, an atom i bonded to j, and an
+    # atom l bonded to k.  Consider each bond once (j < k), and find all (i, l) pairs for it.
+
+    atom1 = np.repeat(np.arange(numAtoms), degree)
+    isCentral = atom1 < neighbors
+    j = atom1[isCentral]
+    k = neighbors[isCentral]
+    edge, position = expand(degree[j])
+    i = neighbors[offsets[j][edge]+position]
+    keep = (i != k[edge])
+    leftEdge, i = edge[keep], i[keep]
+    edge, position = expand(degree[k])
+    l = neighbors[offsets[k][edge]+position]
+    keep = (l != j[edge])
+    rightEdge, l = edge[keep], l[keep]
+    rightCounts = np.bincount(rightEdge, minlength=len(j))
+    rightStarts = np.cumsum(rightCounts)-rightCounts
+    left, position = expand(rightCounts[leftEdge])
+    edge = leftEdge[left]
+    propers = np.column_stack([i[left], j[edge], k[edge], l[rightStarts[edge]+position]])
+    propers = propers[propers[:,0] != propers[:,3]]
+    reverse = propers[:,0] > propers[:,3]
+    propers[reverse] = propers[reverse][:,::-1]
+    return angles, sortRows(propers), impropers
+
+
 def _findBondsForExclusions(data, sys):
     """Create a list of bonds to use when identifying exclusions."""
     bondIndices = []
@@ -1735,6 +2045,92 @@ def _createResidueSignature(elements):
     return s
 
 
+def _createResidueFingerprint(res, bondedToAtom, ignoreExternalBonds):
+    """Create a key that is identical for any two residues that will match the same templates with the
+    same atom correspondence.  It describes the residue name and, in order, the element of each atom, which
+    other atoms of the residue it is bonded to, and how many external bonds it has.  Names are included
+    for atoms without elements, since they are used when matching extra particles."""
+    atoms = list(res.atoms())
+    localIndex = {}
+    for i, atom in enumerate(atoms):
+        localIndex[atom.index] = i
+    description = []
+    for atom in atoms:
+        internal = []
+        numExternal = 0
+        for j in bondedToAtom[atom.index]:
+            if j in localIndex:
+                internal.append(localIndex[j])
+            else:
+                numExternal += 1
+        if ignoreExternalBonds:
+            numExternal = 0
+        name = atom.name if atom.element is None else None
+        description.append((atom.element, name, tuple(internal), numExternal))
+    return (res.name, tuple(description))
+
+
+def _encodeResidueGraph(fingerprint):
+    """Convert a residue fingerprint created by _createResidueFingerprint() to plain data that can be sent
+    to another process.  It lists, for each atom, the element symbol, the name (only for atoms without
+    elements), the indices of bonded atoms within the residue, and the number of external bonds."""
+    return tuple((None if element is None else element.symbol, name, internal, numExternal) for element, name, internal, numExternal in fingerprint[1])
+
+
+def _encodeTemplateGraph(template):
+    """Convert the atoms and bonds of a residue template to plain data in the same format as _encodeResidueGraph()."""
+    return tuple((None if atom.element is None else atom.element.symbol, atom.name, tuple(atom.bondedTo), atom.externalBonds) for atom in template.atoms)
+
+
+class _GraphAtom(object):
+    """An atom of a residue or template decoded by _matchResidueGraphs()."""
+    def __init__(self, index, symbol, name, bondedTo, externalBonds):
+        self.index = index
+        self.element = None if symbol is None else elem.get_by_symbol(symbol)
+        self.name = name
+        self.bondedTo = list(bondedTo)
+        self.externalBonds = externalBonds
+
+
+class _GraphTemplate(object):
+    """A residue template decoded by _matchResidueGraphs().  It has the attributes used by compiled.matchResidueToTemplate()."""
+    def __init__(self, graph):
+        self.atoms = [_GraphAtom(i, *atom) for i, atom in enumerate(graph)]
+
+
+class _GraphResidue(object):
+    """A residue decoded by _matchResidueGraphs().  It has the methods used by compiled.matchResidueToTemplate().
+    External bonds are represented as bonds to an atom whose index is one past the last atom."""
+    def __init__(self, graph):
+        self._atoms = [_GraphAtom(i, *atom) for i, atom in enumerate(graph)]
+        self.bondedToAtom = [list(internal)+[len(graph)]*numExternal for symbol, name, internal, numExternal in graph]
+
+    def atoms(self):
+        return iter(self._atoms)
+
+
+def _matchResidueGraphs(residueGraphs, templateGraphs, ignoreExternalBonds, ignoreExtraParticles):
+    """Match residues to templates.  This is the task executed by ForceField._findTemplatesForResidues() when
+    matching in parallel.  It only receives and returns plain data, so it can be executed in another process.
+
+    residueGraphs is a list of (graph, templateNames), where graph was created by _encodeResidueGraph() and
+    templateNames are the names of the templates to compare it to.  templateGraphs maps each template name
+    to a graph created by _encodeTemplateGraph().  For each residue, this returns a list of (name, matches)
+    for every template that matches it.
+    """
+    templates = dict((name, _GraphTemplate(graph)) for name, graph in templateGraphs.items())
+    results = []
+    for graph, templateNames in residueGraphs:
+        res = _GraphResidue(graph)
+        allMatches = []
+        for name in templateNames:
+            match = compiled.matchResidueToTemplate(res, templates[name], res.bondedToAtom, ignoreExternalBonds, ignoreExtraParticles)
+            if match is not None:
+                allMatches.append((name, match))
+        results.append(allMatches)
+    return results
+
+
 def _applyPatchesToMatchResidues(forcefield, data, residues, templateForResidue, bondedToAtom, ignoreExternalBonds, ignoreExtraParticles):
     """Try to apply patches to find matches for residues."""
     # Start by creating all templates than can be created by applying a combination of one-residue patches
@@ -1760,8 +2156,9 @@ def _applyPatchesToMatchResidues(forcefield, data, residues, templateForResidue,
     # Now see if any of those templates matches any of the residues.
 
     unmatchedResidues = []
+    matchCache = {}
     for res in residues:
-        [template, matches] = forcefield._getResidueTemplateMatches(res, bondedToAtom, patchedTemplateSignatures, ignoreExternalBonds, ignoreExtraParticles)
+        [template, matches] = forcefield._getResidueTemplateMatches(res, bondedToAtom, patchedTemplateSignatures, ignoreExternalBonds, ignoreExtraParticles, matchCache)
         if matches is None:
             unmatchedResidues.append(res)
         else:
@@ -2345,6 +2742,9 @@ class HarmonicBondGenerator(object):
             sys.addForce(force)
         else:
             force = existing[0]
+        particles = []
+        length = []
+        k = []
         for bond in data.bonds:
             type1 = data.atomType[data.atoms[bond.atom1]]
             type2 = data.atomType[data.atoms[bond.atom2]]
@@ -2359,8 +2759,11 @@ class HarmonicBondGenerator(object):
                         # flexibleConstraints allows us to add parameters even if the DOF is
                         # constrained
                         if not bond.isConstrained or args.get('flexibleConstraints', False):
-                            force.addBond(bond.atom1, bond.atom2, self.length[i], self.k[i])
+                            particles.append((bond.atom1, bond.atom2))
+                            length.append(self.length[i])
+                            k.append(self.k[i])
                     break
+        force.addBonds(particles, length, k)
 
 parsers["HarmonicBondForce"] = HarmonicBondGenerator.parseElement
 
@@ -2412,6 +2815,9 @@ class HarmonicAngleGenerator(object):
             sys.addForce(force)
         else:
             force = existing[0]
+        particles = []
+        theta = []
+        k = []
         for (angle, isConstrained) in zip(data.angles, data.isAngleConstrained):
             type1 = data.atomType[data.atoms[angle[0]]]
             type2 = data.atomType[data.atoms[angle[1]]]
@@ -2444,8 +2850,11 @@ class HarmonicAngleGenerator(object):
                                 data.addConstraint(sys, angle[0], angle[2], length)
                     if self.k[i] != 0:
                         if not isConstrained or args.get('flexibleConstraints', False):
-                            force.addAngle(angle[0], angle[1], angle[2], self.angle[i], self.k[i])
+                            particles.append(angle)
+                            theta.append(self.angle[i])
+                            k.append(self.k[i])
                     break
+        force.addAngles(particles, theta, k)
 
 parsers["HarmonicAngleForce"] = HarmonicAngleGenerator.parseElement
 
@@ -2516,6 +2925,15 @@ class PeriodicTorsionGenerator(object):
         else:
             force = existing[0]
         wildcard = self.ff._atomClasses['']
+        particles = []
+        periodicity = []
+        phase = []
+        k = []
+        def addTorsion(a1, a2, a3, a4, tordef, i):
+            particles.append((a1, a2, a3, a4))
+            periodicity.append(tordef.periodicity[i])
+            phase.append(tordef.phase[i])
+            k.append(tordef.k[i])
         proper_cache = {}
         for torsion in data.propers:
             type1, type2, type3, type4 = [data.atomType[data.atoms[torsion[i]]] for i in range(4)]
@@ -2544,7 +2962,7 @@ class PeriodicTorsionGenerator(object):
             if match is not None:
                 for i in range(len(match.phase)):
                     if match.k[i] != 0:
-                        force.addTorsion(torsion[0], torsion[1], torsion[2], torsion[3], match.periodicity[i], match.phase[i], match.k[i])
+                        addTorsion(torsion[0], torsion[1], torsion[2], torsion[3], match, i)
         impr_cache = {}
         for torsion in data.impropers:
             t1, t2, t3, t4 = [data.atomType[data.atoms[torsion[i]]] for i in range(4)]
@@ -2571,11 +2989,12 @@ class PeriodicTorsionGenerator(object):
                     if tordef.k[i] != 0:
                         if tordef.ordering == 'smirnoff':
                             # Add all torsions in trefoil
-                            force.addTorsion(a1, a2, a3, a4, tordef.periodicity[i], tordef.phase[i], tordef.k[i])
-                            force.addTorsion(a1, a3, a4, a2, tordef.periodicity[i], tordef.phase[i], tordef.k[i])
-                            force.addTorsion(a1, a4, a2, a3, tordef.periodicity[i], tordef.phase[i], tordef.k[i])
+                            addTorsion(a1, a2, a3, a4, tordef, i)
+                            addTorsion(a1, a3, a4, a2, tordef, i)
+                            addTorsion(a1, a4, a2, a3, tordef, i)
                         else:
-                            force.addTorsion(a1, a2, a3, a4, tordef.periodicity[i], tordef.phase[i], tordef.k[i])
+                            addTorsion(a1, a2, a3, a4, tordef, i)
+        force.addTorsions(particles, periodicity, phase, k)
 parsers["PeriodicTorsionForce"] = PeriodicTorsionGenerator.parseElement
 
 ## @private
@@ -2808,9 +3227,8 @@ class NonbondedGenerator(object):
         if nonbondedMethod not in methodMap:
             raise ValueError('Illegal nonbonded method for NonbondedForce')
         force = mm.NonbondedForce()
-        for atom in data.atoms:
-            values = self.params.getAtomParameters(atom, data)
-            force.addParticle(values[0], values[1], values[2])
+        values = [self.params.getAtomParameters(atom, data) for atom in data.atoms]
+        force.addParticles([v[0] for v in values], [v[1] for v in values], [v[2] for v in values])
         force.setNonbondedMethod(methodMap[nonbondedMethod])
         force.setCutoffDistance(nonbondedCutoff)
         if args['switchDistance'] is not None:
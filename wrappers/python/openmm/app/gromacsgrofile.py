@@ -33,7 +33,7 @@ __version__ = "1.0"
 from openmm import Vec3
 from openmm.app.internal.unitcell import reducePeriodicBoxVectors
 from re import sub, match
-from openmm.unit import nanometers, Quantity
+from openmm.unit import nanometers, Quantity, strip_units
 from . import element as elem
 try:
     import numpy
@@ -196,7 +196,7 @@ class GromacsGroFile(object):
             if self._numpyPositions is None:
                 self._numpyPositions = [None]*len(self._positions)
             if self._numpyPositions[frame] is None:
-                self._numpyPositions[frame] = Quantity(numpy.array(self._positions[frame].value_in_unit(nanometers)), nanometers)
+                self._numpyPositions[frame] = Quantity(numpy.array(strip_units(self._positions[frame], nanometers)), nanometers)
             return self._numpyPositions[frame]
         return self._positions[frame]
 
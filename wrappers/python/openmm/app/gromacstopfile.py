@@ -746,6 +746,10 @@ class GromacsTopFile(object):
         harmonicTorsion = None
         cmap = None
         mapIndices = {}
+        harmonicBonds = []
+        harmonicAngles = defaultdict(list)
+        periodicTorsions = []
+        nbParams = []
         bondIndices = []
         topologyAtoms = list(self.topology.atoms())
         exclusions = []
@@ -840,7 +844,7 @@ class GromacsTopFile(object):
                         if bondType not in bonds:
                             bonds[bondType] = mm.HarmonicBondForce()
                             sys.addForce(bonds[bondType])
-                        bonds[bondType].addBond(baseAtomIndex+atoms[0], baseAtomIndex+atoms[1], length, float(params[1]))
+                        harmonicBonds.append((baseAtomIndex+atoms[0], baseAtomIndex+atoms[1], length, float(params[1])))
                     elif bondType == '2':
                         if bondType not in bonds:
                             bonds[bondType] = mm.CustomBondForce('0.25*k*(r^2-r0^2)^2')
@@ -894,7 +898,7 @@ class GromacsTopFile(object):
                             if angleType not in angles:
                                 angles[angleType] = mm.HarmonicAngleForce()
                                 sys.addForce(angles[angleType])
-                            angles[angleType].addAngle(baseAtomIndex+atoms[0], baseAtomIndex+atoms[1], baseAtomIndex+atoms[2], theta, float(params[1]))
+                            harmonicAngles[angleType].append((baseAtomIndex+atoms[0], baseAtomIndex+atoms[1], baseAtomIndex+atoms[2], theta, float(params[1])))
                             if angleType == '5':
                                 # This is a Urey-Bradley term, so also add the bond.
                                 if '1' not in bonds:
@@ -902,7 +906,7 @@ class GromacsTopFile(object):
                                     sys.addForce(bonds['1'])
                                 k = float(params[3])
                                 if k != 0:
-                                    bonds['1'].addBond(baseAtomIndex + atoms[0], baseAtomIndex + atoms[2], float(params[2]), k)
+                                    harmonicBonds.append((baseAtomIndex + atoms[0], baseAtomIndex + atoms[2], float(params[2]), k))
                         elif angleType == '2':
                             if angleType not in angles:
                                 angles[angleType] = mm.CustomAngleForce('0.5*k*(cos(theta)-cos(theta0))^2')
@@ -946,7 +950,7 @@ class GromacsTopFile(object):
                                 if periodic is None:
                                     periodic = mm.PeriodicTorsionForce()
                                     sys.addForce(periodic)
-                                periodic.addTorsion(baseAtomIndex+atoms[0], baseAtomIndex+atoms[1], baseAtomIndex+atoms[2], baseAtomIndex+atoms[3], int(float(params[7])), float(params[5])*degToRad, k)
+                                periodicTorsions.append((baseAtomIndex+atoms[0], baseAtomIndex+atoms[1], baseAtomIndex+atoms[2], baseAtomIndex+atoms[3], int(float(params[7])), float(params[5])*degToRad, k))
                         elif dihedralType == '2':
                             # Harmonic torsion
                             k = float(params[6])
@@ -1013,18 +1017,18 @@ class GromacsTopFile(object):
                         q = float(params[4])
 
                     if has_nbfix_terms:
-                        nb.addParticle(q, 1.0, 0.0)
+                        nbParams.append((q, 1.0, 0.0))
                         atom_charges.append(q)
                         ljnbfix.addParticle([0])
                     else:
                         if self._defaults[1] == '1':
-                            nb.addParticle(q, 1.0, 0.0)
+                            nbParams.append((q, 1.0, 0.0))
                             # LJ interactions are handled via separate LJ force with custom potential
                             lj.addParticle([math.sqrt(float(params[6])), math.sqrt(float(params[7]))])
                         elif self._defaults[1] == '2':
-                            nb.addParticle(q, float(params[6]), float(params[7]))
+                            nbParams.append((q, float(params[6]), float(params[7])))
                         elif self._defaults[1] == '3':
-                            nb.addParticle(q, 1.0, 0.0)
+                            nbParams.append((q, 1.0, 0.0))
                             sigma = float(params[6])
                             epsilon = float(params[7])
                             # LJ interactions are handled via separate LJ force with custom potential
@@ -1060,10 +1064,8 @@ class GromacsTopFile(object):
                 for fields in moleculeType.pairs:
                     atoms = [int(x)-1 for x in fields[:2]]
                     types = tuple(atomTypes[i] for i in atoms)
-                    atom1params = nb.getParticleParameters(baseAtomIndex+atoms[0])
-                    atom2params = nb.getParticleParameters(baseAtomIndex+atoms[1])
-                    atom1params = [x.value_in_unit_system(unit.md_unit_system) for x in atom1params]
-                    atom2params = [x.value_in_unit_system(unit.md_unit_system) for x in atom2params]
+                    atom1params = nbParams[baseAtomIndex+atoms[0]]
+                    atom2params = nbParams[baseAtomIndex+atoms[1]]
 
                     def convertParams(params):
                         if self._defaults[1] == '3':
@@ -1135,12 +1137,23 @@ class GromacsTopFile(object):
                     length = float(fields[3])
                     sys.addConstraint(baseAtomIndex+atoms[0], baseAtomIndex+atoms[1], length)
 
+        # Add the terms that were collected for the standard forces.
+
+        if len(harmonicBonds) > 0:
+            bonds['1'].addBonds([b[:2] for b in harmonicBonds], [b[2] for b in harmonicBonds], [b[3] for b in harmonicBonds])
+        for angleType, terms in harmonicAngles.items():
+            angles[angleType].addAngles([a[:3] for a in terms], [a[3] for a in terms], [a[4] for a in terms])
+        if len(periodicTorsions) > 0:
+            periodic.addTorsions([t[:4] for t in periodicTorsions], [t[4] for t in periodicTorsions], [t[5] for t in periodicTorsions], [t[6] for t in periodicTorsions])
+        nb.addParticles([p[0] for p in nbParams], [p[1] for p in nbParams], [p[2] for p in nbParams])
+
         # Create nonbonded exceptions.
 
         if not has_nbfix_terms:
             nb.createExceptionsFromBonds(bondIndices, fudgeQQ, fudgeLJ)
         else:
             excluded_atom_pairs = set() # save these pairs so we don't zero them out
+            nbfixExceptions = []
             for tor in torsionIndices:
                 # First check to see if atoms 1 and 4 are already excluded because
                 # they are 1-2 or 1-3 pairs (would happen in 6-member rings or
@@ -1177,9 +1190,9 @@ class GromacsTopFile(object):
                 # Parameters are generated via standard combining rules.
                 # If different 1-4 parameters are given via pairtypes they will be overwritten below.
                 if self._defaults[1] == '3':
-                    nb.addException(tor[0], tor[3], charge_prod, 4*epsilon*rmin14**6, 4*epsilon*rmin14**12)
+                    nbfixExceptions.append((tor[0], tor[3], charge_prod, 4*epsilon*rmin14**6, 4*epsilon*rmin14**12))
                 else:
-                    nb.addException(tor[0], tor[3], charge_prod, rmin14, epsilon)
+                    nbfixExceptions.append((tor[0], tor[3], charge_prod, rmin14, epsilon))
                 excluded_atom_pairs.add(key)
 
             # Add excluded atoms
@@ -1187,27 +1200,27 @@ class GromacsTopFile(object):
                 # Exclude all bonds and angles
                 for atom2 in atom['bond']:
                     if atom2 > atom_idx:
-                        nb.addException(atom_idx, atom2, 0.0, 1.0, 0.0)
+                        nbfixExceptions.append((atom_idx, atom2, 0.0, 1.0, 0.0))
                         excluded_atom_pairs.add((atom_idx, atom2))
                 for atom2 in atom['angle']:
                     if ((atom_idx, atom2) in excluded_atom_pairs):
                         continue
                     if atom2 > atom_idx:
-                        nb.addException(atom_idx, atom2, 0.0, 1.0, 0.0)
+                        nbfixExceptions.append((atom_idx, atom2, 0.0, 1.0, 0.0))
                         excluded_atom_pairs.add((atom_idx, atom2))
                 for atom2 in atom['dihedral']:
                     if atom2 <= atom_idx: continue
                     if ((atom_idx, atom2) in excluded_atom_pairs):
                         continue
-                    nb.addException(atom_idx, atom2, 0.0, 1.0, 0.0)
+                    nbfixExceptions.append((atom_idx, atom2, 0.0, 1.0, 0.0))
+            nb.addExceptions([e[:2] for e in nbfixExceptions], [e[2] for e in nbfixExceptions], [e[3] for e in nbfixExceptions], [e[4] for e in nbfixExceptions])
 
-        for exclusion in exclusions:
-            nb.addException(exclusion[0], exclusion[1], 0.0, 1.0, 0.0, True)
+        n = len(exclusions)
+        nb.addExceptions(exclusions, [0.0]*n, [1.0]*n, [0.0]*n, replace=True)
 
         # this will overwrite the pairs from the pairlist
         # if nbfix, this will only overwrite pairs if we have pairtype parameters 
-        for pair in pairs:
-            nb.addException(pair[0], pair[1], pair[2], pair[3], pair[4], True)
+        nb.addExceptions([p[:2] for p in pairs], [p[2] for p in pairs], [p[3] for p in pairs], [p[4] for p in pairs], replace=True)
 
         if self._defaults[1] in ('1', '3'):
            # We're using a CustomNonbondedForce for LJ interactions, so also create a CustomBondForce
@@ -1218,13 +1231,18 @@ class GromacsTopFile(object):
             pair_bond.addPerBondParameter('A')
             pair_bond.setName('LennardJonesExceptions')
             sys.addForce(pair_bond)
-            for i in range(nb.getNumExceptions()):
-                ii, jj, q, sig, eps = nb.getExceptionParameters(i)
-                if (eps.value_in_unit(unit.kilojoule_per_mole))>0:
-                    nb.addException(ii,jj,q, 1.0, 0.0, True)
-                    pair_bond.addBond(ii,jj,[sig,eps])
-                if lj is not None:
-                    lj.addExclusion(ii, jj)
+            particles, chargeProd, sig, eps = nb.getAllExceptionParameters()
+            chargeProd = chargeProd.value_in_unit(unit.elementary_charge**2)
+            sig = sig.value_in_unit(unit.nanometer)
+            eps = eps.value_in_unit(unit.kilojoule_per_mole)
+            nonzero = eps > 0
+            n = int(nonzero.sum())
+            nb.addExceptions(particles[nonzero], chargeProd[nonzero], [1.0]*n, [0.0]*n, replace=True)
+            for (ii, jj), c, a in zip(particles[nonzero], sig[nonzero], eps[nonzero]):
+                pair_bond.addBond(int(ii), int(jj), [c, a])
+            if lj is not None:
+                for ii, jj in particles:
+                    lj.addExclusion(int(ii), int(jj))
 
         if ljnbfix is not None:
             for i in range(nb.getNumExceptions()):
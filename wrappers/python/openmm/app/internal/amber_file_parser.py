@@ -784,13 +784,15 @@ def readAmberSystem(topology, prmtop_filename=None, prmtop_loader=None, shake=No
     # Add harmonic bonds.
     if verbose: print("Adding bonds...")
     force = mm.HarmonicBondForce()
+    bonds = []
     if flexibleConstraints or (shake not in ('h-bonds', 'all-bonds', 'h-angles')):
         for (iAtom, jAtom, k, rMin) in prmtop.getBondsWithH():
             if flexibleConstraints or not (rigidWater and isWater[iAtom] and isWater[jAtom]):
-                force.addBond(iAtom, jAtom, rMin, 2*k)
+                bonds.append((iAtom, jAtom, rMin, 2*k))
     if flexibleConstraints or (shake not in ('all-bonds', 'h-angles')):
         for (iAtom, jAtom, k, rMin) in prmtop.getBondsNoH():
-            force.addBond(iAtom, jAtom, rMin, 2*k)
+            bonds.append((iAtom, jAtom, rMin, 2*k))
+    force.addBonds([b[:2] for b in bonds], [b[2] for b in bonds], [b[3] for b in bonds])
     system.addForce(force)
 
     # Add Urey-Bradley terms.
@@ -798,8 +800,8 @@ def readAmberSystem(topology, prmtop_filename=None, prmtop_loader=None, shake=No
         if verbose: print("Adding Urey-Bradley terms...")
         force = mm.HarmonicBondForce()
         force.setName('UreyBradleyForce')
-        for (iAtom, jAtom, k, rMin) in prmtop.getUreyBradleys():
-            force.addBond(iAtom, jAtom, rMin, 2*k)
+        ureyBradleys = prmtop.getUreyBradleys()
+        force.addBonds([b[:2] for b in ureyBradleys], [b[3] for b in ureyBradleys], [2*b[2] for b in ureyBradleys])
         system.addForce(force)
 
     # Add harmonic angles.
@@ -814,6 +816,7 @@ def readAmberSystem(topology, prmtop_filename=None, prmtop_loader=None, shake=No
             atomConstraints[c[0]].append((c[1], distance))
             atomConstraints[c[1]].append((c[0], distance))
     topatoms = list(topology.atoms())
+    angles = []
     for (iAtom, jAtom, kAtom, k, aMin) in prmtop.getAngles():
         if shake == 'h-angles':
             atomI = topatoms[iAtom]
@@ -837,14 +840,15 @@ def readAmberSystem(topology, prmtop_filename=None, prmtop_loader=None, shake=No
             length = sqrt(l1*l1 + l2*l2 - 2*l1*l2*cos(aMin))
             system.addConstraint(iAtom, kAtom, length)
         if flexibleConstraints or not constrained:
-            force.addAngle(iAtom, jAtom, kAtom, aMin, 2*k)
+            angles.append((iAtom, jAtom, kAtom, aMin, 2*k))
+    force.addAngles([a[:3] for a in angles], [a[3] for a in angles], [a[4] for a in angles])
     system.addForce(force)
 
     # Add torsions.
     if verbose: print("Adding torsions...")
     force = mm.PeriodicTorsionForce()
-    for (iAtom, jAtom, kAtom, lAtom, forceConstant, phase, periodicity) in prmtop.getDihedrals():
-        force.addTorsion(iAtom, jAtom, kAtom, lAtom, periodicity, phase, forceConstant)
+    dihedrals = prmtop.getDihedrals()
+    force.addTorsions([d[:4] for d in dihedrals], [d[6] for d in dihedrals], [d[5] for d in dihedrals], [d[4] for d in dihedrals])
     system.addForce(force)
 
     # Add impropers.
@@ -945,8 +949,8 @@ def readAmberSystem(topology, prmtop_filename=None, prmtop_loader=None, shake=No
         nonbondTerms = prmtop.getNonbondTerms()
     except NbfixPresent:
         nbfix = True
-        for charge in prmtop.getCharges():
-            force.addParticle(charge, 1.0, 0.0)
+        charges = prmtop.getCharges()
+        force.addParticles(charges, [1.0]*len(charges), [0.0]*len(charges))
         numTypes = prmtop.getNumTypes()
         parm_acoef = [float(x) for x in prmtop._raw_data['LENNARD_JONES_ACOEF']]
         parm_bcoef = [float(x) for x in prmtop._raw_data['LENNARD_JONES_BCOEF']]
@@ -990,9 +994,7 @@ def readAmberSystem(topology, prmtop_filename=None, prmtop_loader=None, shake=No
         for atom in prmtop._getAtomTypeIndexes():
             cforce.addParticle((atom-1,))
     else:
-        for (charge, (rVdw, epsilon)) in zip(prmtop.getCharges(), nonbondTerms):
-            sigma = rVdw * sigmaScale
-            force.addParticle(charge, sigma, epsilon)
+        force.addParticles(prmtop.getCharges(), [rVdw*sigmaScale for (rVdw, epsilon) in nonbondTerms], [epsilon for (rVdw, epsilon) in nonbondTerms])
         if has_1264:
             numTypes = prmtop.getNumTypes()
             nbidx = [int(x) for x in prmtop._raw_data['NONBONDED_PARM_INDEX']]
@@ -1017,13 +1019,14 @@ def readAmberSystem(topology, prmtop_filename=None, prmtop_loader=None, shake=No
     excludedAtomPairs = set()
     sigmaScale = 2**(-1./6.)
     _scee, _scnb = scee, scnb
+    exceptions = []
     for (iAtom, lAtom, chargeProd, rMin, epsilon, iScee, iScnb) in prmtop.get14Interactions():
         if scee is None: _scee = iScee
         if scnb is None: _scnb = iScnb
         chargeProd /= _scee
         epsilon /= _scnb
         sigma = rMin * sigmaScale
-        force.addException(iAtom, lAtom, chargeProd, sigma, epsilon)
+        exceptions.append((iAtom, lAtom, chargeProd, sigma, epsilon))
         excludedAtomPairs.add(min((iAtom, lAtom), (lAtom, iAtom)))
 
     # Add Excluded Atoms
@@ -1032,7 +1035,8 @@ def readAmberSystem(topology, prmtop_filename=None, prmtop_loader=None, shake=No
     for iAtom in range(prmtop.getNumAtoms()):
         for jAtom in excludedAtoms[iAtom]:
             if min((iAtom, jAtom), (jAtom, iAtom)) in excludedAtomPairs: continue
-            force.addException(iAtom, jAtom, excludeParams[0], excludeParams[1], excludeParams[2])
+            exceptions.append((iAtom, jAtom)+excludeParams)
+    force.addExceptions([e[:2] for e in exceptions], [e[2] for e in exceptions], [e[3] for e in exceptions], [e[4] for e in exceptions])
 
     # Copy the exceptions as exclusions to the CustomNonbondedForce if we have
     # NBFIX terms
@@ -0,0 +1,232 @@
+"""
+checkpointstore.py: Stores full and differential checkpoints of a simulation in a directory.
+
+This is part of the OpenMM molecular simulation toolkit.
+See https://openmm.org/development.
+
+Portions copyright (c) 2026 Stanford University and the Authors.
+Authors:
+Contributors:
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS, CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import io
+import json
+import os
+import numpy as np
+import openmm as mm
+from openmm import BinarySerializer
+from openmm.app.internal import safesave
+from openmm.app.internal.contextsnapshot import hasIntegratorParameters
+from openmm.unit import nanometers, picoseconds
+
+class CheckpointStore(object):
+    """A CheckpointStore saves the state of a Simulation to a directory as a series of full snapshots, each followed
+    by deltas that record how the state has changed since the snapshot.
+
+    A full snapshot is either a checkpoint or a serialized State.  A delta stores the differences of the positions
+    and velocities from the snapshot in single precision, along with the step count, time, periodic box vectors,
+    parameters, and integrator parameters, such as the state of a thermostat or the variables of a CustomIntegrator.
+    The internal state of the Context, such as the states of random number generators, is not stored in deltas.
+    When a delta is restored, those values come from the snapshot it is based on.
+
+    The directory contains a manifest listing the snapshots that have been committed, each with the most recent delta
+    saved after it.  Only that delta is needed to restore the state, so each new delta replaces the previous one.
+    Every file is written before the manifest is updated to refer to it, and files are only deleted once the manifest
+    no longer refers to them, so a write that is interrupted never corrupts the store.  Only the most recent snapshots
+    are retained.  When a new snapshot is committed, the oldest ones are deleted along with their deltas.
+    """
+
+    _manifestVersion = 1
+
+    def __init__(self, directory, writeState=False, retain=2, compress=True):
+        """Create a CheckpointStore.
+
+        Parameters
+        ----------
+        directory : str
+            The directory containing the store.  It is created if it does not already exist.
+        writeState : bool=False
+            If true, snapshots are serialized States.  If false, they are checkpoints.
+        retain : int=2
+            The number of snapshots to keep, each with the deltas that follow it
+        compress : bool=True
+            If true, deltas are compressed.  Compression is lossless.
+        """
+        if retain < 1:
+            raise ValueError('retain must be at least 1')
+        self._directory = directory
+        self._writeState = writeState
+        self._retain = retain
+        self._compress = compress
+        self._manifest = None
+        self._basePositions = None
+        self._baseVelocities = None
+        self._hasIntegratorParameters = False
+
+    @property
+    def hasSnapshot(self):
+        """Whether a snapshot has been saved by this object, so that deltas can be saved."""
+        return self._basePositions is not None
+
+    def saveSnapshot(self, simulation, state):
+        """Save a full snapshot of a Simulation.
+
+        Parameters
+        ----------
+        simulation : Simulation
+            The Simulation to save
+        state : State
+            The current state of the simulation.  It must contain positions and velocities, and the positions must
+            not have been wrapped into the periodic box.
+        """
+        manifest = self._getManifest()
+        if self._writeState:
+            filename = 'snapshot-%d.state' % manifest['nextIndex']
+            simulation.saveState(self._path(filename), format='binary')
+        else:
+            filename = 'snapshot-%d.chk' % manifest['nextIndex']
+            simulation.saveCheckpoint(self._path(filename))
+        manifest['nextIndex'] += 1
+        manifest['snapshots'].append({'file': filename, 'format': 'state' if self._writeState else 'checkpoint',
+                                      'step': state.getStepCount(), 'delta': None})
+        removed = manifest['snapshots'][:-self._retain]
+        manifest['snapshots'] = manifest['snapshots'][-self._retain:]
+        self._commit()
+        self._basePositions = state.getPositions(asNumpy=True).value_in_unit(nanometers)
+        self._baseVelocities = state.getVelocities(asNumpy=True).value_in_unit(nanometers/picoseconds)
+
+        # Only retrieve integrator parameters for deltas if the integrator has any.
+
+        self._hasIntegratorParameters = hasIntegratorParameters(simulation.context.getState(integratorParameters=True))
+
+        # Delete the snapshots that are no longer retained, now that the manifest does not refer to them.
+
+        for snapshot in removed:
+            self._remove(snapshot['file'])
+            if snapshot['delta'] is not None:
+                self._remove(snapshot['delta']['file'])
+
+    def saveDelta(self, simulation, state):
+        """Save the differences between a State and the most recent snapshot.
+
+        Parameters
+        ----------
+        simulation : Simulation
+            The Simulation to save.  Its integrator parameters are retrieved from the Context.
+        state : State
+            The current state of the simulation.  It must contain positions, velocities, and parameters, and the
+            positions must not have been wrapped into the periodic box.
+        """
+        if not self.hasSnapshot:
+            raise ValueError('A snapshot must be saved before any deltas')
+        manifest = self._getManifest()
+        positions = state.getPositions(asNumpy=True).value_in_unit(nanometers)
+        velocities = state.getVelocities(asNumpy=True).value_in_unit(nanometers/picoseconds)
+        parameters = state.getParameters()
+        if self._hasIntegratorParameters:
+            integratorState = BinarySerializer.serialize(simulation.context.getState(integratorParameters=True))
+        else:
+            integratorState = b''
+        data = io.BytesIO()
+        save = np.savez_compressed if self._compress else np.savez
+        save(data,
+             step=np.int64(state.getStepCount()),
+             time=np.float64(state.getTime().value_in_unit(picoseconds)),
+             positions=(positions-self._basePositions).astype(np.float32),
+             velocities=(velocities-self._baseVelocities).astype(np.float32),
+             boxVectors=state.getPeriodicBoxVectors(asNumpy=True).value_in_unit(nanometers),
+             parameterNames=np.array(list(parameters.keys()), dtype=str),
+             parameterValues=np.array(list(parameters.values()), dtype=np.float64),
+             integratorState=np.frombuffer(integratorState, dtype=np.uint8))
+        filename = 'delta-%d.npz' % manifest['nextIndex']
+        safesave.save(data.getvalue(), self._path(filename))
+        manifest['nextIndex'] += 1
+        snapshot = manifest['snapshots'][-1]
+        previous = snapshot['delta']
+        snapshot['delta'] = {'file': filename, 'step': state.getStepCount()}
+        self._commit()
+
+        # The previous delta is no longer needed, now that the manifest does not refer to it.
+
+        if previous is not None:
+            self._remove(previous['file'])
+
+    def restore(self, simulation):
+        """Restore a Simulation to the most recent state saved in the store.
+
+        Parameters
+        ----------
+        simulation : Simulation
+            The Simulation to restore
+        """
+        manifest = self._readManifest()
+        if len(manifest['snapshots']) == 0:
+            raise ValueError('The checkpoint store in %s does not contain any snapshots' % self._directory)
+        snapshot = manifest['snapshots'][-1]
+        if snapshot['format'] == 'state':
+            simulation.loadState(self._path(snapshot['file']))
+        else:
+            simulation.loadCheckpoint(self._path(snapshot['file']))
+        if snapshot['delta'] is None:
+            return
+        context = simulation.context
+        state = context.getState(positions=True, velocities=True)
+        with np.load(self._path(snapshot['delta']['file'])) as data:
+            # Setting a State also sets the time, step count, and box vectors, so restore the integrator parameters first.
+
+            if len(data['integratorState']) > 0:
+                context.setState(BinarySerializer.deserialize(data['integratorState'].tobytes()))
+            context.setTime(float(data['time']))
+            context.setStepCount(int(data['step']))
+            context.setPeriodicBoxVectors(*[mm.Vec3(*v) for v in data['boxVectors'].tolist()])
+            context.setPositions(state.getPositions(asNumpy=True).value_in_unit(nanometers)+data['positions'])
+            context.setVelocities(state.getVelocities(asNumpy=True).value_in_unit(nanometers/picoseconds)+data['velocities'])
+            for name, value in zip(data['parameterNames'], data['parameterValues']):
+                context.setParameter(str(name), float(value))
+
+    def _path(self, filename):
+        return os.path.join(self._directory, filename)
+
+    def _remove(self, filename):
+        try:
+            os.remove(self._path(filename))
+        except OSError:
+            pass
+
+    def _readManifest(self):
+        path = self._path('manifest.json')
+        if not os.path.exists(path):
+            return {'version': CheckpointStore._manifestVersion, 'nextIndex': 0, 'snapshots': []}
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != CheckpointStore._manifestVersion:
+            raise ValueError('Unsupported checkpoint store version in %s' % self._directory)
+        return manifest
+
+    def _getManifest(self):
+        if self._manifest is None:
+            os.makedirs(self._directory, exist_ok=True)
+            self._manifest = self._readManifest()
+        return self._manifest
+
+    def _commit(self):
+        safesave.save(json.dumps(self._manifest, indent=2), self._path('manifest.json'))
+
@@ -0,0 +1,212 @@
+"""
+contextsnapshot.py: Compact in-memory copies of the state of a Context.
+
+This is part of the OpenMM molecular simulation toolkit.
+See https://openmm.org/development.
+
+Portions copyright (c) 2026 Stanford University and the Authors.
+Authors:
+Contributors:
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS, CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import io
+import numpy as np
+import openmm as mm
+from openmm.unit import Quantity, nanometers, picoseconds
+
+class ContextSnapshot(object):
+    """A compact copy of the dynamical state of a Context.
+
+    This records the information needed to restore a Context to an earlier point in a simulation: positions, velocities,
+    periodic box vectors, time, step count, context parameters, and the internal state of the integrator.  Positions
+    and velocities are stored as contiguous float64 arrays in nm and nm/ps, and parameters as a float64 array, which
+    makes a snapshot much cheaper than a State to create, restore, and hold in memory.  It provides the subset of the
+    State interface used by reporters, so it can be passed to a reporter's report() method.
+
+    Create a snapshot with fromContext() or fromState(), and restore it with applyTo() or by passing it to
+    Context.setState().
+    """
+
+    def __init__(self, positions, velocities, boxVectors, time, stepCount, parameterNames, parameterValues,
+                 integratorVariables=None, integratorState=None):
+        self.positions = positions
+        self.velocities = velocities
+        self.boxVectors = boxVectors
+        self.time = time
+        self.stepCount = stepCount
+        self.parameterNames = parameterNames
+        self.parameterValues = parameterValues
+        self.integratorVariables = integratorVariables
+        self.integratorState = integratorState
+
+    @staticmethod
+    def fromContext(context, integratorState=None):
+        """Create a snapshot of the current state of a Context.
+
+        integratorState specifies whether the snapshot must store a State with integrator parameters, as returned by
+        needsIntegratorState().  If it is None, this is determined by retrieving the integrator parameters, which adds
+        to the cost, so code that creates many snapshots should call needsIntegratorState() once and pass the result.
+        """
+        state = context.getState(positions=True, velocities=True, parameters=True)
+        snapshot = ContextSnapshot.fromState(state)
+        snapshot.integratorState = None
+        integrator = context.getIntegrator()
+        if isinstance(integrator, mm.CustomIntegrator):
+            globalValues = np.array([integrator.getGlobalVariable(i) for i in range(integrator.getNumGlobalVariables())], dtype=np.float64)
+            perDofValues = [np.array(integrator.getPerDofVariable(i), dtype=np.float64) for i in range(integrator.getNumPerDofVariables())]
+            snapshot.integratorVariables = (globalValues, perDofValues)
+        elif integratorState is None:
+            integratorState = context.getState(integratorParameters=True)
+            if hasIntegratorParameters(integratorState):
+                snapshot.integratorState = integratorState
+        elif integratorState:
+            snapshot.integratorState = context.getState(integratorParameters=True)
+        return snapshot
+
+    @staticmethod
+    def needsIntegratorState(context):
+        """Get whether snapshots of a Context must store a State with integrator parameters to capture the internal state
+        of its integrator.  This is true for any integrator that reports integrator parameters, except a CustomIntegrator,
+        whose variables are stored directly."""
+        if isinstance(context.getIntegrator(), mm.CustomIntegrator):
+            return False
+        return hasIntegratorParameters(context.getState(integratorParameters=True))
+
+    @staticmethod
+    def fromState(state):
+        """Create a snapshot from a State containing positions, velocities, and parameters.  The State is retained so
+        that any integrator parameters it contains can be restored, so a snapshot created this way is not compact.  This
+        is mainly useful for converting States loaded from files."""
+        positions = np.array(state.getPositionsArray(), dtype=np.float64)
+        velocities = np.array(state.getVelocitiesArray(), dtype=np.float64)
+        boxVectors = state.getPeriodicBoxVectors(asNumpy=True).value_in_unit(nanometers)
+        parameters = state.getParameters()
+        parameterNames = tuple(parameters.keys())
+        parameterValues = np.array([parameters[name] for name in parameterNames], dtype=np.float64)
+        return ContextSnapshot(positions, velocities, boxVectors, state.getTime().value_in_unit(picoseconds),
+                               state.getStepCount(), parameterNames, parameterValues, integratorState=state)
+
+    def applyTo(self, context):
+        """Restore a Context to the state recorded in this snapshot."""
+        if self.integratorState is not None:
+            context.setState(self.integratorState)
+        context.setTime(self.time)
+        context.setStepCount(self.stepCount)
+        context.setPeriodicBoxVectors(*[mm.Vec3(*v) for v in self.boxVectors.tolist()])
+        context.setPositions(self.positions)
+        context.setVelocities(self.velocities)
+        for name, value in zip(self.parameterNames, self.parameterValues.tolist()):
+            context.setParameter(name, value)
+        if self.integratorVariables is not None:
+            integrator = context.getIntegrator()
+            globalValues, perDofValues = self.integratorVariables
+            for i, value in enumerate(globalValues.tolist()):
+                integrator.setGlobalVariable(i, value)
+            for i, values in enumerate(perDofValues):
+                integrator.setPerDofVariable(i, values)
+
+    def getPositions(self, asNumpy=False):
+        """Get the position of each particle with units."""
+        if asNumpy:
+            return Quantity(self.positions.copy(), nanometers)
+        return Quantity([mm.Vec3(*p) for p in self.positions.tolist()], nanometers)
+
+    def getVelocities(self, asNumpy=False):
+        """Get the velocity of each particle with units."""
+        if asNumpy:
+            return Quantity(self.velocities.copy(), nanometers/picoseconds)
+        return Quantity([mm.Vec3(*v) for v in self.velocities.tolist()], nanometers/picoseconds)
+
+    def getPositionsArray(self):
+        """Get the position of each particle as a read-only Numpy array, measured in nanometers."""
+        positions = self.positions.view()
+        positions.flags.writeable = False
+        return positions
+
+    def getVelocitiesArray(self):
+        """Get the velocity of each particle as a read-only Numpy array, measured in nm/ps."""
+        velocities = self.velocities.view()
+        velocities.flags.writeable = False
+        return velocities
+
+    def getPeriodicBoxVectors(self, asNumpy=False):
+        """Get the vectors defining the axes of the periodic box."""
+        if asNumpy:
+            return Quantity(self.boxVectors.copy(), nanometers)
+        return Quantity([mm.Vec3(*v) for v in self.boxVectors.tolist()], nanometers)
+
+    def getPeriodicBoxVolume(self):
+        """Get the volume of the periodic box."""
+        return Quantity(float(np.linalg.det(self.boxVectors)), nanometers**3)
+
+    def getTime(self):
+        """Get the time of the simulation."""
+        return Quantity(self.time, picoseconds)
+
+    def getStepCount(self):
+        """Get the number of time steps that have been taken."""
+        return self.stepCount
+
+    def getParameters(self):
+        """Get a dict containing the values of all context parameters."""
+        return dict(zip(self.parameterNames, self.parameterValues.tolist()))
+
+    def save(self):
+        """Serialize the snapshot to a bytes object that can be restored with load().
+
+        Integrator state other than the variables of a CustomIntegrator is saved with BinarySerializer.
+        """
+        arrays = {'positions': self.positions, 'velocities': self.velocities, 'boxVectors': self.boxVectors,
+                  'time': np.array(self.time), 'stepCount': np.array(self.stepCount, dtype=np.int64),
+                  'parameterNames': np.array(self.parameterNames, dtype=str), 'parameterValues': self.parameterValues}
+        if self.integratorVariables is not None:
+            arrays['integratorGlobals'] = self.integratorVariables[0]
+            for i, values in enumerate(self.integratorVariables[1]):
+                arrays[f'integratorPerDof{i}'] = values
+        if self.integratorState is not None:
+            arrays['integratorState'] = np.frombuffer(mm.BinarySerializer.serialize(self.integratorState), dtype=np.uint8)
+        output = io.BytesIO()
+        np.savez(output, **arrays)
+        return output.getvalue()
+
+    @staticmethod
+    def load(data):
+        """Create a snapshot from a bytes object that was created by save()."""
+        with np.load(io.BytesIO(data)) as arrays:
+            integratorVariables = None
+            integratorState = None
+            if 'integratorGlobals' in arrays:
+                perDofValues = []
+                while f'integratorPerDof{len(perDofValues)}' in arrays:
+                    perDofValues.append(arrays[f'integratorPerDof{len(perDofValues)}'])
+                integratorVariables = (arrays['integratorGlobals'], perDofValues)
+            if 'integratorState' in arrays:
+                integratorState = mm.BinarySerializer.deserialize(arrays['integratorState'].tobytes())
+            return ContextSnapshot(arrays['positions'], arrays['velocities'], arrays['boxVectors'], float(arrays['time']),
+                                   int(arrays['stepCount']), tuple(str(name) for name in arrays['parameterNames']),
+                                   arrays['parameterValues'], integratorVariables, integratorState)
+
+
+def hasIntegratorParameters(state):
+    """Get whether a State contains any integrator parameters.  They can only be accessed by serializing the State."""
+    xml = mm.XmlSerializer.serialize(state)
+    start = xml.find('<IntegratorParameters')
+    return start != -1 and not xml.startswith('<IntegratorParameters/>', start)
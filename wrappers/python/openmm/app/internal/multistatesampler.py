@@ -27,8 +27,10 @@ OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
 USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
+import ast
+import re
 import openmm
-from openmm.unit import kilojoules_per_mole
+from openmm.unit import is_quantity, kilojoules_per_mole, md_unit_system
 
 """This is a utility for internal use by algorithms that perform multistate sampling.  Given the definitions of a set of
 states, it can put a context into any state and efficiently evaluate the potential energies of states.
@@ -42,6 +44,13 @@ specify values for the same properties.  The following properties are supported.
   energy of group 2.
 - Context parameters
 - Global variables defined by a CustomIntegrator
+
+When states differ in context parameters, computeAllEnergies() tries to avoid evaluating the energy separately for every
+combination of parameter values.  Force groups whose forces do not depend on any varying parameter are evaluated only
+once.  Force groups whose energy is a linear function of the varying parameters (determined by analyzing the energy
+expressions of custom forces) are evaluated at one point plus one extra point per parameter, and the energy of every
+state is reconstructed from those.  Only the remaining force groups are evaluated separately for each set of parameter
+values.
 """
 class MultistateSampler(object):
     def __init__(self, states: list[dict], context: openmm.Context):
@@ -155,6 +164,75 @@ class MultistateSampler(object):
                     self.groups_of_groups[i].append(group_of_groups)
                     all_groups.remove(first)
 
+        # Determine whether energies can be computed more efficiently by splitting force groups based on how they
+        # depend on parameters.
+
+        self._batch = None
+        if len(self.subsets) > 1:
+            self._planBatchedEvaluation(energy_parameters)
+
+    def _planBatchedEvaluation(self, energy_parameters):
+        """Decide whether computeAllEnergies() should evaluate force groups based on how they depend on parameters,
+        and if so, record how to do it in self._batch."""
+        varying = set(name for name in energy_parameters[0] if any(p[name] != energy_parameters[0][name] for p in energy_parameters))
+
+        # Classify every force group as independent of the varying parameters (0), linear in them (1), or nonlinear (2).
+
+        groupDegree = {}
+        forceInfo = []
+        for force in self.context.getSystem().getForces():
+            dependencies = _globalParameters(force) & varying
+            degree = _forceDegree(force, dependencies)
+            groups = [force.getForceGroup()]
+            if hasattr(force, 'getReciprocalSpaceForceGroup') and force.getReciprocalSpaceForceGroup() >= 0:
+                groups.append(force.getReciprocalSpaceForceGroup())
+            for g in groups:
+                groupDegree[g] = max(degree, groupDegree.get(g, 0))
+            forceInfo.append((groups, dependencies))
+        linearParameters = set()
+        nonlinearParameters = set()
+        for groups, dependencies in forceInfo:
+            if all(groupDegree[g] == 1 for g in groups):
+                linearParameters |= dependencies
+            if any(groupDegree[g] == 2 for g in groups):
+                nonlinearParameters |= dependencies
+
+        # Nonlinear force groups need to be computed once for each distinct set of values of the parameters they
+        # depend on.
+
+        nonlinearSubsets = {}
+        for i, p in enumerate(energy_parameters):
+            key = tuple(_parameterValue(p[name]) for name in sorted(nonlinearParameters))
+            nonlinearSubsets.setdefault(key, []).append(i)
+        nonlinearSubsets = list(nonlinearSubsets.values())
+
+        # Group force groups into classes that have the same weight in every state and the same dependence on parameters.
+
+        if self.groups is None:
+            weights = lambda g: (1.0,)*len(self.states)
+        else:
+            weights = lambda g: tuple(groups.get(g, 0.0) for groups in self.groups)
+        classes = {}
+        for g, degree in groupDegree.items():
+            w = weights(g)
+            if any(x != 0 for x in w):
+                classes.setdefault((degree, w), set()).add(g)
+        classes = [(degree, w, groups) for (degree, w), groups in classes.items()]
+
+        # Compare the number of energy evaluations with the number required by the standard method.
+
+        linearParameters = sorted(linearParameters)
+        count = [sum(1 for c in classes if c[0] == degree) for degree in range(3)]
+        batchedCost = count[0] + count[1]*(len(linearParameters)+1) + count[2]*len(nonlinearSubsets)
+        if self.groups is None:
+            standardCost = len(self.subsets)
+        else:
+            standardCost = sum(len(g) for g in self.groups_of_groups)
+        if batchedCost >= standardCost:
+            return
+        values = [[_parameterValue(self.parameters[i][name]) for name in linearParameters] for i in range(len(self.states))]
+        self._batch = (classes, linearParameters, values, nonlinearSubsets)
+
     def applyState(self, index: int):
         """Modify the Context to match one of the states.
 
@@ -209,6 +287,8 @@ class MultistateSampler(object):
         -------
         an array containing the potential energies of all states in the order they appear in self.states
         """
+        if self._batch is not None:
+            return self._computeAllEnergiesBatched()
         energies = [0 for _ in self.states]*kilojoules_per_mole
         for i, subset in enumerate(self.subsets):
             if self.groups is None:
@@ -229,6 +309,62 @@ class MultistateSampler(object):
                             energies[j] += energy*self.groups[j][g]
         return energies
 
+    def _computeAllEnergiesBatched(self):
+        """Compute the potential energies of all states using the plan created by _planBatchedEvaluation()."""
+        classes, linearParameters, values, nonlinearSubsets = self._batch
+        energies = [0.0]*len(self.states)
+
+        def computeEnergy(groups):
+            return self.context.getState(energy=True, groups=groups).getPotentialEnergy().value_in_unit(kilojoules_per_mole)
+
+        def addEnergy(weights, energy, states):
+            for j in states:
+                energies[j] += weights[j]*energy
+
+        # Force groups that do not depend on the varying parameters only need to be computed once.  A parameter with
+        # the same value in every state may still differ from the value in the Context, so apply a state first.
+
+        allStates = range(len(self.states))
+        self.applyState(0)
+        for degree, weights, groups in classes:
+            if degree == 0:
+                addEnergy(weights, computeEnergy(groups), allStates)
+
+        # Force groups that depend linearly on parameters are computed at a reference point and after changing each
+        # parameter.  That gives the slope with respect to each parameter.  Each parameter is changed to the value that
+        # differs most from the reference point in any state.  That makes the energy difference as large as possible
+        # relative to rounding error, which matters on single precision platforms, and scales the step to the range of
+        # values the parameter actually takes.
+
+        linear = [(weights, groups) for degree, weights, groups in classes if degree == 1]
+        if len(linear) > 0:
+            reference = [computeEnergy(groups) for weights, groups in linear]
+            slopes = []
+            for k, name in enumerate(linearParameters):
+                delta = max((v[k]-values[0][k] for v in values), key=abs)
+                if delta == 0:
+                    slopes.append([0.0]*len(linear))
+                    continue
+                self.context.setParameter(name, values[0][k]+delta)
+                slopes.append([(computeEnergy(groups)-e)/delta for (weights, groups), e in zip(linear, reference)])
+                self.context.setParameter(name, values[0][k])
+            for j in allStates:
+                for m, (weights, groups) in enumerate(linear):
+                    energy = reference[m]
+                    for k in range(len(linearParameters)):
+                        energy += (values[j][k]-values[0][k])*slopes[k][m]
+                    energies[j] += weights[j]*energy
+
+        # Everything else must be computed separately for each set of values of the parameters it depends on.
+
+        nonlinear = [(weights, groups) for degree, weights, groups in classes if degree == 2]
+        if len(nonlinear) > 0:
+            for subset in nonlinearSubsets:
+                self.applyState(subset[0])
+                for weights, groups in nonlinear:
+                    addEnergy(weights, computeEnergy(groups), subset)
+        return energies*kilojoules_per_mole
+
     def computeRelativeEnergies(self):
         """This is similar to computeAllEnergies(), but the energies are shifted by a constant to make the energy of the
         first state exactly zero.  The advantage is that if states differ only in temperature or other ways that do not
@@ -243,4 +379,91 @@ class MultistateSampler(object):
         if len(self.subsets) == 1 and self.groups is None:
             return [0]*len(self.states)*kilojoules_per_mole
         energies = self.computeAllEnergies()
-        return [e-energies[0] for e in energies]
\ No newline at end of file
+        return [e-energies[0] for e in energies]
+
+
+def _parameterValue(value):
+    """Get the value of a context parameter as a number."""
+    if is_quantity(value):
+        return value.value_in_unit_system(md_unit_system)
+    return value
+
+
+def _globalParameters(force):
+    """Get the names of all global parameters a force depends on."""
+    names = set()
+    if hasattr(force, 'getNumGlobalParameters'):
+        names.update(force.getGlobalParameterName(i) for i in range(force.getNumGlobalParameters()))
+    if isinstance(force, openmm.CustomCVForce):
+        for i in range(force.getNumCollectiveVariables()):
+            names.update(_globalParameters(force.getCollectiveVariable(i)))
+    return names
+
+
+def _forceDegree(force, parameters):
+    """Determine how the energy of a force depends on a set of parameters.  The return value is 0 if it does not depend
+    on them, 1 if it is a linear function of them, or 2 if it is nonlinear or the dependence cannot be determined."""
+    if len(parameters) == 0:
+        return 0
+    if isinstance(force, openmm.CustomCVForce) or not hasattr(force, 'getEnergyFunction'):
+        return 2
+    if hasattr(force, 'getNumComputedValues') and force.getNumComputedValues() > 0:
+        return 2
+    return _expressionDegree(force.getEnergyFunction(), parameters)
+
+
+def _expressionDegree(expression, parameters):
+    """Determine how a custom force's energy expression depends on a set of parameters.  The return value has the same
+    meaning as for _forceDegree()."""
+    # Convert the expression to Python syntax so it can be parsed with the ast module.  Identifiers are renamed so they
+    # cannot conflict with Python keywords such as "lambda".
+
+    names = {}
+
+    def rename(match):
+        return names.setdefault(match.group(0), f'v{len(names)}')
+
+    try:
+        parts = [re.sub(r'(?<![\w.])[A-Za-z_]\w*', rename, p.replace('^', '**')) for p in expression.split(';') if p.strip() != '']
+        energy = ast.parse(parts[0].strip(), mode='eval').body
+        definitions = {}
+        for part in parts[1:]:
+            name, value = part.split('=', 1)
+            definitions[name.strip()] = ast.parse(value.strip(), mode='eval').body
+    except (SyntaxError, ValueError):
+        return 2
+    for p in parameters:
+        if p not in names and p in expression:
+            # The parameter name contains characters we do not recognize as part of an identifier.
+
+            return 2
+    variables = set(names[p] for p in parameters if p in names)
+    cache = {}
+
+    def degree(node):
+        if isinstance(node, ast.Constant):
+            return 0
+        if isinstance(node, ast.Name):
+            if node.id in definitions:
+                if node.id not in cache:
+                    cache[node.id] = 2
+                    cache[node.id] = degree(definitions[node.id])
+                return cache[node.id]
+            return 1 if node.id in variables else 0
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            return degree(node.operand)
+        if isinstance(node, ast.BinOp):
+            left = degree(node.left)
+            right = degree(node.right)
+            if isinstance(node.op, (ast.Add, ast.Sub)):
+                return max(left, right)
+            if isinstance(node.op, ast.Mult):
+                return min(2, left+right)
+            if isinstance(node.op, ast.Div):
+                return left if right == 0 else 2
+            return 0 if left == right == 0 else 2
+        if isinstance(node, ast.Call):
+            return 0 if all(degree(arg) == 0 for arg in node.args) else 2
+        return 2
+
+    return degree(energy)
@@ -0,0 +1,99 @@
+"""
+neighborsearch.py: Find pairs of nearby points using a cell list.
+
+This is part of the OpenMM molecular simulation toolkit.
+See https://openmm.org/development.
+
+Portions copyright (c) 2026 Stanford University and the Authors.
+Authors:
+Contributors:
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS, CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import itertools
+import numpy as np
+
+def findNeighborPairs(positions1, positions2, cutoff):
+    """Find all pairs of points from two sets that are closer than a cutoff distance.
+
+    The points are sorted into a grid of cells whose size equals the cutoff, so only points in neighboring
+    cells need to be compared.  The cost is proportional to the number of points plus the number of pairs
+    found, rather than to the product of the numbers of points.  Periodic boundary conditions are not applied.
+
+    Parameters
+    ----------
+    positions1 : array
+        an (n1, 3) array containing the first set of points
+    positions2 : array
+        an (n2, 3) array containing the second set of points
+    cutoff : float
+        pairs are returned if their distance is less than this
+
+    Returns
+    -------
+    a tuple (index1, index2, distance) of arrays.  For each pair, index1 is the index of the point in positions1,
+    index2 is the index of the point in positions2, and distance is the distance between them.  The pairs are sorted
+    by index1, then by index2.
+    """
+    positions1 = np.asarray(positions1, dtype=float).reshape(-1, 3)
+    positions2 = np.asarray(positions2, dtype=float).reshape(-1, 3)
+    if len(positions1) == 0 or len(positions2) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    # Assign each point to a cell.  Cells are padded by one on each side so the neighbors of every cell have
+    # nonnegative coordinates.
+
+    origin = np.minimum(np.min(positions1, axis=0), np.min(positions2, axis=0))
+    cells1 = np.floor((positions1-origin)/cutoff).astype(np.int64)+1
+    cells2 = np.floor((positions2-origin)/cutoff).astype(np.int64)+1
+    numCells = np.maximum(np.max(cells1, axis=0), np.max(cells2, axis=0))+2
+    def cellKey(cells):
+        return (cells[:,0]*numCells[1] + cells[:,1])*numCells[2] + cells[:,2]
+
+    # Sort the second set of points by cell.
+
+    keys2 = cellKey(cells2)
+    order = np.argsort(keys2, kind='stable')
+    sortedKeys = keys2[order]
+
+    # Loop over neighboring cells and collect the pairs of points in them.
+
+    index1 = []
+    index2 = []
+    for offset in itertools.product((-1, 0, 1), repeat=3):
+        keys = cellKey(cells1+np.array(offset))
+        first = np.searchsorted(sortedKeys, keys, side='left')
+        counts = np.searchsorted(sortedKeys, keys, side='right')-first
+        ends = np.cumsum(counts)
+        if ends[-1] == 0:
+            continue
+        index1.append(np.repeat(np.arange(len(positions1)), counts))
+        index2.append(order[np.arange(ends[-1]) - np.repeat(ends-counts-first, counts)])
+    if len(index1) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    index1 = np.concatenate(index1)
+    index2 = np.concatenate(index2)
+    distance = np.linalg.norm(positions1[index1]-positions2[index2], axis=1)
+    keep = distance < cutoff
+    index1 = index1[keep]
+    index2 = index2[keep]
+    distance = distance[keep]
+    pairOrder = np.lexsort((index2, index1))
+    return index1[pairOrder], index2[pairOrder], distance[pairOrder]
@@ -0,0 +1,140 @@
+"""
+recordfile.py: Append-only binary files of fixed-size records.
+
+This is part of the OpenMM molecular simulation toolkit.
+See https://openmm.org/development.
+
+Portions copyright (c) 2026 Stanford University and the Authors.
+Authors:
+Contributors:
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS, CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import json
+import os
+import numpy as np
+
+class RecordFile(object):
+    """An append-only binary file containing a sequence of fixed-size records.
+
+    Each record contains the same set of fields, each of which is a NumPy array of fixed type and shape.  The file begins
+    with a header describing the fields, followed by the records stored one after another as a NumPy structured array.
+    Because every record has the same size, reopening a file to append to it and retrieving the last record take
+    constant time regardless of how long the file is, and load() can return each field as an array covering all records
+    without parsing anything.
+
+    If a simulation was interrupted while writing a record, the incomplete record is discarded when the file is reopened.
+    """
+
+    _magic = b'OMMRECORDS\x00\x01'
+
+    def __init__(self, filename, fields, append=False):
+        """Open a file for writing.
+
+        Parameters
+        ----------
+        filename: str
+            the path to the file
+        fields: list[tuple]
+            the fields of each record.  Each element is a tuple (name, dtype, shape).
+        append: bool
+            if True, records are appended to an existing file, whose fields must match the ones specified.  If False,
+            a new file is created, replacing any existing file.
+        """
+        self._file = None
+        self.dtype = _createDtype(fields)
+        if append:
+            dtype, headerSize = _readHeader(filename)
+            if dtype != self.dtype:
+                raise ValueError(f'The fields in {filename} do not match the ones expected')
+            self._headerSize = headerSize
+            self._file = open(filename, 'r+b')
+            size = os.fstat(self._file.fileno()).st_size
+            self._numRecords = (size-headerSize)//self.dtype.itemsize
+            self._file.truncate(headerSize+self._numRecords*self.dtype.itemsize)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            header = json.dumps([[name, np.dtype(dtype).str, list(shape)] for name, dtype, shape in fields]).encode('utf-8')
+            self._file = open(filename, 'wb')
+            self._file.write(RecordFile._magic+np.array(len(header), dtype='<u4').tobytes()+header)
+            self._headerSize = self._file.tell()
+            self._numRecords = 0
+        self._file.flush()
+
+    def __len__(self):
+        return self._numRecords
+
+    def append(self, **values):
+        """Append a record to the file.  Each keyword argument gives the value of one field."""
+        record = np.zeros(1, dtype=self.dtype)
+        for name, value in values.items():
+            record[name] = value
+        self._file.write(record.tobytes())
+        self._file.flush()
+        self._numRecords += 1
+
+    def lastRecord(self):
+        """Get the last record in the file as a NumPy structured scalar, or None if the file contains no records."""
+        if self._numRecords == 0:
+            return None
+        self._file.seek(self._headerSize+(self._numRecords-1)*self.dtype.itemsize)
+        data = self._file.read(self.dtype.itemsize)
+        self._file.seek(0, os.SEEK_END)
+        return np.frombuffer(data, dtype=self.dtype)[0]
+
+    def close(self):
+        """Close the file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __del__(self):
+        self.close()
+
+    @staticmethod
+    def load(filename):
+        """Load all complete records from a file.
+
+        Returns
+        -------
+        dict
+            a dict mapping each field name to an array whose first dimension is the number of records
+        """
+        dtype, headerSize = _readHeader(filename)
+        size = os.path.getsize(filename)
+        count = (size-headerSize)//dtype.itemsize
+        records = np.fromfile(filename, dtype=dtype, count=count, offset=headerSize)
+        return {name: records[name] for name in dtype.names}
+
+
+def _createDtype(fields):
+    """Create the NumPy structured dtype for a list of fields.  All values are stored little endian."""
+    return np.dtype([(name, np.dtype(dtype).newbyteorder('<'), tuple(shape)) for name, dtype, shape in fields])
+
+
+def _readHeader(filename):
+    """Read the header of a record file, and return the dtype of its records and the size of the header in bytes."""
+    with open(filename, 'rb') as input:
+        magic = input.read(len(RecordFile._magic))
+        if magic != RecordFile._magic:
+            raise ValueError(f'{filename} is not a record file')
+        length = int(np.frombuffer(input.read(4), dtype='<u4')[0])
+        fields = json.loads(input.read(length).decode('utf-8'))
+    return _createDtype(fields), len(RecordFile._magic)+4+length
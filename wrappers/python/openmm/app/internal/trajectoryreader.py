@@ -0,0 +1,104 @@
+"""
+trajectoryreader.py: Base class for classes that read frames from trajectory files.
+
+This is part of the OpenMM molecular simulation toolkit.
+See https://openmm.org/development.
+
+Portions copyright (c) 2026 Stanford University and the Authors.
+Authors:
+Contributors:
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS, CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE
+USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import operator
+import numpy as np
+from openmm.unit import Quantity, nanometers
+
+class TrajectoryReader(object):
+    """Base class for classes that provide random access to the frames of a trajectory file.
+
+    Subclasses must set _numFrames and _numAtoms, and implement _readFrames().  Indexing the
+    reader returns particle positions.  The first index selects frames and the optional
+    second index selects atoms, so for example reader[10:20, [0, 5, 7]] returns the positions
+    of three atoms in ten frames.  Each index may be an integer, a slice, or an array of
+    indices or booleans.
+    """
+
+    def __len__(self):
+        return self._numFrames
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            if len(key) != 2:
+                raise IndexError('Expected at most two indices (frames and atoms)')
+            frames, atoms = key
+        else:
+            frames, atoms = key, slice(None)
+        frames = _selectIndices(frames, self._numFrames)
+        atoms = _selectIndices(atoms, self._numAtoms)
+        positions = self._readFrames(np.atleast_1d(frames), np.atleast_1d(atoms))
+        if np.ndim(frames) == 0:
+            positions = positions[0]
+        if np.ndim(atoms) == 0:
+            positions = positions[..., 0, :]
+        return Quantity(positions, nanometers)
+
+    def getNumFrames(self):
+        """Get the number of frames in the trajectory."""
+        return self._numFrames
+
+    def getNumAtoms(self):
+        """Get the number of atoms in each frame."""
+        return self._numAtoms
+
+    def _readFrames(self, frames, atoms):
+        """Read the positions of a set of atoms in a set of frames.
+
+        Parameters
+        ----------
+        frames : array of int
+            the indices of the frames to read
+        atoms : array of int
+            the indices of the atoms to read
+
+        Returns
+        -------
+        array
+            the positions in nanometers, with shape (len(frames), len(atoms), 3)
+        """
+        raise NotImplementedError()
+
+
+def _selectIndices(key, size):
+    """Convert an index into a sequence of the specified size to an integer, or an array of integers."""
+    if isinstance(key, slice):
+        return np.arange(*key.indices(size))
+    if np.ndim(key) == 0:
+        index = operator.index(key)
+        if index < 0:
+            index += size
+        if index < 0 or index >= size:
+            raise IndexError('Index %d is out of range' % operator.index(key))
+        return index
+    return np.arange(size)[key]
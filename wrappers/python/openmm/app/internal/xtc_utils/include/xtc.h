@@ -27,6 +27,7 @@ Contributors: Stefan Doerr, Raul P. Pelaez
 #define XTC
 #include "xdrfile.h"
 #include<string>
+#include<vector>
 // Get the number of frames in a trajectory file
 int xtc_nframes(std::string filename);
 
@@ -43,4 +44,36 @@ void xtc_write(std::string filename, int natoms, int nframes, int* step, float*
 // Rewrites a trajectory file with a new timestep and starting step number.
 // Useful when the step number is larger than 2^32.
 void xtc_rewrite_with_new_timestep(std::string filename_in, std::string filename_out, int first_step, int interval, float dt);
+
+// Overwrites the step number and time of every frame in a trajectory file in place,
+// without decompressing or copying the coordinates.
+void xtc_update_steps(std::string filename, int first_step, int interval, float dt);
+
+// Finds the frames in a trajectory file, starting from the frame at start_offset.  For each frame, this
+// records its offset in the file, step, time, and box vectors (9 floats).  Frames are found by reading
+// their headers, without decompressing the coordinates.  An incomplete frame at the end of the file is
+// ignored.
+void xtc_index(std::string filename, int64_t start_offset, std::vector<int64_t>& offsets, std::vector<int>& steps, std::vector<float>& times, std::vector<float>& boxes);
+
+// Reads the frames starting at the specified offsets in a trajectory file.  For each frame, the coordinates
+// of the nsubset atoms whose indices are listed in subset are stored in coords, which must have size
+// nframes*nsubset*3.
+void xtc_read_frames(std::string filename, int natoms, int nframes, int64_t* offsets, int nsubset, int* subset, float* coords);
+
+// Appends frames to a trajectory file, keeping the file open between calls.
+class XTCWriter {
+public:
+    // Opens a file for appending. If buffer_size is positive, it sets the size in bytes
+    // of the buffer used for writing to the file.
+    XTCWriter(std::string filename, int buffer_size);
+    ~XTCWriter();
+    // Appends nframes frames.  pos has shape (nframes, natoms, 3) and box has shape (nframes, 3, 3).
+    void write(int natoms, int nframes, int* step, float* timex, float* pos, float* box);
+    // Writes all buffered data to the file.
+    void flush();
+    // Closes the file.  No more frames may be written after this is called.
+    void close();
+private:
+    XDRFILE* xd;
+};
 #endif
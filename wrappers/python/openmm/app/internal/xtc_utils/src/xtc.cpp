@@ -25,6 +25,9 @@ Contributors: Stefan Doerr, Raul P. Pelaez
 */
 #include "xtc.h"
 #include "xdrfile_xtc.h"
+#include <algorithm>
+#include <cstring>
+#include <fstream>
 #include <vector>
 #include <string>
 #include <stdexcept>
@@ -192,3 +195,167 @@ void xtc_rewrite_with_new_timestep(std::string filename_in, std::string filename
         i++;
     }
 }
+
+// Helper functions to read and write the big endian 32 bit values used by XDR
+static bool read_xdr_int(std::fstream& file, unsigned int& value) {
+    unsigned char bytes[4];
+    if (!file.read(reinterpret_cast<char*>(bytes), 4))
+        return false;
+    value = (bytes[0] << 24) | (bytes[1] << 16) | (bytes[2] << 8) | bytes[3];
+    return true;
+}
+
+static void write_xdr_int(std::fstream& file, unsigned int value) {
+    unsigned char bytes[4] = {(unsigned char) (value >> 24), (unsigned char) (value >> 16), (unsigned char) (value >> 8), (unsigned char) value};
+    file.write(reinterpret_cast<char*>(bytes), 4);
+}
+
+// Information about a frame that can be read without decompressing its coordinates.
+struct XTCFrameHeader {
+    unsigned int natoms;
+    int step;
+    float time;
+    float box[9];
+    std::streamoff size;
+};
+
+static float xdr_bits_to_float(unsigned int bits) {
+    float value;
+    memcpy(&value, &bits, 4);
+    return value;
+}
+
+// Reads the header of the frame at the specified offset.  Returns false if the file ends before the end of
+// the header, which happens when the last frame is still being written.
+static bool read_frame_header(std::fstream& file, std::streamoff offset, XTCFrameHeader& header) {
+    // Each frame starts with a header containing the magic number, number of atoms, step, and time.
+    // This is followed by the box (9 floats) and the coordinates.  Coordinates for more than 9 atoms
+    // are compressed, and the compressed data is preceded by 9 ints and floats ending with its length
+    // in bytes, which is padded to a multiple of 4.
+    const unsigned int magic = 1995;
+    const std::streamoff header_size = 16, box_size = 36;
+    file.seekg(offset);
+    unsigned int frame_magic, step, time_bits;
+    if (!read_xdr_int(file, frame_magic))
+        return false;
+    if (frame_magic != magic)
+        throw std::runtime_error("xtc file: XTC file is corrupt\n");
+    if (!read_xdr_int(file, header.natoms) || !read_xdr_int(file, step) || !read_xdr_int(file, time_bits))
+        return false;
+    header.step = (int) step;
+    header.time = xdr_bits_to_float(time_bits);
+    for (int i = 0; i < 9; i++) {
+        unsigned int box_bits;
+        if (!read_xdr_int(file, box_bits))
+            return false;
+        header.box[i] = xdr_bits_to_float(box_bits);
+    }
+    if (header.natoms <= 9)
+        header.size = header_size + box_size + 4 + 12 * (std::streamoff) header.natoms;
+    else {
+        unsigned int nbytes;
+        file.seekg(offset + header_size + box_size + 36);
+        if (!read_xdr_int(file, nbytes))
+            return false;
+        header.size = header_size + box_size + 40 + 4 * (((std::streamoff) nbytes + 3) / 4);
+    }
+    return true;
+}
+
+void xtc_update_steps(std::string filename, int first_step, int interval, float dt) {
+    std::fstream file(filename, std::ios::in | std::ios::out | std::ios::binary);
+    if (!file)
+        throw std::runtime_error("xtc file: Could not open file");
+    std::streamoff offset = 0;
+    XTCFrameHeader header;
+    for (int i = 0; read_frame_header(file, offset, header); i++) {
+        int step = first_step + i * interval;
+        float time = step * dt;
+        unsigned int time_bits;
+        memcpy(&time_bits, &time, 4);
+        file.seekp(offset + 8);
+        write_xdr_int(file, (unsigned int) step);
+        write_xdr_int(file, time_bits);
+        if (!file)
+            throw std::runtime_error("xtc_update_steps(): could not write frame\n");
+        offset += header.size;
+    }
+}
+
+void xtc_index(std::string filename, int64_t start_offset, std::vector<int64_t>& offsets, std::vector<int>& steps, std::vector<float>& times, std::vector<float>& boxes) {
+    std::fstream file(filename, std::ios::in | std::ios::binary);
+    if (!file)
+        throw std::runtime_error("xtc file: Could not open file");
+    file.seekg(0, std::ios::end);
+    std::streamoff file_size = file.tellg();
+    std::streamoff offset = start_offset;
+    XTCFrameHeader header;
+    while (read_frame_header(file, offset, header) && offset + header.size <= file_size) {
+        // Stop at an incomplete frame, which may still be being written.
+        offsets.push_back(offset);
+        steps.push_back(header.step);
+        times.push_back(header.time);
+        boxes.insert(boxes.end(), header.box, header.box + 9);
+        offset += header.size;
+    }
+}
+
+void xtc_read_frames(std::string filename, int natoms, int nframes, int64_t* offsets, int nsubset, int* subset, float* coords) {
+    XDRFILE_RAII xd(filename, "r");
+    XTCFrame frame(natoms);
+    for (size_t f = 0; f < nframes; f++) {
+#ifdef _WIN32
+        int err = _fseeki64(((XDRFILE*) xd)->fp, offsets[f], SEEK_SET);
+#else
+        int err = fseeko(((XDRFILE*) xd)->fp, offsets[f], SEEK_SET);
+#endif
+        if (err != 0 || frame.readNextFrame(xd) != exdrOK)
+            throw std::runtime_error("xtc_read(): could not read frame\n");
+        float* output = coords + 3 * (size_t) nsubset * f;
+        for (size_t i = 0; i < nsubset; i++) {
+            if (subset[i] < 0 || subset[i] >= natoms)
+                throw std::runtime_error("xtc_read(): atom index out of range\n");
+            for (int j = 0; j < 3; j++)
+                output[3 * i + j] = frame.positions[3 * (size_t) subset[i] + j];
+        }
+    }
+}
+
+XTCWriter::XTCWriter(std::string filename, int buffer_size) : xd(xdrfile_open(filename.c_str(), "a")) {
+    if (!xd)
+        throw std::runtime_error("xtc file: Could not open file");
+    if (buffer_size > 0)
+        setvbuf(xd->fp, NULL, _IOFBF, buffer_size);
+}
+
+XTCWriter::~XTCWriter() {
+    close();
+}
+
+void XTCWriter::write(int natoms, int nframes, int* step, float* timex, float* pos, float* box) {
+    if (!xd)
+        throw std::runtime_error("xtc_write(): file is closed\n");
+    XTCFrame frame(natoms);
+    size_t frame_size = 3 * (size_t) natoms;
+    for (size_t f = 0; f < nframes; f++) {
+        for (size_t i = 0; i < 3; i++)
+            for (size_t j = 0; j < 3; j++)
+                frame.box[i][j] = box[9 * f + 3 * i + j];
+        std::copy(pos + f * frame_size, pos + (f + 1) * frame_size, frame.positions.begin());
+        frame.step = step[f];
+        frame.time = timex[f];
+        frame.appendFrameToFile(xd);
+    }
+}
+
+void XTCWriter::flush() {
+    if (xd && fflush(xd->fp) != 0)
+        throw std::runtime_error("xtc_write(): could not flush file\n");
+}
+
+void XTCWriter::close() {
+    if (xd) {
+        xdrfile_close(xd);
+        xd = NULL;
+    }
+}
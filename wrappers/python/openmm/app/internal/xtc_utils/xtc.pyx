@@ -26,6 +26,8 @@ import numpy as np
 cimport numpy as np
 cimport xtclib
 from libcpp.string cimport string
+from libcpp.vector cimport vector
+from libc.stdint cimport int64_t
 ctypedef np.float32_t FLOAT32_t
 
 def get_xtc_nframes(string filename):
@@ -141,3 +143,128 @@ def xtc_rewrite_with_new_timestep(string filename_in, string filename_out,
         The timestep of the output file
     """
     xtclib.xtc_rewrite_with_new_timestep(filename_in, filename_out, first_step, interval, dt)
+
+
+def xtc_update_steps(string filename, int first_step, int interval, float dt):
+    """
+    Overwrites the step and time of every frame in a xtc file in place. Unlike xtc_rewrite_with_new_timestep,
+    this does not create a new file.
+    Parameters
+    ----------
+    filename: string
+        The filename of the xtc file. You need to pass the string with filename.encode("UTF-8") to this function
+    first_step: int
+        The step of the first frame
+    interval: int
+        The interval between the steps of consecutive frames
+    dt: float
+        The timestep, used to compute the time of each frame
+    """
+    xtclib.xtc_update_steps(filename, first_step, interval, dt)
+
+
+def xtc_build_index(string filename, int64_t start_offset=0):
+    """
+    Finds the frames in a xtc file by reading their headers, without decompressing the coordinates.
+    Parameters
+    ----------
+    filename: string
+        The filename of the xtc file. You need to pass the string with filename.encode("UTF-8") to this function
+    start_offset: int
+        The offset in bytes of the first frame to find. This must be the start of a frame.
+    Returns
+    -------
+    offsets: np.ndarray
+        The offset in bytes of each frame. Shape: (n_frames,)
+    step: np.ndarray
+        The step of each frame. Shape: (n_frames,)
+    time: np.ndarray
+        The time of each frame. Shape: (n_frames,)
+    box: np.ndarray
+        The box vectors of each frame. Shape: (n_frames, 3, 3)
+    """
+    cdef vector[int64_t] offsets
+    cdef vector[int] steps
+    cdef vector[float] times
+    cdef vector[float] boxes
+    xtclib.xtc_index(filename, start_offset, offsets, steps, times, boxes)
+    return (np.array(offsets, dtype=np.int64), np.array(steps, dtype=np.int32),
+            np.array(times, dtype=np.float32), np.array(boxes, dtype=np.float32).reshape((-1, 3, 3)))
+
+def xtc_read_frames(string filename, int natoms, np.int64_t[::1] offsets, int[::1] atoms):
+    """
+    Reads the frames starting at the specified offsets in a xtc file.
+    Parameters
+    ----------
+    filename: string
+        The filename of the xtc file. You need to pass the string with filename.encode("UTF-8") to this function
+    natoms: int
+        The number of atoms in the xtc file
+    offsets: np.ndarray
+        The offset in bytes of each frame to read, as returned by xtc_build_index. Shape: (n_frames,)
+    atoms: np.ndarray
+        The indices of the atoms whose coordinates should be returned. Shape: (n_subset,)
+    Returns
+    -------
+    coords: np.ndarray
+        The coordinates of the selected atoms in each frame. Shape: (n_frames, n_subset, 3)
+    """
+    cdef int nframes = offsets.shape[0]
+    cdef int nsubset = atoms.shape[0]
+    cdef FLOAT32_t[:, :, ::1] coords = np.zeros((nframes, nsubset, 3), dtype=np.float32)
+    if nframes > 0 and nsubset > 0:
+        xtclib.xtc_read_frames(filename, natoms, nframes, <int64_t*> &offsets[0], nsubset, &atoms[0], &coords[0, 0, 0])
+    return np.asarray(coords)
+
+
+cdef class XTCFrameWriter:
+    """
+    Appends frames to a xtc file (creating it if it does not exist), keeping the file open until close() is called.
+    Parameters
+    ----------
+    filename: string
+        The filename of the xtc file. You need to pass the string with filename.encode("UTF-8") to this function
+    buffer_size: int
+        The size in bytes of the buffer used for writing to the file. If 0, the system default is used.
+    """
+    cdef xtclib.XTCWriter* writer
+
+    def __cinit__(self, string filename, int buffer_size=0):
+        self.writer = new xtclib.XTCWriter(filename, buffer_size)
+
+    def __dealloc__(self):
+        del self.writer
+
+    def write_frames(self, float[:, :, ::1] coords, float[:, :, ::1] box, float[::1] time, int[::1] step):
+        """
+        Appends frames to the file. The data may remain in the buffer until flush() or close() is called.
+        Parameters
+        ----------
+        coords: np.ndarray
+            The coordinates of the atoms in each frame. Shape: (n_frames, n_atoms, 3)
+        box: np.ndarray
+            The box vectors of each frame. Shape: (n_frames, 3, 3)
+        time: np.ndarray
+            The time of each frame. Shape: (n_frames,)
+        step: np.ndarray
+            The step of each frame. Shape: (n_frames,)
+        """
+        cdef int nframes = coords.shape[0]
+        cdef int natoms = coords.shape[1]
+        if nframes == 0:
+            return
+        if box.shape[0] != nframes or time.shape[0] != nframes or step.shape[0] != nframes:
+            raise ValueError("All arrays must have the same number of frames")
+        self.writer.write(natoms, nframes, &step[0], &time[0], &coords[0, 0, 0], &box[0, 0, 0])
+
+    def flush(self):
+        """
+        Writes all buffered data to the file.
+        """
+        self.writer.flush()
+
+    def close(self):
+        """
+        Closes the file. No more frames may be written after this is called.
+        """
+        self.writer.close()
@@ -22,6 +22,8 @@
 
 # Contributors: Stefan Doerr, Raul P. Pelaez
 from libcpp.string cimport string
+from libcpp.vector cimport vector
+from libc.stdint cimport int64_t
 cdef extern from "include/xtc.h":
     cdef int xtc_nframes(string filename) except +
     cdef int xtc_natoms(string filename) except +
@@ -29,3 +31,11 @@ cdef extern from "include/xtc.h":
     cdef void xtc_write(string filename, int natoms, int nframes, int *step, float *timex, float *pos, float *box) except +
     cdef void xtc_rewrite_with_new_timestep(string filename_in, string filename_out,
 				  int first_step, int interval, float dt) except +
+    cdef void xtc_update_steps(string filename, int first_step, int interval, float dt) except +
+    cdef void xtc_index(string filename, int64_t start_offset, vector[int64_t]& offsets, vector[int]& steps, vector[float]& times, vector[float]& boxes) except +
+    cdef void xtc_read_frames(string filename, int natoms, int nframes, int64_t *offsets, int nsubset, int *subset, float *coords) except +
+    cdef cppclass XTCWriter:
+        XTCWriter(string filename, int buffer_size) except +
+        void write(int natoms, int nframes, int *step, float *timex, float *pos, float *box) except +
+        void flush() except +
+        void close()
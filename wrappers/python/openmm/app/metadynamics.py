@@ -28,13 +28,20 @@ USE OR OTHER DEALINGS IN THE SOFTWARE.
 import openmm as mm
 import openmm.unit as unit
 from collections import namedtuple
+from contextlib import contextmanager
 from functools import reduce
+import mmap
 import os
 import re
+import threading
 try:
     import numpy as np
 except:
     pass
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 
 class Metadynamics(object):
@@ -68,9 +75,20 @@ class Metadynamics(object):
     way to parallelize metadynamics sampling across many computers.  Just point all of
     them to a shared directory on disk.  Each process will save its biases to that
     directory, and also load in and apply the biases added by other processes.
+
+    When all walkers run on the same computer, they can instead share biases through
+    memory.  Specify the path to a file (preferably on a memory backed file system such
+    as /dev/shm), the number of walkers, and the index of each walker.  The file is
+    memory mapped by every process, and each walker owns one slot in it containing its
+    own biases.  Every saveFrequency steps a walker writes its biases to its slot and
+    adds any changes made by other walkers since the last time it checked to its total
+    bias.  This avoids creating and reading files, and the cost of each update only
+    depends on how many walkers have changed.  If the file is not deleted between runs,
+    it also lets each walker resume from the biases it had previously computed.
     """
 
-    def __init__(self, system, variables, temperature, biasFactor, height, frequency, saveFrequency=None, biasDir=None):
+    def __init__(self, system, variables, temperature, biasFactor, height, frequency, saveFrequency=None, biasDir=None,
+                 sharedBiasFile=None, numWalkers=None, walkerIndex=None, gaussianCutoff=6.0, updateFrequency=None):
         """Create a Metadynamics object.
 
         Parameters
@@ -98,6 +116,27 @@ class Metadynamics(object):
         biasDir: str (optional)
             the directory to which biases should be written, and from which biases written by
             other processes should be loaded
+        sharedBiasFile: str (optional)
+            the path to a file that is memory mapped to share biases with other walkers running
+            on the same computer.  The walkers may run in separate processes or in the same one.
+            If this is specified, saveFrequency, numWalkers, and walkerIndex must also be specified.
+        numWalkers: int (optional)
+            the number of walkers sharing biases through sharedBiasFile.  This may only be
+            specified if sharedBiasFile is.
+        walkerIndex: int (optional)
+            the index of this walker, between 0 and numWalkers-1.  Every walker sharing the file
+            must have a different index.  This may only be specified if sharedBiasFile is.
+        gaussianCutoff: float (optional)
+            each Gaussian is only added to grid points within this many widths (standard deviations)
+            of its center along every axis.  This greatly reduces the cost of adding Gaussians to
+            large 2D and 3D grids.  If None, every Gaussian is evaluated over the whole grid.
+        updateFrequency: int (optional)
+            the interval in time steps at which the bias in the Context is updated.  Updating the
+            Context requires copying the entire grid, so for large grids it can be faster to add
+            several Gaussians between updates.  This must be a multiple of frequency.  If omitted,
+            the Context is updated every time a Gaussian is added.  The Context is always updated
+            before step() returns, and the heights of Gaussians added between updates are computed
+            from the full bias, so this does not affect the results.
         """
         if not unit.is_quantity(temperature):
             temperature = temperature*unit.kelvin
@@ -105,10 +144,23 @@ class Metadynamics(object):
             height = height*unit.kilojoules_per_mole
         if biasFactor <= 1.0:
             raise ValueError('biasFactor must be > 1')
-        if (saveFrequency is None and biasDir is not None) or (saveFrequency is not None and biasDir is None):
+        if (saveFrequency is None and biasDir is not None) or (saveFrequency is not None and biasDir is None and sharedBiasFile is None):
             raise ValueError('Must specify both saveFrequency and biasDir')
+        if sharedBiasFile is not None:
+            if saveFrequency is None:
+                raise ValueError('Must specify saveFrequency when using sharedBiasFile')
+            if numWalkers is None or walkerIndex is None:
+                raise ValueError('Must specify numWalkers and walkerIndex when using sharedBiasFile')
+            if walkerIndex < 0 or walkerIndex >= numWalkers:
+                raise ValueError('walkerIndex must be between 0 and numWalkers-1')
+        elif numWalkers is not None or walkerIndex is not None:
+            raise ValueError('numWalkers and walkerIndex can only be specified when using sharedBiasFile')
         if saveFrequency is not None and (saveFrequency < frequency or saveFrequency%frequency != 0):
             raise ValueError('saveFrequency must be a multiple of frequency')
+        if updateFrequency is None:
+            updateFrequency = frequency
+        if updateFrequency < frequency or updateFrequency%frequency != 0:
+            raise ValueError('updateFrequency must be a multiple of frequency')
         self.variables = variables
         self.temperature = temperature
         self.biasFactor = biasFactor
@@ -116,11 +168,20 @@ class Metadynamics(object):
         self.frequency = frequency
         self.biasDir = biasDir
         self.saveFrequency = saveFrequency
+        self.gaussianCutoff = gaussianCutoff
+        self.updateFrequency = updateFrequency
+        self._biasChanged = False
         self._id = np.random.randint(0x7FFFFFFF)
         self._saveIndex = 0
         self._selfBias = np.zeros(tuple(v.gridWidth for v in reversed(variables)))
         self._totalBias = np.zeros(tuple(v.gridWidth for v in reversed(variables)))
         self._loadedBiases = {}
+        if sharedBiasFile is None:
+            self._sharedBias = None
+        else:
+            self._sharedBias = _SharedBias(sharedBiasFile, numWalkers, walkerIndex, self._selfBias.shape)
+            self._selfBias += self._sharedBias.getOwnBias()
+            self._totalBias += self._selfBias
         self._syncWithDisk()
         self._deltaT = temperature*(biasFactor-1)
         varNames = ['cv%d' % i for i in range(len(variables))]
@@ -134,20 +195,22 @@ class Metadynamics(object):
             raise ValueError('Metadynamics cannot handle mixed periodic/non-periodic variables')
         periodic = numPeriodics == len(variables)
         if len(variables) == 1:
-            self._table = mm.Continuous1DFunction(self._totalBias.flatten(), *self._limits, periodic)
+            self._table = mm.Continuous1DFunction(self._totalBias.ravel(), *self._limits, periodic)
         elif len(variables) == 2:
-            self._table = mm.Continuous2DFunction(*self._widths, self._totalBias.flatten(), *self._limits, periodic)
+            self._table = mm.Continuous2DFunction(*self._widths, self._totalBias.ravel(), *self._limits, periodic)
         elif len(variables) == 3:
-            self._table = mm.Continuous3DFunction(*self._widths, self._totalBias.flatten(), *self._limits, periodic)
+            self._table = mm.Continuous3DFunction(*self._widths, self._totalBias.ravel(), *self._limits, periodic)
         else:
             raise ValueError('Metadynamics requires 1, 2, or 3 collective variables')
         self._force.addTabulatedFunction('table', self._table)
+        self._splineDerivatives = [_createSplineDerivatives(v.gridWidth, v.periodic) for v in variables]
         freeGroups = set(range(32)) - set(force.getForceGroup() for force in system.getForces())
         if len(freeGroups) == 0:
             raise RuntimeError('Cannot assign a force group to the metadynamics force. '
                                'The maximum number (32) of the force groups is already used.')
         self._force.setForceGroup(max(freeGroups))
         system.addForce(self._force)
+        self._biasChanged = False
 
     def step(self, simulation, steps):
         """Advance the simulation by integrating a specified number of time steps.
@@ -170,12 +233,20 @@ class Metadynamics(object):
             simulation.step(nextSteps)
             if simulation.currentStep % self.frequency == 0:
                 position = self._force.getCollectiveVariableValues(simulation.context)
-                energy = simulation.context.getState(energy=True, groups={forceGroup}).getPotentialEnergy()
+                if self._biasChanged:
+                    # Some Gaussians have not been applied to the Context yet, so its energy is out of date.
+
+                    energy = self._evaluateBias(position)
+                else:
+                    energy = simulation.context.getState(energy=True, groups={forceGroup}).getPotentialEnergy()
                 height = self.height*np.exp(-energy/(unit.MOLAR_GAS_CONSTANT_R*self._deltaT))
-                self._addGaussian(position, height, simulation.context)
+                self._addGaussian(position, height)
             if self.saveFrequency is not None and simulation.currentStep % self.saveFrequency == 0:
                 self._syncWithDisk()
+            if simulation.currentStep % self.updateFrequency == 0:
+                self._updateContext(simulation.context)
             stepsToGo -= nextSteps
+        self._updateContext(simulation.context)
 
     def getFreeEnergy(self):
         """Get the free energy of the system as a function of the collective variables.
@@ -190,10 +261,12 @@ class Metadynamics(object):
         """Get the current values of all collective variables in a Simulation."""
         return self._force.getCollectiveVariableValues(simulation.context)
 
-    def _addGaussian(self, position, height, context):
-        """Add a Gaussian to the bias function."""
-        # Compute a Gaussian along each axis.
+    def _addGaussian(self, position, height):
+        """Add a Gaussian to the bias function.  The change is not applied to the Context until
+        _updateContext() is called."""
+        # Compute a Gaussian along each axis, keeping only the grid points within the cutoff.
 
+        axisIndices = []
         axisGaussians = []
         for i,v in enumerate(self.variables):
             x = (position[i]-v.minValue) / (v.maxValue-v.minValue)
@@ -203,6 +276,14 @@ class Metadynamics(object):
             if v.periodic:
                 dist = np.min(np.array([dist, np.abs(dist-1)]), axis=0)
                 dist[-1] = dist[0]
+            if self.gaussianCutoff is None:
+                indices = np.arange(v.gridWidth)
+            else:
+                indices = np.flatnonzero(dist <= self.gaussianCutoff*np.sqrt(v._scaledVariance))
+                if len(indices) == 0:
+                    return
+            dist = dist[indices]
+            axisIndices.append(indices)
             axisGaussians.append(np.exp(-0.5*dist*dist/v._scaledVariance))
 
         # Compute their outer product.
@@ -212,19 +293,53 @@ class Metadynamics(object):
         else:
             gaussian = reduce(np.multiply.outer, reversed(axisGaussians))
 
-        # Add it to the bias.
+        # Add it to the affected part of the bias.
 
         height = height.value_in_unit(unit.kilojoules_per_mole)
-        self._selfBias += height*gaussian
-        self._totalBias += height*gaussian
+        region = np.ix_(*reversed(axisIndices))
+        self._selfBias[region] += height*gaussian
+        self._totalBias[region] += height*gaussian
+        self._biasChanged = True
+
+    def _evaluateBias(self, position):
+        """Evaluate the current total bias at a point.  This uses the same spline interpolation as the tabulated
+        function in the Context, so the result does not depend on whether the Context is up to date."""
+        bias = self._totalBias
+        for i, v in enumerate(self.variables):
+            x = (position[i]-v.minValue) / (v.maxValue-v.minValue)
+            if v.periodic:
+                x -= np.floor(x)
+            elif x < 0 or x > 1:
+                return 0.0*unit.kilojoules_per_mole
+            x *= v.gridWidth-1
+            index = min(int(x), v.gridWidth-2)
+            t = x-index
+
+            # The spline is a cubic Hermite interpolant between grid points, which is a linear function of the
+            # values along this axis.  Contract the grid with the weight of each value.
+
+            derivs = self._splineDerivatives[i]
+            weights = t*(1-t)**2*derivs[index] + t*t*(t-1)*derivs[index+1]
+            weights[index] += (1+2*t)*(1-t)**2
+            weights[index+1] += t*t*(3-2*t)
+            bias = np.dot(bias, weights)
+        return bias*unit.kilojoules_per_mole
+
+    def _updateContext(self, context):
+        """Copy the current bias to the Context if it has changed."""
+        if not self._biasChanged:
+            return
         if len(self.variables) == 1:
-            self._table.setFunctionParameters(self._totalBias.flatten(), *self._limits)
+            self._table.setFunctionParameters(self._totalBias.ravel(), *self._limits)
         else:
-            self._table.setFunctionParameters(*self._widths, self._totalBias.flatten(), *self._limits)
+            self._table.setFunctionParameters(*self._widths, self._totalBias.ravel(), *self._limits)
         self._force.updateParametersInContext(context)
+        self._biasChanged = False
 
     def _syncWithDisk(self):
         """Save biases to disk, and check for updated files created by other processes."""
+        if self._sharedBias is not None:
+            self._syncWithSharedBias()
         if self.biasDir is None:
             return
 
@@ -265,6 +380,17 @@ class Metadynamics(object):
             self._totalBias = np.copy(self._selfBias)
             for bias in self._loadedBiases.values():
                 self._totalBias += bias.bias
+            if self._sharedBias is not None:
+                self._totalBias += self._sharedBias.otherBias
+            self._biasChanged = True
+
+    def _syncWithSharedBias(self):
+        """Publish biases to the shared file, and add changes made by other walkers to the total bias."""
+        self._sharedBias.publish(self._selfBias)
+        delta = self._sharedBias.update()
+        if delta is not None:
+            self._totalBias += delta
+            self._biasChanged = True
 
 
 class BiasVariable(object):
@@ -311,3 +437,141 @@ class BiasVariable(object):
             return quantity
 
 _LoadedBias = namedtuple('LoadedBias', ['id', 'index', 'bias'])
+
+
+def _createSplineDerivatives(numPoints, periodic):
+    """Create a matrix whose rows give the derivative (with respect to grid index) of the cubic spline through
+    a set of evenly spaced values at each grid point, as a linear function of the values.  This matches the
+    splines created by SplineFitter for tabulated functions."""
+    identity = np.eye(numPoints)
+    if periodic:
+        # The last point duplicates the first one, so there is one fewer unknown second derivative.
+
+        n = numPoints-1
+        lhs = np.zeros((n, n))
+        rhs = np.zeros((n, numPoints))
+        for i in range(n):
+            lhs[i, (i-1)%n] += 1
+            lhs[i, i] += 4
+            lhs[i, (i+1)%n] += 1
+            if i == 0:
+                rhs[i] = 6*(identity[1]-identity[0]-identity[numPoints-1]+identity[numPoints-2])
+            else:
+                rhs[i] = 6*(identity[i+1]-2*identity[i]+identity[i-1])
+        second = np.linalg.solve(lhs, rhs)
+        second = np.concatenate([second, second[:1]])
+    else:
+        # Natural splines have zero second derivative at both ends.
+
+        lhs = np.eye(numPoints)
+        rhs = np.zeros((numPoints, numPoints))
+        for i in range(1, numPoints-1):
+            lhs[i, i-1:i+2] = [1, 4, 1]
+            rhs[i] = 6*(identity[i+1]-2*identity[i]+identity[i-1])
+        second = np.linalg.solve(lhs, rhs)
+    derivs = np.empty((numPoints, numPoints))
+    derivs[:-1] = identity[1:]-identity[:-1]-(2*second[:-1]+second[1:])/6
+    derivs[-1] = identity[-1]-identity[-2]+(second[-2]+2*second[-1])/6
+    return derivs
+
+
+class _SharedBias(object):
+    """Biases shared between walkers through a memory mapped file.
+
+    The file contains one slot for each walker, followed by one slot holding the sum of the
+    biases of all walkers.  A slot holds a version number followed by a bias grid.  When a
+    walker publishes its biases, it writes them to its own slot, adds the change to the sum,
+    and increments the version of the sum.  Walkers hold an exclusive lock on the sum while
+    publishing and a shared lock while reading it, which also guarantees that readers see the
+    whole grid, even on processors that reorder memory accesses.  Each walker only needs to
+    read the sum when its version changes, so the cost of an update does not depend on the
+    number of walkers.
+
+    File locks belong to the whole process, and closing any descriptor for a file releases all
+    of the process's locks on it.  Walkers in the same process therefore also share a
+    threading.Lock for each file, which they hold while locking the file and while closing it.
+    """
+
+    _processLocks = {}
+
+    def __init__(self, filename, numWalkers, walkerIndex, shape):
+        if fcntl is None:
+            raise ValueError('Sharing biases through a file is not supported on this platform')
+        self.shape = shape
+        self.index = walkerIndex
+        self._sumIndex = numWalkers
+        gridSize = int(np.prod(shape))
+        self._slotBytes = 8*(gridSize+1)
+        fileBytes = (numWalkers+1)*self._slotBytes
+        self._fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o666)
+        stat = os.fstat(self._fd)
+        self._processLock = _SharedBias._processLocks.setdefault((stat.st_dev, stat.st_ino), threading.Lock())
+        try:
+            size = os.fstat(self._fd).st_size
+            if size == 0:
+                os.ftruncate(self._fd, fileBytes)
+            elif size != fileBytes:
+                raise ValueError('The size of %s does not match the number of walkers and the grid size' % filename)
+            self._mmap = mmap.mmap(self._fd, fileBytes)
+        except:
+            with self._processLock:
+                os.close(self._fd)
+            self._fd = None
+            raise
+        self._versions = np.ndarray((numWalkers+1,), dtype=np.int64, buffer=self._mmap, offset=0, strides=(self._slotBytes,))
+        self._grids = np.ndarray((numWalkers+1, gridSize), dtype=np.float64, buffer=self._mmap, offset=8, strides=(self._slotBytes, 8))
+        self._seenVersion = -1
+        self.otherBias = np.zeros(shape)
+
+    def __del__(self):
+        # Closing the file releases any locks this process holds on it, so it must stay open as long as this object exists.
+        # The mapping cannot be closed while any arrays still refer to it, so release the views first.
+
+        if getattr(self, '_mmap', None) is not None:
+            self._versions = self._grids = None
+            self._mmap.close()
+            self._mmap = None
+        if getattr(self, '_fd', None) is not None:
+            with self._processLock:
+                os.close(self._fd)
+
+    @contextmanager
+    def _locked(self, operation):
+        """Lock the slot holding the sum, excluding both other processes and other walkers in this process."""
+        with self._processLock:
+            fcntl.lockf(self._fd, operation, self._slotBytes, self._sumIndex*self._slotBytes, os.SEEK_SET)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self._slotBytes, self._sumIndex*self._slotBytes, os.SEEK_SET)
+
+    def getOwnBias(self):
+        """Get the biases stored in this walker's slot by an earlier run."""
+        with self._locked(fcntl.LOCK_SH):
+            return self._grids[self.index].reshape(self.shape).copy()
+
+    def publish(self, bias):
+        """Write this walker's biases to its slot, and add the change since the last call to the sum."""
+        with self._locked(fcntl.LOCK_EX):
+            change = bias.ravel()-self._grids[self.index]
+            if not change.any():
+                return
+            self._grids[self.index] += change
+            self._grids[self._sumIndex] += change
+            self._versions[self.index] += 1
+            self._versions[self._sumIndex] += 1
+
+    def update(self):
+        """Check whether other walkers have changed their biases since the last update.  This returns the
+        change in their total, or None if nothing has changed."""
+        with self._locked(fcntl.LOCK_SH):
+            version = int(self._versions[self._sumIndex])
+            if version == self._seenVersion:
+                return None
+            otherBias = (self._grids[self._sumIndex]-self._grids[self.index]).reshape(self.shape)
+        self._seenVersion = version
+        delta = otherBias-self.otherBias
+        self.otherBias = otherBias
+        if not delta.any():
+            return None
+        return delta
@@ -37,10 +37,12 @@ from openmm.app.forcefield import AllBonds, CutoffNonPeriodic, CutoffPeriodic, D
 from openmm.app.internal import compiled
 from openmm.vec3 import Vec3
 from openmm import System, Context, NonbondedForce, AmoebaVdwForce, AmoebaMultipoleForce, CustomNonbondedForce, HarmonicBondForce, HarmonicAngleForce, VerletIntegrator, LangevinIntegrator, LocalEnergyMinimizer
-from openmm.unit import nanometer, molar, elementary_charge, degree, acos, is_quantity, dot, norm, kilojoules_per_mole
+from openmm.unit import nanometer, molar, elementary_charge, degree, acos, is_quantity, dot, norm, kilojoules_per_mole, strip_units
 import openmm.unit as unit
 from . import element as elem
 import gc
+import itertools
+import numpy as np
 import os
 import random
 import sys
@@ -474,12 +476,17 @@ class Modeller(object):
             raise ValueError('Unknown water model: %s' % model)
         pdb = PDBFile(os.path.join(os.path.dirname(__file__), 'data', model+'.pdb'))
         pdbTopology = pdb.getTopology()
-        pdbPositions = pdb.getPositions().value_in_unit(nanometer)
+        pdbPositions = pdb.getPositions(asNumpy=True).value_in_unit(nanometer)
         pdbResidues = list(pdbTopology.residues())
         pdbBoxSize = pdbTopology.getUnitCellDimensions().value_in_unit(nanometer)
 
         # Pick a unit cell size.
 
+        if len(self.positions) == 0:
+            solutePositions = np.zeros((0, 3))
+        else:
+            solutePositions = np.array(strip_units(self.positions, nanometer)).reshape(-1, 3)
+
         if numAdded is not None:
             # Select a padding distance which is guaranteed to give more than the specified number of molecules.
 
@@ -499,14 +506,11 @@ class Modeller(object):
         elif padding is not None:
             if is_quantity(padding):
                 padding = padding.value_in_unit(nanometer)
-            if len(self.positions) == 0:
+            if len(solutePositions) == 0:
                 radius = 0
             else:
-                positions = self.positions.value_in_unit(nanometer)
-                minRange = Vec3(*(min((pos[i] for pos in positions)) for i in range(3)))
-                maxRange = Vec3(*(max((pos[i] for pos in positions)) for i in range(3)))
-                center = 0.5*(minRange+maxRange)
-                radius = max(unit.norm(center-pos) for pos in positions)
+                center = 0.5*(np.min(solutePositions, axis=0)+np.max(solutePositions, axis=0))
+                radius = float(np.max(np.linalg.norm(solutePositions-center, axis=1)))
             width = max(2*radius+padding, 2*padding)
             vectors = self._computeBoxVectors(width, boxShape)
             box = Vec3(vectors[0][0], vectors[1][1], vectors[2][2])
@@ -544,7 +548,6 @@ class Modeller(object):
         newTopology = Topology()
         newTopology.setPeriodicBoxVectors(vectors*nanometer)
         newAtoms = {}
-        newPositions = []*nanometer
         newResidueTemplates=dict()
         for chain in self.topology.chains():
             newChain = newTopology.addChain(chain.id)
@@ -555,50 +558,34 @@ class Modeller(object):
                 for atom in residue.atoms():
                     newAtom = newTopology.addAtom(atom.name, atom.element, newResidue, atom.id, atom.formalCharge)
                     newAtoms[atom] = newAtom
-                    newPositions.append(deepcopy(self.positions[atom.index]))
         for bond in self.topology.bonds():
             newTopology.addBond(newAtoms[bond[0]], newAtoms[bond[1]], bond.type, bond.order)
+        newPositions = [Vec3(*pos) for pos in solutePositions.tolist()]
 
         # Sort the solute atoms into cells for fast lookup.
 
-        if len(self.positions) == 0:
-            positions = []
-        else:
-            positions = deepcopy(self.positions.value_in_unit(nanometer))
-        cells = _CellList(positions, maxCutoff, vectors, True)
-
-        # Create a function to compute the distance between two points, taking periodic boundary conditions into account.
-
-        periodicDistance = compiled.periodicDistance(vectors)
+        cells = _VectorizedCellList(solutePositions, maxCutoff, vectors)
 
-        # Find the list of water molecules to add.
+        # Find the list of water molecules to add.  Every water in every copy of the pre-equilibrated box is
+        # a candidate, and the candidates are tested against the solute all at once.
 
         newChain = newTopology.addChain()
-        if len(positions) == 0:
-            center = Vec3(0, 0, 0)
+        if len(solutePositions) == 0:
+            center = np.zeros(3)
         else:
-            center = [(max((pos[i] for pos in positions))+min((pos[i] for pos in positions)))/2 for i in range(3)]
-            center = Vec3(center[0], center[1], center[2])
+            center = 0.5*(np.max(solutePositions, axis=0)+np.min(solutePositions, axis=0))
+        box = np.array(box)
         numBoxes = [int(ceil(box[i]/pdbBoxSize[i])) for i in range(3)]
-        addedWaters = []
-        for boxx in range(numBoxes[0]):
-            for boxy in range(numBoxes[1]):
-                for boxz in range(numBoxes[2]):
-                    offset = Vec3(boxx*pdbBoxSize[0], boxy*pdbBoxSize[1], boxz*pdbBoxSize[2])
-                    for residue in pdbResidues:
-                        oxygen = [atom for atom in residue.atoms() if atom.element == elem.oxygen][0]
-                        atomPos = pdbPositions[oxygen.index]+offset
-                        if not any((atomPos[i] > box[i] for i in range(3))):
-                            # This molecule is inside the box, so see how close to it is to the solute.
-
-                            atomPos += center-box/2
-                            for i in cells.neighbors(atomPos):
-                                if periodicDistance(atomPos, positions[i]) < cutoff[i]:
-                                    break
-                            else:
-                                # Record this water molecule as one to add.
-
-                                addedWaters.append((residue.index, atomPos))
+        oxygenIndex = np.array([[atom.index for atom in residue.atoms() if atom.element == elem.oxygen][0] for residue in pdbResidues])
+        offsets = np.array(list(itertools.product(*(range(n) for n in numBoxes))))*np.array(pdbBoxSize)
+        candidates = (offsets[:,np.newaxis,:] + pdbPositions[oxygenIndex][np.newaxis,:,:]).reshape(-1, 3)
+        candidateResidues = np.tile(np.arange(len(pdbResidues)), len(offsets))
+        inside = np.all(candidates <= box, axis=1)
+        candidates = candidates[inside] + (center-box/2)
+        candidateResidues = candidateResidues[inside]
+        keep = ~cells.findClashes(candidates, np.array(cutoff))
+        addedPositions = candidates[keep]
+        addedResidues = candidateResidues[keep]
 
         if numAdded is not None:
             # We added many more waters than we actually want.  Sort them based on distance to the nearest box edge and
@@ -606,59 +593,52 @@ class Modeller(object):
 
             lowerBound = center-box/2
             upperBound = center+box/2
-            distToEdge = (min(min(pos-lowerBound), min(upperBound-pos)) for index, pos in addedWaters)
-            sortedIndex = [i[0] for i in sorted(enumerate(distToEdge), key=lambda x: -x[1])]
-            addedWaters = [addedWaters[i] for i in sortedIndex[:numAdded]]
+            distToEdge = np.minimum(np.min(addedPositions-lowerBound, axis=1), np.min(upperBound-addedPositions, axis=1))
+            sortedIndex = np.argsort(-distToEdge, kind='stable')[:numAdded]
+            addedPositions = addedPositions[sortedIndex]
+            addedResidues = addedResidues[sortedIndex]
 
             # Compute a new periodic box size.
 
-            maxSize = max(max((pos[i] for index, pos in addedWaters))-min((pos[i] for index, pos in addedWaters)) for i in range(3))
+            maxSize = float(np.max(np.max(addedPositions, axis=0)-np.min(addedPositions, axis=0)))
             maxSize += 0.1  # Add padding to reduce clashes at the edge.
             newTopology.setPeriodicBoxVectors(self._computeBoxVectors(maxSize, boxShape))
         else:
             # There could be clashes between water molecules at the box edges.  Find ones to remove.
 
-            upperCutoff = center+box/2-Vec3(waterCutoff, waterCutoff, waterCutoff)
-            lowerCutoff = center-box/2+Vec3(waterCutoff, waterCutoff, waterCutoff)
-            lowerSkinPositions = [pos for index, pos in addedWaters if pos[0] < lowerCutoff[0] or pos[1] < lowerCutoff[1] or pos[2] < lowerCutoff[2]]
-            filteredWaters = []
-            cells.cells = {}
-            for i in range(len(lowerSkinPositions)):
-                cell = cells.cellForPosition(lowerSkinPositions[i])
-                if cell in cells.cells:
-                    cells.cells[cell].append(i)
-                else:
-                    cells.cells[cell] = [i]
-            for entry in addedWaters:
-                pos = entry[1]
-                if pos[0] < upperCutoff[0] and pos[1] < upperCutoff[1] and pos[2] < upperCutoff[2]:
-                    filteredWaters.append(entry)
-                else:
-                    if not any((periodicDistance(lowerSkinPositions[i], pos) < waterCutoff and norm(lowerSkinPositions[i]-pos) > waterCutoff for i in cells.neighbors(pos))):
-                        filteredWaters.append(entry)
-            addedWaters = filteredWaters
+            upperCutoff = center+box/2-waterCutoff
+            lowerCutoff = center-box/2+waterCutoff
+            lowerSkinPositions = addedPositions[np.any(addedPositions < lowerCutoff, axis=1)]
+            upperSkin = np.flatnonzero(np.any(addedPositions >= upperCutoff, axis=1))
+            skinCells = _VectorizedCellList(lowerSkinPositions, maxCutoff, vectors)
+            keep = np.ones(len(addedPositions), dtype=bool)
+            keep[upperSkin] = ~skinCells.findClashes(addedPositions[upperSkin], waterCutoff, periodicImagesOnly=True)
+            addedPositions = addedPositions[keep]
+            addedResidues = addedResidues[keep]
+
+        # Add the water molecules.  The positions of all atoms are computed at once from the oxygen positions.
 
-        # Add the water molecules.
         waterPos = {}
-        for index, pos in addedWaters:
-            newResidue = newTopology.addResidue(residue.name, newChain)
-            residue = pdbResidues[index]
-            oxygen = [atom for atom in residue.atoms() if atom.element == elem.oxygen][0]
-            oPos = pdbPositions[oxygen.index]
-            molAtoms = []
-            for atom in residue.atoms():
-                molAtoms.append(newTopology.addAtom(atom.name, atom.element, newResidue))
-                newPositions.append((pos+pdbPositions[atom.index]-oPos)*nanometer)
-                if atom.element == elem.oxygen:
-                    waterPos[newResidue] = newPositions[-1]
-            for atom1 in molAtoms:
-                if atom1.element == elem.oxygen:
-                    for atom2 in molAtoms:
-                        if atom2.element == elem.hydrogen:
-                            newTopology.addBond(atom1, atom2)
+        waterTemplates = []
+        for residueIndex, residue in enumerate(pdbResidues):
+            atoms = list(residue.atoms())
+            atomIndices = [atom.index for atom in atoms]
+            oxygen = oxygenIndex[residueIndex]
+            bonds = [(i, j) for i, atom1 in enumerate(atoms) if atom1.element == elem.oxygen
+                            for j, atom2 in enumerate(atoms) if atom2.element == elem.hydrogen]
+            waterTemplates.append((residue.name, [(atom.name, atom.element) for atom in atoms], bonds, atomIndices.index(oxygen), pdbPositions[atomIndices]-pdbPositions[oxygen]))
+        for residueIndex, pos in zip(addedResidues.tolist(), addedPositions):
+            name, atoms, bonds, oxygen, relativePositions = waterTemplates[residueIndex]
+            newResidue = newTopology.addResidue(name, newChain)
+            molAtoms = [newTopology.addAtom(atomName, element, newResidue) for atomName, element in atoms]
+            for i, j in bonds:
+                newTopology.addBond(molAtoms[i], molAtoms[j])
+            molPositions = [Vec3(*p) for p in (pos+relativePositions).tolist()]
+            newPositions += molPositions
+            waterPos[newResidue] = molPositions[oxygen]*nanometer
 
         self.topology = newTopology
-        self.positions = newPositions
+        self.positions = newPositions*nanometer
 
         # Total number of waters in the box
         numTotalWaters = len(waterPos)
@@ -1138,10 +1118,7 @@ class Modeller(object):
         """
         # Record which atoms are bonded to each other atom.
 
-        bondedToAtom = [set() for _ in self.topology.atoms()]
-        for atom1, atom2 in self.topology.bonds():
-            bondedToAtom[atom1.index].add(atom2.index)
-            bondedToAtom[atom2.index].add(atom1.index)
+        bondedToAtom = ForceField._buildBondedToAtomList(self.topology)
 
         # If the force field has a DrudeForce, record the types of Drude particles and their parents since we'll
         # need them for picking particle positions.
@@ -1412,13 +1389,13 @@ class Modeller(object):
 
         # Figure out how many copies of the membrane patch we need in each direction.
 
-        proteinPos = self.positions.value_in_unit(nanometer)
+        proteinPos = strip_units(self.positions, nanometer)
         proteinMinPos = Vec3(*[min((p[i] for p in proteinPos)) for i in range(3)])
         proteinMaxPos = Vec3(*[max((p[i] for p in proteinPos)) for i in range(3)])
         proteinSize = proteinMaxPos-proteinMinPos
         proteinCenterPos = (proteinMinPos+proteinMaxPos)/2
         proteinCenterPos = Vec3(proteinCenterPos[0], proteinCenterPos[1], membraneCenterZ)
-        patchPos = patch.positions.value_in_unit(nanometer)
+        patchPos = strip_units(patch.positions, nanometer)
         patchSize = patch.topology.getUnitCellDimensions().value_in_unit(nanometer)
         patchMinPos = Vec3(*[min((p[i] for p in patchPos)) for i in range(3)])
         patchMaxPos = Vec3(*[max((p[i] for p in patchPos)) for i in range(3)])
@@ -1764,3 +1741,88 @@ class _CellList(object):
                         processedCells.add(cell)
                         for atom in self.cells[cell]:
                             yield atom
+
+
+class _VectorizedCellList(object):
+    """This class organizes atom positions in a periodic box into cells like _CellList, but works on arrays of
+    positions, so that large numbers of points can be tested against the atoms at once."""
+
+    def __init__(self, positions, maxCutoff, vectors):
+        self.vectors = np.array([[vectors[i][j] for j in range(3)] for i in range(3)], dtype=float)
+        self.numCells = np.array([max(1, int(floor(vectors[i][i]/maxCutoff))) for i in range(3)])
+        self.cellSize = np.diag(self.vectors)/self.numCells
+        self.rawPositions = np.array(positions, dtype=float).reshape(-1, 3)
+        self.positions = self._wrap(self.rawPositions)
+
+        # Sort the atoms by cell, and record where each cell starts in the sorted list.
+
+        cells = self.cellsForPositions(self.positions)
+        self.sortedAtoms = np.argsort(cells, kind='stable')
+        self.cellStart = np.searchsorted(cells[self.sortedAtoms], np.arange(np.prod(self.numCells)+1))
+
+    def _wrap(self, positions):
+        """Translate positions into the periodic box."""
+        positions = positions - np.floor(positions[:,2:3]/self.vectors[2,2])*self.vectors[2]
+        positions -= np.floor(positions[:,1:2]/self.vectors[1,1])*self.vectors[1]
+        positions -= np.floor(positions[:,0:1]/self.vectors[0,0])*self.vectors[0]
+        return positions
+
+    def _periodicDelta(self, delta):
+        """Apply periodic boundary conditions to displacements, in the same way as compiled.periodicDistance."""
+        delta -= np.round(delta[:,2:3]/self.vectors[2,2])*self.vectors[2]
+        delta -= np.round(delta[:,1:2]/self.vectors[1,1])*self.vectors[1]
+        delta -= np.round(delta[:,0:1]/self.vectors[0,0])*self.vectors[0]
+        return delta
+
+    def cellsForPositions(self, positions):
+        """Get the flattened index of the cell containing each position."""
+        cell = np.floor(self._wrap(positions)/self.cellSize).astype(np.int64) % self.numCells
+        return (cell[:,0]*self.numCells[1] + cell[:,1])*self.numCells[2] + cell[:,2]
+
+    def findClashes(self, points, cutoff, periodicImagesOnly=False, blockSize=65536):
+        """Identify points that are closer to any atom than a cutoff distance.
+
+        Parameters
+        ----------
+        points : array
+            an (n, 3) array of points to test
+        cutoff : float or array
+            the cutoff distance.  This may be either a single value, or an array containing a separate
+            cutoff for each atom.
+        periodicImagesOnly : bool=False
+            if True, a point only clashes with an atom if it is within the cutoff of a periodic image of the
+            atom, but not of the atom itself
+        blockSize : int=65536
+            the number of points to process at once.  This limits the memory used.
+
+        Returns
+        -------
+        an array of bools with one element for each point, which is True if the point clashes with an atom
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        cutoff = np.asarray(cutoff, dtype=float)
+        clashes = np.zeros(len(points), dtype=bool)
+        if len(self.positions) == 0:
+            return clashes
+        for start in range(0, len(points), blockSize):
+            block = points[start:start+blockSize]
+            for offset in itertools.product((-1, 0, 1), repeat=3):
+                # Find all atoms in the neighboring cell of each point.
+
+                cells = self.cellsForPositions(block+np.array(offset)*self.cellSize)
+                first = self.cellStart[cells]
+                counts = self.cellStart[cells+1]-first
+                pointIndex = np.repeat(np.arange(len(block)), counts)
+                ends = np.cumsum(counts)
+                atomIndex = self.sortedAtoms[np.arange(ends[-1] if len(ends) > 0 else 0) - np.repeat(ends-counts-first, counts)]
+
+                # Compute the distances and record the clashes.
+
+                delta = self._periodicDelta(block[pointIndex]-self.positions[atomIndex])
+                atomCutoff = (cutoff if cutoff.ndim == 0 else cutoff[atomIndex])
+                clash = np.sum(delta*delta, axis=1) < atomCutoff*atomCutoff
+                if periodicImagesOnly:
+                    direct = block[pointIndex]-self.rawPositions[atomIndex]
+                    clash &= np.sum(direct*direct, axis=1) > atomCutoff*atomCutoff
+                clashes[start+pointIndex[clash]] = True
+        return clashes
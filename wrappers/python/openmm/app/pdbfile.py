@@ -40,7 +40,7 @@ from openmm import Vec3, Platform
 from openmm.app.internal.pdbstructure import PdbStructure
 from openmm.app.internal.unitcell import computeLengthsAndAngles
 from openmm.app import Topology
-from openmm.unit import nanometers, angstroms, is_quantity, norm, Quantity
+from openmm.unit import nanometers, angstroms, norm, Quantity, strip_units
 from . import element as elem
 try:
     import numpy
@@ -73,8 +73,8 @@ class PDBFile(object):
             if this value appears in the element column for an ATOM record, the Atom's element will be set to None to mark it as an extra particle
         """
         
-        metalElements = ['Al','As','Ba','Ca','Cd','Ce','Co','Cs','Cu','Dy','Fe','Gd','Hg','Ho','In','Ir','K','Li','Mg',
-        'Mn','Mo','Na','Ni','Pb','Pd','Pt','Rb','Rh','Sm','Sr','Te','Tl','V','W','Yb','Zn']
+        metalElements = {'Al','As','Ba','Ca','Cd','Ce','Co','Cs','Cu','Dy','Fe','Gd','Hg','Ho','In','Ir','K','Li','Mg',
+        'Mn','Mo','Na','Ni','Pb','Pd','Pt','Rb','Rh','Sm','Sr','Te','Tl','V','W','Yb','Zn'}
         
         top = Topology()
         ## The Topology read from the PDB file
@@ -190,11 +190,12 @@ class PDBFile(object):
                         connectBonds.append((atomByNumber[i], atomByNumber[j]))         
         if len(connectBonds) > 0:
             # Only add bonds that don't already exist.
-            existingBonds = set(top.bonds())
-            for bond in connectBonds:
-                if bond not in existingBonds and (bond[1], bond[0]) not in existingBonds:
-                    top.addBond(bond[0], bond[1])
-                    existingBonds.add(bond)
+            existingBonds = set((min(i, j), max(i, j)) for i, j in top.getBondAtomIndices().tolist())
+            for atom1, atom2 in connectBonds:
+                key = (min(atom1.index, atom2.index), max(atom1.index, atom2.index))
+                if key not in existingBonds:
+                    top.addBond(atom1, atom2)
+                    existingBonds.add(key)
 
     def getTopology(self):
         """Get the Topology of the model."""
@@ -219,7 +220,7 @@ class PDBFile(object):
             if self._numpyPositions is None:
                 self._numpyPositions = [None]*len(self._positions)
             if self._numpyPositions[frame] is None:
-                self._numpyPositions[frame] = Quantity(numpy.array(self._positions[frame].value_in_unit(nanometers)), nanometers)
+                self._numpyPositions[frame] = Quantity(numpy.array(strip_units(self._positions[frame], nanometers)), nanometers)
             return self._numpyPositions[frame]
         return self._positions[frame]
 
@@ -339,8 +340,7 @@ class PDBFile(object):
 
         if len(list(topology.atoms())) != len(positions):
             raise ValueError('The number of positions must match the number of atoms')
-        if is_quantity(positions):
-            positions = positions.value_in_unit(angstroms)
+        positions = strip_units(positions, angstroms)
         import numpy as np
         positions = np.asarray(positions)
         if np.isnan(positions).any():
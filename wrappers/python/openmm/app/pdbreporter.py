@@ -31,7 +31,6 @@ __author__ = "Peter Eastman"
 __version__ = "1.0"
 
 from openmm.app import PDBFile, PDBxFile, Topology
-from openmm.unit import angstroms
 
 class PDBReporter(object):
     """PDBReporter outputs a series of frames from a Simulation to a PDB file.
@@ -79,7 +78,7 @@ class PDBReporter(object):
             A dictionary describing the required information for the next report
         """
         steps = self._reportInterval - simulation.currentStep%self._reportInterval
-        return {'steps':steps, 'periodic':self._enforcePeriodicBox, 'include':['positions']}
+        return {'steps':steps, 'periodic':self._enforcePeriodicBox, 'include':['positions'], 'async':True}
 
     def report(self, simulation, state):
         """Generate a report.
@@ -96,14 +95,14 @@ class PDBReporter(object):
                 self._createSubsetTopology(simulation.topology)
 
             topology = self._subsetTopology
-
-            #PDBFile will convert to angstroms so do it here first instead
-            positions = state.getPositions(asNumpy=True).value_in_unit(angstroms)
-            positions = [positions[i] for i in self._atomSubset]
+            positions = state.getPositionsArray()[self._atomSubset]
 
         else:
             topology = simulation.topology
-            positions = state.getPositions(asNumpy=True)
+            positions = state.getPositionsArray()
+
+        # Unitless positions passed to PDBFile must be in angstroms.
+        positions = 10*positions
 
         if self._nextModel == 0:
             PDBFile.writeHeader(topology, self._out)
@@ -194,14 +193,14 @@ class PDBxReporter(PDBReporter):
                 self._createSubsetTopology(simulation.topology)
 
             topology = self._subsetTopology
-
-            #PDBFile will convert to angstroms so do it here first instead
-            positions = state.getPositions(asNumpy=True).value_in_unit(angstroms)
-            positions = [positions[i] for i in self._atomSubset]
+            positions = state.getPositionsArray()[self._atomSubset]
 
         else:
             topology = simulation.topology
-            positions = state.getPositions(asNumpy=True)
+            positions = state.getPositionsArray()
+
+        # Unitless positions passed to PDBFile must be in angstroms.
+        positions = 10*positions
 
         if self._nextModel == 0:
             PDBxFile.writeHeader(topology, self._out)
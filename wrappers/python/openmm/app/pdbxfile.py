@@ -35,7 +35,7 @@ from openmm import Vec3, Platform
 from openmm.app.internal.pdbx.reader.PdbxReader import PdbxReader
 from openmm.app.internal.unitcell import computePeriodicBoxVectors, computeLengthsAndAngles
 from openmm.app import topology, Topology, PDBFile
-from openmm.unit import nanometers, angstroms, is_quantity, Quantity
+from openmm.unit import nanometers, angstroms, Quantity, strip_units
 from . import element as elem
 import sys
 import math
@@ -289,7 +289,7 @@ class PDBxFile(object):
             if self._numpyPositions is None:
                 self._numpyPositions = [None]*len(self._positions)
             if self._numpyPositions[frame] is None:
-                self._numpyPositions[frame] = Quantity(numpy.array(self._positions[frame].value_in_unit(nanometers)), nanometers)
+                self._numpyPositions[frame] = Quantity(numpy.array(strip_units(self._positions[frame], nanometers)), nanometers)
             return self._numpyPositions[frame]
         return self._positions[frame]
 
@@ -454,8 +454,7 @@ class PDBxFile(object):
         """
         if len(list(topology.atoms())) != len(positions):
             raise ValueError('The number of positions must match the number of atoms')
-        if is_quantity(positions):
-            positions = positions.value_in_unit(angstroms)
+        positions = strip_units(positions, angstroms)
         import numpy as np
         positions = np.asarray(positions)
         if np.isnan(positions).any():
@@ -29,8 +29,10 @@ USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import openmm as mm
 import openmm.app as app
-import openmm.unit as unit
 from openmm.app.internal import safesave
+from openmm.app.internal.contextsnapshot import ContextSnapshot
+from openmm.app.internal.recordfile import RecordFile
+import numpy as np
 import os
 
 class ReplicaExchangeReporter(object):
@@ -43,8 +45,9 @@ class ReplicaExchangeReporter(object):
     As the simulation runs, it creates the following files in a user specified directory.
 
     - A CSV file containing a log of what state each replica was in at each iteration.
-    - A set of XML files containing serialized State objects for each replica. These serve as checkpoints, allowing a
-      simulation to be resumed later.
+    - A set of NPZ files containing a snapshot of each replica (see ContextSnapshot). These serve as checkpoints,
+      allowing a simulation to be resumed later.  When resuming, XML checkpoints containing serialized State objects
+      written by older versions are also accepted.
     - (optional) A trajectory file for each thermodynamic state.  The coordinates in these files jump discontinuously
       whenever an exchange happens.
     - (optional) A trajectory file for each replica.  The coordinates in these files are continuous, but the
@@ -59,12 +62,20 @@ class ReplicaExchangeReporter(object):
 
     `energy[i][j][k]` is the reduced energy of state k for replica j in iteration i.
 
+    For long simulations with many states, writing and parsing the CSV files can become slow.  Specifying
+    `dataFormat='binary'` instead stores the log and the reduced energies as fixed-size binary records in a single file
+    called log.bin.  Resuming from it takes constant time regardless of its length.  In either format, loadData()
+    returns the contents as NumPy arrays:
+
+    >>> data = ReplicaExchangeReporter.loadData(directory)
+    >>> energy = data['energy']
+
     To resume a simulation from the saved files, pass `resume=True` to the constructor.  It will load all necessary
     information and configure the ReplicaExchangeSampler correctly.
     """
     def __init__(self, directory: str, reportInterval: int, sampler: "app.ReplicaExchangeSampler",
                  trajectoryPerState: bool = True, trajectoryPerReplica: bool = False, trajectoryFormat: str = 'xtc',
-                 enforcePeriodicBox: bool | None = None, energy: bool = False, resume: bool = False):
+                 enforcePeriodicBox: bool | None = None, energy: bool = False, resume: bool = False, dataFormat: str = 'csv'):
         """
         Create a ReplicaExchangeReporter.
 
@@ -94,6 +105,9 @@ class ReplicaExchangeReporter(object):
         resume: bool
             Specifies whether to resume an earlier simulation.  If True, the checkpoint and log data will be loaded into
             the ReplicaExchangeSampler, and future output will be appended to the existing files.
+        dataFormat: str
+            The format in which to save the log and reduced energies.  Supported options are 'csv', which writes
+            log.csv and energy.csv, and 'binary', which writes both to log.bin.
         """
         trajectoryFormat = trajectoryFormat.lower()
         self.directory = directory
@@ -103,12 +117,15 @@ class ReplicaExchangeReporter(object):
         self.format = format
         self._log = None
         self._energy = None
+        self._records = None
         numStates = len(sampler.states)
 
         # Validate the inputs and create the output directory if necessary.
 
         if trajectoryFormat not in ('xtc', 'dcd'):
             raise ValueError(f'Unsupported trajectory format: {trajectoryFormat}.  Allowed values are "xtc" and "dcd".')
+        if dataFormat not in ('csv', 'binary'):
+            raise ValueError(f'Unsupported data format: {dataFormat}.  Allowed values are "csv" and "binary".')
         if resume:
             if not os.path.isdir(directory):
                 raise ValueError(f'Cannot resume because the directory does not exist: {directory}')
@@ -117,11 +134,15 @@ class ReplicaExchangeReporter(object):
                 if not os.path.isfile(os.path.join(directory, filename)):
                     raise ValueError(f'Cannot resume because the file {filename} does not exist.')
 
-            checkExists('log.csv')
-            if energy:
-                checkExists('energy.csv')
+            if dataFormat == 'binary':
+                checkExists('log.bin')
+            else:
+                checkExists('log.csv')
+                if energy:
+                    checkExists('energy.csv')
             for i in range(numStates):
-                checkExists(f'checkpoint_{i}.xml')
+                if not os.path.isfile(os.path.join(directory, f'checkpoint_{i}.xml')):
+                    checkExists(f'checkpoint_{i}.npz')
                 if trajectoryPerState:
                     checkExists(f'state_{i}.{trajectoryFormat}')
                 if trajectoryPerReplica:
@@ -137,18 +158,31 @@ class ReplicaExchangeReporter(object):
 
         if resume:
             for i in range(numStates):
-                with open(os.path.join(directory, f'checkpoint_{i}.xml')) as input:
-                    sampler.replicaConformation[i] = mm.XmlSerializer.deserialize(input.read())
-            log = None
-            with open(os.path.join(directory, 'log.csv')) as input:
-                for line in input:
-                    log = line
-            if log is None:
-                raise ValueError('Cannot resume because log file is empty.')
-            fields = log.split(',')
-            sampler.replicaStateIndex = [int(x) for x in fields[2:(numStates+2)]]
+                path = os.path.join(directory, f'checkpoint_{i}.npz')
+                if os.path.isfile(path):
+                    with open(path, 'rb') as input:
+                        sampler.replicaConformation[i] = ContextSnapshot.load(input.read())
+                else:
+                    with open(os.path.join(directory, f'checkpoint_{i}.xml')) as input:
+                        sampler.replicaConformation[i] = ContextSnapshot.fromState(mm.XmlSerializer.deserialize(input.read()))
+            if dataFormat == 'binary':
+                self._records = RecordFile(os.path.join(directory, 'log.bin'), self._recordFields(numStates, energy), append=True)
+                record = self._records.lastRecord()
+                if record is None:
+                    raise ValueError('Cannot resume because log file is empty.')
+                sampler.replicaStateIndex = record['stateIndex'].tolist()
+                sampler.currentIteration = int(record['iteration'])
+            else:
+                log = None
+                with open(os.path.join(directory, 'log.csv')) as input:
+                    for line in input:
+                        log = line
+                if log is None:
+                    raise ValueError('Cannot resume because log file is empty.')
+                fields = log.split(',')
+                sampler.replicaStateIndex = [int(x) for x in fields[2:(numStates+2)]]
+                sampler.currentIteration = int(fields[0])
             sampler._previousReplicaStateIndex = sampler.replicaStateIndex[:]
-            sampler.currentIteration = int(fields[0])
 
         # Create reporters and open files for writing output.
 
@@ -166,38 +200,87 @@ class ReplicaExchangeReporter(object):
                 self._stateReporters.append(createReporter(f'state_{i}.{trajectoryFormat}'))
             if trajectoryPerReplica:
                 self._replicaReporters.append(createReporter(f'replica_{i}.{trajectoryFormat}'))
-        self._log = open(os.path.join(directory, 'log.csv'), 'a' if resume else 'w')
-        if not resume:
-            print(','.join(['Iteration', 'Step']+[f'Replica_{i}_State' for i in range(numStates)]), file=self._log)
-            self._log.flush()
-        if energy:
-            self._energy = open(os.path.join(directory, 'energy.csv'), 'a' if resume else 'w')
+        if dataFormat == 'binary':
+            if not resume:
+                self._records = RecordFile(os.path.join(directory, 'log.bin'), self._recordFields(numStates, energy))
+        else:
+            self._log = open(os.path.join(directory, 'log.csv'), 'a' if resume else 'w')
+            if not resume:
+                print(','.join(['Iteration', 'Step']+[f'Replica_{i}_State' for i in range(numStates)]), file=self._log)
+                self._log.flush()
+            if energy:
+                self._energy = open(os.path.join(directory, 'energy.csv'), 'a' if resume else 'w')
+        self._writeEnergy = energy
 
     def __del__(self):
         if self._log is not None:
             self._log.close()
         if self._energy is not None:
             self._energy.close()
+        if self._records is not None:
+            self._records.close()
+
+    @staticmethod
+    def _recordFields(numStates, energy):
+        """Get the fields of the records in log.bin."""
+        fields = [('iteration', 'int64', ()), ('step', 'int64', ()), ('stateIndex', 'int32', (numStates,))]
+        if energy:
+            fields.append(('energy', 'float64', (numStates, numStates)))
+        return fields
+
+    @staticmethod
+    def loadData(directory: str) -> dict:
+        """Load the log and reduced energies written by a ReplicaExchangeReporter.  This works for both the CSV and
+        binary formats.
+
+        Parameters
+        ----------
+        directory: str
+            The directory the reporter wrote its output to
+
+        Returns
+        -------
+        dict
+            A dict containing the following NumPy arrays.  'iteration' and 'step' have shape (iterations,) and contain
+            the iteration and time step of each report.  'stateIndex' has shape (iterations, replicas) and contains
+            the state of each replica.  If reduced energies were saved, 'energy' has shape (iterations, replicas,
+            states), where energy[i][j][k] is the reduced energy of state k for replica j in iteration i.
+        """
+        path = os.path.join(directory, 'log.bin')
+        if os.path.isfile(path):
+            return RecordFile.load(path)
+        log = np.loadtxt(os.path.join(directory, 'log.csv'), delimiter=',', skiprows=1, dtype=np.int64, ndmin=2)
+        data = {'iteration': log[:,0], 'step': log[:,1], 'stateIndex': log[:,2:]}
+        path = os.path.join(directory, 'energy.csv')
+        if os.path.isfile(path):
+            numStates = log.shape[1]-2
+            data['energy'] = np.loadtxt(path, delimiter=',', ndmin=2).reshape(-1, numStates, numStates)
+        return data
 
     def __call__(self, sampler: "app.ReplicaExchangeSampler"):
         """This is invoked by the ReplicaExchangeSampler at the end of every iteration to generate output."""
         if sampler.currentIteration % self.reportInterval != 0:
             return
-        logData = [sampler.currentIteration, sampler.simulation.currentStep]+sampler.replicaStateIndex
-        print(','.join([str(x) for x in logData]), file=self._log)
-        self._log.flush()
-        if self._energy is not None:
-            import numpy as np
-            energy = np.array(sampler.replicaStateEnergy)
-            if sampler._kT is None:
-                energy /= unit.MOLAR_GAS_CONSTANT_R*sampler.simulation.integrator.getTemperature()
-            else:
-                energy /= sampler._kT
-            print(','.join([str(x) for x in energy.flatten()]), file=self._energy)
-            self._energy.flush()
+        energy = None
+        if self._writeEnergy:
+            energy = sampler.replicaReducedEnergy
+            if energy is None:
+                energy = sampler._computeReducedEnergies()
+        if self._records is not None:
+            values = {'iteration': sampler.currentIteration, 'step': sampler.simulation.currentStep, 'stateIndex': sampler.replicaStateIndex}
+            if energy is not None:
+                values['energy'] = energy
+            self._records.append(**values)
+        else:
+            logData = [sampler.currentIteration, sampler.simulation.currentStep]+sampler.replicaStateIndex
+            print(','.join([str(x) for x in logData]), file=self._log)
+            self._log.flush()
+            if energy is not None:
+                print(','.join([str(x) for x in energy.flatten()]), file=self._energy)
+                self._energy.flush()
         for i, conf in enumerate(sampler.replicaConformation):
             if len(self._stateReporters) > 0:
                 self._stateReporters[sampler.replicaStateIndex[i]].report(sampler.simulation, conf)
             if len(self._replicaReporters) > 0:
                 self._replicaReporters[i].report(sampler.simulation, conf)
-            safesave.save(mm.XmlSerializer.serialize(conf), os.path.join(self.directory, f'checkpoint_{i}.xml'))
+            safesave.save(conf.save(), os.path.join(self.directory, f'checkpoint_{i}.npz'))
@@ -29,8 +29,13 @@ USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import openmm as mm
 import openmm.unit as unit
+from openmm.app.internal.contextsnapshot import ContextSnapshot
 from openmm.app.internal.multistatesampler import MultistateSampler
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import itertools
 import math
+import numpy as np
 import random
 
 class ReplicaExchangeSampler(object):
@@ -110,6 +115,33 @@ class ReplicaExchangeSampler(object):
 
     The function will be called after every iteration.
 
+    By default all replicas are simulated one after another using the Simulation's Context.  If you have enough
+    hardware to run several replicas at once, pass `numContexts` to the constructor to create a pool of Contexts.
+    Replicas are then divided among the Contexts and simulated concurrently on separate threads.  On the CPU platform,
+    the threads used for computing forces are divided among the Contexts, so each one uses a fraction of the available
+    cores.  Because the number of threads used by a Context is fixed when it is created, the Simulation's Context is
+    only used as one of the pool if it was created with no more than its share of the threads, for example by
+    specifying the 'Threads' property in the Simulation's platformProperties.  Otherwise a separate Context is created
+    for every member of the pool.  With other platforms, all Contexts run on the same device or devices as the
+    Simulation's Context, which is always used as one of the pool.
+
+    After each iteration, states are exchanged between replicas using the scheme specified by `exchangeScheme`.  The
+    following schemes are supported.
+
+    - 'metropolis' (the default): exchangesPerIteration attempts are made, each between two randomly chosen replicas,
+      and accepted with the Metropolis criterion.
+    - 'neighbors': exchanges are only attempted between replicas in adjacent states, alternating between the even and
+      odd numbered pairs on successive iterations.  This is only useful when states are ordered so that neighboring
+      states overlap, such as a ladder of increasing temperatures.
+    - 'gibbs': the assignment of states to replicas is drawn from its equilibrium distribution given the current
+      conformations (independence sampling).  With up to six states, every permutation is considered and one is
+      drawn exactly, independent of the previous assignment.  With more states, the replicas are repeatedly divided
+      into random blocks of four, and the states within every block are resampled from their exact conditional
+      distribution (block Gibbs sampling).  This mixes faster than the other schemes when many states overlap.
+
+    All schemes work with the matrix of reduced energies, which is stored in replicaReducedEnergy, so their cost is
+    negligible compared to simulating the replicas even for hundreds of states.
+
     Attributes
     ----------
     states: list[dict]
@@ -123,7 +155,14 @@ class ReplicaExchangeSampler(object):
         This may sometimes improve stability, but also decreases efficiency.
     exchangesPerIteration: int
         The number of state exchange attempts between pairs of replicas to perform on each iteration.  This is initialized
-        to len(states)**2.  There is rarely a reason to change it.
+        to len(states)**2.  There is rarely a reason to change it.  It is used by the 'metropolis' and 'gibbs'
+        schemes.  With 'gibbs', resampling a block of k replicas counts as k*(k-1)/2 attempts, and it has no effect
+        when there are six or fewer states, since the permutation is then sampled exactly.
+    exchangeScheme: str
+        The scheme to use for exchanging states between replicas: 'metropolis', 'neighbors', or 'gibbs'
+    randomGenerator: numpy.random.Generator
+        The random number generator used for exchanges.  Its seed can be specified with the randomSeed argument to
+        the constructor.
     currentIteration: int
         The number of iterations that have been completed
     reporters: list
@@ -131,14 +170,20 @@ class ReplicaExchangeSampler(object):
     replicaStateIndex: list[int]
         The current assignment of states to replicas.  replicaStateIndex[i] is the state of the i'th replica, specified
         as an index into states.
-    replicaConformation: list[openmm.State]
-        The current conformation of each replica, specified as a State object
+    replicaConformation: list[ContextSnapshot]
+        The current conformation of each replica.  Each one is a compact snapshot that stores positions and velocities
+        as NumPy arrays.  It supports the methods of State that are used by reporters, such as getPositions() and
+        getStepCount(), and it can be loaded into a Context by calling applyTo() or by passing it to Context.setState().
     replicaStateEnergy: list[numpy.ndarray]
         The current potential energy of each replica in each state.  replicaStateEnergy[i][j] is the energy of replica
         i in state j.  Note that this includes the energy of each replica in every state, not just the state it is
         currently in, because all of them are required for performing exchanges.
+    replicaReducedEnergy: numpy.ndarray
+        The reduced (unitless) potential energy of each replica in each state.  replicaReducedEnergy[i][j] is the energy
+        of replica i in state j divided by kT for state j.
     """
-    def __init__(self, states: list[dict], simulation: "mm.app.Simulation", stepsPerIteration: int, reinitializeVelocities: bool = False):
+    def __init__(self, states: list[dict], simulation: "mm.app.Simulation", stepsPerIteration: int, reinitializeVelocities: bool = False,
+                 numContexts: int = 1, exchangeScheme: str = 'metropolis', randomSeed: int = None):
         """
         Create a ReplicaExchangeSampler to sample a set of states.
 
@@ -153,18 +198,37 @@ class ReplicaExchangeSampler(object):
         reinitializeVelocities: bool
             If true, a replica's velocities are reinitialized from a Boltzmann distribution every time its state changes.
             This may sometimes improve stability, but also decreases efficiency.
+        numContexts: int
+            The number of Contexts to use for simulating replicas.  If this is greater than 1, replicas are simulated
+            concurrently using a pool of Contexts, each with its own copy of the Integrator.  Subclasses that override
+            simulateReplica() should leave this at 1, since the override is only used for serial simulation.
+        exchangeScheme: str
+            The scheme to use for exchanging states between replicas: 'metropolis', 'neighbors', or 'gibbs'.  See the
+            class documentation for details.
+        randomSeed: int
+            The seed for randomGenerator, which chooses the exchanges.  If this is None, the seed is taken from Python's
+            random module, so calling random.seed() before creating the sampler also makes the exchanges reproducible.
         """
+        if exchangeScheme not in ('metropolis', 'neighbors', 'gibbs'):
+            raise ValueError(f'Unknown exchange scheme: {exchangeScheme}.  Allowed values are "metropolis", "neighbors", and "gibbs".')
         self.states = states
         self.simulation = simulation
         self.stepsPerIteration = stepsPerIteration
         self.reinitializeVelocities = reinitializeVelocities
         self.exchangesPerIteration = len(states)**2
+        self.exchangeScheme = exchangeScheme
+        if randomSeed is None:
+            randomSeed = random.getrandbits(64)
+        self.randomGenerator = np.random.default_rng(randomSeed)
         self.currentIteration = 0
         self.reporters = []
         self.replicaStateIndex = list(range(len(states)))
         self._previousReplicaStateIndex = self.replicaStateIndex[:]
-        self.replicaConformation = [simulation.context.getState(positions=True, velocities=True, parameters=True, integratorParameters=True)]*len(states)
+        self._gibbsPermutations = None
+        self._integratorState = ContextSnapshot.needsIntegratorState(simulation.context)
+        self.replicaConformation = [ContextSnapshot.fromContext(simulation.context, self._integratorState)]*len(states)
         self.replicaStateEnergy = None
+        self.replicaReducedEnergy = None
         self._sampler = MultistateSampler(states, simulation.context)
         if 'temperature' in states[0]:
             temperature = [s['temperature'] for s in states]
@@ -177,6 +241,79 @@ class ReplicaExchangeSampler(object):
             if not hasattr(simulation.integrator, 'getTemperature'):
                 raise ValueError('Cannot determine temperature because the integrator does not have a getTemperature() method. '
                                  'Specify the temperature in each state dict.')
+        if numContexts < 1:
+            raise ValueError('numContexts must be at least 1')
+        numContexts = min(numContexts, len(states))
+        if numContexts > 1:
+            self._workers = self._createWorkers(numContexts)
+            self._executor = ThreadPoolExecutor(numContexts)
+        else:
+            self._workers = None
+            self._executor = None
+
+    def _createWorkers(self, numContexts):
+        """Create the pool of Contexts used for simulating replicas in parallel."""
+        context = self.simulation.context
+        platform = context.getPlatform()
+        properties = {name: platform.getPropertyValue(context, name) for name in platform.getPropertyNames()}
+        contexts = []
+        if platform.getName() == 'CPU':
+            # Divide the threads among the Contexts.  The number of threads a Context uses cannot be changed after it
+            # is created.  If the Simulation's Context uses no more than its share of the available threads, it becomes
+            # the first worker and the remaining threads are divided among the others.  Otherwise it would compete
+            # with the other workers for cores, so we create a new Context for every worker.  The Simulation's Context
+            # then sits idle while replicas are simulated in parallel, and its threads wait without using the CPU.
+
+            threads = int(properties['Threads'])
+            available = int(platform.getPropertyDefaultValue('Threads'))
+            if threads*numContexts <= available:
+                contexts.append((context, self.simulation.integrator))
+                remaining = available-threads
+                for i in range(numContexts-1):
+                    properties['Threads'] = str(max(1, remaining//(numContexts-1) + (1 if i < remaining%(numContexts-1) else 0)))
+                    integrator = self._copyIntegrator(i+1)
+                    contexts.append((mm.Context(self.simulation.system, integrator, platform, properties), integrator))
+            else:
+                for i in range(numContexts):
+                    properties['Threads'] = str(max(1, threads//numContexts + (1 if i < threads%numContexts else 0)))
+                    integrator = self._copyIntegrator(i+1)
+                    contexts.append((mm.Context(self.simulation.system, integrator, platform, properties), integrator))
+        else:
+            contexts.append((context, self.simulation.integrator))
+            for i in range(1, numContexts):
+                integrator = self._copyIntegrator(i)
+                contexts.append((mm.Context(self.simulation.system, integrator, platform, properties), integrator))
+        return [_ReplicaWorker(c, integrator, MultistateSampler(self.states, c)) for c, integrator in contexts]
+
+    def _copyIntegrator(self, index):
+        """Create a copy of the Simulation's Integrator for a worker Context.  If the Integrator has a fixed random
+        number seed, the copy gets a different seed (offset by index) so the replicas simulated by different Contexts
+        do not receive identical random forces."""
+        integrator = copy.deepcopy(self.simulation.integrator)
+        integrators = [integrator]
+        if isinstance(integrator, mm.CompoundIntegrator):
+            integrators = [integrator.getIntegrator(i) for i in range(integrator.getNumIntegrators())]
+        for i in integrators:
+            if hasattr(i, 'setRandomNumberSeed'):
+                seed = i.getRandomNumberSeed()
+                if seed != 0:
+                    i.setRandomNumberSeed((seed+index-1)%(2**31-1)+1)
+        return integrator
+
+    def close(self):
+        """Release the Contexts and threads used for simulating replicas in parallel.  After this is called, simulate()
+        simulates the replicas one at a time with the Simulation's Context.  A ReplicaExchangeSampler can also be used
+        as a context manager, in which case this is called automatically on exit."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._workers = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
 
     def simulate(self, iterations: int):
         """
@@ -190,10 +327,14 @@ class ReplicaExchangeSampler(object):
         """
         for _ in range(iterations):
             self.replicaStateEnergy = None
-            energies = []
-            for i in range(len(self.states)):
-                self.simulateReplica(i)
-                energies.append(self._sampler.computeAllEnergies())
+            self.replicaReducedEnergy = None
+            if self._workers is None:
+                energies = []
+                for i in range(len(self.states)):
+                    self.simulateReplica(i)
+                    energies.append(self._sampler.computeAllEnergies())
+            else:
+                energies = self._simulateReplicasInParallel()
             self.replicaStateEnergy = energies
             self.exchangeReplicas()
             self.currentIteration += 1
@@ -215,7 +356,33 @@ class ReplicaExchangeSampler(object):
         steps: int | None
             the number of time steps to simulate.  If None (the default), stepsPerIteration steps are simulated.
         """
-        self.simulation.context.setState(self.replicaConformation[index])
+        self._simulateReplica(index, steps, self.simulation.context, self.simulation.integrator, self._sampler)
+
+    def _simulateReplicasInParallel(self):
+        """Simulate every replica for one iteration using the pool of Contexts, and return the energy matrix."""
+        n = len(self.states)
+        energies = [None]*n
+
+        def simulateReplicas(worker, replicas):
+            for i in replicas:
+                self._simulateReplica(i, None, worker.context, worker.integrator, worker.sampler)
+                energies[i] = worker.sampler.computeAllEnergies()
+
+        numWorkers = len(self._workers)
+        futures = [self._executor.submit(simulateReplicas, worker, range(i, n, numWorkers)) for i, worker in enumerate(self._workers)]
+        for future in futures:
+            future.result()
+
+        # Leave the Simulation's Context in the same state it would have after serial simulation, so its step count
+        # and conformation are those of the last replica.
+
+        if self._workers[(n-1)%numWorkers].context is not self.simulation.context:
+            self.replicaConformation[n-1].applyTo(self.simulation.context)
+        return energies
+
+    def _simulateReplica(self, index, steps, context, integrator, sampler):
+        """Simulate a single replica using a specified Context."""
+        self.replicaConformation[index].applyTo(context)
         if self.reinitializeVelocities:
             # Reinitialize velocities for replicas whose states have changed.
 
@@ -224,8 +391,8 @@ class ReplicaExchangeSampler(object):
                 if 'temperature' in state:
                     temperature = state['temperature']
                 else:
-                    temperature = self.simulation.integrator.getTemperature()
-                self.simulation.context.setVelocitiesToTemperature(temperature)
+                    temperature = integrator.getTemperature()
+                context.setVelocitiesToTemperature(temperature)
         elif self._kT is not None:
             # Rescale velocities for replicas whose temperatures have changed.
 
@@ -233,46 +400,113 @@ class ReplicaExchangeSampler(object):
             kT2 = self._kT[self.replicaStateIndex[index]]
             if kT1 != kT2:
                 scale = math.sqrt(kT2/kT1)
-                self.simulation.context.setVelocities(self.replicaConformation[index].getVelocities(asNumpy=True)*scale)
+                context.setVelocities(self.replicaConformation[index].velocities*scale)
         self._previousReplicaStateIndex[index] = self.replicaStateIndex[index]
-        self._sampler.applyState(self.replicaStateIndex[index])
+        sampler.applyState(self.replicaStateIndex[index])
         if steps is None:
             steps = self.stepsPerIteration
-        self.simulation.integrator.step(steps)
-        self.replicaConformation[index] = self.simulation.context.getState(positions=True, velocities=True, parameters=True, integratorParameters=True)
+        integrator.step(steps)
+        self.replicaConformation[index] = ContextSnapshot.fromContext(context, self._integratorState)
 
     def exchangeReplicas(self):
         """
         Attempt to exchange states between replicas.  This is called by simulate(), and there is not normally a reason
-        to call it directly.  It performs exchangesPerIteration exchange attempts, each between two randomly chosen
-        replicas.
+        to call it directly.  It computes replicaReducedEnergy from replicaStateEnergy, then performs exchanges using
+        the scheme specified by exchangeScheme.
 
         You can create subclasses that override this method to perform exchanges in different ways.
         """
+        self.replicaReducedEnergy = self._computeReducedEnergies()
         n = len(self.states)
         if n < 2:
             return
-        for _ in range(self.exchangesPerIteration):
-            # Select a random pair of replicas.
-
-            while True:
-                i = random.randrange(n)
-                j = random.randrange(n)
-                if i != j:
-                    break
-            si = self.replicaStateIndex[i]
-            sj = self.replicaStateIndex[j]
-
-            # Compute the probability of exchanging their states.
-
-            if self._kT is None:
-                kT = unit.MOLAR_GAS_CONSTANT_R*self.simulation.integrator.getTemperature()
-                exponent = (self.replicaStateEnergy[i][si]-self.replicaStateEnergy[i][sj]+self.replicaStateEnergy[j][sj]-self.replicaStateEnergy[j][si])/kT
-            else:
-                exponent = (self.replicaStateEnergy[i][si]-self.replicaStateEnergy[j][si])/self._kT[si] + (self.replicaStateEnergy[j][sj]-self.replicaStateEnergy[i][sj])/self._kT[sj]
-            prob = min(1.0, math.exp(exponent))
-            if random.random() <= prob:
-                # Accept the exchange.
-
-                self.replicaStateIndex[i] = sj
-                self.replicaStateIndex[j] = si
+        if self.exchangeScheme == 'neighbors':
+            stateIndex = self._exchangeNeighbors(self.replicaReducedEnergy, np.array(self.replicaStateIndex))
+        elif self.exchangeScheme == 'gibbs':
+            stateIndex = self._exchangeGibbs(self.replicaReducedEnergy, np.array(self.replicaStateIndex))
+        else:
+            stateIndex = self._exchangeMetropolis(self.replicaReducedEnergy, np.array(self.replicaStateIndex))
+        self.replicaStateIndex[:] = stateIndex.tolist()
+
+    def _computeReducedEnergies(self):
+        """Convert replicaStateEnergy to a unitless array of reduced energies."""
+        energy = np.array([unit.Quantity(e).value_in_unit(unit.kilojoules_per_mole) for e in self.replicaStateEnergy], dtype=np.float64)
+        if self._kT is None:
+            kT = unit.MOLAR_GAS_CONSTANT_R*self.simulation.integrator.getTemperature()
+            return energy/kT.value_in_unit(unit.kilojoules_per_mole)
+        return energy/np.array([kT.value_in_unit(unit.kilojoules_per_mole) for kT in self._kT])
+
+    def _exchangeMetropolis(self, u, stateIndex):
+        """Perform exchangesPerIteration Metropolis exchange attempts between randomly chosen pairs of replicas."""
+        n = len(stateIndex)
+        attempts = self.exchangesPerIteration
+        first = self.randomGenerator.integers(n, size=attempts)
+        second = (first+self.randomGenerator.integers(1, n, size=attempts)) % n
+        logRandom = np.log(self.randomGenerator.random(attempts))
+
+        # Each attempt depends on the outcome of the previous ones, so they must be processed in order.  Working with
+        # Python lists of floats keeps this loop fast.
+
+        u = u.tolist()
+        stateIndex = stateIndex.tolist()
+        for i, j, r in zip(first.tolist(), second.tolist(), logRandom.tolist()):
+            si = stateIndex[i]
+            sj = stateIndex[j]
+            if r <= u[i][si]+u[j][sj]-u[i][sj]-u[j][si]:
+                stateIndex[i] = sj
+                stateIndex[j] = si
+        return np.array(stateIndex)
+
+    def _exchangeNeighbors(self, u, stateIndex):
+        """Attempt exchanges between replicas in adjacent states.  The pairs are disjoint, so all of them are processed at once."""
+        n = len(stateIndex)
+        replicaForState = np.argsort(stateIndex)
+        lowerState = np.arange(self.currentIteration % 2, n-1, 2)
+        if len(lowerState) == 0:
+            return stateIndex
+        upperState = lowerState+1
+        i = replicaForState[lowerState]
+        j = replicaForState[upperState]
+        exponent = u[i, lowerState]+u[j, upperState]-u[i, upperState]-u[j, lowerState]
+        accept = np.log(self.randomGenerator.random(len(lowerState))) <= exponent
+        stateIndex = stateIndex.copy()
+        stateIndex[i[accept]] = upperState[accept]
+        stateIndex[j[accept]] = lowerState[accept]
+        return stateIndex
+
+    def _exchangeGibbs(self, u, stateIndex):
+        """Sample the assignment of states to replicas by independence sampling, exactly for up to six states, and
+        otherwise by block Gibbs sampling over randomly chosen blocks of replicas."""
+        n = len(stateIndex)
+        blockSize = n if n <= 6 else 4
+        if self._gibbsPermutations is None or self._gibbsPermutations.shape[1] != blockSize:
+            self._gibbsPermutations = np.array(list(itertools.permutations(range(blockSize))))
+        permutations = self._gibbsPermutations
+        numBlocks = n//blockSize
+        if blockSize == n:
+            sweeps = 1
+        else:
+            sweeps = max(1, int(round(self.exchangesPerIteration/(numBlocks*blockSize*(blockSize-1)/2))))
+        blockIndex = np.arange(numBlocks)
+        stateIndex = stateIndex.copy()
+        for _ in range(sweeps):
+            # Divide the replicas into blocks, and consider every way of permuting the states within each block.
+            # candidates[b, p] holds the states the replicas in block b would have under permutation p.
+
+            replicas = self.randomGenerator.permutation(n)[:numBlocks*blockSize].reshape(numBlocks, blockSize)
+            candidates = stateIndex[replicas][:, permutations]
+            logWeight = -u[replicas[:, np.newaxis, :], candidates].sum(axis=2)
+            weight = np.exp(logWeight-logWeight.max(axis=1, keepdims=True))
+            cumulative = np.cumsum(weight, axis=1)
+            r = self.randomGenerator.random(numBlocks)*cumulative[:, -1]
+            choice = np.minimum((cumulative < r[:, np.newaxis]).sum(axis=1), len(permutations)-1)
+            stateIndex[replicas] = candidates[blockIndex, choice]
+        return stateIndex
+
+
+class _ReplicaWorker(object):
+    """A Context in the pool used by ReplicaExchangeSampler to simulate replicas in parallel."""
+    def __init__(self, context, integrator, sampler):
+        self.context = context
+        self.integrator = integrator
+        self.sampler = sampler
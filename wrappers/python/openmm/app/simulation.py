@@ -33,7 +33,15 @@ __version__ = "1.0"
 import openmm as mm
 import openmm.unit as unit
 from openmm.app.internal import safesave
+from openmm.app.internal.checkpointstore import CheckpointStore
+import atexit
+import io
+import os
+import queue
 import sys
+import threading
+import time
+import weakref
 from datetime import datetime, timedelta
 try:
     string_types = (unicode, str)
@@ -62,38 +70,39 @@ class Simulation(object):
         ----------
         topology : Topology
             A Topology describing the the system to simulate
-        system : System or XML file name
-            The OpenMM System object to simulate (or the name of an XML file
-            with a serialized System)
-        integrator : Integrator or XML file name
+        system : System or file name
+            The OpenMM System object to simulate (or the name of an XML or
+            binary file with a serialized System).  XML files may be
+            compressed with gzip.
+        integrator : Integrator or file name
             The OpenMM Integrator to use for simulating the System (or the name
-            of an XML file with a serialized System)
+            of an XML or binary file with a serialized System)
         platform : Platform=None
             If not None, the OpenMM Platform to use
         platformProperties : map=None
             If not None, a set of platform-specific properties to pass to the
             Context's constructor.  This argument may only be used if a specific
             Platform is specified.
-        state : XML file name=None
-            The name of an XML file containing a serialized State. If not None,
+        state : file name=None
+            The name of an XML or binary file containing a serialized State. If not None,
             the information stored in state will be transferred to the generated
             Simulation object.
         """
         self.topology = topology
         ## The System being simulated
         if isinstance(system, string_types):
-            with open(system, 'r') as f:
-                self.system = mm.XmlSerializer.deserialize(f.read())
+            self.system = _load(system)
         else:
             self.system = system
         ## The Integrator used to advance the simulation
         if isinstance(integrator, string_types):
-            with open(integrator, 'r') as f:
-                self.integrator = mm.XmlSerializer.deserialize(f.read())
+            self.integrator = _load(integrator)
         else:
             self.integrator = integrator
         ## A list of reporters to invoke during the simulation
         self.reporters = []
+        self._maxPendingReports = None
+        self._reportWorker = None
         if platform is None:
             if platformProperties is not None:
                 raise ValueError('Cannot specify platform-specific properties, because the Platform is not specified')
@@ -104,14 +113,19 @@ class Simulation(object):
         else:
             self.context = mm.Context(self.system, self.integrator, platform, platformProperties)
         if state is not None:
-            with open(state, 'r') as f:
-                self.context.setState(mm.XmlSerializer.deserialize(f.read()))
+            self.loadState(state)
         ## Determines whether or not we are using PBC. Try from the System first,
         ## fall back to Topology if that doesn't work
         try:
             self._usesPBC = self.system.usesPeriodicBoundaryConditions()
         except Exception: # OpenMM just raises Exception if it's not implemented everywhere
             self._usesPBC = topology.getUnitCellDimensions() is not None
+        _simulations.add(self)
+
+    def __del__(self):
+        # Let the report thread exit.  No reports can be pending, since they hold references to the Simulation.
+        if getattr(self, '_reportWorker', None) is not None:
+            self._reportWorker.stop()
 
     @property
     def currentStep(self):
@@ -122,6 +136,59 @@ class Simulation(object):
     def currentStep(self, step):
         self.context.setStepCount(step)
 
+    def setAsyncReporting(self, enabled, maxPendingReports=4):
+        """Set whether reports may be generated on a background thread.
+
+        When this is enabled, any reporter whose describeNextReport() includes
+        'async': True in the returned dictionary has its report() method called
+        on a worker thread, so writing output overlaps with integrating the
+        following time steps.  The worker thread is kept across calls to step(),
+        so reports may still be pending when step() returns and continue to be
+        generated during the next call.  Reports are delivered to each reporter
+        in the same order they were generated.  Call flushReports() to wait for
+        all pending reports.  This is also done automatically before saving or
+        loading a checkpoint or State, and when asynchronous reporting is
+        disabled.  Reports that are still pending when the interpreter exits
+        are generated before it exits.  If a reporter raises an exception, it
+        is raised in the thread that called step(), runForClockTime(), or
+        flushReports().
+
+        The Simulation passed to an asynchronous report() reflects the step
+        at which the State was captured in its currentStep attribute, and the
+        wall clock time at which it was captured in its clockTime attribute.
+        The reporter must not access the Context, since the simulation
+        continues running while the report is generated.
+
+        Parameters
+        ----------
+        enabled : bool
+            whether to generate reports asynchronously
+        maxPendingReports : int=4
+            the maximum number of States that may be waiting to be reported.
+            When this many are pending, the simulation blocks until the worker
+            thread has caught up.
+        """
+        if enabled and maxPendingReports < 1:
+            raise ValueError('maxPendingReports must be at least 1')
+        if self._reportWorker is not None:
+            # Finish the pending reports.  A new worker is created when it is next needed.
+
+            worker = self._reportWorker
+            self._reportWorker = None
+            worker.close()
+        self._maxPendingReports = maxPendingReports if enabled else None
+
+    def flushReports(self):
+        """Wait until all reports that are being generated asynchronously have been completed, then call
+        flush() on every reporter that has such a method so it writes any output it has buffered.  If any
+        reporter raised an exception, it is raised by this method."""
+        if self._reportWorker is not None:
+            self._reportWorker.flush()
+        for reporter in self.reporters:
+            flush = getattr(reporter, 'flush', None)
+            if flush is not None:
+                flush()
+
     def minimizeEnergy(self, tolerance=10*unit.kilojoules_per_mole/unit.nanometer, maxIterations=0, reporter=None):
         """Perform a local energy minimization on the system.
 
@@ -195,6 +262,11 @@ class Simulation(object):
                 self.saveState(stateFile)
 
     def _simulate(self, endStep=None, endTime=None):
+        if self._maxPendingReports is not None and self._reportWorker is None:
+            self._reportWorker = _ReportWorker(self._maxPendingReports)
+        self._simulateSteps(endStep, endTime)
+
+    def _simulateSteps(self, endStep, endTime):
         if endStep is None:
             endStep = sys.maxsize
         nextReport = [None]*len(self.reporters)
@@ -277,8 +349,14 @@ class Simulation(object):
         includeArgs = {property:True for property in includes}
 
         state = self.context.getState(groups=self.context.getIntegrator().getIntegrationForceGroups(), enforcePeriodicBox=periodic, parameters=True, **includeArgs)
+        asyncReporters = []
         for reporter, nextReport in reports:
-            reporter.report(self, state)
+            if self._reportWorker is not None and nextReport.get('async', False):
+                asyncReporters.append(reporter)
+            else:
+                reporter.report(self, state)
+        if len(asyncReporters) > 0:
+            self._reportWorker.submit(asyncReporters, _SimulationSnapshot(self, state.getStepCount()), state)
 
     def saveCheckpoint(self, file):
         """Save a checkpoint of the simulation to a file.
@@ -298,6 +376,7 @@ class Simulation(object):
             a File-like object to write the checkpoint to, or alternatively a
             filename
         """
+        self.flushReports()
         if isinstance(file, str):
             safesave.save(self.context.createCheckpoint(), file)
         else:
@@ -306,24 +385,30 @@ class Simulation(object):
     def loadCheckpoint(self, file):
         """Load a checkpoint file that was created with saveCheckpoint().
 
+        This can also restore the most recent state from a directory written by a CheckpointReporter
+        with differential checkpoints.
+
         Parameters
         ----------
         file : string or file
             a File-like object to load the checkpoint from, or alternatively a
-            filename
+            filename or directory name
         """
-        if isinstance(file, str):
+        self.flushReports()
+        if isinstance(file, str) and os.path.isdir(file):
+            CheckpointStore(file).restore(self)
+        elif isinstance(file, str):
             with open(file, 'rb') as f:
                 self.context.loadCheckpoint(f.read())
         else:
             self.context.loadCheckpoint(file.read())
 
-    def saveState(self, file):
+    def saveState(self, file, format='xml'):
         """Save the current state of the simulation to a file.
 
-        The output is an XML file containing a serialized State object.  It includes all publicly visible data,
-        including positions, velocities, and parameters.  Reloading the State will put the Simulation back into
-        approximately the same state it had before.
+        The output contains a serialized State object.  It includes all publicly visible data, including positions,
+        velocities, and parameters.  Reloading the State will put the Simulation back into approximately the same
+        state it had before.
 
         Unlike saveCheckpoint(), this does not store internal data such as the states of random number generators.
         Therefore, you should not expect the following trajectory to be identical to what would have been produced
@@ -335,16 +420,27 @@ class Simulation(object):
         file : string or file
             a File-like object to write the state to, or alternatively a
             filename
+        format : str
+            the format to write the state in.  'xml' writes a human readable XML file.  'binary' writes a
+            much smaller file in OpenMM's binary serialization format, which is also much faster to read and
+            write.  If file is a File-like object, it must be opened in binary mode for the binary format.
         """
+        self.flushReports()
         state = self.context.getState(positions=True, velocities=True, parameters=True, integratorParameters=True)
-        xml = mm.XmlSerializer.serialize(state)
+        if format == 'xml':
+            data = mm.XmlSerializer.serialize(state)
+        elif format == 'binary':
+            data = mm.BinarySerializer.serialize(state)
+        else:
+            raise ValueError(f"Unknown format '{format}'.  Supported formats are 'xml' and 'binary'.")
         if isinstance(file, str):
-            safesave.save(xml, file)
+            safesave.save(data, file)
         else:
-            file.write(xml)
+            file.write(data)
 
     def loadState(self, file):
-        """Load a State file that was created with saveState().
+        """Load a State file that was created with saveState().  The format of the file is detected
+        automatically, and XML files may be compressed with gzip.
 
         Parameters
         ----------
@@ -352,9 +448,114 @@ class Simulation(object):
             a File-like object to load the state from, or alternatively a
             filename
         """
-        if isinstance(file, str):
-            with open(file, 'r') as f:
-                xml = f.read()
-        else:
-            xml = file.read()
-        self.context.setState(mm.XmlSerializer.deserialize(xml))
+        self.flushReports()
+        self.context.setState(_load(file))
+
+
+def _load(file):
+    """Reconstruct an object from a file or file name containing data serialized with either XmlSerializer or
+    BinarySerializer.  XML is read incrementally with XmlSerializer.load()."""
+    if isinstance(file, str):
+        with open(file, 'rb') as f:
+            return _load(f)
+    if not hasattr(file, 'peek') and not file.seekable():
+        data = file.read()
+        file = io.StringIO(data) if isinstance(data, str) else io.BytesIO(data)
+    if hasattr(file, 'peek'):
+        start = file.peek(4)[:4]
+    else:
+        position = file.tell()
+        start = file.read(4)
+        file.seek(position)
+    if mm.BinarySerializer.isBinary(start):
+        return mm.BinarySerializer.deserialize(file.read())
+    return mm.XmlSerializer.load(file)
+
+
+# Every Simulation that exists, so pending reports can be finished when the interpreter exits.
+
+_simulations = weakref.WeakSet()
+
+@atexit.register
+def _finishReports():
+    """Generate any asynchronous reports that are still pending when the interpreter exits, and let reporters
+    write any output they have buffered.  The report thread is a daemon, so it would otherwise be killed."""
+    for simulation in list(_simulations):
+        simulation.setAsyncReporting(False)
+        simulation.flushReports()
+
+
+class _SimulationSnapshot(object):
+    """This is passed to reporters that run asynchronously in place of the Simulation.  It forwards
+    all attributes to the Simulation, except that currentStep is the step at which the State was captured,
+    and clockTime is the wall clock time (as returned by time.time()) when it was captured."""
+
+    def __init__(self, simulation, currentStep):
+        self._simulation = simulation
+        self.currentStep = currentStep
+        self.clockTime = time.time()
+
+    def __getattr__(self, name):
+        return getattr(self._simulation, name)
+
+
+class _ReportWorker(object):
+    """A background thread that generates reports in the order they are submitted."""
+
+    def __init__(self, maxPendingReports):
+        self._queue = queue.Queue(maxPendingReports)
+        self._error = None
+        self._generation = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, reporters, simulation, state):
+        """Queue a State to be reported.  This blocks if the queue is full, and raises any exception
+        thrown by a previous report."""
+        self._raiseError()
+        self._queue.put((self._generation, reporters, simulation, state))
+
+    def flush(self):
+        """Wait for all pending reports to be generated, and raise any exception thrown by them."""
+        self._queue.join()
+        self._raiseError()
+
+    def stop(self):
+        """Tell the thread to exit once all pending reports have been generated, without waiting for it."""
+        self._queue.put(None)
+
+    def close(self):
+        """Wait for all pending reports to be generated, then stop the thread."""
+        self.stop()
+        self._thread.join()
+        self._raiseError()
+
+    def _raiseError(self):
+        if self._error is not None:
+            # Discard the reports that were submitted before the error was raised.  The generation must be
+            # changed before clearing the error, so the worker cannot run any of them in between.
+
+            error = self._error
+            self._generation += 1
+            self._error = None
+            raise error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            generation, reporters, simulation, state = item
+            if self._error is None and generation == self._generation:
+                # Once a report has failed, discard the remaining ones until the error has been raised.
+                try:
+                    for reporter in reporters:
+                        reporter.report(simulation, state)
+                except Exception as e:
+                    self._error = e
+
+            # Do not keep a reference to the Simulation while waiting for the next report.
+
+            item = reporters = simulation = state = reporter = None
+            self._queue.task_done()
@@ -172,7 +172,9 @@ class StateDataReporter(object):
             A dictionary describing the required information for the next report
         """
         steps = self._reportInterval - simulation.currentStep%self._reportInterval
-        return {'steps':steps, 'periodic':None, 'include':self._includes}
+        # Computing the temperature with the integrator requires the Context, so it cannot be done asynchronously.
+        useContext = self._temperature and hasattr(simulation.integrator, 'computeSystemTemperature')
+        return {'steps':steps, 'periodic':None, 'include':self._includes, 'async':not useContext}
 
     def report(self, simulation, state):
         """Generate a report.
@@ -193,7 +195,7 @@ class StateDataReporter(object):
                 self._out.flush()
             except AttributeError:
                 pass
-            self._initialClockTime = time.time()
+            self._initialClockTime = _getClockTime(simulation)
             self._initialSimulationTime = state.getTime()
             self._initialSteps = simulation.currentStep
             self._hasInitialized = True
@@ -228,9 +230,8 @@ class StateDataReporter(object):
         corresponds to one of the columns in the resulting CSV file.
         """
         values = []
-        box = state.getPeriodicBoxVectors()
-        volume = box[0][0]*box[1][1]*box[2][2]
-        clockTime = time.time()
+        volume = state.getPeriodicBoxVolume()
+        clockTime = _getClockTime(simulation)
         if self._progress:
             values.append('%.1f%%' % (100.0*simulation.currentStep/self._totalSteps))
         if self._step:
@@ -244,7 +245,7 @@ class StateDataReporter(object):
         if self._totalEnergy:
             values.append((state.getKineticEnergy()+state.getPotentialEnergy()).value_in_unit(unit.kilojoules_per_mole))
         if self._temperature:
-            integrator = simulation.context.getIntegrator()
+            integrator = simulation.integrator
             if hasattr(integrator, 'computeSystemTemperature'):
                 values.append(integrator.computeSystemTemperature().value_in_unit(unit.kelvin))
             else:
@@ -261,7 +262,7 @@ class StateDataReporter(object):
             else:
                 values.append('--')
         if self._elapsedTime:
-            values.append(time.time() - self._initialClockTime)
+            values.append(clockTime - self._initialClockTime)
         if self._remainingTime:
             elapsedSeconds = clockTime-self._initialClockTime
             elapsedSteps = simulation.currentStep-self._initialSteps
@@ -365,3 +366,9 @@ class StateDataReporter(object):
     def __del__(self):
         if self._openedFile:
             self._out.close()
+
+
+def _getClockTime(simulation):
+    """Get the wall clock time at which the State being reported was captured.  When reports are generated
+    asynchronously, the Simulation records it, so time spent waiting to be reported is not included."""
+    return getattr(simulation, 'clockTime', None) or time.time()
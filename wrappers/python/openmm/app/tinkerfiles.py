@@ -38,7 +38,7 @@ from typing import Any, Dict, List, Optional, Tuple, Union
 import numpy as np
 
 from openmm.app.internal.unitcell import computePeriodicBoxVectors
-from openmm.unit import nanometers
+from openmm.unit import nanometers, strip_units
 from openmm.vec3 import Vec3
 from openmm.app import element as elem
 
@@ -2273,7 +2273,7 @@ class TinkerFiles:
         if asNumpy:
             if self._numpyPositions is None:
                 self._numpyPositions = (
-                    np.array(self.positions.value_in_unit(nanometers)) * nanometers
+                    np.array(strip_units(self.positions, nanometers)) * nanometers
                 )
             return self._numpyPositions
         return self.positions
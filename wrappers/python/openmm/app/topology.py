@@ -31,11 +31,13 @@ __author__ = "Peter Eastman"
 __version__ = "1.0"
 
 from collections import namedtuple
+import numpy as np
 import os
 import xml.etree.ElementTree as etree
 from openmm.vec3 import Vec3
 from openmm.app.internal.singleton import Singleton
-from openmm.unit import nanometers, sqrt, is_quantity
+from openmm.app.internal.neighborsearch import findNeighborPairs
+from openmm.unit import nanometers, is_quantity, strip_units
 from copy import deepcopy
 
 # Enumerated values for bond type
@@ -90,6 +92,7 @@ class Topology(object):
         self._numAtoms = 0
         self._bonds = []
         self._periodicBoxVectors = None
+        self._arrays = None
 
     def __repr__(self):
         nchains = len(self._chains)
@@ -137,6 +140,7 @@ class Topology(object):
             id = str(len(self._chains)+1)
         chain = Chain(len(self._chains), self, id)
         self._chains.append(chain)
+        self._arrays = None
         return chain
 
     def addResidue(self, name, chain, id=None, insertionCode=''):
@@ -166,6 +170,7 @@ class Topology(object):
         residue = Residue(name, self._numResidues, chain, id, insertionCode)
         self._numResidues += 1
         chain._residues.append(residue)
+        self._arrays = None
         return residue
 
     def addAtom(self, name, element, residue, id=None, formalCharge=None):
@@ -196,6 +201,7 @@ class Topology(object):
         atom = Atom(name, element, self._numAtoms, residue, id, formalCharge=formalCharge)
         self._numAtoms += 1
         residue._atoms.append(atom)
+        self._arrays = None
         return atom
 
     def addBond(self, atom1, atom2, type=None, order=None):
@@ -214,6 +220,7 @@ class Topology(object):
             The bond order, or None if it is not specified
         """
         self._bonds.append(Bond(atom1, atom2, type, order))
+        self._arrays = None
 
     def chains(self):
         """Iterate over all Chains in the Topology."""
@@ -238,6 +245,76 @@ class Topology(object):
         """
         return iter(self._bonds)
 
+    def getAtomResidueIndices(self):
+        """Get an array containing the index of the Residue each Atom belongs to.
+
+        The array is read-only and is shared with the Topology, so retrieving it is fast.  It remains
+        valid until the Topology is modified.
+        """
+        return self._getArrays().atomResidue
+
+    def getResidueChainIndices(self):
+        """Get an array containing the index of the Chain each Residue belongs to.
+
+        The array is read-only and is shared with the Topology, so retrieving it is fast.  It remains
+        valid until the Topology is modified.
+        """
+        return self._getArrays().residueChain
+
+    def getBondAtomIndices(self):
+        """Get an array of shape (number of bonds, 2) containing the indices of the two Atoms in each bond.
+        The bonds are in the same order as returned by bonds().
+
+        The array is read-only and is shared with the Topology, so retrieving it is fast.  It remains
+        valid until the Topology is modified.
+        """
+        return self._getArrays().bondAtoms
+
+    def getBondedAtomIndices(self):
+        """Get the atoms bonded to each Atom, represented in compressed sparse row format.
+
+        The return value is a tuple (offsets, neighbors) of arrays.  The indices of the atoms bonded to
+        atom i are neighbors[offsets[i]:offsets[i+1]].  Each atom's neighbors are sorted and contain no
+        duplicates.  The arrays are read-only and are shared with the Topology.  They remain valid until
+        the Topology is modified.
+        """
+        arrays = self._getArrays()
+        return (arrays.neighborOffsets, arrays.neighbors)
+
+    def getAtomicNumbers(self):
+        """Get an array containing the atomic number of each Atom.  Atoms whose element is None have an atomic
+        number of 0.
+        """
+        return np.fromiter((0 if atom.element is None else atom.element.atomic_number for atom in self.atoms()), dtype=np.int32, count=self._numAtoms)
+
+    def _getArrays(self):
+        """Get the arrays describing the structure of the Topology, building them if necessary.  They are discarded
+        whenever a chain, residue, atom, or bond is added."""
+        if getattr(self, '_arrays', None) is None:
+            numAtoms = self._numAtoms
+            atomResidue = np.fromiter((atom.residue.index for atom in self.atoms()), dtype=np.int32, count=numAtoms)
+            residueChain = np.fromiter((residue.chain.index for residue in self.residues()), dtype=np.int32, count=self._numResidues)
+            bondAtoms = np.fromiter((atom.index for bond in self._bonds for atom in bond), dtype=np.int64, count=2*len(self._bonds)).reshape(-1, 2)
+
+            # Sort the ends of the bonds by atom to build the list of bonds involving each atom.
+
+            ends = bondAtoms.ravel()
+            order = np.argsort(ends, kind='stable')
+            atomBondOffsets = np.searchsorted(ends[order], np.arange(numAtoms+1))
+            atomBonds = order//2
+
+            # Build the sorted, unique list of neighbors of each atom.
+
+            pairs = np.unique(ends*numAtoms + bondAtoms[:,::-1].ravel())
+            neighborOffsets = np.searchsorted(pairs//max(numAtoms, 1), np.arange(numAtoms+1))
+            neighbors = pairs%max(numAtoms, 1)
+
+            arrays = _TopologyArrays(atomResidue, residueChain, bondAtoms, atomBondOffsets, atomBonds, neighborOffsets, neighbors)
+            for array in arrays:
+                array.flags.writeable = False
+            self._arrays = arrays
+        return self._arrays
+
     def getPeriodicBoxVectors(self):
         """Get the vectors defining the periodic box.
 
@@ -368,33 +445,44 @@ class Topology(object):
         def isCyx(res):
             names = [atom.name for atom in res._atoms]
             return 'SG' in names and 'HG' not in names
-        # This function is used to prevent multiple di-sulfide bonds from being
-        # assigned to a given atom.
-        def isDisulfideBonded(atom):
-          for b in self._bonds:
-              if (atom in b and b[0].name == 'SG' and
-                  b[1].name == 'SG'):
-                  return True
-
-          return False
 
         cyx = [res for res in self.residues() if res.name == 'CYS' and isCyx(res)]
-        atomNames = [[atom.name for atom in res._atoms] for res in cyx]
-        for i in range(len(cyx)):
-            sg1 = cyx[i]._atoms[atomNames[i].index('SG')]
-            pos1 = positions[sg1.index]
-            candidate_distance, candidate_atom = 0.3*nanometers, None
-            for j in range(i):
-                sg2 = cyx[j]._atoms[atomNames[j].index('SG')]
-                pos2 = positions[sg2.index]
-                delta = [x-y for (x,y) in zip(pos1, pos2)]
-                distance = sqrt(delta[0]*delta[0] + delta[1]*delta[1] + delta[2]*delta[2])
-                if distance < candidate_distance and not isDisulfideBonded(sg2):
-                    candidate_distance = distance
-                    candidate_atom = sg2
-            # Assign bond to closest pair.
-            if candidate_atom:
-                self.addBond(sg1, candidate_atom)
+        sg = [[atom for atom in res._atoms if atom.name == 'SG'][0] for res in cyx]
+        if len(sg) < 2:
+            return
+        positions = strip_units(positions, nanometers)
+        sgPos = []
+        for atom in sg:
+            pos = positions[atom.index]
+            if is_quantity(pos):
+                pos = pos.value_in_unit(nanometers)
+            sgPos.append([pos[0], pos[1], pos[2]])
+
+        # Record which sulfur atoms are already in disulfide bonds, so no atom is assigned more than one.
+
+        bonded = set()
+        for atom1, atom2 in self._bonds:
+            if atom1.name == 'SG' and atom2.name == 'SG':
+                bonded.add(atom1)
+                bonded.add(atom2)
+
+        # Find all pairs of sulfur atoms that are close enough to be bonded.  Each one is bonded to the
+        # closest earlier one that is still available.
+
+        index1, index2, distance = findNeighborPairs(sgPos, sgPos, 0.3)
+        candidates = [[] for _ in sg]
+        for i, j, d in zip(index1.tolist(), index2.tolist(), distance.tolist()):
+            if j < i:
+                candidates[i].append((d, j))
+        for i in range(len(sg)):
+            for d, j in sorted(candidates[i]):
+                if sg[j] not in bonded:
+                    self.addBond(sg[i], sg[j])
+                    bonded.add(sg[i])
+                    bonded.add(sg[j])
+                    break
+
+_TopologyArrays = namedtuple('_TopologyArrays', ['atomResidue', 'residueChain', 'bondAtoms', 'atomBondOffsets', 'atomBonds', 'neighborOffsets', 'neighbors'])
 
 class Chain(object):
     """A Chain object represents a chain within a Topology."""
@@ -446,15 +534,44 @@ class Residue(object):
 
     def bonds(self):
         """Iterate over all Bonds involving any atom in this residue."""
-        return ( bond for bond in self.chain.topology.bonds() if ((bond[0] in self._atoms) or (bond[1] in self._atoms)) )
+        bonds, inside = self._findBonds()
+        return self._selectBonds(bonds, inside[:,0] | inside[:,1])
 
     def internal_bonds(self):
         """Iterate over all internal Bonds."""
-        return ( bond for bond in self.chain.topology.bonds() if ((bond[0] in self._atoms) and (bond[1] in self._atoms)) )
+        bonds, inside = self._findBonds()
+        return self._selectBonds(bonds, inside[:,0] & inside[:,1])
 
     def external_bonds(self):
         """Iterate over all Bonds to external atoms."""
-        return ( bond for bond in self.chain.topology.bonds() if ((bond[0] in self._atoms) != (bond[1] in self._atoms)) )
+        bonds, inside = self._findBonds()
+        return self._selectBonds(bonds, inside[:,0] != inside[:,1])
+
+    def _findBonds(self):
+        """Find the indices of all bonds involving atoms in this residue, and which of their atoms are in the residue.
+        This only looks at the bonds of the residue's own atoms, so it takes time proportional to the residue size."""
+        arrays = self.chain.topology._getArrays()
+        indices = [atom.index for atom in self._atoms]
+        if len(indices) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 2), dtype=bool)
+        first = indices[0]
+        last = indices[-1]
+        offsets = arrays.atomBondOffsets
+        if last-first == len(indices)-1:
+            # The atoms are contiguous, so their bonds form a contiguous block.
+
+            bonds = np.unique(arrays.atomBonds[offsets[first]:offsets[last+1]])
+            bondAtoms = arrays.bondAtoms[bonds]
+            inside = (bondAtoms >= first) & (bondAtoms <= last)
+        else:
+            bonds = np.unique(np.concatenate([arrays.atomBonds[offsets[i]:offsets[i+1]] for i in indices]))
+            bondAtoms = arrays.bondAtoms[bonds]
+            inside = np.isin(bondAtoms, indices)
+        return bonds, inside
+
+    def _selectBonds(self, bonds, mask):
+        allBonds = self.chain.topology._bonds
+        return iter([allBonds[i] for i in bonds[mask]])
 
     def __len__(self):
         return len(self._atoms)
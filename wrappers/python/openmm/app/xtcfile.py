@@ -4,25 +4,50 @@ __author__ = "Raul P. Pelaez"
 __version__ = "1.0"
 
 from openmm.app.internal.xtc_utils import (
-    xtc_rewrite_with_new_timestep,
-    xtc_write_frame,
+    XTCFrameWriter,
+    xtc_build_index,
+    xtc_read_frames,
+    xtc_update_steps,
     get_xtc_nframes,
     get_xtc_natoms,
 )
+from openmm.app.internal import safesave
+from openmm.app.internal.trajectoryreader import TrajectoryReader
+import io
 import os
 from openmm import Vec3
-from openmm.unit import nanometers, picoseconds, is_quantity, norm
-import tempfile
-import shutil
+from openmm.unit import nanometers, picoseconds, is_quantity, norm, strip_units
 
 
 class XTCFile(object):
 
     """XTCFile provides methods for creating XTC files.
     To use this class, create a XTCFile object, then call writeModel() once for each model in the file.
+
+    The file is kept open until close() is called or the XTCFile is deleted.  Frames can be buffered
+    in memory and written to the file in batches, in which case call flush() to make sure all frames
+    have been written before reading the file.  To read an existing file, call XTCFile.read().
     """
 
-    def __init__(self, fileName, topology, dt, firstStep=0, interval=1, append=False):
+    @staticmethod
+    def read(fileName, indexFile=None):
+        """Open an existing XTC file for reading.
+
+        Parameters
+        ----------
+        fileName : str
+            The name of the file to read
+        indexFile : str=None
+            The file in which to save the locations of frames.  See XTCTrajectory for details.
+
+        Returns
+        -------
+        XTCTrajectory
+            an object providing access to the frames in the file
+        """
+        return XTCTrajectory(fileName, indexFile)
+
+    def __init__(self, fileName, topology, dt, firstStep=0, interval=1, append=False, bufferFrames=1, bufferSize=0):
         """Create a XTC file, or open an existing file to append.
 
         Parameters
@@ -40,6 +65,12 @@ class XTCFile(object):
             to the trajectory
         append : bool=False
             If True, open an existing XTC file to append to.  If False, create a new file.
+        bufferFrames : int=1
+            The number of frames to accumulate in memory before writing them to the file
+            together.  The file is flushed each time frames are written.
+        bufferSize : int=0
+            The size in bytes of the buffer used for writing to the file.  If 0, the system
+            default is used.
         """
         if not isinstance(fileName, str):
             raise TypeError("fileName must be a string")
@@ -48,6 +79,9 @@ class XTCFile(object):
         self._firstStep = firstStep
         self._interval = interval
         self._modelCount = 0
+        self._bufferFrames = bufferFrames
+        self._pendingFrames = []
+        self._writer = None
         if is_quantity(dt):
             dt = dt.value_in_unit(picoseconds)
         self._dt = dt
@@ -63,10 +97,37 @@ class XTCFile(object):
         else:
             if os.path.isfile(self._filename) and os.path.getsize(self._filename) > 0:
                 raise FileExistsError(f"The file '{self._filename}' already exists.")
+        self._writer = XTCFrameWriter(self._filename.encode("utf-8"), bufferSize)
 
     def _getNumFrames(self):
+        self.flush()
         return get_xtc_nframes(self._filename.encode("utf-8"))
 
+    def flush(self):
+        """Write all buffered frames to the file."""
+        if len(self._pendingFrames) > 0:
+            import numpy as np
+            coords, box, time, step = zip(*self._pendingFrames)
+            self._pendingFrames = []
+            self._writer.write_frames(
+                np.array(coords, dtype=np.float32),
+                np.array(box, dtype=np.float32),
+                np.array(time, dtype=np.float32),
+                np.array(step, dtype=np.int32),
+            )
+        self._writer.flush()
+
+    def close(self):
+        """Write all buffered frames and close the file.  No more models may be written after this is called."""
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+
+    def __del__(self):
+        if getattr(self, "_writer", None) is not None:
+            self.close()
+
     def writeModel(self, positions, unitCellDimensions=None, periodicBoxVectors=None):
         """Write out a model to the XTC file.
 
@@ -88,8 +149,7 @@ class XTCFile(object):
         """
         if self._topology.getNumAtoms() != len(positions):
             raise ValueError("The number of positions must match the number of atoms")
-        if is_quantity(positions):
-            positions = positions.value_in_unit(nanometers)
+        positions = strip_units(positions, nanometers)
         import numpy as np
         positions = np.asarray(positions)
         if np.isnan(positions).any():
@@ -110,20 +170,18 @@ class XTCFile(object):
         ):
             # This will exceed the range of a 32 bit integer.  To avoid crashing or producing a corrupt file,
             # update the file to say the trajectory consisted of a smaller number of larger steps (so the
-            # total trajectory length remains correct).
+            # total trajectory length remains correct).  Only the step and time of each frame need to change,
+            # so they are overwritten in place.
+            self.flush()
             self._firstStep //= self._interval
             self._dt *= self._interval
             self._interval = 1
-            with tempfile.TemporaryDirectory() as temp:
-                fname = os.path.join(temp, "temp.xtc")
-                xtc_rewrite_with_new_timestep(
-                    self._filename.encode("utf-8"),
-                    fname.encode("utf-8"),
-                    self._firstStep,
-                    self._interval,
-                    self._dt,
-                )
-                shutil.copyfile(fname, self._filename)
+            xtc_update_steps(
+                self._filename.encode("utf-8"),
+                self._firstStep,
+                self._interval,
+                self._dt,
+            )
         boxVectors = self._topology.getPeriodicBoxVectors()
         if boxVectors is not None:
             if periodicBoxVectors is not None:
@@ -145,10 +203,108 @@ class XTCFile(object):
             boxVectors = np.zeros((3, 3)).astype(np.float32)
         step = (self._modelCount - 1) * self._interval + self._firstStep
         time = step * self._dt
-        xtc_write_frame(
+        self._pendingFrames.append((np.array(positions, dtype=np.float32), boxVectors, time, step))
+        if len(self._pendingFrames) >= self._bufferFrames:
+            self.flush()
+
+
+class XTCTrajectory(TrajectoryReader):
+    """XTCTrajectory provides random access to the frames of an existing XTC file.
+
+    Index it like an array to get particle positions.  The first index selects frames and the
+    optional second index selects atoms, so for example trajectory[-1] returns the positions in
+    the last frame, and trajectory[::10, atoms] returns the positions of a subset of atoms in
+    every tenth frame.  len(trajectory) is the number of frames.
+
+    Frames in an XTC file are compressed and have different sizes, so when the file is opened, the
+    header of every frame is read to find where it begins.  This index is saved to a second file,
+    so later it only needs to be extended with any frames that have been added since.  Only the
+    frames that are accessed are decompressed.
+    """
+
+    def __init__(self, fileName, indexFile=None):
+        """Open an XTC file for reading.
+
+        Parameters
+        ----------
+        fileName : str
+            The name of the file to read
+        indexFile : str=None
+            The file in which to save the locations of frames, so they do not need to be found again
+            the next time the trajectory is opened.  If None, the name of the XTC file with ".index.npz"
+            appended is used.  If the index cannot be written, it is not saved.
+        """
+        import numpy as np
+        if not isinstance(fileName, str):
+            raise TypeError("fileName must be a string")
+        if indexFile is None:
+            indexFile = fileName + ".index.npz"
+        self._filename = fileName
+        self._numAtoms = get_xtc_natoms(fileName.encode("utf-8"))
+        index = self._loadIndex(indexFile)
+        updated = False
+        if index is not None:
+            # Look for frames that have been added since the index was saved.  The last frame in the index
+            # must still be present, or else the file has been replaced and the index is not valid.
+            try:
+                newFrames = xtc_build_index(fileName.encode("utf-8"), index[0][-1])
+            except RuntimeError:
+                newFrames = None
+            if newFrames is None or len(newFrames[0]) == 0 or newFrames[1][0] != index[1][-1] or newFrames[2][0] != index[2][-1]:
+                index = None
+            elif len(newFrames[0]) > 1:
+                index = tuple(np.concatenate([old, new[1:]]) for old, new in zip(index, newFrames))
+                updated = True
+        if index is None:
+            index = xtc_build_index(fileName.encode("utf-8"))
+            updated = True
+        self._offsets, self._steps, self._times, self._boxes = index
+        self._numFrames = len(self._offsets)
+        if updated and self._numFrames > 0:
+            self._saveIndex(indexFile)
+
+    def getPeriodicBoxVectors(self, frame):
+        """Get the periodic box vectors for a frame, or None if the file does not contain periodic boxes."""
+        box = self._boxes[frame]
+        if not box.any():
+            return None
+        return tuple(Vec3(*vector) for vector in box.tolist())*nanometers
+
+    def getStep(self, frame):
+        """Get the index of the time step at which a frame was saved."""
+        return int(self._steps[frame])
+
+    def getTime(self, frame):
+        """Get the simulation time at which a frame was saved."""
+        return float(self._times[frame])*picoseconds
+
+    def _readFrames(self, frames, atoms):
+        import numpy as np
+        positions = xtc_read_frames(
             self._filename.encode("utf-8"),
-            np.array(positions, dtype=np.float32),
-            boxVectors,
-            np.float32(time),
-            np.int32(step),
+            self._numAtoms,
+            np.ascontiguousarray(self._offsets[frames], dtype=np.int64),
+            np.ascontiguousarray(atoms, dtype=np.int32),
         )
+        return positions.astype(np.float64)
+
+    def _loadIndex(self, indexFile):
+        """Load a saved index.  If it does not exist or is not valid, return None."""
+        import numpy as np
+        try:
+            with np.load(indexFile) as data:
+                if int(data["numAtoms"]) != self._numAtoms or len(data["offsets"]) == 0:
+                    return None
+                return (data["offsets"], data["steps"], data["times"], data["boxes"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _saveIndex(self, indexFile):
+        """Save the index so it does not need to be rebuilt the next time the file is opened."""
+        import numpy as np
+        data = io.BytesIO()
+        np.savez(data, numAtoms=self._numAtoms, offsets=self._offsets, steps=self._steps, times=self._times, boxes=self._boxes)
+        try:
+            safesave.save(data.getvalue(), indexFile)
+        except OSError:
+            pass
@@ -35,7 +35,7 @@ class XTCReporter(object):
     To use it, create a XTCReporter, then add it to the Simulation's list of reporters.
     """
 
-    def __init__(self, file, reportInterval, append=False, enforcePeriodicBox=None, atomSubset=None):
+    def __init__(self, file, reportInterval, append=False, enforcePeriodicBox=None, atomSubset=None, bufferFrames=1):
         """Create a XTCReporter.
 
         Parameters
@@ -53,13 +53,20 @@ class XTCReporter(object):
             conditions.
         atomSubset: list
             Atom indices (zero indexed) of the particles to output.  If None (the default), all particles will be output.
+        bufferFrames: int
+            The number of frames to accumulate in memory before writing them to the file together.  Buffered
+            frames are written when flush() or close() is called, when the Simulation's flushReports() is called
+            (which happens automatically when saving a checkpoint or State), and when the reporter is deleted.
+            If the program crashes, any frames that are still buffered are lost.
         """
         self._reportInterval = reportInterval
         self._append = append
         self._enforcePeriodicBox = enforcePeriodicBox
         self._atomSubset = atomSubset
         self._fileName = file
+        self._bufferFrames = bufferFrames
         self._xtc = None
+        self._closed = False
         if not append:
             open(file, 'wb').close()
 
@@ -77,7 +84,7 @@ class XTCReporter(object):
             A dictionary describing the required information for the next report
         """
         steps = self._reportInterval - simulation.currentStep%self._reportInterval
-        return {'steps':steps, 'periodic':self._enforcePeriodicBox, 'include':['positions']}
+        return {'steps':steps, 'periodic':self._enforcePeriodicBox, 'include':['positions'], 'async':True}
 
     def report(self, simulation, state):
         """Generate a report.
@@ -108,8 +115,23 @@ class XTCReporter(object):
                 self._reportInterval,
                 self._reportInterval,
                 self._append,
+                bufferFrames=self._bufferFrames,
             )
-        positions = state.getPositions(asNumpy=True)
+        positions = state.getPositionsArray()
         if self._atomSubset is not None:
-            positions = [positions[i] for i in self._atomSubset]
+            positions = positions[self._atomSubset]
         self._xtc.writeModel(positions, periodicBoxVectors=state.getPeriodicBoxVectors())
+
+    def flush(self):
+        """Write any buffered frames to the file."""
+        if self._xtc is not None and not self._closed:
+            self._xtc.flush()
+
+    def close(self):
+        """Write any buffered frames and close the file.  No more reports may be generated after this is called."""
+        if self._xtc is not None and not self._closed:
+            self._xtc.close()
+        self._closed = True
+
+    def __del__(self):
+        self.close()
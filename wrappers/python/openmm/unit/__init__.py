@@ -12,7 +12,7 @@ __maintainer__ = "Christopher M. Bruns"
 __email__ = "cmbruns@stanford.edu"
 
 from .unit import Unit, is_unit
-from .quantity import Quantity, is_quantity
+from .quantity import Quantity, is_quantity, strip_units
 from .unit_math import *
 from .unit_definitions import *
 from .constants import *
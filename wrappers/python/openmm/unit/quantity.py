@@ -143,8 +143,14 @@ class Quantity(object):
                             unit = Quantity(first_item).unit
                      # Notice that tuples, lists, and numpy.arrays can all be initialized with a list
                     new_container = Quantity([], unit)
-                    for item in value:
-                        new_container.append(Quantity(item)) # Strips off units into list new_container._value
+                    if all(is_quantity(item) and item.unit is unit for item in value):
+                        # Fast path: every element already has the same unit, so just collect their values
+                        new_container._value = [item._value for item in value]
+                        if not _is_flat_sequence(new_container._value):
+                            new_container._value = copy.deepcopy(new_container._value)
+                    else:
+                        for item in value:
+                            new_container.append(Quantity(item)) # Strips off units into list new_container._value
                     # __class__ trick does not work for numpy.arrays
                     try:
                         import numpy
@@ -289,8 +295,57 @@ class Quantity(object):
 
     __hash__ = None
 
+    # Performance: maps (id(unit), id(guide_unit)) to (reduced unit, value factor, unit, guide_unit).
+    # The trailing references keep the Units alive so their ids cannot be reused.
     _reduce_cache = {}
 
+    @staticmethod
+    def _reduced_unit(unit, guide_unit=None):
+        """
+        Returns a tuple (reduced unit, value factor) describing how reduce_unit() converts
+        a Quantity in the given unit.
+        """
+        key = (id(unit), id(guide_unit))
+        entry = Quantity._reduce_cache.get(key)
+        if entry is not None:
+            return entry[0], entry[1]
+        value_factor = 1.0
+        canonical_units = {} # dict of dimensionTuple: (Base/ScaledUnit, exponent)
+        # Bias result toward guide units
+        if guide_unit is not None:
+            for u, exponent in guide_unit.iter_base_or_scaled_units():
+                d = u.get_dimension_tuple()
+                if d not in canonical_units:
+                    canonical_units[d] = [u, 0]
+        for u, exponent in unit.iter_base_or_scaled_units():
+            d = u.get_dimension_tuple()
+            # Take first unit found in a dimension as canonical
+            if d not in canonical_units:
+                canonical_units[d] = [u, exponent]
+            else:
+                value_factor *= (u.conversion_factor_to(canonical_units[d][0])**exponent)
+                canonical_units[d][1] += exponent
+        new_base_units = {}
+        for d in canonical_units:
+            u, exponent = canonical_units[d]
+            if exponent != 0:
+                assert u not in new_base_units
+                new_base_units[u] = exponent
+        # Create new unit
+        if len(new_base_units) == 0:
+            new_unit = dimensionless
+        else:
+            new_unit = Unit._intern(Unit(new_base_units))
+        # There might be a factor due to unit conversion, even though unit is dimensionless
+        # e.g. suppose unit is meter/centimeter
+        if new_unit.is_dimensionless():
+            unit_factor = new_unit.conversion_factor_to(dimensionless)
+            if unit_factor != 1.0:
+                value_factor *= unit_factor
+            new_unit = dimensionless
+        Quantity._reduce_cache[key] = (new_unit, value_factor, unit, guide_unit)
+        return new_unit, value_factor
+
     def reduce_unit(self, guide_unit=None):
         """
         Combine similar component units and scale, to form an
@@ -298,46 +353,7 @@ class Quantity(object):
 
         Returns underlying value type if unit is dimensionless.
         """
-        key = (self.unit, guide_unit)
-        if key in Quantity._reduce_cache:
-            (unit, value_factor) = Quantity._reduce_cache[key]
-        else:
-            value_factor = 1.0
-            canonical_units = {} # dict of dimensionTuple: (Base/ScaledUnit, exponent)
-            # Bias result toward guide units
-            if guide_unit is not None:
-                for u, exponent in guide_unit.iter_base_or_scaled_units():
-                    d = u.get_dimension_tuple()
-                    if d not in canonical_units:
-                        canonical_units[d] = [u, 0]
-            for u, exponent in self.unit.iter_base_or_scaled_units():
-                d = u.get_dimension_tuple()
-                # Take first unit found in a dimension as canonical
-                if d not in canonical_units:
-                    canonical_units[d] = [u, exponent]
-                else:
-                    value_factor *= (u.conversion_factor_to(canonical_units[d][0])**exponent)
-                    canonical_units[d][1] += exponent
-            new_base_units = {}
-            for d in canonical_units:
-                u, exponent = canonical_units[d]
-                if exponent != 0:
-                    assert u not in new_base_units
-                    new_base_units[u] = exponent
-            # Create new unit
-            if len(new_base_units) == 0:
-                unit = dimensionless
-            else:
-                unit = Unit(new_base_units)
-            # There might be a factor due to unit conversion, even though unit is dimensionless
-            # e.g. suppose unit is meter/centimeter
-            if unit.is_dimensionless():
-                unit_factor = unit.conversion_factor_to(dimensionless)
-                if unit_factor != 1.0:
-                    value_factor *= unit_factor
-                    # print "value_factor = %s" % value_factor
-                unit = dimensionless
-            Quantity._reduce_cache[key] = (unit, value_factor)
+        unit, value_factor = Quantity._reduced_unit(self.unit, guide_unit)
         # Create Quantity, then scale (in case value is a container)
         # That's why we don't just scale the value.
         result = Quantity(self._value, unit)
@@ -366,6 +382,10 @@ class Quantity(object):
             return Quantity(self._value, unit).reduce_unit(self.unit)
         elif is_quantity(other):
             # print "quantity * quantity"
+            if type(self._value) in _scalar_types and type(other._value) in _scalar_types and not self.unit.is_dimensionless():
+                # Fast path for plain numbers, giving the same result as the general case below
+                value = self._value if other._value == 1.0 else other._value*self._value
+                return self._scalar_result(value, other.unit, 1)
             # Situations where the units cancel can result in scale factors from the unit cancellation.
             # To simplify things, delegate Quantity * Quantity to (Quantity * scalar) * unit
             return (self * other._value) * other.unit
@@ -404,6 +424,11 @@ class Quantity(object):
             # return Quantity(self._value, unit).reduce_unit(self.unit)
         elif is_quantity(other):
             # print "quantity / quantity"
+            if type(self._value) in _scalar_types and type(other._value) in _scalar_types and not self.unit.is_dimensionless():
+                # Fast path for plain numbers, giving the same result as the general case below
+                factor = pow(other._value, -1.0)
+                value = self._value if factor == 1.0 else factor*self._value
+                return self._scalar_result(value, other.unit, -1)
             # Delegate quantity/quantity to (quantity/scalar)/unit
             return (self/other._value) / other.unit
         else:
@@ -413,6 +438,30 @@ class Quantity(object):
 
     __div__ = __truediv__
 
+    # Performance: maps (id(unit1), id(unit2), exponent) to (reduced unit, value factor, unit1, unit2)
+    _product_cache = {}
+
+    def _scalar_result(self, value, other_unit, exponent):
+        """
+        Returns the result of multiplying (exponent=1) or dividing (exponent=-1) this Quantity by
+        one in other_unit, where value is the product of the two numeric values.
+        """
+        key = (id(self.unit), id(other_unit), exponent)
+        entry = Quantity._product_cache.get(key)
+        if entry is None:
+            if exponent == 1:
+                unit = self.unit * other_unit
+            else:
+                unit = self.unit * pow(other_unit, -1.0)
+            entry = Quantity._reduced_unit(unit, self.unit) + (self.unit, other_unit)
+            Quantity._product_cache[key] = entry
+        unit, value_factor = entry[0], entry[1]
+        if value_factor != 1.0:
+            value = value_factor*value
+        if unit is dimensionless:
+            return value
+        return Quantity(value, unit)
+
     def __rtruediv__(self, other):
         """Divide a scalar by a quantity.
 
@@ -670,7 +719,14 @@ class Quantity(object):
             pass
         if factor_is_identity:
             # No multiplication required
-            result = Quantity(copy.deepcopy(self._value), new_unit)
+            result = Quantity(_copy_value(self._value), new_unit)
+        elif _is_flat_sequence(self._value):
+            # Scale each element of a list directly, without first making a deep copy of it
+            if post_multiply:
+                value = [x*factor for x in self._value]
+            else:
+                value = [factor*x for x in self._value]
+            result = Quantity(value, new_unit)
         else:
             try:
                 # multiply operator, if it exists, is preferred
@@ -790,6 +846,29 @@ def is_quantity(x):
     """
     return isinstance(x, Quantity)
 
+def strip_units(x, unit):
+    """
+    Returns the value of x expressed in the specified unit.
+
+    This is a cheap alternative to value_in_unit() for code that only reads the result.  If x
+    already has the requested unit, its underlying value is returned directly without making
+    a copy, so the result must not be modified.  If x is not a Quantity, it is assumed to
+    already be in the requested unit and is returned unchanged.
+
+    >>> from openmm.unit import nanometers, angstroms
+    >>> strip_units(Quantity([1.0, 2.0], nanometers), nanometers)
+    [1.0, 2.0]
+    >>> strip_units(Quantity([1.0, 2.0], nanometers), angstroms)
+    [10.0, 20.0]
+    >>> strip_units(3.0, nanometers)
+    3.0
+    """
+    if not is_quantity(x):
+        return x
+    if x.unit is unit or x.unit == unit:
+        return x._value
+    return x.value_in_unit(unit)
+
 def is_dimensionless(x):
     """
     """
@@ -801,6 +880,33 @@ def is_dimensionless(x):
         # everything else in the universe is dimensionless
         return True
 
+def _is_flat_sequence(value):
+    """
+    Returns True if value is a list whose elements are all numbers or Vec3s.  Such a list can be
+    copied or scaled element by element, which is much faster than using deepcopy.
+    """
+    if not isinstance(value, list):
+        return False
+    try:
+        from openmm.vec3 import Vec3
+        flat_types = (float, int, Vec3)
+    except ImportError:
+        flat_types = (float, int)
+    return set(map(type, value)).issubset(flat_types)
+
+_scalar_types = (float, int)
+
+def _copy_value(value):
+    """
+    Returns a copy of the value of a Quantity.  Numbers and Vec3s are immutable, so a list of them
+    only needs a shallow copy.
+    """
+    if type(value) in _scalar_types:
+        return value
+    if _is_flat_sequence(value):
+        return list(value)
+    return copy.deepcopy(value)
+
 # Strings can cause trouble
 # as can any container that has infinite levels of containment
 def _is_string(x):
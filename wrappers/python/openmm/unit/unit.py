@@ -228,23 +228,40 @@ class Unit(object):
     # def __rtruediv__(self, other):
     # Because rtruediv returns a Quantity, look in quantity.py for definition of Unit.__rtruediv__
 
+    # Performance: the results of operations on Units are stored in flat tables keyed by the ids
+    # of the Units involved.  Each entry also holds references to those Units, so their ids cannot
+    # be reused by other objects while the entry exists.
     _pow_cache = {}
 
+    # Units created by operations are interned, so equal Units are usually the same object.
+    # That lets the id-keyed tables and identity checks succeed far more often.  The key is the
+    # ordered list of component units and exponents, so an interned Unit is indistinguishable
+    # from a new one, including the order of symbols in its string.  Matching on the name alone
+    # would merge different component units that happen to share a name.
+    _interned_units = {}
+
+    @staticmethod
+    def _intern(unit):
+        """
+        Returns the interned Unit with the same components as unit, registering unit if there is none.
+        """
+        key = tuple((id(u), exponent) for u, exponent in unit.iter_base_or_scaled_units())
+        return Unit._interned_units.setdefault(key, unit)
+
     def __pow__(self, exponent):
         """Raise a Unit to a power.
 
         Returns a new Unit with different exponents on the BaseUnits.
         """
-        if self in Unit._pow_cache:
-            if exponent in Unit._pow_cache[self]:
-                return Unit._pow_cache[self][exponent]
-        else:
-            Unit._pow_cache[self] = {}
+        key = (id(self), exponent)
+        entry = Unit._pow_cache.get(key)
+        if entry is not None:
+            return entry[0]
         result = {} # dictionary of unit: exponent
         for unit, exponent2 in self.iter_base_or_scaled_units():
             result[unit] = exponent2 * exponent
-        new_unit = Unit(result)
-        Unit._pow_cache[self][exponent] = new_unit
+        new_unit = Unit._intern(Unit(result))
+        Unit._pow_cache[key] = (new_unit, self)
         return new_unit
 
     def sqrt(self):
@@ -284,7 +301,7 @@ class Unit(object):
                 if exponent%2 != 0:
                     raise ArithmeticError('Exponents in Unit.sqrt() must be even.')
                 new_units[u] = exponent/2
-        return Unit(new_units)
+        return Unit._intern(Unit(new_units))
 
     def __str__(self):
         """Returns the human-readable name of this unit"""
@@ -300,51 +317,32 @@ class Unit(object):
             units[unit] = power
         return 'Unit(%s)' % repr(units)
 
-    # Performance
-    _is_compatible_cache = {}
+    def _get_dimensions(self):
+        """
+        Returns a tuple of (BaseDimension, exponent) pairs describing the dimensions of this Unit.
+        It is computed once and stored, so dimensions can be compared with a single tuple comparison.
+        """
+        try:
+            return self._dimensions
+        except AttributeError:
+            pass
+        self._dimensions = tuple(self.iter_base_dimensions())
+        return self._dimensions
 
     def is_compatible(self, other):
         """
         Returns True if two Units share the same dimension.
         Returns False otherwise.
         """
-        if self in Unit._is_compatible_cache:
-            if other in Unit._is_compatible_cache[self]:
-                return Unit._is_compatible_cache[self][other]
         if not is_unit(other):
-            if self.is_dimensionless():
-                return True
-            else:
-                return False
-        self_dims = {}
-        for dimension, exponent in self.iter_base_dimensions():
-            self_dims[dimension] = exponent
-        other_dims = {}
-        for dimension, exponent in other.iter_base_dimensions():
-            other_dims[dimension] = exponent
-        if len(self_dims) != len(other_dims):
-            result = False
-        else:
-            result = (self_dims == other_dims)
-        if not self in Unit._is_compatible_cache:
-            Unit._is_compatible_cache[self] = {}
-        Unit._is_compatible_cache[self][other] = result
-        return result
-
-    _is_dimensionless_cache = {}
+            return self.is_dimensionless()
+        return self is other or self._get_dimensions() == other._get_dimensions()
 
     def is_dimensionless(self):
         """Returns True if this Unit has no dimensions.
         Returns False otherwise.
         """
-        if self in Unit._is_dimensionless_cache:
-            return Unit._is_dimensionless_cache[self]
-        for dimension, exponent in self.iter_base_dimensions():
-            if exponent != 0:
-                Unit._is_dimensionless_cache[self] = False
-                return False
-        Unit._is_dimensionless_cache[self] = True
-        return True
+        return len(self._get_dimensions()) == 0
 
     # Performance
     _conversion_factor_cache = {}
@@ -363,9 +361,10 @@ class Unit(object):
         factor = 1.0
         if (self is other):
             return factor
-        if self in Unit._conversion_factor_cache:
-            if other in Unit._conversion_factor_cache[self]:
-                return Unit._conversion_factor_cache[self][other]
+        key = (id(self), id(other))
+        entry = Unit._conversion_factor_cache.get(key)
+        if entry is not None:
+            return entry[0]
         assert self.is_compatible(other)
         factor *= self.get_conversion_factor_to_base_units()
         factor /= other.get_conversion_factor_to_base_units()
@@ -401,9 +400,7 @@ class Unit(object):
             else:
                 canonical_units[d] = unit
         factor *= 10**powers_of_ten
-        if not self in Unit._conversion_factor_cache:
-            Unit._conversion_factor_cache[self] = {}
-        Unit._conversion_factor_cache[self][other] = factor
+        Unit._conversion_factor_cache[key] = (factor, self, other)
         return factor
 
     def in_unit_system(self, system):
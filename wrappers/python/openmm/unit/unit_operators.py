@@ -90,11 +90,10 @@ def _unit_class_mul(self, other):
     of the Quantity is returned.
     """
     if is_unit(other):
-        if self in Unit._multiplication_cache:
-            if other in Unit._multiplication_cache[self]:
-                return Unit._multiplication_cache[self][other]
-        else:
-            Unit._multiplication_cache[self] = {}
+        key = (id(self), id(other))
+        entry = Unit._multiplication_cache.get(key)
+        if entry is not None:
+            return entry[0]
         # print "unit * unit"
         result1 = {} # dictionary of dimensionTuple: (BaseOrScaledUnit, exponent)
         for unit, exponent in self.iter_base_or_scaled_units():
@@ -117,8 +116,8 @@ def _unit_class_mul(self, other):
                 if exponent != 0:
                     assert unit not in result2
                     result2[unit] = exponent
-        new_unit = Unit(result2)
-        Unit._multiplication_cache[self][other] = new_unit
+        new_unit = Unit._intern(Unit(result2))
+        Unit._multiplication_cache[key] = (new_unit, self, other)
         return new_unit
     elif is_quantity(other):
         # print "unit * quantity"
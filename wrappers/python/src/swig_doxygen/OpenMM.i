@@ -41,6 +41,7 @@ namespace std {
 #include "openmm/serialization/SerializationNode.h"
 #include "openmm/serialization/SerializationProxy.h"
 #include "openmm/serialization/XmlSerializer.h"
+#include "openmm/serialization/BinarySerializer.h"
 
 using namespace OpenMM;
 
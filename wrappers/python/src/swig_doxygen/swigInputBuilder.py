@@ -303,12 +303,18 @@ class SwigInputBuilder:
             self.fOut.write(",\n         OpenMM::%s" % name)
         self.fOut.write(");\n\n")
 
-        self.fOut.write("%factory(OpenMM::Force* OpenMM_XmlSerializer__cloneForce")
-        for name in sorted(forceSubclassList):
-            self.fOut.write(",\n         OpenMM::%s" % name)
-        self.fOut.write(");\n\n")
-
-        self.fOut.write("%factory(OpenMM::Force* OpenMM_XmlSerializer__deserializeForce")
+        for serializer in ('XmlSerializer', 'BinarySerializer'):
+            self.fOut.write("%factory(OpenMM::Force* OpenMM_%s__cloneForce" % serializer)
+            for name in sorted(forceSubclassList):
+                self.fOut.write(",\n         OpenMM::%s" % name)
+            self.fOut.write(");\n\n")
+
+            self.fOut.write("%factory(OpenMM::Force* OpenMM_%s__deserializeForce" % serializer)
+            for name in sorted(forceSubclassList):
+                self.fOut.write(",\n         OpenMM::%s" % name)
+            self.fOut.write(");\n\n")
+
+        self.fOut.write("%factory(OpenMM::Force* OpenMM_XmlSerializer__loadForce")
         for name in sorted(forceSubclassList):
             self.fOut.write(",\n         OpenMM::%s" % name)
         self.fOut.write(");\n\n")
@@ -318,12 +324,18 @@ class SwigInputBuilder:
             self.fOut.write(",\n         OpenMM::%s" % name)
         self.fOut.write(");\n\n")
 
-        self.fOut.write("%factory(OpenMM::Integrator* OpenMM_XmlSerializer__cloneIntegrator")
-        for name in sorted(integratorSubclassList):
-            self.fOut.write(",\n         OpenMM::%s" % name)
-        self.fOut.write(");\n\n")
+        for serializer in ('XmlSerializer', 'BinarySerializer'):
+            self.fOut.write("%factory(OpenMM::Integrator* OpenMM_%s__cloneIntegrator" % serializer)
+            for name in sorted(integratorSubclassList):
+                self.fOut.write(",\n         OpenMM::%s" % name)
+            self.fOut.write(");\n\n")
+
+            self.fOut.write("%factory(OpenMM::Integrator* OpenMM_%s__deserializeIntegrator" % serializer)
+            for name in sorted(integratorSubclassList):
+                self.fOut.write(",\n         OpenMM::%s" % name)
+            self.fOut.write(");\n\n")
 
-        self.fOut.write("%factory(OpenMM::Integrator* OpenMM_XmlSerializer__deserializeIntegrator")
+        self.fOut.write("%factory(OpenMM::Integrator* OpenMM_XmlSerializer__loadIntegrator")
         for name in sorted(integratorSubclassList):
             self.fOut.write(",\n         OpenMM::%s" % name)
         self.fOut.write(");\n\n")
@@ -338,12 +350,18 @@ class SwigInputBuilder:
             self.fOut.write(",\n         OpenMM::%s" % name)
         self.fOut.write(");\n\n")
 
-        self.fOut.write("%factory(OpenMM::TabulatedFunction* OpenMM_XmlSerializer__cloneTabulatedFunction")
-        for name in sorted(tabulatedFunctionSubclassList):
-            self.fOut.write(",\n         OpenMM::%s" % name)
-        self.fOut.write(");\n\n")
+        for serializer in ('XmlSerializer', 'BinarySerializer'):
+            self.fOut.write("%factory(OpenMM::TabulatedFunction* OpenMM_%s__cloneTabulatedFunction" % serializer)
+            for name in sorted(tabulatedFunctionSubclassList):
+                self.fOut.write(",\n         OpenMM::%s" % name)
+            self.fOut.write(");\n\n")
+
+            self.fOut.write("%factory(OpenMM::TabulatedFunction* OpenMM_%s__deserializeTabulatedFunction" % serializer)
+            for name in sorted(tabulatedFunctionSubclassList):
+                self.fOut.write(",\n         OpenMM::%s" % name)
+            self.fOut.write(");\n\n")
 
-        self.fOut.write("%factory(OpenMM::TabulatedFunction* OpenMM_XmlSerializer__deserializeTabulatedFunction")
+        self.fOut.write("%factory(OpenMM::TabulatedFunction* OpenMM_XmlSerializer__loadTabulatedFunction")
         for name in sorted(tabulatedFunctionSubclassList):
             self.fOut.write(",\n         OpenMM::%s" % name)
         self.fOut.write(");\n\n")
@@ -97,6 +97,9 @@ SKIP_METHODS = [('State', 'getPositions'),
                 ('IntegrateDrudeSCFStepKernel',),
                 ('XmlSerializer',  'serialize'),
                 ('XmlSerializer',  'deserialize'),
+                ('XmlSerializer',  'deserializeIncrementally'),
+                ('BinarySerializer',  'serialize'),
+                ('BinarySerializer',  'deserialize'),
                 ("NoseHooverIntegrator", "getAllThermostatedIndividualParticles"),
                 ("NoseHooverIntegrator", "getAllThermostatedPairs"),
                 ("PythonForce", "PythonForce"),
@@ -229,7 +229,394 @@ Parameters:
   %}
 }
 
+%extend OpenMM::HarmonicBondForce {
+  %pythoncode %{
+    def addBonds(self, particles, length, k):
+        """Add many bonds to the force at once.  This is equivalent to calling addBond() for each one,
+        but much faster.
+
+        Parameters
+        ----------
+        particles : array
+            an array of shape (n, 2) containing the indices of the two particles connected by each bond
+        length : array
+            the equilibrium length of each bond, measured in nm
+        k : array
+            the harmonic force constant for each bond, measured in kJ/mol/nm^2
+
+        Returns
+        -------
+        int
+            the index of the first bond that was added
+        """
+        particles = _toBulkArray(particles, numpy.int32, 2)
+        length = _toBulkArray(length, numpy.float64)
+        k = _toBulkArray(k, numpy.float64)
+        numBonds = _checkBulkLengths(particles, length, k)
+        first = self.getNumBonds()
+        self._addBonds(numBonds, particles, length, k)
+        return first
+
+    def getAllBondParameters(self):
+        """Get the parameters of every bond in the force at once.
+
+        Returns
+        -------
+        particles : array
+            an array of shape (n, 2) containing the indices of the two particles connected by each bond
+        length : array
+            the equilibrium length of each bond
+        k : array
+            the harmonic force constant for each bond
+        """
+        numBonds = self.getNumBonds()
+        particles = numpy.empty((numBonds, 2), numpy.int32)
+        length = numpy.empty(numBonds, numpy.float64)
+        k = numpy.empty(numBonds, numpy.float64)
+        self._getAllBondParameters(particles, length, k)
+        return particles, length*unit.nanometer, k*unit.kilojoule_per_mole/(unit.nanometer*unit.nanometer)
+  %}
+
+  PyObject* _addBonds(int numBonds, PyObject* particles, PyObject* length, PyObject* k) {
+      int* p = (int*) getNumpyArrayData(particles, NPY_INT32, 2*numBonds, false);
+      if (p == NULL) return NULL;
+      double* l = (double*) getNumpyArrayData(length, NPY_DOUBLE, numBonds, false);
+      if (l == NULL) return NULL;
+      double* kb = (double*) getNumpyArrayData(k, NPY_DOUBLE, numBonds, false);
+      if (kb == NULL) return NULL;
+      for (int i = 0; i < numBonds; i++)
+          self->addBond(p[2*i], p[2*i+1], l[i], kb[i]);
+      Py_RETURN_NONE;
+  }
+
+  PyObject* _getAllBondParameters(PyObject* particles, PyObject* length, PyObject* k) {
+      int numBonds = self->getNumBonds();
+      int* p = (int*) getNumpyArrayData(particles, NPY_INT32, 2*numBonds, true);
+      if (p == NULL) return NULL;
+      double* l = (double*) getNumpyArrayData(length, NPY_DOUBLE, numBonds, true);
+      if (l == NULL) return NULL;
+      double* kb = (double*) getNumpyArrayData(k, NPY_DOUBLE, numBonds, true);
+      if (kb == NULL) return NULL;
+      for (int i = 0; i < numBonds; i++)
+          self->getBondParameters(i, p[2*i], p[2*i+1], l[i], kb[i]);
+      Py_RETURN_NONE;
+  }
+}
+
+%extend OpenMM::HarmonicAngleForce {
+  %pythoncode %{
+    def addAngles(self, particles, angle, k):
+        """Add many angles to the force at once.  This is equivalent to calling addAngle() for each one,
+        but much faster.
+
+        Parameters
+        ----------
+        particles : array
+            an array of shape (n, 3) containing the indices of the three particles forming each angle
+        angle : array
+            the equilibrium angle of each term, measured in radians
+        k : array
+            the harmonic force constant for each angle, measured in kJ/mol/radian^2
+
+        Returns
+        -------
+        int
+            the index of the first angle that was added
+        """
+        particles = _toBulkArray(particles, numpy.int32, 3)
+        angle = _toBulkArray(angle, numpy.float64)
+        k = _toBulkArray(k, numpy.float64)
+        numAngles = _checkBulkLengths(particles, angle, k)
+        first = self.getNumAngles()
+        self._addAngles(numAngles, particles, angle, k)
+        return first
+
+    def getAllAngleParameters(self):
+        """Get the parameters of every angle in the force at once.
+
+        Returns
+        -------
+        particles : array
+            an array of shape (n, 3) containing the indices of the three particles forming each angle
+        angle : array
+            the equilibrium angle of each term
+        k : array
+            the harmonic force constant for each angle
+        """
+        numAngles = self.getNumAngles()
+        particles = numpy.empty((numAngles, 3), numpy.int32)
+        angle = numpy.empty(numAngles, numpy.float64)
+        k = numpy.empty(numAngles, numpy.float64)
+        self._getAllAngleParameters(particles, angle, k)
+        return particles, angle*unit.radian, k*unit.kilojoule_per_mole/(unit.radian*unit.radian)
+  %}
+
+  PyObject* _addAngles(int numAngles, PyObject* particles, PyObject* angle, PyObject* k) {
+      int* p = (int*) getNumpyArrayData(particles, NPY_INT32, 3*numAngles, false);
+      if (p == NULL) return NULL;
+      double* a = (double*) getNumpyArrayData(angle, NPY_DOUBLE, numAngles, false);
+      if (a == NULL) return NULL;
+      double* ka = (double*) getNumpyArrayData(k, NPY_DOUBLE, numAngles, false);
+      if (ka == NULL) return NULL;
+      for (int i = 0; i < numAngles; i++)
+          self->addAngle(p[3*i], p[3*i+1], p[3*i+2], a[i], ka[i]);
+      Py_RETURN_NONE;
+  }
+
+  PyObject* _getAllAngleParameters(PyObject* particles, PyObject* angle, PyObject* k) {
+      int numAngles = self->getNumAngles();
+      int* p = (int*) getNumpyArrayData(particles, NPY_INT32, 3*numAngles, true);
+      if (p == NULL) return NULL;
+      double* a = (double*) getNumpyArrayData(angle, NPY_DOUBLE, numAngles, true);
+      if (a == NULL) return NULL;
+      double* ka = (double*) getNumpyArrayData(k, NPY_DOUBLE, numAngles, true);
+      if (ka == NULL) return NULL;
+      for (int i = 0; i < numAngles; i++)
+          self->getAngleParameters(i, p[3*i], p[3*i+1], p[3*i+2], a[i], ka[i]);
+      Py_RETURN_NONE;
+  }
+}
+
+%extend OpenMM::PeriodicTorsionForce {
+  %pythoncode %{
+    def addTorsions(self, particles, periodicity, phase, k):
+        """Add many torsions to the force at once.  This is equivalent to calling addTorsion() for each one,
+        but much faster.
+
+        Parameters
+        ----------
+        particles : array
+            an array of shape (n, 4) containing the indices of the four particles forming each torsion
+        periodicity : array
+            the periodicity of each torsion
+        phase : array
+            the phase offset of each torsion, measured in radians
+        k : array
+            the force constant for each torsion, measured in kJ/mol
+
+        Returns
+        -------
+        int
+            the index of the first torsion that was added
+        """
+        particles = _toBulkArray(particles, numpy.int32, 4)
+        periodicity = _toBulkArray(periodicity, numpy.int32)
+        phase = _toBulkArray(phase, numpy.float64)
+        k = _toBulkArray(k, numpy.float64)
+        numTorsions = _checkBulkLengths(particles, periodicity, phase, k)
+        first = self.getNumTorsions()
+        self._addTorsions(numTorsions, particles, periodicity, phase, k)
+        return first
+
+    def getAllTorsionParameters(self):
+        """Get the parameters of every torsion in the force at once.
+
+        Returns
+        -------
+        particles : array
+            an array of shape (n, 4) containing the indices of the four particles forming each torsion
+        periodicity : array
+            the periodicity of each torsion
+        phase : array
+            the phase offset of each torsion
+        k : array
+            the force constant for each torsion
+        """
+        numTorsions = self.getNumTorsions()
+        particles = numpy.empty((numTorsions, 4), numpy.int32)
+        periodicity = numpy.empty(numTorsions, numpy.int32)
+        phase = numpy.empty(numTorsions, numpy.float64)
+        k = numpy.empty(numTorsions, numpy.float64)
+        self._getAllTorsionParameters(particles, periodicity, phase, k)
+        return particles, periodicity, phase*unit.radian, k*unit.kilojoule_per_mole
+  %}
+
+  PyObject* _addTorsions(int numTorsions, PyObject* particles, PyObject* periodicity, PyObject* phase, PyObject* k) {
+      int* p = (int*) getNumpyArrayData(particles, NPY_INT32, 4*numTorsions, false);
+      if (p == NULL) return NULL;
+      int* n = (int*) getNumpyArrayData(periodicity, NPY_INT32, numTorsions, false);
+      if (n == NULL) return NULL;
+      double* ph = (double*) getNumpyArrayData(phase, NPY_DOUBLE, numTorsions, false);
+      if (ph == NULL) return NULL;
+      double* kt = (double*) getNumpyArrayData(k, NPY_DOUBLE, numTorsions, false);
+      if (kt == NULL) return NULL;
+      for (int i = 0; i < numTorsions; i++)
+          self->addTorsion(p[4*i], p[4*i+1], p[4*i+2], p[4*i+3], n[i], ph[i], kt[i]);
+      Py_RETURN_NONE;
+  }
+
+  PyObject* _getAllTorsionParameters(PyObject* particles, PyObject* periodicity, PyObject* phase, PyObject* k) {
+      int numTorsions = self->getNumTorsions();
+      int* p = (int*) getNumpyArrayData(particles, NPY_INT32, 4*numTorsions, true);
+      if (p == NULL) return NULL;
+      int* n = (int*) getNumpyArrayData(periodicity, NPY_INT32, numTorsions, true);
+      if (n == NULL) return NULL;
+      double* ph = (double*) getNumpyArrayData(phase, NPY_DOUBLE, numTorsions, true);
+      if (ph == NULL) return NULL;
+      double* kt = (double*) getNumpyArrayData(k, NPY_DOUBLE, numTorsions, true);
+      if (kt == NULL) return NULL;
+      for (int i = 0; i < numTorsions; i++)
+          self->getTorsionParameters(i, p[4*i], p[4*i+1], p[4*i+2], p[4*i+3], n[i], ph[i], kt[i]);
+      Py_RETURN_NONE;
+  }
+}
+
 %extend OpenMM::NonbondedForce {
+  %pythoncode %{
+    def addParticles(self, charge, sigma, epsilon):
+        """Add many particles to the force at once.  This is equivalent to calling addParticle() for each one,
+        but much faster.
+
+        Parameters
+        ----------
+        charge : array
+            the charge of each particle, measured in units of the proton charge
+        sigma : array
+            the sigma parameter of the Lennard-Jones potential for each particle, measured in nm
+        epsilon : array
+            the epsilon parameter of the Lennard-Jones potential for each particle, measured in kJ/mol
+
+        Returns
+        -------
+        int
+            the index of the first particle that was added
+        """
+        charge = _toBulkArray(charge, numpy.float64)
+        sigma = _toBulkArray(sigma, numpy.float64)
+        epsilon = _toBulkArray(epsilon, numpy.float64)
+        numParticles = _checkBulkLengths(charge, sigma, epsilon)
+        first = self.getNumParticles()
+        self._addParticles(numParticles, charge, sigma, epsilon)
+        return first
+
+    def getAllParticleParameters(self):
+        """Get the nonbonded parameters of every particle at once.
+
+        Returns
+        -------
+        charge : array
+            the charge of each particle
+        sigma : array
+            the sigma parameter of the Lennard-Jones potential for each particle
+        epsilon : array
+            the epsilon parameter of the Lennard-Jones potential for each particle
+        """
+        numParticles = self.getNumParticles()
+        charge = numpy.empty(numParticles, numpy.float64)
+        sigma = numpy.empty(numParticles, numpy.float64)
+        epsilon = numpy.empty(numParticles, numpy.float64)
+        self._getAllParticleParameters(charge, sigma, epsilon)
+        return charge*unit.elementary_charge, sigma*unit.nanometer, epsilon*unit.kilojoule_per_mole
+
+    def addExceptions(self, particles, chargeProd, sigma, epsilon, replace=False):
+        """Add many exceptions to the force at once.  This is equivalent to calling addException() for each one,
+        but much faster.
+
+        Parameters
+        ----------
+        particles : array
+            an array of shape (n, 2) containing the indices of the two particles involved in each exception
+        chargeProd : array
+            the scaled product of the atomic charges for each exception, measured in units of the proton charge squared
+        sigma : array
+            the sigma parameter of the Lennard-Jones potential for each exception, measured in nm
+        epsilon : array
+            the epsilon parameter of the Lennard-Jones potential for each exception, measured in kJ/mol
+        replace : bool=False
+            determines the behavior if there is already an exception for the same two particles.  If true,
+            the existing one is replaced.  If false, an exception is thrown.
+
+        Returns
+        -------
+        int
+            the index of the first exception that was added
+        """
+        particles = _toBulkArray(particles, numpy.int32, 2)
+        chargeProd = _toBulkArray(chargeProd, numpy.float64)
+        sigma = _toBulkArray(sigma, numpy.float64)
+        epsilon = _toBulkArray(epsilon, numpy.float64)
+        numExceptions = _checkBulkLengths(particles, chargeProd, sigma, epsilon)
+        first = self.getNumExceptions()
+        self._addExceptions(numExceptions, particles, chargeProd, sigma, epsilon, replace)
+        return first
+
+    def getAllExceptionParameters(self):
+        """Get the parameters of every exception at once.
+
+        Returns
+        -------
+        particles : array
+            an array of shape (n, 2) containing the indices of the two particles involved in each exception
+        chargeProd : array
+            the scaled product of the atomic charges for each exception
+        sigma : array
+            the sigma parameter of the Lennard-Jones potential for each exception
+        epsilon : array
+            the epsilon parameter of the Lennard-Jones potential for each exception
+        """
+        numExceptions = self.getNumExceptions()
+        particles = numpy.empty((numExceptions, 2), numpy.int32)
+        chargeProd = numpy.empty(numExceptions, numpy.float64)
+        sigma = numpy.empty(numExceptions, numpy.float64)
+        epsilon = numpy.empty(numExceptions, numpy.float64)
+        self._getAllExceptionParameters(particles, chargeProd, sigma, epsilon)
+        return particles, chargeProd*unit.elementary_charge**2, sigma*unit.nanometer, epsilon*unit.kilojoule_per_mole
+  %}
+
+  PyObject* _addParticles(int numParticles, PyObject* charge, PyObject* sigma, PyObject* epsilon) {
+      double* q = (double*) getNumpyArrayData(charge, NPY_DOUBLE, numParticles, false);
+      if (q == NULL) return NULL;
+      double* s = (double*) getNumpyArrayData(sigma, NPY_DOUBLE, numParticles, false);
+      if (s == NULL) return NULL;
+      double* e = (double*) getNumpyArrayData(epsilon, NPY_DOUBLE, numParticles, false);
+      if (e == NULL) return NULL;
+      for (int i = 0; i < numParticles; i++)
+          self->addParticle(q[i], s[i], e[i]);
+      Py_RETURN_NONE;
+  }
+
+  PyObject* _getAllParticleParameters(PyObject* charge, PyObject* sigma, PyObject* epsilon) {
+      int numParticles = self->getNumParticles();
+      double* q = (double*) getNumpyArrayData(charge, NPY_DOUBLE, numParticles, true);
+      if (q == NULL) return NULL;
+      double* s = (double*) getNumpyArrayData(sigma, NPY_DOUBLE, numParticles, true);
+      if (s == NULL) return NULL;
+      double* e = (double*) getNumpyArrayData(epsilon, NPY_DOUBLE, numParticles, true);
+      if (e == NULL) return NULL;
+      for (int i = 0; i < numParticles; i++)
+          self->getParticleParameters(i, q[i], s[i], e[i]);
+      Py_RETURN_NONE;
+  }
+
+  PyObject* _addExceptions(int numExceptions, PyObject* particles, PyObject* chargeProd, PyObject* sigma, PyObject* epsilon, bool replace) {
+      int* p = (int*) getNumpyArrayData(particles, NPY_INT32, 2*numExceptions, false);
+      if (p == NULL) return NULL;
+      double* q = (double*) getNumpyArrayData(chargeProd, NPY_DOUBLE, numExceptions, false);
+      if (q == NULL) return NULL;
+      double* s = (double*) getNumpyArrayData(sigma, NPY_DOUBLE, numExceptions, false);
+      if (s == NULL) return NULL;
+      double* e = (double*) getNumpyArrayData(epsilon, NPY_DOUBLE, numExceptions, false);
+      if (e == NULL) return NULL;
+      for (int i = 0; i < numExceptions; i++)
+          self->addException(p[2*i], p[2*i+1], q[i], s[i], e[i], replace);
+      Py_RETURN_NONE;
+  }
+
+  PyObject* _getAllExceptionParameters(PyObject* particles, PyObject* chargeProd, PyObject* sigma, PyObject* epsilon) {
+      int numExceptions = self->getNumExceptions();
+      int* p = (int*) getNumpyArrayData(particles, NPY_INT32, 2*numExceptions, true);
+      if (p == NULL) return NULL;
+      double* q = (double*) getNumpyArrayData(chargeProd, NPY_DOUBLE, numExceptions, true);
+      if (q == NULL) return NULL;
+      double* s = (double*) getNumpyArrayData(sigma, NPY_DOUBLE, numExceptions, true);
+      if (s == NULL) return NULL;
+      double* e = (double*) getNumpyArrayData(epsilon, NPY_DOUBLE, numExceptions, true);
+      if (e == NULL) return NULL;
+      for (int i = 0; i < numExceptions; i++)
+          self->getExceptionParameters(i, p[2*i], p[2*i+1], q[i], s[i], e[i]);
+      Py_RETURN_NONE;
+  }
+
   %pythoncode %{
     def addParticle_usingRVdw(self, charge, rVDW, epsilon):
         """Add particle using elemetrary charge.  Rvdw and epsilon,
@@ -257,11 +644,13 @@ Parameters:
 %extend OpenMM::System {
   %pythoncode %{
     def __getstate__(self):
-        serializationString = XmlSerializer.serializeSystem(self)
-        return serializationString
+        return BinarySerializer.serialize(self)
 
     def __setstate__(self, serializationString):
-        system = XmlSerializer.deserializeSystem(serializationString)
+        if BinarySerializer.isBinary(serializationString):
+            system = BinarySerializer.deserialize(serializationString)
+        else:
+            system = XmlSerializer.deserializeSystem(serializationString)
         self.this = system.this
     def __deepcopy__(self, memo):
         return self.__copy__()
@@ -271,7 +660,7 @@ Parameters:
   %}
   %newobject __copy__;
   OpenMM::System* __copy__() {
-      return OpenMM::XmlSerializer::clone<OpenMM::System>(*self);
+      return OpenMM::BinarySerializer::clone<OpenMM::System>(*self);
   }
 }
 
@@ -368,6 +757,111 @@ Parameters:
       return OpenMM::XmlSerializer::clone<OpenMM::State>(*object);
   }
 
+  %newobject _loadSystem;
+  static OpenMM::System* _loadSystem(PyObject* file, std::string prefix) {
+      OpenMM::PythonFileInputBuffer buffer(file, prefix);
+      std::istream stream(&buffer);
+      try {
+          return OpenMM::XmlSerializer::deserializeIncrementally<OpenMM::System>(stream);
+      }
+      catch (...) {
+          buffer.checkError();
+          throw;
+      }
+  }
+
+  static void _saveSystem(const OpenMM::System* object, PyObject* file) {
+      OpenMM::PythonFileOutputBuffer buffer(file);
+      std::ostream stream(&buffer);
+      OpenMM::XmlSerializer::serialize<OpenMM::System>(object, "System", stream);
+      stream.flush();
+      buffer.checkError();
+  }
+
+  %newobject _loadForce;
+  static OpenMM::Force* _loadForce(PyObject* file, std::string prefix) {
+      OpenMM::PythonFileInputBuffer buffer(file, prefix);
+      std::istream stream(&buffer);
+      try {
+          return OpenMM::XmlSerializer::deserializeIncrementally<OpenMM::Force>(stream);
+      }
+      catch (...) {
+          buffer.checkError();
+          throw;
+      }
+  }
+
+  static void _saveForce(const OpenMM::Force* object, PyObject* file) {
+      OpenMM::PythonFileOutputBuffer buffer(file);
+      std::ostream stream(&buffer);
+      OpenMM::XmlSerializer::serialize<OpenMM::Force>(object, "Force", stream);
+      stream.flush();
+      buffer.checkError();
+  }
+
+  %newobject _loadIntegrator;
+  static OpenMM::Integrator* _loadIntegrator(PyObject* file, std::string prefix) {
+      OpenMM::PythonFileInputBuffer buffer(file, prefix);
+      std::istream stream(&buffer);
+      try {
+          return OpenMM::XmlSerializer::deserializeIncrementally<OpenMM::Integrator>(stream);
+      }
+      catch (...) {
+          buffer.checkError();
+          throw;
+      }
+  }
+
+  static void _saveIntegrator(const OpenMM::Integrator* object, PyObject* file) {
+      OpenMM::PythonFileOutputBuffer buffer(file);
+      std::ostream stream(&buffer);
+      OpenMM::XmlSerializer::serialize<OpenMM::Integrator>(object, "Integrator", stream);
+      stream.flush();
+      buffer.checkError();
+  }
+
+  %newobject _loadTabulatedFunction;
+  static OpenMM::TabulatedFunction* _loadTabulatedFunction(PyObject* file, std::string prefix) {
+      OpenMM::PythonFileInputBuffer buffer(file, prefix);
+      std::istream stream(&buffer);
+      try {
+          return OpenMM::XmlSerializer::deserializeIncrementally<OpenMM::TabulatedFunction>(stream);
+      }
+      catch (...) {
+          buffer.checkError();
+          throw;
+      }
+  }
+
+  static void _saveTabulatedFunction(const OpenMM::TabulatedFunction* object, PyObject* file) {
+      OpenMM::PythonFileOutputBuffer buffer(file);
+      std::ostream stream(&buffer);
+      OpenMM::XmlSerializer::serialize<OpenMM::TabulatedFunction>(object, "TabulatedFunction", stream);
+      stream.flush();
+      buffer.checkError();
+  }
+
+  %newobject _loadState;
+  static OpenMM::State* _loadState(PyObject* file, std::string prefix) {
+      OpenMM::PythonFileInputBuffer buffer(file, prefix);
+      std::istream stream(&buffer);
+      try {
+          return OpenMM::XmlSerializer::deserializeIncrementally<OpenMM::State>(stream);
+      }
+      catch (...) {
+          buffer.checkError();
+          throw;
+      }
+  }
+
+  static void _saveState(const OpenMM::State* object, PyObject* file) {
+      OpenMM::PythonFileOutputBuffer buffer(file);
+      std::ostream stream(&buffer);
+      OpenMM::XmlSerializer::serialize<OpenMM::State>(object, "State", stream);
+      stream.flush();
+      buffer.checkError();
+  }
+
   %pythoncode %{
     @staticmethod
     def serialize(object):
@@ -420,6 +914,257 @@ Parameters:
       elif isinstance(object, TabulatedFunction):
         return XmlSerializer._cloneTabulatedFunction(object)
       raise ValueError("Unsupported object type")
+
+    @staticmethod
+    def save(object, file, compress=None):
+      """Serialize an object as XML and write it to a file.  Unlike serialize(), this writes the XML as it is
+         generated instead of first building a string that contains the whole document.
+
+      Parameters
+      ----------
+      object : System, Force, Integrator, State, or TabulatedFunction
+          the object to serialize
+      file : str or file
+          the path of the file to write, or a file object to write to
+      compress : bool or None
+          if True, the output is compressed with gzip.  If None, it is compressed only if file is a path that
+          ends in ".gz".
+      """
+      import gzip
+      import io
+      if isinstance(file, str):
+        if compress is None:
+          compress = file.endswith('.gz')
+        with open(file, 'wb') as f:
+          XmlSerializer.save(object, f, compress)
+        return
+      if compress:
+        with gzip.GzipFile(fileobj=file, mode='wb') as f:
+          XmlSerializer.save(object, f, False)
+        return
+      if isinstance(file, io.TextIOBase):
+        file.write(XmlSerializer.serialize(object))
+      elif isinstance(object, System):
+        XmlSerializer._saveSystem(object, file)
+      elif isinstance(object, Force):
+        XmlSerializer._saveForce(object, file)
+      elif isinstance(object, Integrator):
+        XmlSerializer._saveIntegrator(object, file)
+      elif isinstance(object, State):
+        XmlSerializer._saveState(object, file)
+      elif isinstance(object, TabulatedFunction):
+        XmlSerializer._saveTabulatedFunction(object, file)
+      else:
+        raise ValueError("Unsupported object type")
+
+    @staticmethod
+    def load(file):
+      """Reconstruct an object that has been serialized as XML, reading it from a file.  Unlike deserialize(),
+         this reads the XML incrementally and never holds the whole document in memory.  When loading a System,
+         each Force is created as soon as it has been read, which greatly reduces the memory needed to load
+         very large Systems.  Files compressed with gzip are decompressed automatically.
+
+      Parameters
+      ----------
+      file : str or file
+          the path of the file to read, or a file object to read from
+      """
+      import gzip
+      import re
+      if isinstance(file, str):
+        with open(file, 'rb') as f:
+          return XmlSerializer.load(f)
+      if XmlSerializer._isCompressed(file):
+        with gzip.GzipFile(fileobj=file, mode='rb') as f:
+          return XmlSerializer.load(f)
+
+      # Read enough of the file to find the root element, which tells us what type of object it contains.
+
+      prefix = b''
+      match = None
+      while match is None:
+        data = file.read(4096)
+        if isinstance(data, str):
+          data = data.encode('utf-8')
+        if len(data) == 0:
+          raise ValueError("Invalid input file")
+        prefix += data
+        match = re.search(rb"<([^?!/\s][^\s/>]*)[\s/>]", re.sub(rb"<!--.*?(-->|$)", b"", prefix, flags=re.DOTALL))
+      type = match.groups()[0].decode()
+      if type == "System":
+        return XmlSerializer._loadSystem(file, prefix)
+      if type == "Force":
+        return XmlSerializer._loadForce(file, prefix)
+      if type == "Integrator":
+        return XmlSerializer._loadIntegrator(file, prefix)
+      if type == "State":
+        return XmlSerializer._loadState(file, prefix)
+      if type == "TabulatedFunction":
+        return XmlSerializer._loadTabulatedFunction(file, prefix)
+      raise ValueError("Unsupported object type")
+
+    @staticmethod
+    def _isCompressed(file):
+      """Get whether a file object contains data compressed with gzip, without consuming any of it."""
+      if hasattr(file, 'peek'):
+        return file.peek(2)[:2] == b'\x1f\x8b'
+      if file.seekable():
+        position = file.tell()
+        start = file.read(2)
+        file.seek(position)
+        return start == b'\x1f\x8b'
+      return False
+  %}
+}
+
+%extend OpenMM::BinarySerializer {
+  static PyObject* _serializeSystem(const OpenMM::System* object) {
+      std::stringstream ss(std::ios_base::out | std::ios_base::binary);
+      OpenMM::BinarySerializer::serialize<OpenMM::System>(object, "System", ss);
+      std::string data = ss.str();
+      return PyBytes_FromStringAndSize(data.c_str(), data.size());
+  }
+
+  %newobject _deserializeSystem;
+  static OpenMM::System* _deserializeSystem(std::string data) {
+      std::stringstream ss(data, std::ios_base::in | std::ios_base::binary);
+      return OpenMM::BinarySerializer::deserialize<OpenMM::System>(ss);
+  }
+
+  %newobject _cloneSystem;
+  static OpenMM::System* _cloneSystem(const OpenMM::System* object) {
+      return OpenMM::BinarySerializer::clone<OpenMM::System>(*object);
+  }
+
+  static PyObject* _serializeForce(const OpenMM::Force* object) {
+      std::stringstream ss(std::ios_base::out | std::ios_base::binary);
+      OpenMM::BinarySerializer::serialize<OpenMM::Force>(object, "Force", ss);
+      std::string data = ss.str();
+      return PyBytes_FromStringAndSize(data.c_str(), data.size());
+  }
+
+  %newobject _deserializeForce;
+  static OpenMM::Force* _deserializeForce(std::string data) {
+      std::stringstream ss(data, std::ios_base::in | std::ios_base::binary);
+      return OpenMM::BinarySerializer::deserialize<OpenMM::Force>(ss);
+  }
+
+  %newobject _cloneForce;
+  static OpenMM::Force* _cloneForce(const OpenMM::Force* object) {
+      return OpenMM::BinarySerializer::clone<OpenMM::Force>(*object);
+  }
+
+  static PyObject* _serializeIntegrator(const OpenMM::Integrator* object) {
+      std::stringstream ss(std::ios_base::out | std::ios_base::binary);
+      OpenMM::BinarySerializer::serialize<OpenMM::Integrator>(object, "Integrator", ss);
+      std::string data = ss.str();
+      return PyBytes_FromStringAndSize(data.c_str(), data.size());
+  }
+
+  %newobject _deserializeIntegrator;
+  static OpenMM::Integrator* _deserializeIntegrator(std::string data) {
+      std::stringstream ss(data, std::ios_base::in | std::ios_base::binary);
+      return OpenMM::BinarySerializer::deserialize<OpenMM::Integrator>(ss);
+  }
+
+  %newobject _cloneIntegrator;
+  static OpenMM::Integrator* _cloneIntegrator(const OpenMM::Integrator* object) {
+      return OpenMM::BinarySerializer::clone<OpenMM::Integrator>(*object);
+  }
+
+  static PyObject* _serializeState(const OpenMM::State* object) {
+      std::stringstream ss(std::ios_base::out | std::ios_base::binary);
+      OpenMM::BinarySerializer::serialize<OpenMM::State>(object, "State", ss);
+      std::string data = ss.str();
+      return PyBytes_FromStringAndSize(data.c_str(), data.size());
+  }
+
+  %newobject _deserializeState;
+  static OpenMM::State* _deserializeState(std::string data) {
+      std::stringstream ss(data, std::ios_base::in | std::ios_base::binary);
+      return OpenMM::BinarySerializer::deserialize<OpenMM::State>(ss);
+  }
+
+  %newobject _cloneState;
+  static OpenMM::State* _cloneState(const OpenMM::State* object) {
+      return OpenMM::BinarySerializer::clone<OpenMM::State>(*object);
+  }
+
+  static PyObject* _serializeTabulatedFunction(const OpenMM::TabulatedFunction* object) {
+      std::stringstream ss(std::ios_base::out | std::ios_base::binary);
+      OpenMM::BinarySerializer::serialize<OpenMM::TabulatedFunction>(object, "TabulatedFunction", ss);
+      std::string data = ss.str();
+      return PyBytes_FromStringAndSize(data.c_str(), data.size());
+  }
+
+  %newobject _deserializeTabulatedFunction;
+  static OpenMM::TabulatedFunction* _deserializeTabulatedFunction(std::string data) {
+      std::stringstream ss(data, std::ios_base::in | std::ios_base::binary);
+      return OpenMM::BinarySerializer::deserialize<OpenMM::TabulatedFunction>(ss);
+  }
+
+  %newobject _cloneTabulatedFunction;
+  static OpenMM::TabulatedFunction* _cloneTabulatedFunction(const OpenMM::TabulatedFunction* object) {
+      return OpenMM::BinarySerializer::clone<OpenMM::TabulatedFunction>(*object);
+  }
+
+  %pythoncode %{
+    @staticmethod
+    def serialize(object):
+      """Serialize an object in OpenMM's binary format.  The result is a bytes object."""
+      if isinstance(object, System):
+        return BinarySerializer._serializeSystem(object)
+      elif isinstance(object, Force):
+        return BinarySerializer._serializeForce(object)
+      elif isinstance(object, Integrator):
+        return BinarySerializer._serializeIntegrator(object)
+      elif isinstance(object, State):
+        return BinarySerializer._serializeState(object)
+      elif isinstance(object, TabulatedFunction):
+        return BinarySerializer._serializeTabulatedFunction(object)
+      raise ValueError("Unsupported object type")
+
+    @staticmethod
+    def isBinary(data):
+      """Get whether a bytes object contains data in OpenMM's binary format, as opposed to XML."""
+      return isinstance(data, bytes) and data[:4] == b'OMMB'
+
+    @staticmethod
+    def deserialize(data):
+      """Reconstruct an object that has been serialized in OpenMM's binary format."""
+      import struct
+      if not BinarySerializer.isBinary(data) or len(data) < 12:
+        raise ValueError("Invalid input data")
+      # The name of the root node immediately follows the four byte signature and the version.
+      length, = struct.unpack_from('<I', data, 8)
+      type = data[12:12+length].decode()
+      if type == "System":
+        return BinarySerializer._deserializeSystem(data)
+      if type == "Force":
+        return BinarySerializer._deserializeForce(data)
+      if type == "Integrator":
+        return BinarySerializer._deserializeIntegrator(data)
+      if type == "State":
+        return BinarySerializer._deserializeState(data)
+      if type == "TabulatedFunction":
+        return BinarySerializer._deserializeTabulatedFunction(data)
+      raise ValueError("Unsupported object type")
+
+    @staticmethod
+    def clone(object):
+      """Clone an object by first serializing it, then deserializing it again.  This method constructs the
+         new object directly from the SerializationNodes without first encoding them."""
+      if isinstance(object, System):
+        return BinarySerializer._cloneSystem(object)
+      elif isinstance(object, Force):
+        return BinarySerializer._cloneForce(object)
+      elif isinstance(object, Integrator):
+        return BinarySerializer._cloneIntegrator(object)
+      elif isinstance(object, State):
+        return BinarySerializer._cloneState(object)
+      elif isinstance(object, TabulatedFunction):
+        return BinarySerializer._cloneTabulatedFunction(object)
+      raise ValueError("Unsupported object type")
   %}
 }
 
@@ -434,18 +1179,20 @@ Parameters:
 %extend OpenMM::Force {
   %pythoncode %{
     def __getstate__(self):
-        serializationString = XmlSerializer.serialize(self)
-        return serializationString
+        return BinarySerializer.serialize(self)
 
     def __setstate__(self, serializationString):
-        system = XmlSerializer.deserialize(serializationString)
+        if BinarySerializer.isBinary(serializationString):
+            system = BinarySerializer.deserialize(serializationString)
+        else:
+            system = XmlSerializer.deserialize(serializationString)
         self.this = system.this
 
     def __deepcopy__(self, memo):
         return self.__copy__()
 
     def __copy__(self):
-      duplicate = XmlSerializer.clone(self)
+      duplicate = BinarySerializer.clone(self)
       duplicate.__class__ = self.__class__
       attributes = {key: value for key, value in self.__dict__.items() if key != 'this'}
       from copy import deepcopy
@@ -457,18 +1204,20 @@ Parameters:
 %extend OpenMM::Integrator {
   %pythoncode %{
     def __getstate__(self):
-        serializationString = XmlSerializer.serialize(self)
-        return serializationString
+        return BinarySerializer.serialize(self)
 
     def __setstate__(self, serializationString):
-        system = XmlSerializer.deserialize(serializationString)
+        if BinarySerializer.isBinary(serializationString):
+            system = BinarySerializer.deserialize(serializationString)
+        else:
+            system = XmlSerializer.deserialize(serializationString)
         self.this = system.this
 
     def __deepcopy__(self, memo):
         return self.__copy__()
 
     def __copy__(self):
-      duplicate = XmlSerializer.clone(self)
+      duplicate = BinarySerializer.clone(self)
       duplicate.__class__ = self.__class__
       attributes = {key: value for key, value in self.__dict__.items() if key != 'this'}
       from copy import deepcopy
@@ -480,29 +1229,33 @@ Parameters:
 %extend OpenMM::TabulatedFunction {
   %pythoncode %{
     def __getstate__(self):
-        serializationString = XmlSerializer.serialize(self)
-        return serializationString
+        return BinarySerializer.serialize(self)
 
     def __setstate__(self, serializationString):
-        system = XmlSerializer.deserialize(serializationString)
+        if BinarySerializer.isBinary(serializationString):
+            system = BinarySerializer.deserialize(serializationString)
+        else:
+            system = XmlSerializer.deserialize(serializationString)
         self.this = system.this
 
     def __deepcopy__(self, memo):
         return self.__copy__()
 
     def __copy__(self):
-        return XmlSerializer.clone(self)
+        return BinarySerializer.clone(self)
   %}
 }
 
 %extend OpenMM::State {
   %pythoncode %{
     def __getstate__(self):
-        serializationString = XmlSerializer.serialize(self)
-        return serializationString
+        return BinarySerializer.serialize(self)
 
     def __setstate__(self, serializationString):
-        system = XmlSerializer.deserialize(serializationString)
+        if BinarySerializer.isBinary(serializationString):
+            system = BinarySerializer.deserialize(serializationString)
+        else:
+            system = XmlSerializer.deserialize(serializationString)
         self.this = system.this
 
     def __deepcopy__(self, memo):
@@ -565,6 +1318,28 @@ Parameters:
         if '_forces' not in dir(self):
             self._forces = self._getVectorAsVec3(State.Forces)*unit.kilojoules_per_mole/unit.nanometer
         return self._forces
+
+    def getPositionsArray(self):
+        """Get the position of each particle as a read-only Numpy array of shape
+           (particles, 3), measured in nanometers.  Unlike getPositions(), this
+           does not copy the data or add units.  The array is a view of the data
+           stored in the State, and the State is kept alive as long as the array
+           exists.  Raises an exception if positions were not requested in the
+           context.getState() call.
+           """
+        return self._getVectorAsView(State.Positions, self)
+
+    def getVelocitiesArray(self):
+        """Get the velocity of each particle as a read-only Numpy array of shape
+           (particles, 3), measured in nm/ps.  See getPositionsArray() for details.
+           """
+        return self._getVectorAsView(State.Velocities, self)
+
+    def getForcesArray(self):
+        """Get the force acting on each particle as a read-only Numpy array of shape
+           (particles, 3), measured in kJ/mol/nm.  See getPositionsArray() for details.
+           """
+        return self._getVectorAsView(State.Forces, self)
   %}
   
   int _getNumParticles() {
@@ -604,8 +1379,41 @@ Parameters:
       memcpy(data, &array[0][0], 3*sizeof(double)*array->size());
   }
 
+  PyObject* _getVectorAsView(State::DataType type, PyObject* owner) {
+      const std::vector<Vec3>* array;
+      if (type == State::Positions)
+          array = &self->getPositions();
+      else if (type == State::Velocities)
+          array = &self->getVelocities();
+      else if (type == State::Forces)
+          array = &self->getForces();
+      else {
+        PyErr_SetString(PyExc_ValueError, "Illegal type specified in _getVectorAsView");
+        return NULL;
+      }
+      if (!isNumpyAvailable()) {
+        PyErr_SetString(PyExc_ImportError, "Numpy is required to create array views");
+        return NULL;
+      }
+
+      // Wrap the State's own storage in a read-only array that holds a reference to the State,
+      // so the data cannot be freed while the array is still in use.
+
+      npy_intp dims[] = {(npy_intp) array->size(), 3};
+      PyObject* view = PyArray_SimpleNewFromData(2, dims, NPY_DOUBLE, (void*) array->data());
+      if (view == NULL)
+          return NULL;
+      PyArray_CLEARFLAGS((PyArrayObject*) view, NPY_ARRAY_WRITEABLE);
+      Py_INCREF(owner);
+      if (PyArray_SetBaseObject((PyArrayObject*) view, owner) != 0) {
+          Py_DECREF(view);
+          return NULL;
+      }
+      return view;
+  }
+
   %newobject __copy__;
   OpenMM::State* __copy__() {
-      return OpenMM::XmlSerializer::clone<OpenMM::State>(*self);
+      return OpenMM::BinarySerializer::clone<OpenMM::State>(*self);
   }
 }
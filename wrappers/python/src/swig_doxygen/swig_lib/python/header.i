@@ -30,6 +30,145 @@ int isNumpyAvailable() {
     return available;
 }
 
+/* Get a pointer to the data of a C contiguous NumPy array with a specified element type and number of
+   elements.  If writable is true, the array must also be writable.  If the object is not such an array,
+   a Python exception is set and NULL is returned. */
+void* getNumpyArrayData(PyObject* obj, int type, int size, bool writable) {
+    if (!isNumpyAvailable() || !PyArray_Check(obj)) {
+        PyErr_SetString(PyExc_TypeError, "Expected a NumPy array");
+        return NULL;
+    }
+    PyArrayObject* array = (PyArrayObject*) obj;
+    if (!PyArray_ISCARRAY_RO(array) || PyArray_TYPE(array) != type) {
+        PyErr_SetString(PyExc_TypeError, "Expected a contiguous NumPy array of the correct type");
+        return NULL;
+    }
+    if (writable && !PyArray_ISWRITEABLE(array)) {
+        PyErr_SetString(PyExc_TypeError, "Expected a writable NumPy array");
+        return NULL;
+    }
+    if (PyArray_SIZE(array) != size) {
+        PyErr_SetString(PyExc_ValueError, "NumPy array has the wrong number of elements");
+        return NULL;
+    }
+    return PyArray_DATA(array);
+}
+
+/* Get the message of the Python exception that is currently set, then clear it. */
+std::string getPythonErrorMessage() {
+#if PY_MAJOR_VERSION == 3 && PY_MINOR_VERSION < 12
+    PyObject *type;
+    PyObject *exception;
+    PyObject *traceback;
+    PyErr_Fetch(&type, &exception, &traceback);
+    PyErr_NormalizeException(&type, &exception, &traceback);
+    Py_XDECREF(type);
+    Py_XDECREF(traceback);
+#else
+    PyObject *exception = PyErr_GetRaisedException();
+#endif
+    std::string result = "Unknown error";
+    PyObject* message = (exception == NULL ? NULL : PyObject_Str(exception));
+    if (message != NULL) {
+        const char* text = PyUnicode_AsUTF8(message);
+        if (text != NULL)
+            result = text;
+        Py_DECREF(message);
+    }
+    Py_XDECREF(exception);
+    PyErr_Clear();
+    return result;
+}
+
+/* A stream buffer that reads from a Python file object.  It first returns a prefix that has already been read
+   from the file, then calls read() to get more data as it is needed.  If reading fails, it reports the end of
+   the stream and records the error so checkError() can report it. */
+class PythonFileInputBuffer : public std::streambuf {
+public:
+    PythonFileInputBuffer(PyObject* file, const std::string& prefix) : file(file), data(prefix) {
+        setg(&data[0], &data[0], &data[0]+data.size());
+    }
+    void checkError() const {
+        if (error.size() > 0)
+            throw OpenMMException(error);
+    }
+protected:
+    int underflow() {
+        if (gptr() < egptr())
+            return traits_type::to_int_type(*gptr());
+        if (error.size() > 0)
+            return traits_type::eof();
+        PyObject* result = PyObject_CallMethod(file, "read", "n", (Py_ssize_t) (1<<20));
+        if (result != NULL && PyUnicode_Check(result)) {
+            PyObject* encoded = PyUnicode_AsUTF8String(result);
+            Py_DECREF(result);
+            result = encoded;
+        }
+        char* bytes;
+        Py_ssize_t length;
+        if (result == NULL || PyBytes_AsStringAndSize(result, &bytes, &length) != 0) {
+            Py_XDECREF(result);
+            error = getPythonErrorMessage();
+            return traits_type::eof();
+        }
+        data.assign(bytes, length);
+        Py_DECREF(result);
+        if (length == 0)
+            return traits_type::eof();
+        setg(&data[0], &data[0], &data[0]+data.size());
+        return traits_type::to_int_type(data[0]);
+    }
+private:
+    PyObject* file;
+    std::string data, error;
+};
+
+/* A stream buffer that writes to a Python file object.  Data is collected in a buffer and passed to the file's
+   write() method whenever the buffer is full or the stream is flushed.  If writing fails, the error is
+   recorded so checkError() can report it. */
+class PythonFileOutputBuffer : public std::streambuf {
+public:
+    PythonFileOutputBuffer(PyObject* file) : file(file), data(1<<20, 0) {
+        setp(&data[0], &data[0]+data.size());
+    }
+    void checkError() const {
+        if (error.size() > 0)
+            throw OpenMMException(error);
+    }
+protected:
+    int overflow(int c) {
+        if (!writeData())
+            return traits_type::eof();
+        if (!traits_type::eq_int_type(c, traits_type::eof())) {
+            *pptr() = traits_type::to_char_type(c);
+            pbump(1);
+        }
+        return traits_type::not_eof(c);
+    }
+    int sync() {
+        return (writeData() ? 0 : -1);
+    }
+private:
+    bool writeData() {
+        if (error.size() > 0)
+            return false;
+        if (pptr() > pbase()) {
+            PyObject* bytes = PyBytes_FromStringAndSize(pbase(), pptr()-pbase());
+            PyObject* result = (bytes == NULL ? NULL : PyObject_CallMethod(file, "write", "O", bytes));
+            Py_XDECREF(bytes);
+            if (result == NULL) {
+                error = getPythonErrorMessage();
+                return false;
+            }
+            Py_DECREF(result);
+        }
+        setp(&data[0], &data[0]+data.size());
+        return true;
+    }
+    PyObject* file;
+    std::string data, error;
+};
+
 } // namespace OpenMM
 %}
 
@@ -20,6 +20,38 @@ else:
 import openmm.unit as unit
 from openmm.vec3 import Vec3
 
+def _toBulkArray(values, dtype, columns=None):
+    """Convert an argument to one of the methods for adding many interactions at once to a contiguous
+    NumPy array.  Units are converted to the MD unit system and stripped."""
+    if unit.is_quantity(values):
+        values = values.value_in_unit_system(unit.md_unit_system)
+    elif len(values) > 0 and unit.is_quantity(values[0]):
+        values = [v.value_in_unit_system(unit.md_unit_system) for v in values]
+    if numpy.issubdtype(dtype, numpy.integer):
+        array = numpy.asarray(values)
+        if array.size > 0:
+            if array.dtype.kind not in 'iu':
+                raise TypeError('Expected an array of integers')
+            limits = numpy.iinfo(dtype)
+            if array.min() < limits.min or array.max() > limits.max:
+                raise ValueError('Integer value out of range')
+    array = numpy.ascontiguousarray(values, dtype=dtype)
+    if columns is None:
+        if array.ndim != 1:
+            raise ValueError('Expected a one dimensional array')
+    elif array.ndim != 2 or array.shape[1] != columns:
+        if array.size == 0:
+            array = array.reshape((0, columns))
+        else:
+            raise ValueError('Expected an array of shape (n, %d)' % columns)
+    return array
+
+def _checkBulkLengths(*arrays):
+    """Verify that all arguments to one of the methods for adding many interactions at once have the same length."""
+    if any(len(a) != len(arrays[0]) for a in arrays):
+        raise ValueError('All arguments must have the same length')
+    return len(arrays[0])
+
 
 %}
 
@@ -28,6 +60,16 @@ from openmm.vec3 import Vec3
     self._integrator = args[1]
 %}
 
+%pythonprepend OpenMM::Context::setState %{
+    try:
+        state = args[0]
+    except (NameError, UnboundLocalError):
+        pass
+    if hasattr(state, 'applyTo'):
+        # This is a ContextSnapshot, such as a replica conformation from ReplicaExchangeSampler.
+        return state.applyTo(self)
+%}
+
 %pythonprepend OpenMM::AmoebaAngleForce::addAngle %{
     try:
         length = args[3]
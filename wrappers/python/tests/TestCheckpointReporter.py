@@ -4,6 +4,7 @@ import tempfile
 from io import BytesIO, StringIO
 from openmm import app
 import openmm as mm
+import numpy as np
 from openmm import unit
 
 
@@ -69,5 +70,60 @@ class TestCheckpointReporter(unittest.TestCase):
         self.simulation.saveState(stateBuffer)
         self.assertSequenceEqual(stateData, stateBuffer.getvalue())
 
+    def testDifferential(self):
+        """Test writing full checkpoints with deltas in between."""
+        for writeState in [True, False]:
+            with tempfile.TemporaryDirectory() as tempdir:
+                dirname = os.path.join(tempdir, 'checkpoints')
+                self.simulation.currentStep = 0
+                self.simulation.reporters.clear()
+                self.simulation.reporters.append(app.CheckpointReporter(dirname, 2, writeState=writeState, fullInterval=6, retain=2))
+                self.simulation.step(18)
+                state = self.simulation.context.getState(positions=True, velocities=True)
+
+                # Full checkpoints were written at steps 2, 8, and 14.  Only the last two should be kept,
+                # each with the newest delta that follows it.
+
+                files = os.listdir(dirname)
+                self.assertEqual(2, len([f for f in files if f.startswith('snapshot')]))
+                self.assertEqual(2, len([f for f in files if f.startswith('delta')]))
+
+                # Reload the state and see if it is restored correctly.
+
+                self.simulation.context.setPositions([mm.Vec3(0, 0, 0)] * len(state.getPositions()))
+                self.simulation.context.setStepCount(0)
+                self.simulation.loadCheckpoint(dirname)
+                newState = self.simulation.context.getState(positions=True, velocities=True)
+                self.assertEqual(18, self.simulation.currentStep)
+                self.assertAlmostEqual(state.getTime().value_in_unit(unit.picoseconds), newState.getTime().value_in_unit(unit.picoseconds))
+                pos1 = state.getPositions(asNumpy=True).value_in_unit(unit.nanometers)
+                pos2 = newState.getPositions(asNumpy=True).value_in_unit(unit.nanometers)
+                vel1 = state.getVelocities(asNumpy=True).value_in_unit(unit.nanometers/unit.picoseconds)
+                vel2 = newState.getVelocities(asNumpy=True).value_in_unit(unit.nanometers/unit.picoseconds)
+                self.assertTrue(np.allclose(pos1, pos2, rtol=0, atol=1e-5))
+                self.assertTrue(np.allclose(vel1, vel2, rtol=0, atol=1e-5))
+        with self.assertRaises(ValueError):
+            app.CheckpointReporter(BytesIO(), 1, fullInterval=10)
+
+    def testDifferentialIntegratorParameters(self):
+        """Test that deltas restore the parameters of the integrator."""
+        integrator = mm.CustomIntegrator(0.002*unit.picoseconds)
+        integrator.addGlobalVariable('count', 0)
+        integrator.addComputeGlobal('count', 'count+1')
+        positions = self.simulation.context.getState(positions=True).getPositions()
+        simulation = app.Simulation(self.simulation.topology, self.simulation.system, integrator)
+        simulation.context.setPositions(positions)
+        with tempfile.TemporaryDirectory() as tempdir:
+            dirname = os.path.join(tempdir, 'checkpoints')
+            simulation.reporters.append(app.CheckpointReporter(dirname, 2, fullInterval=6))
+            simulation.step(10)
+
+            # The last full checkpoint was written at step 8, so the value at step 10 must come from the delta.
+
+            integrator.setGlobalVariableByName('count', 0)
+            simulation.loadCheckpoint(dirname)
+            self.assertEqual(10, simulation.currentStep)
+            self.assertEqual(10, integrator.getGlobalVariableByName('count'))
+
 if __name__ == '__main__':
     unittest.main()
@@ -4,6 +4,7 @@ from openmm import app
 import openmm as mm
 from openmm import unit
 from random import random
+import io
 import os
 import struct
 
@@ -39,6 +40,67 @@ class TestDCDFile(unittest.TestCase):
                 dcd.writeModel([mm.Vec3(random(), random(), random()) for j in range(natom)]*unit.angstroms)
         os.remove(fname)
     
+    def testWriteModels(self):
+        """Test writing many models at once, and buffering models."""
+        import numpy as np
+        from io import BytesIO
+        pdbfile = app.PDBFile('systems/alanine-dipeptide-implicit.pdb')
+        pdbfile.topology.setUnitCellDimensions(mm.Vec3(2, 2, 2))
+        natom = pdbfile.topology.getNumAtoms()
+        positions = np.random.random((6, natom, 3))
+        boxes = [mm.Vec3(2+0.1*i, 2, 2)*unit.nanometers for i in range(6)]
+        files = []
+        for mode in range(3):
+            f = BytesIO()
+            dcd = app.DCDFile(f, pdbfile.topology, 0.001, interval=10, bufferFrames=(4 if mode == 2 else 1))
+            headerLength = len(f.getvalue())
+            if mode == 0:
+                for i in range(6):
+                    dcd.writeModel(positions[i]*unit.nanometers, unitCellDimensions=boxes[i])
+            elif mode == 1:
+                dcd.writeModels(positions*unit.nanometers, unitCellDimensions=boxes)
+            else:
+                for i in range(6):
+                    dcd.writeModel(positions[i]*unit.nanometers, unitCellDimensions=boxes[i])
+                    writtenModels = (4 if i >= 3 else 0)
+                    self.assertEqual(headerLength+writtenModels*len(files[0])//6, len(f.getvalue()))
+                dcd.flush()
+            self.assertEqual((6, 50), struct.unpack('<i', f.getvalue()[8:12])+struct.unpack('<i', f.getvalue()[20:24]))
+            files.append(f.getvalue()[headerLength:])
+        self.assertEqual(files[0], files[1])
+        self.assertEqual(files[0], files[2])
+        with self.assertRaises(ValueError):
+            dcd.writeModels(positions[:, :-1])
+
+    def testRead(self):
+        """Test reading frames from a DCD file."""
+        import numpy as np
+        pdbfile = app.PDBFile('systems/alanine-dipeptide-implicit.pdb')
+        pdbfile.topology.setUnitCellDimensions(mm.Vec3(2, 3, 4))
+        natom = pdbfile.topology.getNumAtoms()
+        positions = np.random.random((10, natom, 3))
+        with tempfile.TemporaryDirectory() as temp:
+            fname = os.path.join(temp, 'traj.dcd')
+            with open(fname, 'wb') as f:
+                dcd = app.DCDFile(f, pdbfile.topology, 0.002*unit.picoseconds, firstStep=100, interval=50)
+                dcd.writeModels(positions*unit.nanometers)
+            traj = app.DCDFile.read(fname)
+            self.assertEqual(10, len(traj))
+            self.assertEqual(natom, traj.getNumAtoms())
+            self.assertTrue(np.allclose(positions[3], traj[3].value_in_unit(unit.nanometers), atol=1e-5))
+            self.assertTrue(np.allclose(positions[-1], traj[-1].value_in_unit(unit.nanometers), atol=1e-5))
+            atoms = [2, 0, 7]
+            self.assertTrue(np.allclose(positions[1:8:3][:, atoms], traj[1:8:3, atoms].value_in_unit(unit.nanometers), atol=1e-5))
+            self.assertEqual((10, 3), traj[:, 4].shape)
+            self.assertEqual(100+9*50, traj.getStep(9))
+            self.assertAlmostEqual(0.002*(100+2*50), traj.getTime(2).value_in_unit(unit.picoseconds), places=5)
+            box = traj.getPeriodicBoxVectors(5)
+            for i in range(3):
+                self.assertAlmostEqual((2, 3, 4)[i], box[i][i].value_in_unit(unit.nanometers), places=5)
+            with self.assertRaises(IndexError):
+                traj[10]
+            del traj
+
     def testAppend(self):
         """Test appending to an existing trajectory."""
         fname = tempfile.mktemp(suffix='.dcd')
@@ -83,6 +145,32 @@ class TestDCDFile(unittest.TestCase):
         self.assertEqual(20, currStep)
         os.remove(fname)
 
+    def testBufferedReporter(self):
+        """Test that frames buffered by a DCDReporter are written when reports are flushed."""
+        fname = tempfile.mktemp(suffix='.dcd')
+        pdb = app.PDBFile('systems/alanine-dipeptide-implicit.pdb')
+        ff = app.ForceField('amber99sb.xml', 'tip3p.xml')
+        system = ff.createSystem(pdb.topology)
+        integrator = mm.VerletIntegrator(0.001*unit.picoseconds)
+        simulation = app.Simulation(pdb.topology, system, integrator, mm.Platform.getPlatform('Reference'))
+        dcd = app.DCDReporter(fname, 2, bufferFrames=4)
+        simulation.reporters.append(dcd)
+        simulation.context.setPositions(pdb.positions)
+        simulation.step(10)
+        self.assertEqual((4, 8), _read_dcd_header(fname))
+
+        # Saving a checkpoint should write the buffered frame, so the trajectory is not behind the checkpoint.
+
+        simulation.saveCheckpoint(io.BytesIO())
+        self.assertEqual((5, 10), _read_dcd_header(fname))
+        simulation.step(2)
+        dcd.close()
+        self.assertEqual((6, 12), _read_dcd_header(fname))
+        dcd.close()
+        del simulation
+        del dcd
+        os.remove(fname)
+
     def testAtomSubset(self):
         """Test writing a DCD file containing a subset of atoms"""
         fname = tempfile.mktemp(suffix='.dcd')
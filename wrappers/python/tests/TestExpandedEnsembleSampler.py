@@ -95,8 +95,10 @@ class TestExpandedEnsembleSampler(unittest.TestCase):
                     integrator = LangevinIntegrator(300*kelvin, 1/picosecond, 0.001*picosecond)
                     simulation = Simulation(Topology(), system, integrator, Platform.getPlatform('Reference'))
                     simulation.context.setPositions([Vec3(0, 0, 0)]*3)
+                    dataFile = checkpointFile.name+'.bin'
                     sampler = ExpandedEnsembleSampler(states, simulation, 5, reportInterval=5, logFile=logFile.name,
-                                                      energyFile=energyFile.name, checkpointFile=checkpointFile.name)
+                                                      energyFile=energyFile.name, checkpointFile=checkpointFile.name,
+                                                      dataFile=dataFile)
 
                     # Run a simulation.
 
@@ -133,7 +135,7 @@ class TestExpandedEnsembleSampler(unittest.TestCase):
                     simulation = Simulation(Topology(), system, integrator, Platform.getPlatform('Reference'))
                     sampler = ExpandedEnsembleSampler(states, simulation, 5, reportInterval=5, logFile=logFile.name,
                                                       energyFile=energyFile.name, checkpointFile=checkpointFile.name,
-                                                      resume=True)
+                                                      resume=True, dataFile=dataFile)
 
                     # Make sure everything was loaded correctly.
 
@@ -174,3 +176,43 @@ class TestExpandedEnsembleSampler(unittest.TestCase):
                         fields = line.split(',')
                         self.assertEqual(int(fields[0]), step[i])
                         self.assertTrue(np.allclose([float(x) for x in fields[1:]], energies[i]))
+
+                    # Check the data file.
+
+                    data = ExpandedEnsembleSampler.loadData(dataFile)
+                    del sampler
+                    os.remove(dataFile)
+                    self.assertEqual(step, data['step'].tolist())
+                    self.assertEqual(iteration, data['iteration'].tolist())
+                    self.assertEqual(stateIndex, data['stateIndex'].tolist())
+                    self.assertTrue(np.allclose(weights, data['weights']))
+                    self.assertTrue(np.allclose(energies, data['energy']))
+
+    def testResumeWithNewDataFile(self):
+        """Test resuming a simulation with a data file that does not exist yet."""
+        system = System()
+        force = CustomExternalForce('0.5*k*(x*x+y*y+z*z)')
+        force.addGlobalParameter('k', 1.0)
+        system.addForce(force)
+        system.addParticle(1.0)
+        force.addParticle(0)
+        states = [{'k':k} for k in (200.0, 300.0)]
+        with tempfile.TemporaryDirectory() as tempdir:
+            checkpointFile = os.path.join(tempdir, 'checkpoint')
+            dataFile = os.path.join(tempdir, 'data.bin')
+            integrator = LangevinIntegrator(300*kelvin, 1/picosecond, 0.001*picosecond)
+            simulation = Simulation(Topology(), system, integrator, Platform.getPlatform('Reference'))
+            simulation.context.setPositions([Vec3(0, 0, 0)])
+            sampler = ExpandedEnsembleSampler(states, simulation, 5, reportInterval=5, checkpointFile=checkpointFile)
+            simulation.step(10)
+
+            # Resume with a data file that was not used before.  It should be created.
+
+            integrator = LangevinIntegrator(300*kelvin, 1/picosecond, 0.001*picosecond)
+            simulation = Simulation(Topology(), system, integrator, Platform.getPlatform('Reference'))
+            sampler = ExpandedEnsembleSampler(states, simulation, 5, reportInterval=5, checkpointFile=checkpointFile,
+                                              resume=True, dataFile=dataFile)
+            simulation.step(10)
+            data = ExpandedEnsembleSampler.loadData(dataFile)
+            del sampler
+            self.assertEqual([15, 20], data['step'].tolist())
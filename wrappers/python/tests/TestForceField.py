@@ -990,6 +990,86 @@ class TestForceField(unittest.TestCase):
         self.assertEqual(templates[1].name, 'ALA')
         self.assertEqual(templates[2].name, 'CALA')
 
+    def test_findAnglesAndTorsions(self):
+        """Test enumerating angles and torsions from bonds."""
+        # A branched chain: 0-1-2-3, with 4 and 5 also bonded to 1, and a three membered ring 3-6-7.
+        bondedToAtom = [[1], [0, 2, 4, 5], [1, 3], [2, 6, 7], [1], [1], [3, 7], [3, 6]]
+        angles, propers, impropers = forcefield._findAnglesAndTorsions(bondedToAtom)
+        self.assertEqual([(0, 1, 2), (0, 1, 4), (0, 1, 5), (1, 2, 3), (2, 1, 4), (2, 1, 5), (2, 3, 6), (2, 3, 7), (3, 6, 7), (3, 7, 6), (4, 1, 5), (6, 3, 7)],
+                         [tuple(a) for a in angles.tolist()])
+        self.assertEqual([(0, 1, 2, 3), (1, 2, 3, 6), (1, 2, 3, 7), (2, 3, 6, 7), (2, 3, 7, 6), (3, 2, 1, 4), (3, 2, 1, 5)],
+                         [tuple(p) for p in propers.tolist()])
+        self.assertEqual([(1, 0, 2, 4), (1, 0, 2, 5), (1, 0, 4, 5), (1, 2, 4, 5), (3, 2, 6, 7)],
+                         [tuple(i) for i in impropers.tolist()])
+
+    def test_matchCache(self):
+        """Test that identical residues share template matches, while residues with different atom orders are matched independently."""
+        topology = Topology()
+        chain = topology.addChain()
+        for i in range(4):
+            residue = topology.addResidue('HOH', chain)
+            if i % 2 == 0:
+                o = topology.addAtom('O', elem.oxygen, residue)
+                h1 = topology.addAtom('H1', elem.hydrogen, residue)
+                h2 = topology.addAtom('H2', elem.hydrogen, residue)
+            else:
+                h1 = topology.addAtom('H1', elem.hydrogen, residue)
+                o = topology.addAtom('O', elem.oxygen, residue)
+                h2 = topology.addAtom('H2', elem.hydrogen, residue)
+            topology.addBond(o, h1)
+            topology.addBond(o, h2)
+        ff = ForceField('tip3p.xml')
+        templates = ff.getMatchingTemplates(topology)
+        self.assertEqual(4, len(templates))
+        self.assertTrue(all(t is templates[0] for t in templates))
+        system = ff.createSystem(topology, constraints=None, rigidWater=False)
+        nonbonded = [f for f in system.getForces() if isinstance(f, NonbondedForce)][0]
+        for atom in topology.atoms():
+            charge = nonbonded.getParticleParameters(atom.index)[0].value_in_unit(elementary_charge)
+            mass = system.getParticleMass(atom.index).value_in_unit(dalton)
+            if atom.element == elem.oxygen:
+                self.assertAlmostEqual(-0.834, charge)
+                self.assertAlmostEqual(15.99943, mass)
+            else:
+                self.assertAlmostEqual(0.417, charge)
+                self.assertAlmostEqual(1.007947, mass)
+
+    def test_parallelMatching(self):
+        """Test that matching templates with an executor gives the same results as matching serially."""
+        from concurrent.futures import ThreadPoolExecutor
+        pdb = PDBFile('systems/alanine-dipeptide-explicit.pdb')
+        ff = ForceField('amber99sb.xml', 'tip3p.xml')
+        with ThreadPoolExecutor(4) as executor:
+            self.assertEqual(ff.getMatchingTemplates(pdb.topology), ff.getMatchingTemplates(pdb.topology, executor=executor))
+            self.assertEqual(ff.getUnmatchedResidues(pdb.topology), ff.getUnmatchedResidues(pdb.topology, executor=executor))
+            system1 = ff.createSystem(pdb.topology)
+            system2 = ff.createSystem(pdb.topology, executor=executor)
+        self.assertEqual(XmlSerializer.serialize(system1), XmlSerializer.serialize(system2))
+
+        # Residues that cannot be matched should be reported the same way.
+
+        modeller = Modeller(pdb.topology, pdb.positions)
+        modeller.delete([a for a in modeller.topology.atoms() if a.name == 'HA'])
+        with ThreadPoolExecutor(4) as executor:
+            self.assertEqual(1, len(ff.getUnmatchedResidues(modeller.topology, executor=executor)))
+            with self.assertRaises(ValueError):
+                ff.createSystem(modeller.topology, executor=executor)
+
+    def test_parallelMatchingProcesses(self):
+        """Test that matching templates with a process pool gives the same results as matching serially."""
+        from concurrent.futures import ProcessPoolExecutor
+        pdb = PDBFile('systems/alanine-dipeptide-explicit.pdb')
+        ff = ForceField('amber99sb.xml', 'tip3p.xml')
+        with ProcessPoolExecutor(2) as executor:
+            templates = ff.getMatchingTemplates(pdb.topology, executor=executor)
+            system = ff.createSystem(pdb.topology, executor=executor)
+
+        # The results should refer to the ForceField's own templates, not copies of them.
+
+        for t1, t2 in zip(ff.getMatchingTemplates(pdb.topology), templates):
+            self.assertIs(t1, t2)
+        self.assertEqual(XmlSerializer.serialize(ff.createSystem(pdb.topology)), XmlSerializer.serialize(system))
+
     def test_matchErrorMessages(self):
         """Test match error detection and diagnostics"""
 
@@ -1604,6 +1684,61 @@ class TestForceField(unittest.TestCase):
         finally:
             forcefield._dataDirectories = oldDataDirs
 
+    def test_Cache(self):
+        """Test loading a ForceField from a cache directory."""
+        with tempfile.TemporaryDirectory() as tempDir:
+            for testFileName in ['ff_with_includes.xml', 'test_amber_ff.xml']:
+                shutil.copyfile(os.path.join('systems', testFileName), os.path.join(tempDir, testFileName))
+            ffFile = os.path.join(tempDir, 'ff_with_includes.xml')
+            cacheDir = os.path.join(tempDir, 'cache')
+            ff1 = ForceField(ffFile, cacheDir=cacheDir)
+            self.assertEqual(1, len(os.listdir(cacheDir)))
+            ff2 = ForceField(ffFile, cacheDir=cacheDir)
+            self.assertEqual(set(ff1._atomTypes), set(ff2._atomTypes))
+            self.assertEqual(set(ff1._templates), set(ff2._templates))
+            self.assertEqual(set(ff1._templateSignatures), set(ff2._templateSignatures))
+            self.assertEqual([type(f) for f in ff1._forces], [type(f) for f in ff2._forces])
+            for generator in ff2._forces:
+                if hasattr(generator, 'ff'):
+                    self.assertIs(ff2, generator.ff)
+
+            # Both should produce identical Systems.
+
+            pdb = PDBFile('systems/opc3box.pdb')
+            system1 = ff1.createSystem(pdb.topology)
+            system2 = ff2.createSystem(pdb.topology)
+            self.assertEqual(XmlSerializer.serialize(system1), XmlSerializer.serialize(system2))
+
+            # Modifying an included file should invalidate the cache.
+
+            with open(os.path.join(tempDir, 'test_amber_ff.xml')) as f:
+                content = f.read()
+            with open(os.path.join(tempDir, 'test_amber_ff.xml'), 'w') as f:
+                f.write(content.replace('<AtomTypes>', '<AtomTypes>\n  <Type name="extra-type" class="extra" element="C" mass="12.01"/>'))
+            ff3 = ForceField(ffFile, cacheDir=cacheDir)
+            self.assertTrue('extra-type' in ff3._atomTypes)
+            self.assertFalse('extra-type' in ff2._atomTypes)
+
+            # A different prefix should use a different cache entry.
+
+            ff4 = ForceField(cacheDir=cacheDir)
+            ff4.loadFile(ffFile, resname_prefix='X', cacheDir=cacheDir)
+            self.assertTrue('XHOH' in ff4._templates)
+
+            # A cache that other users could have modified should be ignored.
+
+            if hasattr(os, 'getuid'):
+                privateDir = os.path.join(tempDir, 'private')
+                ForceField(ffFile, cacheDir=privateDir)
+                cacheFile = os.path.join(privateDir, os.listdir(privateDir)[0])
+                os.chmod(cacheFile, 0o666)
+                with self.assertWarns(UserWarning):
+                    ff5 = ForceField(ffFile, cacheDir=privateDir)
+                self.assertEqual(set(ff1._templates), set(ff5._templates))
+                os.chmod(privateDir, 0o777)
+                with self.assertWarns(UserWarning):
+                    ForceField(ffFile, cacheDir=privateDir)
+
     def test_ImpropersOrdering(self):
         """Test correctness of the ordering of atom indexes in improper torsions
         and the torsion.ordering parameter.
@@ -2,6 +2,31 @@ import unittest
 from openmm import *
 from openmm.app import *
 from openmm.unit import *
+from openmm.app.metadynamics import _SharedBias
+import multiprocessing
+import numpy as np
+import os
+import sys
+import tempfile
+import threading
+
+_sharedGridSize = 10000
+
+def _publishSharedBias(filename, numWalkers, walkerIndices, count):
+    """Publish biases from several walkers in the same process, each in its own thread.  This is run in separate
+    processes by testSharedBiasLocking()."""
+    def publish(index):
+        shared = _SharedBias(filename, numWalkers, index, (_sharedGridSize,))
+        bias = np.zeros(_sharedGridSize)
+        for i in range(count):
+            bias += 1
+            shared.publish(bias)
+            shared.update()
+    threads = [threading.Thread(target=publish, args=(i,)) for i in walkerIndices]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
 
 class TestMetadynamics(unittest.TestCase):
     """Test the Metadynamics class"""
@@ -37,4 +62,123 @@ class TestMetadynamics(unittest.TestCase):
         for i in range(center-3, center+4):
             r = bias.minValue + i*(bias.maxValue-bias.minValue)/(bias.gridWidth-1)
             e = 0.5*100000.0*(r-1.0)**2*kilojoules_per_mole
-            assert abs(fe[i]-e) < 1.0*kilojoules_per_mole
\ No newline at end of file
+            assert abs(fe[i]-e) < 1.0*kilojoules_per_mole
+
+    @unittest.skipIf(sys.platform == 'win32', 'Shared bias files require POSIX file locks')
+    def testSharedBias(self):
+        """Test sharing biases between walkers through a memory mapped file."""
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'bias')
+            walkers = []
+            for i in range(2):
+                system = System()
+                system.addParticle(1.0)
+                system.addParticle(1.0)
+                force = HarmonicBondForce()
+                force.addBond(0, 1, 1.0, 100000.0)
+                system.addForce(force)
+                cv = CustomBondForce('r')
+                cv.addBond(0, 1)
+                bias = BiasVariable(cv, 0.94, 1.06, 0.00431, gridWidth=31)
+                meta = Metadynamics(system, [bias], 300*kelvin, 3.0, 5.0, 10, saveFrequency=50, sharedBiasFile=filename, numWalkers=2, walkerIndex=i)
+                integrator = LangevinIntegrator(300*kelvin, 10/picosecond, 0.001*picosecond)
+                simulation = Simulation(Topology(), system, integrator, Platform.getPlatform('Reference'))
+                simulation.context.setPositions([Vec3(0, 0, 0), Vec3(1, 0, 0)])
+                walkers.append((meta, simulation))
+            for meta, simulation in walkers:
+                meta.step(simulation, 500)
+            meta0, simulation0 = walkers[0]
+            meta1, simulation1 = walkers[1]
+            self.assertTrue(np.allclose(meta1._totalBias, meta0._selfBias+meta1._selfBias))
+            meta0.step(simulation0, 50)
+            self.assertTrue(np.allclose(meta0._totalBias, meta0._selfBias+meta1._selfBias))
+
+            # A new walker using the same slot should resume from the stored biases.
+
+            bias = BiasVariable(CustomBondForce('r'), 0.94, 1.06, 0.00431, gridWidth=31)
+            resumed = Metadynamics(System(), [bias], 300*kelvin, 3.0, 5.0, 10, saveFrequency=50, sharedBiasFile=filename, numWalkers=2, walkerIndex=0)
+            self.assertTrue(np.allclose(resumed._selfBias, meta0._selfBias))
+            self.assertTrue(np.allclose(resumed._totalBias, meta0._totalBias))
+            with self.assertRaises(ValueError):
+                Metadynamics(System(), [bias], 300*kelvin, 3.0, 5.0, 10, saveFrequency=50, sharedBiasFile=filename, numWalkers=3, walkerIndex=0)
+        with self.assertRaises(ValueError):
+            Metadynamics(System(), [bias], 300*kelvin, 3.0, 5.0, 10, numWalkers=2, walkerIndex=0)
+
+    @unittest.skipIf(sys.platform == 'win32', 'Shared bias files require POSIX file locks')
+    def testSharedBiasLocking(self):
+        """Test that walkers publishing biases concurrently from several processes and threads never lose updates."""
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'bias')
+            context = multiprocessing.get_context('spawn')
+            processes = [context.Process(target=_publishSharedBias, args=(filename, 4, [2*i, 2*i+1], 200)) for i in range(2)]
+            for p in processes:
+                p.start()
+            for p in processes:
+                p.join()
+                self.assertEqual(0, p.exitcode)
+            shared = _SharedBias(filename, 4, 0, (_sharedGridSize,))
+            self.assertTrue(np.all(shared._grids[:4] == 200))
+            self.assertTrue(np.all(shared._grids[4] == 800))
+            self.assertEqual(800, shared._versions[4])
+
+    def testTruncatedGaussians(self):
+        """Test that truncated Gaussians and batched updates produce the same bias as full Gaussians."""
+        biases = []
+        for cutoff in [None, 6.0]:
+            system = System()
+            system.addParticle(1.0)
+            system.addParticle(1.0)
+            system.addParticle(1.0)
+            cv1 = CustomBondForce('r')
+            cv1.addBond(0, 1)
+            cv2 = CustomBondForce('r')
+            cv2.addBond(0, 2)
+            variables = [BiasVariable(cv1, 0.5, 1.5, 0.05, gridWidth=101), BiasVariable(cv2, 0.5, 1.5, 0.05, gridWidth=81)]
+            meta = Metadynamics(system, variables, 300*kelvin, 3.0, 5.0, 10, gaussianCutoff=cutoff, updateFrequency=30)
+            integrator = VerletIntegrator(0.001*picosecond)
+            simulation = Simulation(Topology(), system, integrator, Platform.getPlatform('Reference'))
+            simulation.context.setPositions([Vec3(0, 0, 0), Vec3(0.8, 0, 0), Vec3(0, 1.1, 0)])
+            meta.step(simulation, 90)
+            self.assertFalse(meta._biasChanged)
+            meta.step(simulation, 10)
+
+            # The Context should be up to date after step() returns, even between scheduled updates.
+
+            self.assertFalse(meta._biasChanged)
+            biases.append(meta.getFreeEnergy().value_in_unit(kilojoules_per_mole))
+        self.assertTrue(np.allclose(biases[0], biases[1], atol=1e-6*np.max(np.abs(biases[0]))))
+        with self.assertRaises(ValueError):
+            Metadynamics(system, variables, 300*kelvin, 3.0, 5.0, 10, updateFrequency=15)
+
+    def testDelayedUpdateHeights(self):
+        """Test that delaying updates to the Context does not change the heights of Gaussians."""
+        biases = []
+        for updateFrequency in [1, 5]:
+            system = System()
+            system.addParticle(0.0)
+            system.addParticle(0.0)
+            system.addParticle(0.0)
+            cv1 = CustomBondForce('r')
+            cv1.addBond(0, 1)
+            cv2 = CustomBondForce('r')
+            cv2.addBond(0, 2)
+            variables = [BiasVariable(cv1, 0.5, 1.5, 0.05, gridWidth=101), BiasVariable(cv2, 0.5, 1.5, 0.05, gridWidth=81)]
+            meta = Metadynamics(system, variables, 300*kelvin, 3.0, 5.0, 1, updateFrequency=updateFrequency)
+            integrator = VerletIntegrator(0.001*picosecond)
+            simulation = Simulation(Topology(), system, integrator, Platform.getPlatform('Reference'))
+
+            # The particles are massless so they never move.  Move them between points that are not on the grid,
+            # so the heights depend on the bias interpolated between grid points.
+
+            for x, y in [(0.8037, 1.1071), (0.8212, 1.0933), (0.7964, 1.1158)]:
+                simulation.context.setPositions([Vec3(0, 0, 0), Vec3(x, 0, 0), Vec3(0, y, 0)])
+                meta.step(simulation, 7)
+            biases.append(meta.getFreeEnergy().value_in_unit(kilojoules_per_mole))
+
+            # The bias computed from the grid should match the energy in the Context.
+
+            self.assertFalse(meta._biasChanged)
+            energy = simulation.context.getState(energy=True, groups={meta._force.getForceGroup()}).getPotentialEnergy()
+            position = meta.getCollectiveVariables(simulation)
+            self.assertAlmostEqual(energy.value_in_unit(kilojoules_per_mole), meta._evaluateBias(position).value_in_unit(kilojoules_per_mole), delta=1e-6*abs(energy.value_in_unit(kilojoules_per_mole)))
+        self.assertTrue(np.allclose(biases[0], biases[1], atol=1e-6*np.max(np.abs(biases[0]))))
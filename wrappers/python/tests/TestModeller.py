@@ -1,6 +1,7 @@
 from collections import defaultdict
 import unittest
 import random
+import numpy as np
 
 from validateModeller import *
 from openmm.app import *
@@ -391,6 +392,29 @@ class TestModeller(unittest.TestCase):
         self.assertAlmostEqual(0.707, dodecVolume/cubeVolume, places=3)
         self.assertAlmostEqual(0.770, octVolume/cubeVolume, places=3)
 
+    def test_addSolventClashes(self):
+        """Test that addSolvent() does not place water molecules too close to the solute or to each other."""
+        modeller = Modeller(self.pdb.topology, self.positions)
+        modeller.deleteWater()
+        vectors = (Vec3(3.5, 0, 0), Vec3(1.0, 3.2, 0), Vec3(-1.0, 1.5, 2.9))*nanometers
+        modeller.addSolvent(self.forcefield, boxVectors=vectors, neutralize=False)
+        box = np.array(vectors.value_in_unit(nanometers))
+        positions = np.array(modeller.getPositions().value_in_unit(nanometers))
+        solute = [atom.index for atom in modeller.topology.atoms() if atom.residue.name != 'HOH']
+        oxygens = [atom.index for atom in modeller.topology.atoms() if atom.residue.name == 'HOH' and atom.element == element.oxygen]
+        self.assertTrue(len(oxygens) > 500)
+
+        def periodicDistances(pos1, pos2):
+            delta = pos1[:,np.newaxis,:]-pos2[np.newaxis,:,:]
+            for i in (2, 1, 0):
+                delta -= np.round(delta[:,:,i:i+1]/box[i,i])*box[i]
+            return np.sqrt(np.sum(delta*delta, axis=2))
+
+        self.assertTrue(np.min(periodicDistances(positions[oxygens], positions[solute])) > 0.17)
+        waterDistances = periodicDistances(positions[oxygens], positions[oxygens])
+        np.fill_diagonal(waterDistances, 1.0)
+        self.assertTrue(np.min(waterDistances) > 0.17)
+
     def test_addSolventNeutralSolvent(self):
         """ Test the addSolvent() method; test adding ions to neutral solvent. """
 
@@ -105,6 +105,45 @@ class TestMultistateSampler(unittest.TestCase):
             self.assertAlmostEqual(1.0, self.context.getParameter('k2'), 5)
         self.validateEnergies(sampler, [4.0, 16.0, 4.0, 14.0])
 
+    def testBatchedEnergies(self):
+        """Test computing energies of many states that differ in linear and nonlinear parameters."""
+        force = CustomBondForce('lambda^2*r')
+        force.addGlobalParameter('lambda', 1.0)
+        force.addBond(0, 1)
+        force.setForceGroup(4)
+        self.system.addForce(force)
+        integrator = LangevinIntegrator(300*kelvin, 1.0/picosecond, 0.004*picoseconds)
+        context = Context(self.system, integrator, Platform.getPlatform('Reference'))
+        context.setPositions([Vec3(0, 0, 0), Vec3(0, 2, 0)])
+        states = [{'k1':k1, 'k2':k2, 'lambda':x} for k1 in [0.0, 0.5, 1.0, 1.5, 2.0] for k2 in [1.0, 3.0] for x in [0.0, 1.0]]
+        sampler = MultistateSampler(states, context)
+        self.assertEqual(20, len(sampler.subsets))
+        self.assertIsNotNone(sampler._batch)
+        self.validateEnergies(sampler, [4*s['k1']+2*s['k2']+10+2*s['lambda']**2 for s in states])
+        states = [{'k1':k1, 'groups':{1:0.5, 3:1.0, 4:2.0}} for k1 in [0.0, 0.5, 1.0, 1.5, 2.0]]
+        sampler = MultistateSampler(states, context)
+        self.assertIsNotNone(sampler._batch)
+        self.validateEnergies(sampler, [2*s['k1']+10+4 for s in states])
+
+        # The slope is measured over the range of values the parameter takes, whatever its scale.
+
+        states = [{'k1':k1, 'groups':{1:0.5, 3:1.0, 4:2.0}} for k1 in [-250.0, -100.0, 1e-3, 0.0, 300.0]]
+        sampler = MultistateSampler(states, context)
+        self.assertIsNotNone(sampler._batch)
+        self.validateEnergies(sampler, [2*s['k1']+10+4 for s in states])
+
+        # A parameter that has the same value in every state, but a different value in the Context, must still be
+        # set before computing the energies that depend on it.
+
+        states = [{'k1':k1, 'lambda':0.5} for k1 in [0.0, 0.5, 1.0, 1.5, 2.0]]
+        sampler = MultistateSampler(states, context)
+        self.assertIsNotNone(sampler._batch)
+        context.setParameter('lambda', 1.0)
+        expected = [4*s['k1']+2+10+0.5 for s in states]
+        for e1, e2 in zip(expected, sampler.computeAllEnergies()):
+            self.assertAlmostEqual(e1, e2.value_in_unit(kilojoules_per_mole), 5)
+        self.validateEnergies(sampler, expected)
+
     def testCustomIntegrator(self):
         """Test a set of states that set global variables on a CustomIntegrator."""
         integrator = CustomIntegrator(0.001)
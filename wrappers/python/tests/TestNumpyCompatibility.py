@@ -65,6 +65,27 @@ class TestNumpyCompatibility(unittest.TestCase):
         for i in range(3):
             np.testing.assert_array_almost_equal(systemBox[i].value_in_unit(unit.nanometers), output[i].value_in_unit(unit.nanometers))
 
+    def test_stateArrayViews(self):
+        n_particles = self.simulation.context.getSystem().getNumParticles()
+        self.simulation.context.setPositions(np.random.randn(n_particles, 3))
+        self.simulation.context.setVelocities(np.random.randn(n_particles, 3))
+        state = self.simulation.context.getState(getPositions=True, getVelocities=True, getForces=True)
+        for view, expected in [(state.getPositionsArray(), state.getPositions(asNumpy=True).value_in_unit(unit.nanometers)),
+                               (state.getVelocitiesArray(), state.getVelocities(asNumpy=True).value_in_unit(unit.nanometers/unit.picoseconds)),
+                               (state.getForcesArray(), state.getForces(asNumpy=True).value_in_unit(unit.kilojoules_per_mole/unit.nanometers))]:
+            self.assertEqual((n_particles, 3), view.shape)
+            self.assertFalse(view.flags.writeable)
+            np.testing.assert_array_equal(expected, view)
+
+        # The view should remain valid after the State is deleted.
+
+        view = state.getPositionsArray()
+        expected = np.array(view)
+        del state
+        np.testing.assert_array_equal(expected, view)
+        with self.assertRaises(Exception):
+            self.simulation.context.getState(getVelocities=True).getPositionsArray()
+
 
     def test_tabulatedFunction(self):
         f = mm.CustomNonbondedForce('g(r)')
@@ -96,7 +117,61 @@ class TestNumpyCompatibility(unittest.TestCase):
         sys = mm.System()
         sys.addParticle(2.0)
         assert sys.getParticleMass(indices[0]) == 2.0*unit.amu
-        
+
+    def test_bulkBonded(self):
+        bonds = mm.HarmonicBondForce()
+        bonds.addBond(0, 1, 0.1, 100.0)
+        self.assertEqual(1, bonds.addBonds(np.array([[1, 2], [2, 3]]), [0.2, 0.3]*unit.nanometers, np.array([200.0, 300.0])))
+        particles, length, k = bonds.getAllBondParameters()
+        np.testing.assert_array_equal([[0, 1], [1, 2], [2, 3]], particles)
+        np.testing.assert_array_almost_equal([0.1, 0.2, 0.3], length.value_in_unit(unit.nanometers))
+        np.testing.assert_array_almost_equal([100.0, 200.0, 300.0], k.value_in_unit(unit.kilojoules_per_mole/unit.nanometers**2))
+        self.assertEqual(0.3*unit.nanometers, bonds.getBondParameters(2)[2])
+        self.assertRaises(ValueError, lambda: bonds.addBonds([[0, 1]], [0.1, 0.2], [1.0, 2.0]))
+
+        # Read-only arrays are accepted, but indices must be integers that fit in 32 bits.
+
+        readOnly = np.array([[3, 4]], dtype=np.int32)
+        readOnly.flags.writeable = False
+        lengths = np.array([0.4])
+        lengths.flags.writeable = False
+        bonds.addBonds(readOnly, lengths, [400.0])
+        self.assertEqual(4, bonds.getNumBonds())
+        self.assertRaises(TypeError, lambda: bonds.addBonds([[0.5, 1.0]], [0.1], [1.0]))
+        self.assertRaises(ValueError, lambda: bonds.addBonds(np.array([[0, 2**32]]), [0.1], [1.0]))
+        self.assertEqual(4, bonds.getNumBonds())
+
+        angles = mm.HarmonicAngleForce()
+        angles.addAngles([(0, 1, 2), (1, 2, 3)], [1.5, 2.0], [10.0, 20.0])
+        particles, angle, k = angles.getAllAngleParameters()
+        np.testing.assert_array_equal([[0, 1, 2], [1, 2, 3]], particles)
+        np.testing.assert_array_almost_equal([1.5, 2.0], angle.value_in_unit(unit.radians))
+        self.assertEqual(2, angles.getNumAngles())
+
+        torsions = mm.PeriodicTorsionForce()
+        torsions.addTorsions([(0, 1, 2, 3)]*2, [1, 3], [0.0, np.pi], [5.0, 2.0])
+        particles, periodicity, phase, k = torsions.getAllTorsionParameters()
+        np.testing.assert_array_equal([[0, 1, 2, 3]]*2, particles)
+        np.testing.assert_array_equal([1, 3], periodicity)
+        np.testing.assert_array_almost_equal([0.0, np.pi], phase.value_in_unit(unit.radians))
+        np.testing.assert_array_almost_equal([5.0, 2.0], k.value_in_unit(unit.kilojoules_per_mole))
+
+    def test_bulkNonbonded(self):
+        force = mm.NonbondedForce()
+        self.assertEqual(0, force.addParticles([0.5, -0.5, 0.0], [0.3, 0.2, 0.1], [1.0, 2.0, 3.0]))
+        charge, sigma, epsilon = force.getAllParticleParameters()
+        np.testing.assert_array_almost_equal([0.5, -0.5, 0.0], charge.value_in_unit(unit.elementary_charge))
+        np.testing.assert_array_almost_equal([0.3, 0.2, 0.1], sigma.value_in_unit(unit.nanometers))
+        np.testing.assert_array_almost_equal([1.0, 2.0, 3.0], epsilon.value_in_unit(unit.kilojoules_per_mole))
+        force.addExceptions([[0, 1], [1, 2]], [0.0, 0.1], [1.0, 0.2], [0.0, 0.5])
+        particles, chargeProd, sigma, epsilon = force.getAllExceptionParameters()
+        np.testing.assert_array_equal([[0, 1], [1, 2]], particles)
+        np.testing.assert_array_almost_equal([0.0, 0.1], chargeProd.value_in_unit(unit.elementary_charge**2))
+        self.assertRaises(Exception, lambda: force.addExceptions([[0, 1]], [0.0], [1.0], [0.0]))
+        force.addExceptions([[0, 1]], [0.2], [1.0], [0.0], replace=True)
+        self.assertEqual(2, force.getNumExceptions())
+        self.assertAlmostEqual(0.2, force.getExceptionParameters(0)[2].value_in_unit(unit.elementary_charge**2))
+
 
 @unittest.skipIf(NUMPY_IMPORT_FAILED, 'Numpy is not installed')
 class TestNumpyUnits(unittest.TestCase):
@@ -7,7 +7,11 @@ import openmm
 import openmm.app.element as elem
 import openmm.app.forcefield as forcefield
 import copy
+import gzip
+import io
+import os
 import pickle
+import tempfile
 
 class TestPickle(unittest.TestCase):
     """Pickling / deepcopy of OpenMM objects."""
@@ -92,6 +96,68 @@ class TestPickle(unittest.TestCase):
         self.assertEqual(3, f2.scale)
         self.assertEqual('3*r', f2.getEnergyFunction())
 
+    def testBinarySerializer(self):
+        """Test serializing objects in binary format."""
+        system = self.forcefield1.createSystem(self.pdb1.topology)
+        integrator = LangevinMiddleIntegrator(300*kelvin, 1/picosecond, 2*femtosecond)
+        context = Context(system, integrator, Platform.getPlatform('Reference'))
+        context.setPositions(self.pdb1.positions)
+        state = context.getState(positions=True, velocities=True, forces=True, energy=True, parameters=True)
+        for object in [system, integrator, state, Continuous1DFunction([1.0, 2.0, 3.0], 0.0, 1.0)]+system.getForces():
+            data = BinarySerializer.serialize(object)
+            self.assertIsInstance(data, bytes)
+            self.assertTrue(BinarySerializer.isBinary(data))
+            self.check_copy(object, BinarySerializer.deserialize(data))
+            self.check_copy(object, BinarySerializer.clone(object))
+        self.assertLess(len(BinarySerializer.serialize(system)), len(XmlSerializer.serialize(system))/2)
+        self.assertFalse(BinarySerializer.isBinary(XmlSerializer.serialize(system)))
+        with self.assertRaises(ValueError):
+            BinarySerializer.deserialize(XmlSerializer.serialize(system).encode())
+
+        # Pickles use the binary format, but objects pickled as XML by older versions can still be loaded.
+
+        self.assertTrue(BinarySerializer.isBinary(system.__getstate__()))
+        system2 = System()
+        system2.__setstate__(XmlSerializer.serialize(system))
+        self.check_copy(system, system2)
+        force = system.getForce(0)
+        force2 = copy.copy(force)
+        force2.__setstate__(XmlSerializer.serialize(force))
+        self.check_copy(force, force2)
+
+    def testXmlSerializerFiles(self):
+        """Test saving objects to files as XML and loading them incrementally."""
+        system = self.forcefield1.createSystem(self.pdb1.topology)
+        integrator = LangevinMiddleIntegrator(300*kelvin, 1/picosecond, 2*femtosecond)
+        context = Context(system, integrator, Platform.getPlatform('Reference'))
+        context.setPositions(self.pdb1.positions)
+        state = context.getState(positions=True, velocities=True, forces=True, energy=True, parameters=True)
+        for object in [system, integrator, state, Continuous1DFunction([1.0, 2.0, 3.0], 0.0, 1.0)]+system.getForces():
+            for compress in [False, True]:
+                buffer = io.BytesIO()
+                XmlSerializer.save(object, buffer, compress)
+                data = buffer.getvalue()
+                if compress:
+                    data = gzip.decompress(data)
+                self.assertEqual(XmlSerializer.serialize(object), data.decode())
+                buffer.seek(0)
+                self.check_copy(object, XmlSerializer.load(buffer))
+            self.check_copy(object, XmlSerializer.load(io.StringIO(XmlSerializer.serialize(object))))
+
+        # Compression is chosen based on the file name, and detected automatically when loading.
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            for filename in ['system.xml', 'system.xml.gz']:
+                path = os.path.join(tempdir, filename)
+                XmlSerializer.save(system, path)
+                with open(path, 'rb') as f:
+                    self.assertEqual(filename.endswith('.gz'), f.read(2) == b'\x1f\x8b')
+                self.check_copy(system, XmlSerializer.load(path))
+        with self.assertRaises(ValueError):
+            XmlSerializer.load(io.BytesIO(b'not xml'))
+        with self.assertRaises(OpenMMException):
+            XmlSerializer.load(io.BytesIO(XmlSerializer.serialize(system)[:1000].encode()))
+
 if __name__ == '__main__':
     unittest.main()
 
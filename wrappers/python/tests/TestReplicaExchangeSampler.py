@@ -1,11 +1,16 @@
 from openmm import *
 from openmm.app import *
 from openmm.unit import *
+from openmm.app.internal.contextsnapshot import ContextSnapshot
 from openmm.app.internal.xtc_utils import read_xtc
+import gc
+import itertools
 import numpy as np
 import os
+import random
 import tempfile
 import unittest
+import weakref
 
 class TestReplicaExchangeSampler(unittest.TestCase):
     def testTemperature(self):
@@ -80,6 +85,304 @@ class TestReplicaExchangeSampler(unittest.TestCase):
                 average = 0.5*states[i]['k']*r2[i]/steps
                 self.assertTrue(0.7 < average/expected < 1.3)
 
+    def testParallelContexts(self):
+        """Test simulating replicas concurrently with a pool of Contexts."""
+        system = System()
+        system.addParticle(1.0)
+        force = CustomExternalForce('x*x+y*y+z*z')
+        force.addParticle(0)
+        system.addForce(force)
+        states = [{'temperature':t*kelvin} for t in np.geomspace(300.0, 600.0, 5)]
+        platforms = [Platform.getPlatform(i) for i in range(Platform.getNumPlatforms())]
+        for platform in platforms:
+            if platform.getName() not in ('Reference', 'CPU'):
+                continue
+            integrator = LangevinIntegrator(300*kelvin, 10/picosecond, 0.01*picosecond)
+            integrator.setRandomNumberSeed(5)
+            simulation = Simulation(Topology(), system, integrator, platform)
+            simulation.context.setPositions([Vec3(0, 0, 0)])
+            repex = ReplicaExchangeSampler(states, simulation, 20, numContexts=2)
+            self.assertEqual(2, len(repex._workers))
+
+            # Each worker's integrator must use a different random number seed.
+
+            seeds = set(worker.integrator.getRandomNumberSeed() for worker in repex._workers)
+            self.assertEqual(2, len(seeds))
+            self.assertNotIn(0, seeds)
+            energies = [0.0*kilojoules_per_mole]*len(states)
+
+            def recordEnergies(repex):
+                for i in range(len(states)):
+                    energies[repex.replicaStateIndex[i]] += repex.replicaStateEnergy[i][repex.replicaStateIndex[i]]
+
+            repex.reporters.append(recordEnergies)
+            steps = 1000
+            repex.simulate(steps)
+            self.assertEqual(steps*20, simulation.currentStep)
+            for i, e in enumerate(energies):
+                average = e/steps
+                expected = 1.5*(states[i]['temperature']*MOLAR_GAS_CONSTANT_R)
+                self.assertTrue(0.7 < average/expected < 1.3)
+                self.assertEqual(steps*20, repex.replicaConformation[i].getStepCount())
+
+            # Closing the sampler releases the pool of Contexts, after which replicas are simulated serially.
+
+            contexts = [weakref.ref(worker.context) for worker in repex._workers if worker.context is not simulation.context]
+            with repex:
+                pass
+            self.assertIsNone(repex._executor)
+            self.assertIsNone(repex._workers)
+            gc.collect()
+            for context in contexts:
+                self.assertIsNone(context())
+            repex.simulate(1)
+            self.assertEqual((steps+1)*20, repex.replicaConformation[0].getStepCount())
+
+    def testReuseCpuContext(self):
+        """Test that the Simulation's Context is used in the pool if it has few enough threads."""
+        if 'CPU' not in [Platform.getPlatform(i).getName() for i in range(Platform.getNumPlatforms())]:
+            self.skipTest('CPU platform not available')
+        platform = Platform.getPlatform('CPU')
+        available = int(platform.getPropertyDefaultValue('Threads'))
+        if available < 2:
+            self.skipTest('Not enough threads to divide between Contexts')
+        system = System()
+        system.addParticle(1.0)
+        states = [{'temperature':t*kelvin} for t in [300.0, 400.0]]
+        integrator = LangevinIntegrator(300*kelvin, 10/picosecond, 0.01*picosecond)
+        simulation = Simulation(Topology(), system, integrator, platform, {'Threads': str(available//2)})
+        simulation.context.setPositions([Vec3(0, 0, 0)])
+        with ReplicaExchangeSampler(states, simulation, 10, numContexts=2) as repex:
+            self.assertIs(simulation.context, repex._workers[0].context)
+            threads = [int(platform.getPropertyValue(worker.context, 'Threads')) for worker in repex._workers]
+            self.assertEqual(available, sum(threads))
+            repex.simulate(2)
+
+    def testExchangeSchemes(self):
+        """Test that every exchange scheme samples state permutations with the correct probabilities."""
+        system = System()
+        system.addParticle(1.0)
+        integrator = LangevinIntegrator(300*kelvin, 10/picosecond, 0.01*picosecond)
+        simulation = Simulation(Topology(), system, integrator, Platform.getPlatform('Reference'))
+        numStates = 3
+        states = [{'temperature':300*kelvin}]*numStates
+        kT = (MOLAR_GAS_CONSTANT_R*300*kelvin).value_in_unit(kilojoules_per_mole)
+        u = np.array([[0.0, 1.0, 2.5], [0.5, -1.0, 0.0], [1.5, 0.2, -0.3]])
+        permutations = list(itertools.permutations(range(numStates)))
+        expected = np.array([np.exp(-sum(u[i][p[i]] for i in range(numStates))) for p in permutations])
+        expected /= np.sum(expected)
+        for scheme in ['metropolis', 'neighbors', 'gibbs']:
+            repex = ReplicaExchangeSampler(states, simulation, 1, exchangeScheme=scheme)
+            repex.replicaStateEnergy = [(u[i]*kT)*kilojoules_per_mole for i in range(numStates)]
+            counts = np.zeros(len(permutations))
+            iterations = 20000
+            for i in range(iterations):
+                repex.currentIteration = i
+                repex.exchangeReplicas()
+                counts[permutations.index(tuple(repex.replicaStateIndex))] += 1
+            self.assertTrue(np.allclose(u, repex.replicaReducedEnergy))
+            self.assertTrue(np.allclose(expected, counts/iterations, atol=0.02))
+        with self.assertRaises(ValueError):
+            ReplicaExchangeSampler(states, simulation, 1, exchangeScheme='unknown')
+
+    def testGibbsMixing(self):
+        """Test that the 'gibbs' scheme draws permutations independently, unlike 'metropolis', and that its block
+        sampling for larger numbers of states has the correct distribution."""
+        system = System()
+        system.addParticle(1.0)
+        integrator = LangevinIntegrator(300*kelvin, 10/picosecond, 0.01*picosecond)
+        simulation = Simulation(Topology(), system, integrator, Platform.getPlatform('Reference'))
+        kT = (MOLAR_GAS_CONSTANT_R*300*kelvin).value_in_unit(kilojoules_per_mole)
+
+        # The identity and one cyclic permutation are equally likely, but every swap of two states leads to an
+        # unlikely permutation.  Independence sampling changes the permutation with probability 1-sum(p**2),
+        # while swapping pairs rarely gets from one likely permutation to the other.
+
+        u = np.array([[0.0, 0.0, 5.0], [5.0, 0.0, 0.0], [0.0, 5.0, 0.0]])
+        permutations = list(itertools.permutations(range(3)))
+        probability = np.array([np.exp(-sum(u[i][p[i]] for i in range(3))) for p in permutations])
+        probability /= np.sum(probability)
+        changes = {}
+        for scheme in ['metropolis', 'gibbs']:
+            repex = ReplicaExchangeSampler([{'temperature':300*kelvin}]*3, simulation, 1, exchangeScheme=scheme, randomSeed=1)
+            repex.replicaStateEnergy = [(u[i]*kT)*kilojoules_per_mole for i in range(3)]
+            iterations = 10000
+            changes[scheme] = 0
+            for i in range(iterations):
+                previous = list(repex.replicaStateIndex)
+                repex.exchangeReplicas()
+                if repex.replicaStateIndex != previous:
+                    changes[scheme] += 1
+            changes[scheme] /= iterations
+        self.assertAlmostEqual(1-np.sum(probability**2), changes['gibbs'], delta=0.03)
+        self.assertLess(changes['metropolis'], 0.15)
+
+        # With more than six states, blocks of replicas are resampled.  Compare the probability of each replica
+        # being in each state to the exact value.
+
+        numStates = 8
+        u = np.random.default_rng(2).normal(size=(numStates, numStates))
+        permutations = np.array(list(itertools.permutations(range(numStates))))
+        probability = np.exp(-u[np.arange(numStates), permutations].sum(axis=1))
+        probability /= np.sum(probability)
+        expected = np.zeros((numStates, numStates))
+        for p, prob in zip(permutations, probability):
+            expected[np.arange(numStates), p] += prob
+        repex = ReplicaExchangeSampler([{'temperature':300*kelvin}]*numStates, simulation, 1, exchangeScheme='gibbs', randomSeed=1)
+        repex.replicaStateEnergy = [(u[i]*kT)*kilojoules_per_mole for i in range(numStates)]
+        counts = np.zeros((numStates, numStates))
+        iterations = 5000
+        for i in range(iterations):
+            repex.exchangeReplicas()
+            counts[np.arange(numStates), repex.replicaStateIndex] += 1
+        self.assertTrue(np.allclose(expected, counts/iterations, atol=0.03))
+
+    def testRandomSeed(self):
+        """Test that the sequence of exchanges can be made reproducible."""
+        system = System()
+        system.addParticle(1.0)
+        integrator = LangevinIntegrator(300*kelvin, 10/picosecond, 0.01*picosecond)
+        simulation = Simulation(Topology(), system, integrator, Platform.getPlatform('Reference'))
+        numStates = 4
+        states = [{'temperature':300*kelvin}]*numStates
+        energy = [np.array([0.0, 0.3, 0.6, 0.9])*i*kilojoules_per_mole for i in range(numStates)]
+
+        def exchanges(repex):
+            history = []
+            for i in range(20):
+                repex.currentIteration = i
+                repex.replicaStateEnergy = energy
+                repex.exchangeReplicas()
+                history.append(list(repex.replicaStateIndex))
+            return history
+
+        for scheme in ['metropolis', 'neighbors', 'gibbs']:
+            history1 = exchanges(ReplicaExchangeSampler(states, simulation, 1, exchangeScheme=scheme, randomSeed=10))
+            history2 = exchanges(ReplicaExchangeSampler(states, simulation, 1, exchangeScheme=scheme, randomSeed=10))
+            self.assertEqual(history1, history2)
+            random.seed(5)
+            history1 = exchanges(ReplicaExchangeSampler(states, simulation, 1, exchangeScheme=scheme))
+            random.seed(5)
+            history2 = exchanges(ReplicaExchangeSampler(states, simulation, 1, exchangeScheme=scheme))
+            self.assertEqual(history1, history2)
+
+    def testBinaryReporter(self):
+        """Test writing the log and energies of a replica exchange simulation in binary format."""
+        system = System()
+        system.addParticle(1.0)
+        force = CustomExternalForce('0.5*k*x*x')
+        force.addGlobalParameter('k', 1.0)
+        force.addParticle(0)
+        system.addForce(force)
+        states = [{'k':k} for k in [10.0, 20.0, 40.0]]
+        stateIndices = []
+        energies = []
+
+        def report(sampler):
+            if sampler.currentIteration % 2 == 0:
+                stateIndices.append(sampler.replicaStateIndex[:])
+                energies.append(sampler.replicaReducedEnergy.copy())
+
+        with tempfile.TemporaryDirectory() as directory:
+            for resume in [False, True]:
+                integrator = LangevinIntegrator(300*kelvin, 10/picosecond, 0.01*picosecond)
+                simulation = Simulation(Topology(), system, integrator, Platform.getPlatform('Reference'))
+                simulation.context.setPositions([Vec3(0, 0, 0)])
+                sampler = ReplicaExchangeSampler(states, simulation, 5)
+                reporter = ReplicaExchangeReporter(directory, 2, sampler, trajectoryPerState=False, energy=True, resume=resume, dataFormat='binary')
+                sampler.reporters.append(reporter)
+                sampler.reporters.append(report)
+                if resume:
+                    self.assertEqual(10, sampler.currentIteration)
+                    self.assertEqual(stateIndices[-1], sampler.replicaStateIndex)
+                sampler.simulate(10)
+                del sampler
+                del reporter
+            self.assertFalse(os.path.exists(os.path.join(directory, 'log.csv')))
+            data = ReplicaExchangeReporter.loadData(directory)
+            self.assertEqual(list(range(2, 21, 2)), data['iteration'].tolist())
+            self.assertEqual([5*i for i in range(2, 21, 2)], data['step'].tolist())
+            self.assertEqual(stateIndices, data['stateIndex'].tolist())
+            self.assertTrue(np.array_equal(np.array(energies), data['energy']))
+
+    def testSnapshots(self):
+        """Test saving and restoring the state of a Context with ContextSnapshot."""
+        system = System()
+        for i in range(3):
+            system.addParticle(1.0)
+        force = CustomExternalForce('k*(x*x+y*y+z*z)')
+        force.addGlobalParameter('k', 1.0)
+        for i in range(3):
+            force.addParticle(i)
+        system.addForce(force)
+        system.setDefaultPeriodicBoxVectors(Vec3(2, 0, 0), Vec3(0, 2, 0), Vec3(0, 0, 2))
+        integrator = CustomIntegrator(0.001)
+        integrator.addGlobalVariable('a', 1.0)
+        integrator.addPerDofVariable('b', 0.0)
+        integrator.addUpdateContextState()
+        context = Context(system, integrator, Platform.getPlatform('Reference'))
+        context.setPositions([Vec3(0.1, 0.2, 0.3), Vec3(0.4, 0.5, 0.6), Vec3(0.7, 0.8, 0.9)])
+        context.setVelocitiesToTemperature(300*kelvin)
+        context.setParameter('k', 2.5)
+        context.setTime(1.5)
+        context.setStepCount(10)
+        integrator.setGlobalVariableByName('a', 3.0)
+        integrator.setPerDofVariableByName('b', [Vec3(1, 2, 3)]*3)
+        state = context.getState(positions=True, velocities=True, parameters=True)
+        for snapshot in [ContextSnapshot.fromContext(context), ContextSnapshot.load(ContextSnapshot.fromContext(context).save())]:
+            context.setPositions([Vec3(0, 0, 0)]*3)
+            context.setVelocities([Vec3(0, 0, 0)]*3)
+            context.setParameter('k', 1.0)
+            context.setTime(0.0)
+            context.setStepCount(0)
+            integrator.setGlobalVariableByName('a', 0.0)
+            integrator.setPerDofVariableByName('b', [Vec3(0, 0, 0)]*3)
+            snapshot.applyTo(context)
+            restored = context.getState(positions=True, velocities=True, parameters=True)
+            self.assertTrue(np.array_equal(state.getPositionsArray(), restored.getPositionsArray()))
+            self.assertTrue(np.array_equal(state.getVelocitiesArray(), restored.getVelocitiesArray()))
+            self.assertEqual(2.5, restored.getParameters()['k'])
+            self.assertEqual(10, restored.getStepCount())
+            self.assertAlmostEqual(1.5, restored.getTime().value_in_unit(picoseconds))
+            self.assertEqual(3.0, integrator.getGlobalVariableByName('a'))
+            self.assertEqual([Vec3(1, 2, 3)]*3, integrator.getPerDofVariableByName('b'))
+            self.assertTrue(np.array_equal(state.getPeriodicBoxVectors(asNumpy=True).value_in_unit(nanometers), snapshot.getPeriodicBoxVectors(asNumpy=True).value_in_unit(nanometers)))
+            self.assertEqual(state.getPositions().value_in_unit(nanometers), snapshot.getPositions().value_in_unit(nanometers))
+
+    def testSnapshotIntegratorState(self):
+        """Test that ContextSnapshot saves the internal state of any integrator that reports integrator parameters."""
+        system = System()
+        for i in range(4):
+            system.addParticle(1.0)
+        system.addForce(HarmonicBondForce())
+        system.getForce(0).addBond(0, 2, 0.2, 1000.0)
+        drude = DrudeForce()
+        drude.addParticle(1, 0, -1, -1, -1, -1.0, 0.001, 1, 1)
+        drude.addParticle(3, 2, -1, -1, -1, -1.0, 0.001, 1, 1)
+        system.addForce(drude)
+        positions = [Vec3(0, 0, 0), Vec3(0.01, 0, 0), Vec3(0.2, 0, 0), Vec3(0.21, 0, 0)]
+
+        # A plugin integrator with internal state should have it saved and restored.
+
+        integrator = DrudeNoseHooverIntegrator(300, 10, 1, 100, 0.001)
+        context = Context(system, integrator, Platform.getPlatform('Reference'))
+        context.setPositions(positions)
+        context.setVelocitiesToTemperature(300*kelvin)
+        integrator.step(10)
+        snapshot = ContextSnapshot.load(ContextSnapshot.fromContext(context).save())
+        self.assertIsNotNone(snapshot.integratorState)
+        energy = integrator.computeHeatBathEnergy()
+        integrator.step(10)
+        self.assertNotEqual(energy, integrator.computeHeatBathEnergy())
+        snapshot.applyTo(context)
+        self.assertEqual(energy, integrator.computeHeatBathEnergy())
+
+        # An integrator without internal state should not store anything.
+
+        context = Context(system, LangevinMiddleIntegrator(300, 1, 0.001), Platform.getPlatform('Reference'))
+        context.setPositions(positions)
+        self.assertIsNone(ContextSnapshot.fromContext(context).integratorState)
+
     def testReporter(self):
         """Test reporting output from a replica exchange simulation."""
         # Set up a replica exchange simulation.
@@ -127,9 +430,13 @@ class TestReplicaExchangeSampler(unittest.TestCase):
             # Check that it loaded the checkpoints correctly.
 
             for i in range(len(states)):
-                xml1 = XmlSerializer.serialize(sampler.replicaConformation[i])
-                xml2 = open(os.path.join(directory, f'checkpoint_{i}.xml')).read()
-                self.assertEqual(xml1, xml2)
+                conf1 = sampler.replicaConformation[i]
+                with open(os.path.join(directory, f'checkpoint_{i}.npz'), 'rb') as input:
+                    conf2 = ContextSnapshot.load(input.read())
+                self.assertTrue(np.array_equal(conf1.positions, conf2.positions))
+                self.assertTrue(np.array_equal(conf1.velocities, conf2.velocities))
+                self.assertEqual(conf1.getStepCount(), conf2.getStepCount())
+                self.assertEqual(conf1.getParameters(), conf2.getParameters())
 
             # Generate some more output.
 
@@ -146,6 +453,12 @@ class TestReplicaExchangeSampler(unittest.TestCase):
                 for j in range(len(states)):
                     self.assertEqual(stateIndices[i][j], fields[j+2])
 
+            # Check that loadData() returns the same information.
+
+            data = ReplicaExchangeReporter.loadData(directory)
+            self.assertEqual(stateIndices, data['stateIndex'].tolist())
+            self.assertTrue(np.allclose(np.loadtxt(os.path.join(directory, 'energy.csv'), delimiter=',').reshape(-1, len(states), len(states)), data['energy']))
+
             # Check the energy file.
 
             energy = np.loadtxt(os.path.join(directory, 'energy.csv'), delimiter=',').reshape(-1, len(states), len(states))
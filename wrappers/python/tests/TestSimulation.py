@@ -1,5 +1,9 @@
+import os
+import subprocess
+import sys
 import unittest
 import tempfile
+import threading
 from datetime import datetime, timedelta
 from io import BytesIO, StringIO
 from openmm import *
@@ -80,24 +84,59 @@ class TestSimulation(unittest.TestCase):
         simulation.context.setVelocitiesToTemperature(300*kelvin)
         initialState = simulation.context.getState(getPositions=True, getVelocities=True)
 
-        # Create a state.
+        for format in ['xml', 'binary']:
+            simulation.context.setState(initialState)
 
-        filename = tempfile.mktemp()
-        simulation.saveState(filename)
+            # Create a state.
 
-        # Take a few steps so the positions and velocities will be different.
+            filename = tempfile.mktemp()
+            simulation.saveState(filename, format=format)
 
-        simulation.step(2)
-        state = simulation.context.getState(getPositions=True, getVelocities=True)
-        self.assertNotEqual(initialState.getPositions(), state.getPositions())
-        self.assertNotEqual(initialState.getVelocities(), state.getVelocities())
+            # Take a few steps so the positions and velocities will be different.
 
-        # Reload the state and see if it resets them correctly.
+            simulation.step(2)
+            state = simulation.context.getState(getPositions=True, getVelocities=True)
+            self.assertNotEqual(initialState.getPositions(), state.getPositions())
+            self.assertNotEqual(initialState.getVelocities(), state.getVelocities())
 
-        simulation.loadState(filename)
-        state = simulation.context.getState(getPositions=True, getVelocities=True)
-        self.assertEqual(initialState.getPositions(), state.getPositions())
-        self.assertEqual(initialState.getVelocities(), state.getVelocities())
+            # Reload the state and see if it resets them correctly.
+
+            simulation.loadState(filename)
+            state = simulation.context.getState(getPositions=True, getVelocities=True)
+            self.assertEqual(initialState.getPositions(), state.getPositions())
+            self.assertEqual(initialState.getVelocities(), state.getVelocities())
+
+            # Also try loading it from a file object.
+
+            simulation.step(2)
+            with open(filename, 'rb') as f:
+                simulation.loadState(f)
+            state = simulation.context.getState(getPositions=True, getVelocities=True)
+            self.assertEqual(initialState.getPositions(), state.getPositions())
+            os.remove(filename)
+        with self.assertRaises(ValueError):
+            simulation.saveState(BytesIO(), format='json')
+
+    def testLoadFiles(self):
+        """Test creating a Simulation from serialized files, including compressed ones."""
+        pdb = PDBFile('systems/alanine-dipeptide-implicit.pdb')
+        ff = ForceField('amber99sb.xml')
+        system = ff.createSystem(pdb.topology)
+        integrator = VerletIntegrator(0.001*picoseconds)
+        with tempfile.TemporaryDirectory() as tempdir:
+            systemFile = os.path.join(tempdir, 'system.xml.gz')
+            integratorFile = os.path.join(tempdir, 'integrator.xml')
+            stateFile = os.path.join(tempdir, 'state.xml.gz')
+            XmlSerializer.save(system, systemFile)
+            XmlSerializer.save(integrator, integratorFile)
+            context = Context(system, VerletIntegrator(0.001*picoseconds), Platform.getPlatform('Reference'))
+            context.setPositions(pdb.positions)
+            state = context.getState(positions=True)
+            XmlSerializer.save(state, stateFile)
+            simulation = Simulation(pdb.topology, systemFile, integratorFile, Platform.getPlatform('Reference'), state=stateFile)
+            self.assertEqual(XmlSerializer.serialize(system), XmlSerializer.serialize(simulation.system))
+            self.assertIsInstance(simulation.integrator, VerletIntegrator)
+            self.assertEqual(state.getPositions(), simulation.context.getState(positions=True).getPositions())
 
     def testSafeSave(self):
         """Test that the safe saving feature works as expected."""
@@ -269,6 +308,161 @@ class TestSimulation(unittest.TestCase):
         
         simulation.step(500)
 
+    def testAsyncReporting(self):
+        """Test generating reports on a background thread."""
+        pdb = PDBFile('systems/alanine-dipeptide-implicit.pdb')
+        ff = ForceField('amber99sb.xml', 'tip3p.xml')
+        system = ff.createSystem(pdb.topology)
+        integrator = VerletIntegrator(0.001*picoseconds)
+
+        class RecordingReporter(object):
+            def __init__(self, interval, asynchronous, fail=False):
+                self.interval = interval
+                self.asynchronous = asynchronous
+                self.fail = fail
+                self.steps = []
+                self.times = []
+
+            def describeNextReport(self, simulation):
+                steps = self.interval - simulation.currentStep%self.interval
+                return {'steps':steps, 'periodic':False, 'include':['positions'], 'async':self.asynchronous}
+
+            def report(self, simulation, state):
+                if self.fail:
+                    raise ValueError('Report failed')
+                self.steps.append(simulation.currentStep)
+                self.times.append(state.getTime().value_in_unit(picoseconds))
+
+        simulation = Simulation(pdb.topology, system, integrator, Platform.getPlatform('Reference'))
+        simulation.context.setPositions(pdb.positions)
+        simulation.setAsyncReporting(True, maxPendingReports=1)
+        asyncReporter = RecordingReporter(3, True)
+        syncReporter = RecordingReporter(5, False)
+        simulation.reporters.append(asyncReporter)
+        simulation.reporters.append(syncReporter)
+        output = StringIO()
+        simulation.reporters.append(StateDataReporter(output, 10, step=True, potentialEnergy=True))
+        simulation.step(30)
+        simulation.flushReports()
+
+        # All reports should have been delivered in order, and with the correct step.
+
+        self.assertEqual(list(range(3, 31, 3)), asyncReporter.steps)
+        self.assertEqual(list(range(5, 31, 5)), syncReporter.steps)
+        for step, time in zip(asyncReporter.steps, asyncReporter.times):
+            self.assertAlmostEqual(0.001*step, time)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(['10', '20', '30'], [line.split(',')[0] for line in lines[1:]])
+
+        # An exception thrown by an asynchronous reporter should be raised by step() or flushReports().
+
+        simulation.reporters.append(RecordingReporter(2, True, fail=True))
+        with self.assertRaises(ValueError):
+            simulation.step(10)
+            simulation.flushReports()
+
+        # If the simulation loop fails while asynchronous reports are pending, its exception should take precedence
+        # over any raised by those reports, which is raised later.
+
+        class FailingReporter(RecordingReporter):
+            def report(self, simulation, state):
+                raise RuntimeError('Synchronous report failed')
+
+        simulation.reporters[-1] = RecordingReporter(1, True, fail=True)
+        simulation.reporters.append(FailingReporter(2, False))
+        with self.assertRaises(RuntimeError):
+            simulation.step(10)
+        with self.assertRaises(ValueError):
+            simulation.flushReports()
+        simulation.reporters.pop()
+
+        # Disabling asynchronous reporting should call all reporters directly.
+
+        simulation.reporters.pop()
+        simulation.setAsyncReporting(False)
+        startStep = simulation.currentStep
+        simulation.step(3)
+        self.assertEqual(1, len([step for step in asyncReporter.steps if step > startStep]))
+
+    def testAsyncReportingOverlap(self):
+        """Test that asynchronous reports keep being generated between calls to step()."""
+        pdb = PDBFile('systems/alanine-dipeptide-implicit.pdb')
+        ff = ForceField('amber99sb.xml', 'tip3p.xml')
+        system = ff.createSystem(pdb.topology)
+        integrator = VerletIntegrator(0.001*picoseconds)
+
+        class BlockingReporter(object):
+            def __init__(self):
+                self.event = threading.Event()
+                self.steps = []
+
+            def describeNextReport(self, simulation):
+                return {'steps':1, 'periodic':False, 'include':['positions'], 'async':True}
+
+            def report(self, simulation, state):
+                self.event.wait(10)
+                self.steps.append(simulation.currentStep)
+
+        simulation = Simulation(pdb.topology, system, integrator, Platform.getPlatform('Reference'))
+        simulation.context.setPositions(pdb.positions)
+        simulation.setAsyncReporting(True, maxPendingReports=3)
+        reporter = BlockingReporter()
+        simulation.reporters.append(reporter)
+
+        # Every report blocks, so step() must return without waiting for them.
+
+        for i in range(3):
+            simulation.step(1)
+        self.assertEqual([], reporter.steps)
+
+        # Saving a State should wait for the pending reports.
+
+        reporter.event.set()
+        simulation.saveState(StringIO())
+        self.assertEqual([1, 2, 3], reporter.steps)
+        simulation.step(2)
+        simulation.flushReports()
+        self.assertEqual([1, 2, 3, 4, 5], reporter.steps)
+        simulation.setAsyncReporting(False)
+
+    def testAsyncReportingAtExit(self):
+        """Test that pending asynchronous reports are generated when the interpreter exits."""
+        script = """
+import sys
+import time
+from openmm import *
+from openmm.app import *
+from openmm.unit import *
+
+class SlowReporter(object):
+    def __init__(self, file):
+        self.file = file
+        self.clockTimes = []
+
+    def describeNextReport(self, simulation):
+        return {'steps':1, 'periodic':False, 'include':[], 'async':True}
+
+    def report(self, simulation, state):
+        time.sleep(0.05)
+        with open(self.file, 'a') as f:
+            print(simulation.currentStep, simulation.clockTime <= time.time(), file=f)
+
+system = System()
+system.addParticle(1.0)
+simulation = Simulation(Topology(), system, VerletIntegrator(0.001), Platform.getPlatform('Reference'))
+simulation.context.setPositions([Vec3(0, 0, 0)])
+simulation.setAsyncReporting(True, maxPendingReports=10)
+simulation.reporters.append(SlowReporter(sys.argv[1]))
+simulation.step(10)
+"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'reports.txt')
+            subprocess.run([sys.executable, '-c', script, output], check=True)
+            with open(output) as f:
+                lines = f.read().split()
+        self.assertEqual([str(i) for i in range(1, 11)], lines[0::2])
+        self.assertEqual(['True']*10, lines[1::2])
+
     def testMinimizationReporter(self):
         """Test invoking a reporter during minimization."""
         pdb = PDBFile('systems/alanine-dipeptide-implicit.pdb')
@@ -5,6 +5,8 @@ from openmm.app import *
 from openmm import *
 from openmm.unit import *
 import openmm.app.element as elem
+from openmm.app.internal.neighborsearch import findNeighborPairs
+import numpy as np
 if sys.version_info >= (3, 0):
     from io import StringIO
 else:
@@ -59,5 +61,70 @@ class TestTopology(unittest.TestCase):
         self.assertEqual(internal_bonds, [ (atom_B1, atom_B2) ])
         self.assertEqual(external_bonds, [ (atom_A1, atom_B1), (atom_B2, atom_C1) ])
 
+    def test_arrays(self):
+        """Test the arrays describing the structure of a Topology."""
+        topology = PDBFile('systems/1T2Y.pdb').topology
+        atoms = list(topology.atoms())
+        self.assertEqual([atom.residue.index for atom in atoms], list(topology.getAtomResidueIndices()))
+        self.assertEqual([res.chain.index for res in topology.residues()], list(topology.getResidueChainIndices()))
+        self.assertEqual([(a1.index, a2.index) for a1, a2 in topology.bonds()], [tuple(b) for b in topology.getBondAtomIndices()])
+        self.assertEqual([atom.element.atomic_number for atom in atoms], list(topology.getAtomicNumbers()))
+        offsets, neighbors = topology.getBondedAtomIndices()
+        bonded = [set() for atom in atoms]
+        for a1, a2 in topology.bonds():
+            bonded[a1.index].add(a2.index)
+            bonded[a2.index].add(a1.index)
+        for i in range(len(atoms)):
+            self.assertEqual(sorted(bonded[i]), list(neighbors[offsets[i]:offsets[i+1]]))
+        with self.assertRaises(ValueError):
+            topology.getAtomResidueIndices()[0] = 1
+
+        # Residue bond queries should agree with a search over all bonds.
+
+        for residue in topology.residues():
+            atoms = set(residue.atoms())
+            self.assertEqual(list(residue.bonds()), [b for b in topology.bonds() if b[0] in atoms or b[1] in atoms])
+            self.assertEqual(list(residue.internal_bonds()), [b for b in topology.bonds() if b[0] in atoms and b[1] in atoms])
+            self.assertEqual(list(residue.external_bonds()), [b for b in topology.bonds() if (b[0] in atoms) != (b[1] in atoms)])
+
+        # Adding to the Topology should update the arrays.
+
+        residue = topology.addResidue('HOH', topology.addChain())
+        o = topology.addAtom('O', element.oxygen, residue)
+        h = topology.addAtom('H1', element.hydrogen, residue)
+        topology.addBond(o, h)
+        self.assertEqual(topology.getNumAtoms(), len(topology.getAtomResidueIndices()))
+        self.assertEqual([o.index, h.index], list(topology.getBondAtomIndices()[-1]))
+        self.assertEqual([(o, h)], list(residue.internal_bonds()))
+
+    def test_disulfide_bonds(self):
+        """Test identifying disulfide bonds from positions."""
+        topology = Topology()
+        chain = topology.addChain()
+        sg = []
+        for i in range(5):
+            residue = topology.addResidue('CYS', chain)
+            topology.addAtom('CA', element.carbon, residue)
+            sg.append(topology.addAtom('SG', element.sulfur, residue))
+        sgPositions = [Vec3(0, 0, 0), Vec3(0, 0, 1.0), Vec3(0, 0, 1.2), Vec3(0, 0, 1.45), Vec3(0, 0, 5)]
+        positions = []
+        for pos in sgPositions:
+            positions += [pos+Vec3(0.15, 0, 0), pos]
+        topology.createDisulfideBonds(positions*nanometers)
+
+        # SG 2 is close to both SG 1 and SG 3, but is bonded to the closer one.  That leaves nothing
+        # within range for SG 3.  SG 0 and SG 4 are too far from all others.
+
+        self.assertEqual([(sg[2], sg[1])], list(topology.bonds()))
+
+    def test_neighbor_pairs(self):
+        """Test finding pairs of nearby points."""
+        points1 = np.random.random((200, 3))*3
+        points2 = np.random.random((150, 3))*3
+        index1, index2, distance = findNeighborPairs(points1, points2, 0.4)
+        expected = [(i, j) for i in range(len(points1)) for j in range(len(points2)) if np.linalg.norm(points1[i]-points2[j]) < 0.4]
+        self.assertEqual(expected, list(zip(index1, index2)))
+        self.assertTrue(np.allclose(distance, np.linalg.norm(points1[index1]-points2[index2], axis=1)))
+
 if __name__ == '__main__':
     unittest.main()
@@ -233,6 +233,93 @@ class TestUnits(QuantityTestCase):
         self.assertEqual(i.value_in_unit(u.millimeters), 50)
         self.assertEqual(i / u.millimeters, 50)
 
+    def testStripUnits(self):
+        """ Tests strip_units and conversions of lists of Vec3 """
+        from openmm import Vec3
+        positions = [Vec3(1, 2, 3), Vec3(4, 5, 6)]
+        q = u.Quantity(positions, u.nanometers)
+        self.assertIs(u.strip_units(q, u.nanometers), positions)
+        self.assertEqual(u.strip_units(q, u.angstroms), [Vec3(10, 20, 30), Vec3(40, 50, 60)])
+        self.assertIs(u.strip_units(positions, u.nanometers), positions)
+        # value_in_unit must still return an independent list
+        value = q.value_in_unit(u.nanometers)
+        self.assertEqual(value, positions)
+        self.assertIsNot(value, positions)
+        value[0] = Vec3(0, 0, 0)
+        self.assertEqual(q[0], Vec3(1, 2, 3)*u.nanometers)
+        # Building a Quantity from a list of Quantities
+        q = u.Quantity([p*u.nanometers for p in positions])
+        self.assertEqual(q.unit, u.nanometers)
+        self.assertEqual(q._value, positions)
+        q = u.Quantity([1*u.nanometers, 2*u.angstroms])
+        self.assertEqual(q.unit, u.nanometers)
+        self.assertAlmostEqualQuantities(q, [1, 0.2]*u.nanometers)
+
+    def testInternedUnits(self):
+        """ Tests that equal Units produced by operations are the same object """
+        self.assertIs(u.nanometer*u.nanometer, u.nanometer**2)
+        self.assertIs(u.meter/u.second, u.meter*u.second**-1)
+        self.assertIs((u.nanometer**2).sqrt(), (u.nanometer**4).sqrt().sqrt())
+        q = (2*u.nanometers)*(3*u.nanometers)
+        self.assertIs(q.unit, u.nanometer**2)
+        self.assertEqual(q, 6*u.nanometers**2)
+        self.assertEqual((6*u.nanometers)/(2*u.angstroms), 30)
+        self.assertTrue((u.meter/u.second).is_compatible(u.angstrom/u.picosecond))
+        self.assertFalse((u.meter/u.second).is_compatible(u.meter))
+        self.assertTrue((u.meter/u.angstrom).is_dimensionless())
+
+    def testOperationCaching(self):
+        """ Tests that repeated Unit and Quantity arithmetic gives identical results """
+        a = 2.5*u.nanometers
+        b = 1.5*u.picoseconds
+        unit = u.nanometer*u.picosecond
+        self.assertIs(unit, u.nanometer*u.picosecond)
+        self.assertEqual(unit, u.picosecond*u.nanometer)
+        for i in range(3):
+            self.assertEqual(a*b, 3.75*unit)
+            self.assertIs((a*b).unit, unit)
+            self.assertAlmostEqualQuantities(a/b, (2.5/1.5)*u.nanometer/u.picosecond)
+            self.assertIs((a/b).unit, (a/b).unit)
+            self.assertEqual(a*2.0, 5.0*u.nanometers)
+            self.assertIs((a*2.0).unit, a.unit)
+            self.assertIs(u.nanometer**3, u.nanometer**3)
+            self.assertEqual((1.0*u.nanometer**3).value_in_unit(u.angstrom**3), 1000.0)
+
+    def testOperationOverhead(self):
+        """ Measures the time per operation for common Unit and Quantity arithmetic """
+        import timeit
+        a = 2.5*u.nanometers
+        b = 1.5*u.picoseconds
+        c = 3.0*u.angstroms
+        operations = {
+            'unit*unit': lambda: u.nanometer*u.picosecond,
+            'unit.is_compatible': lambda: u.nanometer.is_compatible(u.angstrom),
+            'quantity*scalar': lambda: a*2.0,
+            'quantity*quantity': lambda: a*b,
+            'quantity/quantity': lambda: a/b,
+            'quantity+quantity': lambda: a+c,
+            'value_in_unit': lambda: a.value_in_unit(u.angstroms),
+        }
+        # Timings depend on the machine and its load, so they are only reported, never checked.
+        for name, operation in operations.items():
+            count = 1000
+            seconds = min(timeit.repeat(operation, number=count, repeat=3))/count
+            print('%s: %g microseconds per operation' % (name, seconds*1e6))
+
+    def testInternedUnitStrings(self):
+        """ Tests that interning Units does not change how they are printed """
+        unit = u.dalton*u.attoliter/u.mole
+        self.assertEqual(str(1.0*unit), str(1.0*u.Unit(dict(unit.iter_base_or_scaled_units()))))
+        self.assertEqual(str(1.0*unit), str(1.0*u.attoliter*u.dalton/u.mole))
+        self.assertEqual(str(u.kilojoule/(u.nanometer*u.mole)), 'kilojoule/(nanometer*mole)')
+        self.assertEqual(str(6*u.angstrom*u.kilocalorie/u.mole), '6 A kcal/mol')
+
+        # A different base unit with the same name must keep its own symbol.
+
+        custom = u.Unit({u.BaseUnit(u.nanometer_base_unit.dimension, 'nanometer', 'NM'): 1.0})
+        self.assertEqual(str(1*(custom**4).sqrt()), '1 NM**2')
+        self.assertEqual(str(1*(u.nanometer**4).sqrt()), '1 nm**2')
+
     def testCollectionQuantities(self):
         """ Tests the use of collections as Quantity values """
         s = [1, 2, 3] * u.centimeters
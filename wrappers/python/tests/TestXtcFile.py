@@ -1,4 +1,5 @@
 __author__ = "Raul P. Pelaez"
+import io
 import sys
 import os
 import unittest
@@ -190,6 +191,88 @@ class TestXtcFile(unittest.TestCase):
                     * unit.angstroms
                 )
 
+    def testBufferedWrites(self):
+        """Test writing frames in batches, and changing the step size of frames that have already been written."""
+        from openmm.app.internal.xtc_utils import get_xtc_nframes
+
+        with tempfile.TemporaryDirectory() as temp:
+            fname = os.path.join(temp, 'traj.xtc')
+            pdbfile = app.PDBFile("systems/alanine-dipeptide-implicit.pdb")
+            natom = len(list(pdbfile.topology.atoms()))
+            xtc = app.XTCFile(fname, pdbfile.topology, 0.001, interval=500000000, bufferFrames=3)
+            coords = np.random.random((7, natom, 3))
+
+            # Frames are written three at a time, except that writing the fifth frame exceeds the range
+            # of a 32 bit integer, which causes all buffered frames to be written so the steps can be changed.
+
+            expectedFrames = [0, 0, 3, 3, 4, 4, 7]
+            for i in range(7):
+                xtc.writeModel(coords[i]*unit.nanometers)
+                if expectedFrames[i] == 0:
+                    self.assertEqual(0, os.path.getsize(fname))
+                else:
+                    self.assertEqual(expectedFrames[i], get_xtc_nframes(fname.encode("utf-8")))
+            xtc.close()
+            coords_read, _, time, step = read_xtc(fname.encode("utf-8"))
+            self.assertTrue(np.allclose(coords_read, coords.transpose(1, 2, 0), atol=1e-3))
+            self.assertTrue(np.array_equal(np.arange(7), step))
+            self.assertTrue(np.allclose(np.arange(7)*500000, time, rtol=1e-5))
+
+    def testRead(self):
+        """Test reading frames from an XTC file, and updating the index when frames are added."""
+        with tempfile.TemporaryDirectory() as temp:
+            fname = os.path.join(temp, 'traj.xtc')
+            pdbfile = app.PDBFile("systems/alanine-dipeptide-implicit.pdb")
+            natom = pdbfile.topology.getNumAtoms()
+            positions = np.random.random((10, natom, 3))
+            xtc = app.XTCFile(fname, pdbfile.topology, 0.002, interval=10)
+            for i in range(6):
+                xtc.writeModel(positions[i]*unit.nanometers)
+            traj = app.XTCFile.read(fname)
+            self.assertEqual(6, len(traj))
+            self.assertTrue(os.path.isfile(fname+'.index.npz'))
+            self.assertTrue(np.allclose(positions[4], traj[4].value_in_unit(unit.nanometers), atol=1e-3))
+            atoms = [5, 1, 3]
+            self.assertTrue(np.allclose(positions[::2][:, atoms], traj[::2, atoms].value_in_unit(unit.nanometers), atol=1e-3))
+            self.assertEqual(50, traj.getStep(-1))
+            self.assertAlmostEqual(0.1, traj.getTime(5).value_in_unit(unit.picoseconds), places=5)
+            self.assertIsNone(traj.getPeriodicBoxVectors(0))
+
+            # Add more frames.  Opening the file again should find them.
+
+            for i in range(6, 10):
+                xtc.writeModel(positions[i]*unit.nanometers)
+            xtc.close()
+            traj = app.XTCTrajectory(fname)
+            self.assertEqual(10, len(traj))
+            self.assertEqual(list(range(0, 100, 10)), [traj.getStep(i) for i in range(10)])
+            self.assertTrue(np.allclose(positions[-4:, 0], traj[-4:, 0].value_in_unit(unit.nanometers), atol=1e-3))
+
+    def testTruncatedHeader(self):
+        """Test reading a file whose last frame header has only been partly written."""
+        with tempfile.TemporaryDirectory() as temp:
+            fname = os.path.join(temp, 'traj.xtc')
+            pdbfile = app.PDBFile("systems/alanine-dipeptide-implicit.pdb")
+            natom = pdbfile.topology.getNumAtoms()
+            positions = np.random.random((3, natom, 3))
+            xtc = app.XTCFile(fname, pdbfile.topology, 0.002, interval=10)
+            for i in range(3):
+                xtc.writeModel(positions[i]*unit.nanometers)
+            xtc.close()
+            with open(fname, 'rb') as f:
+                data = f.read()
+
+            # Cut off the header of a fourth frame in the middle of the magic number, the number of atoms,
+            # the step, the time, and the box.  The incomplete frame should be ignored.
+
+            for length in [2, 6, 10, 14, 30]:
+                truncated = os.path.join(temp, f'truncated{length}.xtc')
+                with open(truncated, 'wb') as f:
+                    f.write(data+data[:length])
+                traj = app.XTCTrajectory(truncated)
+                self.assertEqual(3, len(traj))
+                self.assertTrue(np.allclose(positions[-1], traj[-1].value_in_unit(unit.nanometers), atol=1e-3))
+
     def testAppend(self):
         from openmm.app.internal.xtc_utils import read_xtc
 
@@ -245,6 +328,36 @@ class TestXtcFile(unittest.TestCase):
             del simulation
             del xtc
 
+    def testBufferedReporter(self):
+        """Test that frames buffered by an XTCReporter are written when reports are flushed."""
+        from openmm.app.internal.xtc_utils import get_xtc_nframes
+
+        with tempfile.TemporaryDirectory() as temp:
+            fname = os.path.join(temp, 'traj.xtc')
+            pdb = app.PDBFile("systems/alanine-dipeptide-implicit.pdb")
+            ff = app.ForceField("amber99sb.xml", "tip3p.xml")
+            system = ff.createSystem(pdb.topology)
+            integrator = mm.VerletIntegrator(0.001 * unit.picoseconds)
+            simulation = app.Simulation(pdb.topology, system, integrator, mm.Platform.getPlatform("Reference"))
+            xtc = app.XTCReporter(fname, 2, bufferFrames=4)
+            simulation.reporters.append(xtc)
+            simulation.context.setPositions(pdb.positions)
+            simulation.step(10)
+            self.assertEqual(4, get_xtc_nframes(fname.encode("utf-8")))
+
+            # Saving a checkpoint should write the buffered frame, so the trajectory is not behind the checkpoint.
+
+            simulation.saveCheckpoint(io.BytesIO())
+            self.assertEqual(5, get_xtc_nframes(fname.encode("utf-8")))
+            simulation.step(2)
+            xtc.close()
+            _, _, time, step = read_xtc(fname.encode("utf-8"))
+            self.assertTrue(np.array_equal(np.arange(2, 13, 2), step))
+            xtc.close()
+            simulation.flushReports()
+            del simulation
+            del xtc
+
     def testAtomSubset(self):
         """Test writing an XTC file containing a subset of atoms"""
         with tempfile.TemporaryDirectory() as temp: